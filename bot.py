@@ -3,27 +3,45 @@ import ctypes
 import ctypes.util
 import asyncio
 import os
-import aiofiles
 from discord.ext import commands
-from gtts import gTTS
 from groq import Groq
 import time
 import signal
 import sys
-
-try:
-    import orjson as json
-    _ORJSON = True
-except ImportError:
-    import json
-    _ORJSON = False
+from cogs.utils.dispatch import RelayDispatcher, WebhookCache
+from cogs.utils.dedupe import MessageDedupe
+from cogs.utils.lazy import LazyCogLoader
+from cogs.utils.startup import StartupProfiler, discover_cogs
+from cogs.utils.state_store import StateStore
+from cogs.utils.errors import CommandErrors
+from cogs.utils.metrics import Metrics
+from cogs.utils.watchdog import LoopWatchdog
+from cogs.utils.render import RenderService
+from cogs.utils.web import WebClient
+from cogs.utils.avatars import AvatarCache
+from cogs.utils.member_index import MemberIndex
+from cogs.utils.reactions import ReactionDispatcher
+from cogs.utils.logs import setup_logging
+from cogs.utils.memory import MemoryAccountant, format_bytes, parse_budgets, process_rss
+from cogs.utils.tts import CommandBackend, GTTSBackend, TTSPipeline
+from cogs.utils.voice import PRIORITY_TTS, VoiceBusy, VoiceManager, VoiceProducer
+from cogs.utils.overload import CRITICAL, HEAVY, INTERACTIVE, OverloadController
+from cogs.utils.scheduler import Scheduler
+from cogs.utils.registry import AutoShardedBot, Bot, CommandRegistry
+from cogs.utils.uploads import UploadGovernor
+from cogs.utils.ipc import IPCClient
+from cogs.utils.cluster import ClusterSupervisor, recommended_shard_count, share_cooldowns, shared_cooldown
+from cogs.utils import schemas, serial
 
 _CHANNEL_ID = 1132395937180950599
 _AUTH_USER_ID = 103873926622363648
 _EMBED_COLOR = 0x0099ff
 _MAX_DEL_MSG = 5
 _SAVE_CD = 5
-_CLEANUP_INT = 1800
+_DEDUPE_WINDOW = 1800
+_DEDUPE_CAP = 100_000
+_DEDUPE_GENS = 4
+_CLEANUP_INT = _DEDUPE_WINDOW // _DEDUPE_GENS
 _MAX_MSG = 50
 _MAX_CONN = 2
 _CD_RATE = 1
@@ -31,16 +49,64 @@ _CD_PER = 120
 _JACKYBOT_CHAT = "jackybot-chat"
 _CONN_MASK = _MAX_CONN - 1
 _NS_TO_MS = 1_000_000
-_RATE_SLEEP = 0.2
-_JSON_SEP = (',', ':')
 _DATA_PATH = 'data/jackychat_channels.json'
+# Cluster mode (see cogs/utils/cluster.py). JACKYBOT_CLUSTERS > 1 makes this process the
+# supervisor; the workers it starts get their shard range and IPC port in the environment.
+_CLUSTERS = int(os.environ.get('JACKYBOT_CLUSTERS', '1'))
+_CLUSTER_ID = int(os.environ.get('JACKYBOT_CLUSTER_ID', '0'))
+_SHARD_COUNT = int(os.environ.get('JACKYBOT_SHARD_COUNT', '0'))
+_SHARD_IDS = [int(s) for s in os.environ.get('JACKYBOT_SHARD_IDS', '').split(',') if s.strip()]
+_IPC_HOST = '127.0.0.1'
+_IPC_PORT = int(os.environ.get('JACKYBOT_IPC_PORT', '0'))
+_WEBHOOK_PATH = f'data/jackychat_webhooks.{_CLUSTER_ID}.json' if _IPC_PORT else 'data/jackychat_webhooks.json'
+_MEMBER_INDEX_PATH = f'data/member_index.{_CLUSTER_ID}.bin' if _IPC_PORT else 'data/member_index.bin'
+_USE_WEBHOOKS = os.environ.get('JACKYCHAT_WEBHOOKS', '').lower() in ('1', 'true', 'yes')
+# The web dashboard reads the command list from here; one cluster writes it.
+_COMMANDS_EXPORT_PATH = 'data/commands.json' if _CLUSTER_ID == 0 else None
 _DISABLED_COGS = frozenset(('image_gen', 'model_manager', 'music', 'quote', 'server_manager'))
-
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-intents.voice_states = True
-bot = commands.Bot(command_prefix='!', intents=intents, chunk_guilds_at_startup=False, case_insensitive=True, max_messages=_MAX_MSG)
+# Cogs with heavy imports (torch, transformers, scipy, numpy, playwright) are stubbed at
+# startup and imported on first use. The flag says whether their listeners should also
+# trigger the import; record's voice-state listener only tidies its own sessions.
+_LAZY_COGS = {'ai_audio': True, 'record': False, 'steamos_updates': True}
+# Lazy cogs that run background pollers are still loaded, just after on_ready.
+_DEFERRED_COGS = ('steamos_updates',)
+_DEFERRED_DELAY = 60
+_PROFILE_STARTUP = os.environ.get('JACKYBOT_PROFILE_STARTUP', '').lower() in ('1', 'true', 'yes')
+_PROFILE_PATH = 'data/startup_profile.json'
+_STORE_PATH = 'data/jackybot.db'
+_METRICS_HOST = '127.0.0.1'
+_METRICS_PORT = int(os.environ.get('JACKYBOT_METRICS_PORT', '9108'))
+if _METRICS_PORT:
+    _METRICS_PORT += _CLUSTER_ID
+_STALL_MS = int(os.environ.get('JACKYBOT_STALL_MS', '250'))
+_STALL_LOG = 'loop_stalls.log'
+_HTTP_CACHE_DIR = 'data/http_cache'
+_AVATAR_CACHE_MB = int(os.environ.get('JACKYBOT_AVATAR_CACHE_MB', '32'))
+_AVATAR_DISK_DIR = 'data/avatar_cache' if os.environ.get('JACKYBOT_AVATAR_DISK', '').lower() in ('1', 'true', 'yes') else None
+_RENDER_WORKERS = int(os.environ.get('JACKYBOT_RENDER_WORKERS', '0')) or None
+_LOG_LEVEL = os.environ.get('JACKYBOT_LOG_LEVEL', 'INFO').upper()
+_LOG_PATH = os.environ.get('JACKYBOT_LOG_FILE') or None
+_LOG_FILES = {'SteamOSUpdates': 'steamos_bot.log'}
+_LOG_SAMPLE = {'jackybot.context.budget': int(os.environ.get('JACKYBOT_LOG_SAMPLE_CONTEXT', '20'))}
+_TTS_COMMAND = os.environ.get('JACKYBOT_TTS_COMMAND', '').strip()
+_TTS_FORMAT = os.environ.get('JACKYBOT_TTS_FORMAT', 'wav')
+_TTS_CACHE_MB = int(os.environ.get('JACKYBOT_TTS_CACHE_MB', '16'))
+# Where Lavalink fetches TTS clips to play them over the music connection; served by the metrics endpoint.
+_TTS_URL = os.environ.get('JACKYBOT_TTS_URL', f'http://{_METRICS_HOST}:{_METRICS_PORT}/tts' if _METRICS_PORT else '') or None
+_VOICE_LINGER = float(os.environ.get('JACKYBOT_VOICE_LINGER', '2'))
+_MEMORY_INTERVAL = float(os.environ.get('JACKYBOT_MEMORY_INTERVAL', '600'))
+_MEMORY_BUDGETS = parse_budgets(os.environ.get('JACKYBOT_MEMORY_BUDGETS', ''))
+_MEMORY_DEFAULT_MB = int(os.environ.get('JACKYBOT_MEMORY_DEFAULT_MB', '64'))
+_TRACEMALLOC_FRAMES = int(os.environ.get('JACKYBOT_TRACEMALLOC', '0'))
+_OVERLOAD_LAG_MS = int(os.environ.get('JACKYBOT_OVERLOAD_LAG_MS', '250'))
+_OVERLOAD_CPU = float(os.environ.get('JACKYBOT_OVERLOAD_CPU', '0.9'))
+_OVERLOAD_RSS_MB = int(os.environ.get('JACKYBOT_OVERLOAD_RSS_MB', '0'))
+
+# Built by create_bot(). Nothing here runs at import time, so processes that import this
+# module without starting the bot (render workers re-import the main module) stay cheap.
+bot = None
+_state = _processed = _channels = _dispatcher = _member_index = None
+_bot_user = None
 
 class ConnectionPool:
     __slots__ = ('connections', '_index')
@@ -67,51 +133,223 @@ class ConnectionPool:
                     await result
 
 class BotState:
-    __slots__ = ('jackychat_channels', 'processed_messages', 'last_save_time', 'last_cleanup_time', 'broadcast_semaphore')
+    __slots__ = ('jackychat_channels', 'processed_messages', 'last_save_time', 'last_cleanup_time', 'dispatcher')
 
     def __init__(self):
         self.jackychat_channels = {}
-        self.processed_messages = set()
+        self.processed_messages = MessageDedupe(_DEDUPE_WINDOW, _DEDUPE_CAP, _DEDUPE_GENS)
         self.last_save_time = 0.0
         self.last_cleanup_time = time.time()
-        self.broadcast_semaphore = asyncio.Semaphore(5)
-
-bot.pool = ConnectionPool()
-bot.state = BotState()
-
-_state = bot.state
-_processed = _state.processed_messages
-_channels = _state.jackychat_channels
-_semaphore = _state.broadcast_semaphore
-_bot_user = None
+        self.dispatcher = RelayDispatcher(webhooks=WebhookCache(bot, _WEBHOOK_PATH) if _USE_WEBHOOKS else None)
+
+_TTS_VOICE = VoiceProducer('tts', PRIORITY_TTS)
+
+def create_bot(logs=None):
+    """Build the bot and its services once; later calls return the same bot."""
+    global bot, _state, _processed, _channels, _dispatcher, _member_index
+    if bot is not None:
+        return bot
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    intents.voice_states = True
+    options = dict(command_prefix='!', intents=intents, chunk_guilds_at_startup=False, case_insensitive=True, max_messages=_MAX_MSG)
+    if _SHARD_COUNT:
+        bot = AutoShardedBot(shard_count=_SHARD_COUNT, shard_ids=_SHARD_IDS or None, **options)
+    else:
+        bot = Bot(**options)
+
+    bot.pool = ConnectionPool()
+    bot.state = BotState()
+    bot.lazy_cogs = LazyCogLoader(bot)
+    bot.store = StateStore(_STORE_PATH)
+    # Features register observers and handlers on this instead of on_command_error listeners.
+    bot.errors = CommandErrors(bot)
+    bot.errors.install()
+    bot.metrics = Metrics()
+    bot.metrics.install(bot)
+    bot.watchdog = LoopWatchdog(_STALL_MS, _STALL_LOG)
+    bot.render = RenderService(_RENDER_WORKERS)
+    bot.web = WebClient(_HTTP_CACHE_DIR)
+    bot.avatars = AvatarCache(bot.web, bot.render, _AVATAR_CACHE_MB << 20, _AVATAR_DISK_DIR)
+    bot.member_index = MemberIndex(_MEMBER_INDEX_PATH)
+    bot.member_index.install(bot)
+    bot.reactions = ReactionDispatcher(bot)
+    bot.reactions.install()
+    bot.tts = TTSPipeline(CommandBackend(_TTS_COMMAND, _TTS_FORMAT) if _TTS_COMMAND else GTTSBackend(), _TTS_CACHE_MB << 20,
+                          base_url=_TTS_URL)
+    bot.voice = VoiceManager(bot, _VOICE_LINGER)
+    bot.scheduler = Scheduler()
+    bot.registry = CommandRegistry(bot, export_path=_COMMANDS_EXPORT_PATH)
+    bot.uploads = UploadGovernor()
+    bot.overload = OverloadController(_OVERLOAD_LAG_MS / 1000, _OVERLOAD_CPU, (_OVERLOAD_RSS_MB << 20) or None)
+    bot.startup_profiler = StartupProfiler() if _PROFILE_STARTUP else None
+    bot.cluster_id = _CLUSTER_ID
+    bot.logs = logs
+    bot.ipc = IPCClient(_CLUSTER_ID, _IPC_HOST, _IPC_PORT) if _IPC_PORT else None
+    bot.memory = MemoryAccountant(bot, _MEMORY_BUDGETS, _MEMORY_DEFAULT_MB << 20, _MEMORY_INTERVAL,
+                                  tracemalloc_frames=_TRACEMALLOC_FRAMES)
+
+    _state = bot.state
+    _processed = _state.processed_messages
+    _channels = _state.jackychat_channels
+    _dispatcher = _state.dispatcher
+    _member_index = bot.member_index
+
+    bot.memory.register('bot', 'dedupe', _processed)
+    bot.memory.register('bot', 'relay_channels', _channels)
+    bot.memory.register('bot', 'relay_queue', _dispatcher)
+    bot.memory.register('bot', 'member_index', _member_index)
+    bot.memory.register('bot', 'avatar_cache', bot.avatars)
+    bot.memory.register('bot', 'tts_cache', bot.tts)
+    bot.memory.register('bot', 'reaction_counters', bot.reactions)
+    bot.memory.register('bot', 'voice_sessions', bot.voice.sessions)
+
+    # Heavy subsystems and how much each may have running and waiting. Groq keeps its own
+    # worker queue, so only its depth is read; the rest queue inside overload.slot().
+    overload = bot.overload
+    overload.register('groq', INTERACTIVE, concurrency=3, max_queue=20, depth=lambda: _groq_queue_depth(), service_time=2.0)
+    overload.register('ai_audio', HEAVY, concurrency=1, max_queue=3, service_time=30.0)
+    overload.register('image_gen', HEAVY, concurrency=1, max_queue=3, service_time=45.0)
+    overload.register('video', HEAVY, concurrency=2, max_queue=4, service_time=10.0)
+    # Recordings are already captured; their conversion is bounded but never refused.
+    overload.register('record', CRITICAL, concurrency=1, max_queue=None, service_time=10.0)
+    overload.install(bot)
+
+    bot.setup_hook = setup_hook
+    bot.event(on_ready)
+    bot.event(on_message)
+    for command in (ping, voice_diag, tts, leave, delete, relay_stats, memory, stalls, jobs):
+        bot.add_command(command)
+    return bot
 
 async def cleanup_task():
-    sleep = asyncio.sleep
-    interval = _CLEANUP_INT
-    processed = _processed
-    state = _state
-    get_time = time.time
-    while True:
-        await sleep(interval)
-        processed.clear()
-        state.last_cleanup_time = get_time()
+    _processed.expire()
+    await _member_index.save()
+    _state.last_cleanup_time = time.time()
+
+def _groq_queue_depth():
+    cog = bot.get_cog('GroqChat')
+    return cog.request_queue.qsize() if cog else 0
+
+def _groq_active_requests():
+    cog = bot.get_cog('GroqChat')
+    return cog.active_requests if cog else 0
+
+def _music_players():
+    wavelink = sys.modules.get('wavelink')
+    if wavelink is None:
+        return 0
+    player_cls = wavelink.Player
+    return sum(1 for vc in bot.voice_clients if isinstance(vc, player_cls))
+
+def _generation_jobs():
+    jobs = {}
+    audio = bot.get_cog('AIAudio')
+    jobs['ai_audio'] = 1 if audio is not None and audio.generation_lock.locked() else 0
+    return jobs
+
+async def start_metrics():
+    metrics = bot.metrics
+    gauge = metrics.gauge
+    gauge('jackybot_groq_queue_depth', _groq_queue_depth, 'Groq requests waiting for a worker.')
+    gauge('jackybot_groq_active_requests', _groq_active_requests, 'Groq requests in flight.')
+    gauge('jackybot_music_players', _music_players, 'Connected wavelink players.')
+    gauge('jackybot_generation_jobs_active', _generation_jobs, 'Model generation jobs running, by cog.')
+    gauge('jackybot_relay_queue_depth', lambda: _dispatcher.queue_depth, 'Relay embeds waiting to be sent.')
+    gauge('jackybot_dedupe_entries', lambda: len(_processed), 'Message keys in the dedupe window.')
+    gauge('jackybot_guilds', lambda: len(bot.guilds), 'Guilds the bot is in.')
+    gauge('jackybot_render_jobs_active', lambda: bot.render.active, 'Render jobs in the process pool, by cog.')
+    gauge('jackybot_http_requests_inflight', lambda: bot.web.inflight, 'Outbound HTTP requests in flight (after single-flight).')
+    gauge('jackybot_avatar_cache_bytes', lambda: bot.avatars.bytes, 'Bytes held by the in-memory avatar cache.')
+    gauge('jackybot_tts_cache_bytes', lambda: bot.tts.bytes, 'Bytes held by the TTS phrase cache.')
+    gauge('jackybot_voice_sessions', lambda: bot.voice.stats()['sessions'], 'Guilds with a voice connection held by a producer.')
+    metrics.counter('jackybot_voice_events_total', lambda: bot.voice.counters, 'Voice connects, reuses, moves, preemptions, resumes, shared clips, busy refusals and failures.')
+    metrics.histogram('jackybot_voice_connect_seconds', bot.voice.connect_latency, 'producer', 'Voice connect handshake time.')
+    gauge('jackybot_overload_pressure', lambda: bot.overload.pressure, 'Smoothed worst of loop lag, CPU and RSS over their limits.')
+    gauge('jackybot_overload_level', lambda: bot.overload.level, 'Load level: 0 normal, 1 elevated (degrade), 2 overloaded (shed).')
+    gauge('jackybot_overload_backlog', bot.overload.queue_depths, 'Running plus queued work, by subsystem.')
+    gauge('jackybot_overload_rejections', bot.overload.rejections, 'Work refused with a busy reply, by subsystem.')
+    gauge('jackybot_scheduler_jobs', bot.scheduler.job_counts, 'Scheduled background jobs, by group.')
+    gauge('jackybot_scheduler_wakeups', lambda: bot.scheduler.wakeups, 'Timer wheel wakeups since start.')
+    gauge('jackybot_scheduler_skipped', lambda: bot.scheduler.skips, 'Runs skipped because the previous run was still going, by group.')
+    gauge('jackybot_scheduler_failures', lambda: bot.scheduler.failures, 'Runs that raised, by group.')
+    metrics.histogram('jackybot_scheduler_job_seconds', bot.scheduler.runtimes, 'job', 'Run time of scheduled jobs, by group.')
+    metrics.histogram('jackybot_upload_planned_bytes', bot.uploads.planned, 'cog', 'Estimated size of each media encode, by cog.')
+    metrics.histogram('jackybot_upload_actual_bytes', bot.uploads.actual, 'cog', 'Actual size of each media encode, by cog.')
+    metrics.histogram('jackybot_upload_size_ratio', bot.uploads.accuracy, 'cog', 'Actual over estimated encode size, by cog.')
+    gauge('jackybot_upload_encodes', lambda: bot.uploads.encodes, 'Media encodes run to fit the upload limit, by cog.')
+    gauge('jackybot_upload_fallbacks', lambda: bot.uploads.fallbacks, 'Encodes over the upload limit that were retried cheaper, by cog.')
+    gauge('jackybot_upload_oversize', lambda: bot.uploads.oversize, 'Media given up on because even the cheapest encode was too big, by cog.')
+    gauge('jackybot_member_index_entries', _member_index.total, 'User IDs held by the member index.')
+    if bot.logs is not None:
+        gauge('jackybot_log_queue_depth', lambda: bot.logs.queue_depth, 'Log records waiting for the writer thread.')
+    gauge('jackybot_loop_stalls', lambda: bot.watchdog.stalls, f'Event loop stalls longer than {_STALL_MS}ms.')
+    gauge('jackybot_memory_bytes', bot.memory.by_cog, 'Retained bytes of tracked containers at the last snapshot, by cog.')
+    gauge('jackybot_memory_container_bytes', bot.memory.container_bytes, 'Retained bytes per tracked container.')
+    rss = process_rss()
+    if rss is not None:
+        gauge('jackybot_process_rss_bytes', process_rss, 'Resident set size of this process.')
+    metrics.start_lag_monitor()
+    metrics.route('/tts/{name}', bot.tts.handle)
+    if _METRICS_PORT:
+        try:
+            await metrics.start_server(_METRICS_HOST, _METRICS_PORT)
+        except OSError as e:
+            print(f"Could not start metrics endpoint on {_METRICS_HOST}:{_METRICS_PORT}: {e}")
 
 async def setup_hook():
-    listdir = os.listdir
-    disabled = _DISABLED_COGS
-    load_ext = bot.load_extension
-    cog_files = [f[:-3] for f in listdir('./cogs') if f[-3:] == '.py' and f[:-3] not in disabled]
-    results = await asyncio.gather(*(load_ext(f'cogs.{f}') for f in cog_files), return_exceptions=True)
-    for filename, result in zip(cog_files, results):
+    await asyncio.to_thread(bot.store.open)
+    await _member_index.load()
+    ipc = bot.ipc
+    if ipc is not None:
+        ipc.on('relay', _on_remote_relay)
+        share_cooldowns(bot, ipc)
+        ipc.start()
+    await start_metrics()
+    bot.watchdog.start()
+    bot.memory.start()
+    bot.overload.start(bot.scheduler, bot.metrics)
+    bot.registry.install()
+    lazy = _LAZY_COGS
+    eager, lazy_files = discover_cogs('./cogs', _DISABLED_COGS, lazy)
+    profiler = bot.startup_profiler
+    if profiler is None:
+        load_ext = bot.load_extension
+        results = await asyncio.gather(*(load_ext(f'cogs.{f}') for f in eager), return_exceptions=True)
+    else:
+        results = []
+        for filename in eager:
+            try:
+                await profiler.load_extension(bot, f'cogs.{filename}')
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+    for filename, result in zip(eager, results):
         if isinstance(result, Exception):
             print(f'Failed to load {filename}: {result}')
-    asyncio.create_task(cleanup_task())
-
-bot.setup_hook = setup_hook
+    loader = bot.lazy_cogs
+    perf = time.perf_counter
+    for filename in lazy_files:
+        start = perf()
+        try:
+            loader.register(filename, listeners=lazy[filename])
+        except Exception as e:
+            print(f'Failed to register lazy cog {filename}: {e}')
+        if profiler is not None:
+            profiler.record_step(filename, 'lazy stubs', perf() - start)
+    bot.scheduler.every('bot.cleanup', _CLEANUP_INT, cleanup_task, align=60)
+    asyncio.create_task(load_deferred_cogs())
+
+async def load_deferred_cogs():
+    await bot.wait_until_ready()
+    await asyncio.sleep(_DEFERRED_DELAY)
+    loader = bot.lazy_cogs
+    for filename in _DEFERRED_COGS:
+        await loader.ensure_loaded(filename)
 
 _ready_once = False
 
-@bot.event
 async def on_ready():
     global _ready_once, _bot_user
     if _ready_once:
@@ -119,7 +357,21 @@ async def on_ready():
     _ready_once = True
     _bot_user = bot.user
 
+    profiler = bot.startup_profiler
+    if profiler is not None:
+        profiler.mark_ready()
+        print(profiler.table())
+        await profiler.write(_PROFILE_PATH)
+
     await load_jackychat_channels()
+    webhooks = _dispatcher.webhooks
+    if webhooks is not None:
+        await webhooks.load()
+        # Channels that left the relay while the bot was down
+        await webhooks.prune({channel.id for channel in _channels.values() if channel is not None})
+    elif os.path.exists(_WEBHOOK_PATH):
+        # Webhook fan-out was turned off: remove the webhooks it left behind
+        await WebhookCache(bot, _WEBHOOK_PATH).purge()
     print('Bot is ready')
 
     channel = bot.get_channel(_CHANNEL_ID)
@@ -140,7 +392,6 @@ async def on_ready():
     except Exception as e:
         print(f"Warning: Opus library not loaded ({e}). Voice may fail.")
 
-@bot.event
 async def on_message(message):
     author = message.author
     if author.id == _bot_user.id:
@@ -154,10 +405,13 @@ async def on_message(message):
     msg_id = message.id
     key = (channel_id << 64) | msg_id
     
-    processed = _processed
-    if key in processed:
+    if _processed.check_and_add(key):
         return
-    processed.add(key)
+    # Relay copies are posted by webhooks into jackybot-chat channels; relaying those
+    # again would bounce every message between the linked guilds forever.
+    if message.webhook_id is not None:
+        return
+    _member_index.add(guild.id, author.id)
 
     channel_name = msg_channel.name
     if _JACKYBOT_CHAT in channel_name:
@@ -166,6 +420,8 @@ async def on_message(message):
         current = channels.get(guild_id)
 
         if current is not msg_channel:
+            if current is not None:
+                _dispatcher.forget(current.id)
             channels[guild_id] = msg_channel
             asyncio.create_task(save_jackychat_channels())
 
@@ -178,33 +434,23 @@ async def on_message(message):
         if attachments:
             embed.set_image(url=attachments[0].url)
 
-        targets = [(gid, ch) for gid, ch in channels.items() if gid != guild_id and ch is not None]
+        targets = [ch for gid, ch in channels.items() if gid != guild_id and ch is not None]
         if targets:
-            asyncio.create_task(_broadcast(targets, embed))
+            _dispatcher.broadcast(targets, embed)
+        ipc = bot.ipc
+        if ipc is not None:
+            ipc.publish('relay', {'guild_id': guild_id, 'embed': embed.to_dict()})
 
     await bot.process_commands(message)
 
-async def _broadcast(targets, embed):
-    sem = _semaphore
-    tasks = [_send_one(ch, embed, sem) for _, ch in targets]
-    await asyncio.gather(*tasks, return_exceptions=True)
+def _on_remote_relay(data):
+    # A jackybot-chat message from a guild on another cluster; deliver to ours.
+    origin = data['guild_id']
+    targets = [ch for gid, ch in _channels.items() if gid != origin and ch is not None]
+    if targets:
+        _dispatcher.broadcast(targets, discord.Embed.from_dict(data['embed']))
 
-async def _send_one(channel, embed, semaphore):
-    async with semaphore:
-        try:
-            await channel.send(embed=embed)
-            await asyncio.sleep(_RATE_SLEEP)
-        except discord.Forbidden:
-            pass
-        except discord.HTTPException as e:
-            if e.status == 429:
-                await asyncio.sleep(getattr(e, 'retry_after', 5))
-                try:
-                    await channel.send(embed=embed)
-                except Exception:
-                    pass
-
-@bot.command()
+@commands.command()
 async def ping(ctx):
     perf_ns = time.perf_counter_ns
     start = perf_ns()
@@ -214,7 +460,7 @@ async def ping(ctx):
     message_ms = (end - start) // _NS_TO_MS
     await msg.edit(content=f'Pong! API: {latency_ms}ms | Message: {message_ms}ms')
 
-@bot.command()
+@commands.command()
 async def voice_diag(ctx):
     nacl_ok = False
     try:
@@ -238,53 +484,35 @@ async def voice_diag(ctx):
     opus_str = 'LOADED' if opus_loaded else 'NOT LOADED'
     await ctx.reply(f"PyNaCl: {nacl_str} | Opus: {opus_str}")
 
-@bot.command()
+@commands.command()
 async def tts(ctx, *, message):
     voice_state = ctx.author.voice
     if voice_state is None or voice_state.channel is None:
         return await ctx.reply('You need to be in a voice channel.')
 
-    voice_channel = voice_state.channel
-    vc = ctx.voice_client
-    if vc is None:
-        vc = await voice_channel.connect()
-    elif vc.channel != voice_channel:
-        await vc.move_to(voice_channel)
-
-    temp_file = f"temp_{ctx.message.id}.mp3"
-    to_thread = asyncio.to_thread
-    FFmpegPCMAudio = discord.FFmpegPCMAudio
     try:
-        tts_obj = gTTS(text=message, lang='en')
-        await to_thread(tts_obj.save, temp_file)
         def _after(err):
             if err:
                 print(f"Error in voice playback: {err}")
-            try:
-                asyncio.create_task(delete_file(temp_file))
-            except RuntimeError:
-                pass
-        vc.play(FFmpegPCMAudio(temp_file), after=_after)
+        # Long messages come in parts; each is queued as soon as it is synthesized,
+        # and repeated phrases come straight from the pipeline's in-memory cache
+        async for clip in bot.tts.clips(message):
+            # Over music, Lavalink plays the clip from its URL on the same connection
+            await bot.voice.play(voice_state.channel, _TTS_VOICE, clip.source(), after=_after, url=bot.tts.url(clip))
+    except VoiceBusy as e:
+        await ctx.reply(f"Voice is busy with {e.holder} right now.")
     except Exception as e:
         await ctx.reply("Failed to generate TTS audio.")
         print(f"TTS Error: {e}")
-        await delete_file(temp_file)
-
-async def delete_file(filename):
-    try:
-        await asyncio.to_thread(os.remove, filename)
-    except OSError:
-        pass
 
-@bot.command()
+@commands.command()
 async def leave(ctx):
-    vc = ctx.voice_client
-    if vc:
-        await vc.disconnect()
+    if ctx.voice_client:
+        await bot.voice.disconnect(ctx.guild)
         await ctx.reply("Disconnected from voice channel.")
 
-@bot.command()
-@commands.cooldown(_CD_RATE, _CD_PER, commands.BucketType.user)
+@commands.command(hidden=True)
+@shared_cooldown(_CD_RATE, _CD_PER, commands.BucketType.user)
 async def delete(ctx, number_of_messages: int):
     if ctx.author.id != _AUTH_USER_ID:
         return await ctx.reply("You are not authorized to use this command.")
@@ -299,6 +527,107 @@ async def delete(ctx, number_of_messages: int):
     except discord.HTTPException as e:
         await ctx.send(f"Failed to delete messages: {e}")
 
+@commands.command(hidden=True)
+async def relay_stats(ctx):
+    if ctx.author.id != _AUTH_USER_ID:
+        return await ctx.reply("You are not authorized to use this command.")
+    stats = _dispatcher.stats()
+    mode = "webhooks" if _dispatcher.webhooks is not None else "bot"
+    embed = discord.Embed(title=f"Relay Dispatcher ({mode})", color=_EMBED_COLOR)
+    embed.add_field(name="Queue", value=f"`{stats['queue_depth']}` pending | `{stats['max_depth']}` peak | `{stats['active_workers']}` workers", inline=False)
+    embed.add_field(name="Delivered", value=f"`{stats['sent']}` embeds in `{stats['messages']}` messages (`{stats['coalesced']}` coalesced)", inline=False)
+    embed.add_field(name="Problems", value=f"`{stats['rate_limited']}` 429s | `{stats['dropped']}` dropped | `{stats['failed']}` failed", inline=False)
+    dedupe = _processed.stats()
+    embed.add_field(name="Dedupe", value=f"`{dedupe['entries']}`/`{dedupe['max_entries']}` keys | `{dedupe['hits']}` hits | `{dedupe['misses']}` misses | `{dedupe['evictions']}` evicted", inline=False)
+    embed.add_field(name="Latency", value=f"send `{stats['latency_ms']}ms` (max `{stats['max_latency_ms']}ms`) | queued `{stats['queue_ms']}ms`", inline=False)
+    await ctx.reply(embed=embed)
+
+@commands.command(hidden=True)
+async def memory(ctx, target: str = None):
+    if ctx.author.id != _AUTH_USER_ID:
+        return await ctx.reply("You are not authorized to use this command.")
+    accountant = bot.memory
+    if target == 'refresh' or accountant.taken_at is None:
+        async with ctx.typing():
+            await accountant.snapshot()
+        target = None
+    rows = accountant.rows
+    if target:
+        rows = [row for row in rows if row['owner'].lower() == target.lower()]
+    age = int(time.time() - accountant.taken_at)
+    embed = discord.Embed(
+        title=f"Memory{f' ({target})' if target else ''}",
+        description=f"RSS `{format_bytes(process_rss())}` | snapshot `{age}s` ago in `{accountant.duration * 1000:.0f}ms` | "
+                    f"`{accountant.warnings}` warnings",
+        color=_EMBED_COLOR
+    )
+    if not target:
+        by_cog = sorted(accountant.by_cog().items(), key=lambda item: item[1], reverse=True)[:8]
+        embed.add_field(name="By cog", value="\n".join(f"{name}: `{format_bytes(size)}`" for name, size in by_cog) or "Nothing tracked", inline=False)
+    for row in rows[:10]:
+        growth = row['growth_per_hour']
+        flags = (" | ⚠️ over budget" if row['over_budget'] else "") + (" | 📈 growing" if row['growing'] else "")
+        embed.add_field(
+            name=row['name'][:256],
+            value=f"`{format_bytes(row['bytes'])}`{'+' if row['truncated'] else ''} | `{row['items'] if row['items'] is not None else '-'}` items"
+                  f" | `{format_bytes(growth) + '/h' if growth is not None else 'n/a'}`{flags}",
+            inline=False
+        )
+    allocations = accountant.allocations_by_cog()
+    if allocations:
+        top = sorted(allocations.items(), key=lambda item: item[1]['bytes'], reverse=True)[:6]
+        embed.add_field(name="Allocated by cog code (tracemalloc)", value="\n".join(
+            f"{name}: `{format_bytes(stats['bytes'])}` ({'+' if stats['delta'] >= 0 else ''}{format_bytes(stats['delta'])})"
+            for name, stats in top), inline=False)
+    await ctx.reply(embed=embed)
+
+@commands.command(hidden=True)
+async def stalls(ctx, action: str = None):
+    if ctx.author.id != _AUTH_USER_ID:
+        return await ctx.reply("You are not authorized to use this command.")
+    watchdog = bot.watchdog
+    if action == 'reset':
+        watchdog.reset()
+        return await ctx.reply("Loop stall statistics cleared.")
+    offenders = watchdog.report(10)
+    embed = discord.Embed(
+        title="Event Loop Stalls",
+        description=f"`{watchdog.stalls}` stalls over {_STALL_MS}ms | worst `{watchdog.worst_ms:.0f}ms` | log: `{_STALL_LOG}`",
+        color=_EMBED_COLOR
+    )
+    for location, entry in offenders:
+        embed.add_field(
+            name=location[:256],
+            value=f"`{entry['count']}`x | total `{entry['total_ms']:.0f}ms` | max `{entry['max_ms']:.0f}ms`",
+            inline=False
+        )
+    if not offenders:
+        embed.add_field(name="No stalls recorded", value="The event loop has kept up so far.", inline=False)
+    await ctx.reply(embed=embed)
+
+@commands.command(hidden=True)
+async def jobs(ctx):
+    if ctx.author.id != _AUTH_USER_ID:
+        return await ctx.reply("You are not authorized to use this command.")
+    scheduler = bot.scheduler
+    rows = scheduler.stats()
+    embed = discord.Embed(
+        title="Scheduled Jobs",
+        description=f"`{len(rows)}` jobs | `{scheduler.wakeups}` wakeups | `{sum(scheduler.skips.values())}` skipped runs",
+        color=_EMBED_COLOR
+    )
+    for row in rows[:20]:
+        every = f"every `{row['interval']:.0f}s`" if row['interval'] is not None else "once"
+        status = " | ▶️ running" if row['running'] else ""
+        error = f"\nLast error: `{row['last_error'][:200]}`" if row['last_error'] else ""
+        embed.add_field(
+            name=row['name'][:256],
+            value=f"{every} | next in `{row['next_in']:.0f}s` | `{row['runs']}` runs, `{row['skipped']}` skipped, "
+                  f"`{row['failures']}` failed | mean `{row['mean'] * 1000:.0f}ms` max `{row['max'] * 1000:.0f}ms`{status}{error}",
+            inline=False
+        )
+    await ctx.reply(embed=embed)
+
 async def save_jackychat_channels():
     get_time = time.time
     current_time = get_time()
@@ -308,40 +637,24 @@ async def save_jackychat_channels():
     state.last_save_time = current_time
 
     channels = _channels
-    if _ORJSON:
-        data_bytes = json.dumps({str(gid): {'channel_id': ch.id} for gid, ch in channels.items()})
-        data_str = data_bytes.decode('utf-8')
-    else:
-        data_str = json.dumps({str(gid): {'channel_id': ch.id} for gid, ch in channels.items()}, separators=_JSON_SEP)
-    
+    ipc = bot.ipc
+    if ipc is not None:
+        # The supervisor's hub merges every cluster's guilds and owns the file.
+        ipc.update('relay', {str(gid): {'channel_id': ch.id} for gid, ch in channels.items()})
+        return
     try:
-        async with aiofiles.open(_DATA_PATH, 'w') as f:
-            await f.write(data_str)
+        await serial.save(_DATA_PATH, {str(gid): {'channel_id': ch.id} for gid, ch in channels.items()})
     except Exception as e:
         print(f"Error saving jackychat channels: {e}")
 
 async def load_jackychat_channels():
     get_channel = bot.get_channel
     channels = _channels
-    try:
-        async with aiofiles.open(_DATA_PATH, 'r') as f:
-            content = await f.read()
-            if not content or content.isspace():
-                return
-            if _ORJSON:
-                data = json.loads(content)
-            else:
-                data = json.loads(content)
-            for guild_id_str, info in data.items():
-                channel_id = info.get('channel_id')
-                if channel_id:
-                    channel = get_channel(channel_id)
-                    if channel:
-                        channels[int(guild_id_str)] = channel
-    except FileNotFoundError:
-        pass
-    except Exception as e:
-        print(f"Could not load {_DATA_PATH} ({e}). Starting fresh.")
+    data = await serial.load(_DATA_PATH, schemas.RELAY_CHANNELS)
+    for guild_id_str, info in data.items():
+        channel = get_channel(info['channel_id'])
+        if channel:
+            channels[int(guild_id_str)] = channel
 
 async def shutdown(sig, loop):
     print(f"Received exit signal {sig.name}...")
@@ -350,18 +663,49 @@ async def shutdown(sig, loop):
     for t in tasks:
         t.cancel()
     await asyncio.gather(*tasks, return_exceptions=True)
+    await _dispatcher.close()
+    await bot.metrics.close()
+    bot.watchdog.stop()
+    bot.scheduler.stop()
+    bot.render.close()
+    await bot.web.close()
+    await _member_index.save()
+    if bot.ipc is not None:
+        await bot.ipc.close()
+    await asyncio.to_thread(bot.store.close)
     pool = getattr(bot, 'pool', None)
     if pool:
         await pool.close()
     await bot.close()
     loop.stop()
 
-async def main():
+async def run_cluster(token):
+    shard_count = _SHARD_COUNT
+    if not shard_count:
+        try:
+            shard_count = await recommended_shard_count(token)
+        except discord.LoginFailure:
+            print("Error: Invalid Discord token.")
+            return
+    supervisor = ClusterSupervisor(os.path.abspath(__file__), _CLUSTERS, max(shard_count, _CLUSTERS),
+                                   _IPC_HOST, _IPC_PORT, persist={'relay': _DATA_PATH})
+    loop = asyncio.get_running_loop()
+    if sys.platform != "win32":
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, lambda: asyncio.create_task(supervisor.stop()))
+    await supervisor.run()
+
+async def main(logs=None):
     token = os.environ.get("DISCORD_BOT_TOKEN")
     if not token:
         print("Error: DISCORD_BOT_TOKEN environment variable not set.")
         return
 
+    if _CLUSTERS > 1 and not _SHARD_IDS:
+        return await run_cluster(token)
+
+    create_bot(logs)
+
     loop = asyncio.get_running_loop()
     if sys.platform != "win32":
         from functools import partial
@@ -380,9 +724,13 @@ async def main():
             await pool.close()
         if not bot.is_closed():
             await bot.close()
+        await asyncio.to_thread(bot.store.close)
 
 if __name__ == "__main__":
+    logs = setup_logging(_LOG_LEVEL, _LOG_PATH, files=_LOG_FILES, sample=_LOG_SAMPLE, capture_prints=True)
     try:
-        asyncio.run(main())
+        asyncio.run(main(logs))
     except (KeyboardInterrupt, SystemExit):
-        print("Bot shutdown requested.")
\ No newline at end of file
+        print("Bot shutdown requested.")
+    finally:
+        logs.stop()
\ No newline at end of file
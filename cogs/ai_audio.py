@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 import asyncio
 import os
+import subprocess
 import tempfile
 import time
 import gc
@@ -11,6 +12,11 @@ from transformers import pipeline
 import scipy.io.wavfile
 import torch
 import warnings
+import logging
+from cogs.utils.uploads import TooLarge, audio_ladder
+
+log = logging.getLogger('jackybot.ai_audio')
+_MAX_NEW_TOKENS = 128
 
 class AIAudio(commands.Cog):
     def __init__(self, bot):
@@ -31,7 +37,7 @@ class AIAudio(commands.Cog):
         
         if forced_single_core:
             cpu_count = 1
-            print("INFO: Single-core mode enabled (MUSICGEN_SINGLE_CORE=true)")
+            log.info("Single-core mode enabled (MUSICGEN_SINGLE_CORE=true)")
         else:
             try:
                 import resource
@@ -57,11 +63,11 @@ class AIAudio(commands.Cog):
         
         try:
             import intel_extension_for_pytorch as ipex
-            print(f"CPU optimization: {cpu_count} core(s) + Intel IPEX acceleration enabled")
+            log.info("CPU optimization: %s core(s) + Intel IPEX acceleration enabled", cpu_count)
         except ImportError:
-            print(f"CPU optimization: {cpu_count} core(s) configured")
+            log.info("CPU optimization: %s core(s) configured", cpu_count)
             if cpu_count == 1:
-                print("INFO: Running on 1 core - suitable for shared VPS environments")
+                log.info("Running on 1 core - suitable for shared VPS environments")
 
     def cog_unload(self):
         """Clean up resources when cog is unloaded."""
@@ -77,10 +83,10 @@ class AIAudio(commands.Cog):
                 {torch.nn.Linear, torch.nn.Conv1d},
                 dtype=torch.qint8
             )
-            print("Applied dynamic int8 quantization (2-4x speedup)")
+            log.info("Applied dynamic int8 quantization (2-4x speedup)")
             return quantized_model
         except Exception as e:
-            print(f"Quantization failed, using fp32: {e}")
+            log.warning("Quantization failed, using fp32: %s", e)
             return model
 
     def _apply_bettertransformer(self, model):
@@ -89,10 +95,10 @@ class AIAudio(commands.Cog):
             from optimum.bettertransformer import BetterTransformer
             optimized_model = BetterTransformer.transform(model)
             self.use_bettertransformer = True
-            print("Applied BetterTransformer optimization")
+            log.info("Applied BetterTransformer optimization")
             return optimized_model
         except Exception as e:
-            print(f"BetterTransformer not available: {e}")
+            log.info("BetterTransformer not available: %s", e)
             return model
 
     def _apply_ipex_optimization(self, model):
@@ -100,13 +106,13 @@ class AIAudio(commands.Cog):
         try:
             import intel_extension_for_pytorch as ipex
             optimized_model = ipex.optimize(model, dtype=torch.float32, inplace=False)
-            print("Applied Intel IPEX optimization (2-3x speedup expected)")
+            log.info("Applied Intel IPEX optimization (2-3x speedup expected)")
             return optimized_model
         except ImportError:
-            print("Intel IPEX not installed. Install with: pip install intel-extension-for-pytorch")
+            log.info("Intel IPEX not installed. Install with: pip install intel-extension-for-pytorch")
             return model
         except Exception as e:
-            print(f"IPEX optimization failed: {e}")
+            log.warning("IPEX optimization failed: %s", e)
             return model
 
     def _load_model_sync(self):
@@ -115,7 +121,7 @@ class AIAudio(commands.Cog):
             return True
 
         try:
-            print("Loading MusicGen model with CPU accelerations...")
+            log.info("Loading MusicGen model with CPU accelerations...")
             
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore")
@@ -136,7 +142,7 @@ class AIAudio(commands.Cog):
             try:
                 import intel_extension_for_pytorch as ipex
                 self.synthesiser.model = ipex.optimize(self.synthesiser.model, dtype=torch.float32)
-                print("Applied Intel IPEX optimizations")
+                log.info("Applied Intel IPEX optimizations")
             except ImportError:
                 pass
             
@@ -144,15 +150,15 @@ class AIAudio(commands.Cog):
             
             try:
                 torch.jit.optimize_for_inference(torch.jit.script(self.synthesiser.model))
-                print("Applied JIT optimization")
+                log.info("Applied JIT optimization")
             except:
                 pass
             
             self.model_loaded = True
-            print("MusicGen model loaded with all CPU accelerations")
+            log.info("MusicGen model loaded with all CPU accelerations")
             return True
         except Exception as e:
-            print(f"Error loading MusicGen model: {e}")
+            log.error("Error loading MusicGen model: %s", e)
             self.model_loaded = False
             return False
 
@@ -169,7 +175,7 @@ class AIAudio(commands.Cog):
     def _cleanup_model(self):
         """Clean up the MusicGen model and free memory."""
         if self.synthesiser is not None:
-            print("Unloading MusicGen model...")
+            log.info("Unloading MusicGen model...")
             
             if hasattr(self.synthesiser, 'model'):
                 del self.synthesiser.model
@@ -186,9 +192,9 @@ class AIAudio(commands.Cog):
             gc.collect()
 
         self.model_loaded = False
-        print("MusicGen model unloaded and memory freed")
+        log.info("MusicGen model unloaded and memory freed")
 
-    def generate_audio_sync(self, prompt: str) -> tuple:
+    def generate_audio_sync(self, prompt: str, max_new_tokens: int = _MAX_NEW_TOKENS) -> tuple:
         """Synchronous audio generation function with aggressive CPU optimizations."""
         if not self.synthesiser:
             raise Exception("Model not loaded")
@@ -203,7 +209,7 @@ class AIAudio(commands.Cog):
                     prompt,
                     forward_params={
                         "do_sample": True,
-                        "max_new_tokens": 128,
+                        "max_new_tokens": max_new_tokens,
                         "num_beams": 1,
                         "temperature": 1.0,
                         "top_k": 250,
@@ -230,14 +236,14 @@ class AIAudio(commands.Cog):
             memory_used = memory_after - memory_before
             
             if memory_after > 3.5:
-                print(f"WARNING: Memory usage at {memory_after:.2f}GB (threshold: 4GB)")
+                log.warning("Memory usage at %.2fGB (threshold: 4GB)", memory_after)
             
-            print(f"Memory during generation: {memory_before:.2f}GB → {memory_after:.2f}GB (delta: {memory_used:+.2f}GB)")
+            log.info("Memory during generation: %.2fGB → %.2fGB (delta: %+.2fGB)", memory_before, memory_after, memory_used)
 
             return temp_path, music["sampling_rate"]
 
         except Exception as e:
-            print(f"Error generating audio: {e}")
+            log.error("Error generating audio: %s", e)
             raise
 
     @commands.command(name='music')
@@ -247,14 +253,6 @@ class AIAudio(commands.Cog):
         Usage: !music [your prompt here]
         Example: !music lo-fi hip hop beats with rain sounds
         """
-        if not self.model_loaded:
-            loading_msg = await ctx.reply("Loading MusicGen model for CPU inference... This may take a moment.")
-            model_loaded = await self._load_model()
-            if not model_loaded:
-                await loading_msg.edit(content="Failed to load MusicGen model. Please try again later.")
-                return
-            await loading_msg.delete()
-
         prompt = prompt.strip()
         if not prompt:
             await ctx.reply("❌ Please provide a prompt for music generation.\nExample: `!music soothing piano melody`")
@@ -264,7 +262,7 @@ class AIAudio(commands.Cog):
             await ctx.reply("❌ Prompt is too long. Please keep it under 200 characters.")
             return
 
-        if self.generation_lock.locked():
+        async def queued():
             queue_embed = discord.Embed(
                 title="Music Generation Queue",
                 description=f"**Your prompt:** {prompt}\n\nAnother music generation is currently in progress. Your request has been added to the queue.\n\nPlease wait for the current generation to complete...",
@@ -273,6 +271,45 @@ class AIAudio(commands.Cog):
             queue_embed.set_footer(text="You'll be notified when generation starts")
             await ctx.reply(embed=queue_embed)
 
+        # Bounded backlog; refused with a busy reply (before the model loads) when shed
+        async with self.bot.overload.slot('ai_audio', on_wait=queued):
+            await self._generate(ctx, prompt)
+
+    @staticmethod
+    def _wav_to_mp3(wav_path, kbps, channels):
+        mp3_path = os.path.splitext(wav_path)[0] + '.mp3'
+        subprocess.run(['ffmpeg', '-i', wav_path, '-codec:a', 'libmp3lame', '-b:a', f'{kbps}k',
+                        '-ac', str(channels), mp3_path, '-y'], capture_output=True, check=True, timeout=60)
+        return mp3_path
+
+    async def _fit_upload(self, guild, temp_path):
+        """The WAV if it fits the guild's upload limit, else an MP3 at a bitrate that does."""
+        uploads = self.bot.uploads
+        budget = uploads.budget(guild)
+        rate, data = scipy.io.wavfile.read(temp_path, mmap=True)
+        channels = 1 if data.ndim == 1 else data.shape[1]
+        rungs = audio_ladder(budget, len(data) / rate, channels, rate, data.dtype.itemsize, lossless=True)
+        del data
+
+        async def encode(rung):
+            if rung.format == 'wav':
+                return temp_path
+            return await asyncio.to_thread(self._wav_to_mp3, temp_path, rung.params['kbps'], rung.params['channels'])
+        _, output_path = await uploads.fit('ai_audio', rungs, encode, budget)
+        return output_path
+
+    async def _generate(self, ctx, prompt: str):
+        if not self.model_loaded:
+            loading_msg = await ctx.reply("Loading MusicGen model for CPU inference... This may take a moment.")
+            model_loaded = await self._load_model()
+            if not model_loaded:
+                await loading_msg.edit(content="Failed to load MusicGen model. Please try again later.")
+                return
+            await loading_msg.delete()
+
+        # Shorter clips while the bot is under pressure
+        max_new_tokens = self.bot.overload.scale(_MAX_NEW_TOKENS, 64)
+
         async with self.generation_lock:
             try:
                 embed = discord.Embed(
@@ -287,14 +324,16 @@ class AIAudio(commands.Cog):
 
                 # Generate audio in thread pool to avoid blocking
                 temp_path, sample_rate = await asyncio.get_event_loop().run_in_executor(
-                    self.executor, self.generate_audio_sync, prompt
+                    self.executor, self.generate_audio_sync, prompt, max_new_tokens
                 )
 
                 generation_time = time.time() - start_time
 
                 try:
-                    with open(temp_path, 'rb') as audio_file:
-                        discord_file = discord.File(audio_file, filename=f"musicgen_{int(time.time())}.wav")
+                    output_path = await self._fit_upload(ctx.guild, temp_path)
+                    extension = os.path.splitext(output_path)[1]
+                    with open(output_path, 'rb') as audio_file:
+                        discord_file = discord.File(audio_file, filename=f"musicgen_{int(time.time())}{extension}")
 
                         result_embed = discord.Embed(
                             title="Music Generated!",
@@ -308,11 +347,14 @@ class AIAudio(commands.Cog):
                     await status_msg.delete()
 
                 finally:
-                    try:
-                        os.unlink(temp_path)
-                    except:
-                        pass
-
+                    for path in (temp_path, os.path.splitext(temp_path)[0] + '.mp3'):
+                        try:
+                            os.unlink(path)
+                        except:
+                            pass
+
+            except TooLarge as e:
+                await ctx.reply(e.user_message())
             except Exception as e:
                 error_embed = discord.Embed(
                     title="Generation Failed",
@@ -320,9 +362,7 @@ class AIAudio(commands.Cog):
                     color=0xe74c3c
                 )
                 await ctx.reply(embed=error_embed)
-                print(f"Music generation error: {e}")
-                import traceback
-                traceback.print_exc()
+                log.exception("Music generation error: %s", e)
 
         self._cleanup_model()
 
@@ -0,0 +1,288 @@
+import discord
+from discord.ext import commands
+import asyncio
+import heapq
+import time
+from datetime import datetime
+from cogs.utils import schemas, serial
+
+_COMMAND_FILE = 'data/command_stats.json'
+_USER_FILE = 'data/user_stats.json'
+_SERVER_FILE = 'data/server_command_stats.json'
+_ERROR_FILE = 'data/error_stats.json'
+_FLUSH_INTERVAL = 60
+_MINUTES = 1440
+_HOURS = 24
+_PREFIX = '!'
+
+
+class CommandAnalytics(commands.Cog):
+    """Write-behind command usage counters.
+
+    Listeners only bump dict counters and preallocated ring slots; the JSON
+    snapshots under data/ are rewritten off the event loop at most once per
+    flush interval, and only when something changed.
+
+    In cluster mode every completion and error is also published over IPC so
+    each cluster holds bot-wide counts; only cluster 0 writes the snapshots.
+    """
+    __slots__ = ('bot', 'command_counts', 'user_counts', 'user_names', 'guild_counts', 'guild_names',
+                 'guild_last_used', 'error_counts', 'total', 'in_flight', 'started_at',
+                 '_minute_ring', '_minute_slot', '_hour_rings', '_hour_slot', '_dirty', 'flush_task',
+                 'ipc', 'writer')
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.command_counts = {}
+        self.user_counts = {}
+        self.user_names = {}
+        self.guild_counts = {}
+        self.guild_names = {}
+        self.guild_last_used = {}
+        self.error_counts = {}
+        self.total = 0
+        self.in_flight = 0
+        self.started_at = time.time()
+        self._minute_ring = [0] * _MINUTES
+        self._minute_slot = int(self.started_at // 60) % _MINUTES
+        self._hour_rings = {}
+        self._hour_slot = int(self.started_at // 3600) % _HOURS
+        self._dirty = False
+        self.ipc = getattr(bot, 'ipc', None)
+        self.writer = getattr(bot, 'cluster_id', 0) == 0
+        self.load_snapshots()
+        if self.ipc is not None:
+            self.ipc.on('analytics.command', self._on_remote_command)
+            self.ipc.on('analytics.error', self._count_error)
+        self.flush_task = bot.scheduler.every('analytics.flush', _FLUSH_INTERVAL, self._flush_job, align=60)
+
+    async def cog_load(self):
+        # Counted through the bot's error router; a listener would silence discord.py's error log.
+        self.bot.errors.observe(self._on_command_error)
+
+    def cog_unload(self):
+        self.bot.errors.remove(self._on_command_error)
+        self.flush_task.cancel()
+        if self.ipc is not None:
+            self.ipc.off('analytics.command')
+            self.ipc.off('analytics.error')
+        if self._dirty and self.writer:
+            self._write_snapshots(self._snapshot())
+
+    def load_snapshots(self):
+        plen = len(_PREFIX)
+        for key, count in serial.read(_COMMAND_FILE, schemas.COUNTS).items():
+            name = key[plen:] if key.startswith(_PREFIX) else key
+            self.command_counts[name] = self.command_counts.get(name, 0) + count
+        for user_id, info in serial.read(_USER_FILE, schemas.USER_STATS).items():
+            uid = int(user_id)
+            self.user_counts[uid] = info.get('count', 0)
+            self.user_names[uid] = info.get('name', user_id)
+        for guild_id, info in serial.read(_SERVER_FILE, schemas.SERVER_STATS).items():
+            if not guild_id.isdigit():
+                continue
+            gid = int(guild_id)
+            self.guild_counts[gid] = info.get('count', 0)
+            self.guild_names[gid] = info.get('name', guild_id)
+            last_used = info.get('last_used')
+            if last_used:
+                try:
+                    self.guild_last_used[gid] = datetime.fromisoformat(last_used).timestamp()
+                except ValueError:
+                    pass
+        self.error_counts.update(serial.read(_ERROR_FILE, schemas.COUNTS))
+        self.total = sum(self.command_counts.values())
+
+    @commands.Cog.listener()
+    async def on_command(self, ctx):
+        self.in_flight += 1
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx):
+        self.in_flight -= 1
+        name = ctx.command.qualified_name
+        author = ctx.author
+        guild = ctx.guild
+        guild_id = guild.id if guild is not None else None
+        guild_name = guild.name if guild is not None else None
+        self._count_command(name, author.id, str(author), guild_id, guild_name)
+        if self.ipc is not None:
+            self.ipc.publish('analytics.command', [name, author.id, str(author), guild_id, guild_name])
+
+    def _on_remote_command(self, data):
+        self._count_command(*data)
+
+    def _count_command(self, name, author_id, author_name, guild_id, guild_name):
+        counts = self.command_counts
+        counts[name] = counts.get(name, 0) + 1
+        self.total += 1
+
+        users = self.user_counts
+        if author_id not in users:
+            self.user_names[author_id] = author_name
+            users[author_id] = 1
+        else:
+            users[author_id] += 1
+
+        if guild_id is not None:
+            guilds = self.guild_counts
+            if guild_id not in guilds:
+                self.guild_names[guild_id] = guild_name
+                guilds[guild_id] = 1
+            else:
+                guilds[guild_id] += 1
+            self.guild_last_used[guild_id] = time.time()
+
+        self._minute_ring[self._minute_slot] += 1
+        ring = self._hour_rings.get(name)
+        if ring is None:
+            ring = self._hour_rings[name] = [0] * _HOURS
+        ring[self._hour_slot] += 1
+        self._dirty = True
+
+    def _on_command_error(self, ctx, error):
+        if ctx.command is not None and self.in_flight > 0:
+            self.in_flight -= 1
+        name = type(error).__name__
+        self._count_error(name)
+        if self.ipc is not None:
+            self.ipc.publish('analytics.error', name)
+
+    def _count_error(self, name):
+        errors = self.error_counts
+        errors[name] = errors.get(name, 0) + 1
+        self._dirty = True
+
+    # Query API
+
+    def top_commands(self, n=5):
+        return heapq.nlargest(n, self.command_counts.items(), key=lambda item: item[1])
+
+    def top_users(self, n=5):
+        names = self.user_names
+        return [(names.get(uid, str(uid)), count)
+                for uid, count in heapq.nlargest(n, self.user_counts.items(), key=lambda item: item[1])]
+
+    def top_guilds(self, n=5):
+        names = self.guild_names
+        return [(names.get(gid, str(gid)), count)
+                for gid, count in heapq.nlargest(n, self.guild_counts.items(), key=lambda item: item[1])]
+
+    def top_errors(self, n=3):
+        return heapq.nlargest(n, self.error_counts.items(), key=lambda item: item[1])
+
+    def command_count(self, name):
+        return self.command_counts.get(name, 0)
+
+    def recent_total(self, minutes=60):
+        """Commands completed in the last ``minutes`` minutes (up to 24 hours)."""
+        self._advance()
+        ring = self._minute_ring
+        slot = self._minute_slot
+        minutes = min(minutes, _MINUTES)
+        return sum(ring[(slot - i) % _MINUTES] for i in range(minutes))
+
+    def hourly_histogram(self, name=None):
+        """Per-hour counts for the last 24 hours, oldest first."""
+        self._advance()
+        slot = self._hour_slot
+        if name is None:
+            ring = self._minute_ring
+            mslot = self._minute_slot
+            per_minute = [ring[(mslot - i) % _MINUTES] for i in range(_MINUTES - 1, -1, -1)]
+            return [sum(per_minute[h * 60:(h + 1) * 60]) for h in range(_HOURS)]
+        ring = self._hour_rings.get(name)
+        if ring is None:
+            return [0] * _HOURS
+        return [ring[(slot - i) % _HOURS] for i in range(_HOURS - 1, -1, -1)]
+
+    # Write-behind
+
+    def _advance(self):
+        """Move the ring cursors to the current minute/hour, zeroing skipped slots."""
+        now = time.time()
+        minute = int(now // 60) % _MINUTES
+        ring = self._minute_ring
+        slot = self._minute_slot
+        steps = min((minute - slot) % _MINUTES, _MINUTES)
+        for i in range(1, steps + 1):
+            ring[(slot + i) % _MINUTES] = 0
+        self._minute_slot = minute
+
+        hour = int(now // 3600) % _HOURS
+        slot = self._hour_slot
+        steps = (hour - slot) % _HOURS
+        if steps:
+            for ring in self._hour_rings.values():
+                for i in range(1, steps + 1):
+                    ring[(slot + i) % _HOURS] = 0
+            self._hour_slot = hour
+
+    def _snapshot(self):
+        names = self.user_names
+        guild_names = self.guild_names
+        last_used = self.guild_last_used
+        servers = {}
+        for gid, count in self.guild_counts.items():
+            entry = {'name': guild_names.get(gid, str(gid)), 'count': count}
+            if gid in last_used:
+                entry['last_used'] = datetime.fromtimestamp(last_used[gid]).isoformat()
+            servers[str(gid)] = entry
+        return (
+            {f'{_PREFIX}{name}': count for name, count in self.command_counts.items()},
+            {str(uid): {'name': names.get(uid, str(uid)), 'count': count} for uid, count in self.user_counts.items()},
+            servers,
+            dict(self.error_counts),
+        )
+
+    @staticmethod
+    def _write_snapshots(snapshot):
+        for path, data in zip((_COMMAND_FILE, _USER_FILE, _SERVER_FILE, _ERROR_FILE), snapshot):
+            try:
+                serial.write(path, data)
+            except OSError as e:
+                print(f"Error saving {path}: {e}")
+
+    async def flush(self):
+        if not self._dirty or not self.writer:
+            return
+        self._dirty = False
+        await asyncio.to_thread(self._write_snapshots, self._snapshot())
+
+    async def _flush_job(self):
+        self._advance()
+        await self.flush()
+
+    @commands.command(name="stats")
+    async def stats(self, ctx):
+        """Display bot statistics"""
+        uptime = int(time.time() - self.started_at)
+        hours, remainder = divmod(uptime, 3600)
+        minutes, seconds = divmod(remainder, 60)
+
+        embed = discord.Embed(title="Bot Statistics", color=0x2b2d31)
+        embed.add_field(name="Uptime", value=f"{hours}h {minutes}m {seconds}s", inline=True)
+        embed.add_field(name="Latency", value=f"{round(self.bot.latency * 1000)}ms", inline=True)
+        embed.add_field(name="Commands Run", value=f"{self.total} ({self.recent_total(60)} in the last hour)", inline=True)
+
+        top_commands = self.top_commands(5)
+        if top_commands:
+            command_str = "\n".join(f"{_PREFIX}{name}: {count}" for name, count in top_commands)
+            embed.add_field(name="Top Commands", value=f"```\n{command_str}\n```", inline=False)
+        else:
+            embed.add_field(name="Top Commands", value="No commands used yet!", inline=False)
+
+        top_users = self.top_users(3)
+        if top_users:
+            user_str = "\n".join(f"{name}: {count}" for name, count in top_users)
+            embed.add_field(name="Top Users", value=f"```\n{user_str}\n```", inline=False)
+
+        top_errors = self.top_errors(1)
+        if top_errors:
+            name, count = top_errors[0]
+            embed.add_field(name="Most Common Error", value=f"{name} ({count} times)", inline=False)
+
+        await ctx.reply(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(CommandAnalytics(bot))
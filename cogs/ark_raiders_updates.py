@@ -1,12 +1,11 @@
-import asyncio
-import json
 import os
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-import aiohttp
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
+
+from cogs.utils import schemas, serial
 
 
 class ArkRaidersUpdatesCog(commands.Cog):
@@ -30,44 +29,26 @@ class ArkRaidersUpdatesCog(commands.Cog):
         self._last_check_epoch: int = 0
         self._cache_ttl_seconds: int = 1800  # 30 minutes
 
-        # HTTP session
-        self._session: Optional[aiohttp.ClientSession] = None
-
-    async def cog_load(self) -> None:
-        timeout = aiohttp.ClientTimeout(total=20)
-        headers = {
+        # Request headers for the shared HTTP client (bot.web)
+        self._headers: Dict[str, str] = {
             "User-Agent": "JackyBot-ArkRaidersUpdates/1.0",
         }
-        self._session = aiohttp.ClientSession(timeout=timeout, headers=headers)
-        self.check_for_updates.start()
+
+    async def cog_load(self) -> None:
+        # Hourly, jittered so instances and the other update cogs do not poll in step
+        self._check_job = self.bot.scheduler.every('ark_raiders.poll', 3600, self.check_for_updates, delay=60, jitter=300)
 
     async def cog_unload(self) -> None:
-        self.check_for_updates.cancel()
-        if self._session and not self._session.closed:
-            await self._session.close()
+        self._check_job.cancel()
 
     # ---- Persistence ----
     def _load_state(self) -> Dict[str, Any]:
         os.makedirs(self.json_dir, exist_ok=True)
-        try:
-            with open(self.state_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    return data
-        except FileNotFoundError:
-            pass
-        except json.JSONDecodeError:
-            pass
-        return {"last_news_gid": None, "etag": None}
+        return serial.read(self.state_file, schemas.ARK_STATE, default=lambda: {"last_news_gid": None})
 
     async def _save_state(self) -> None:
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, self._save_state_sync)
-
-    def _save_state_sync(self) -> None:
         try:
-            with open(self.state_file, "w", encoding="utf-8") as f:
-                json.dump(self._state, f, indent=2)
+            await serial.save(self.state_file, self._state)
         except Exception:
             # Avoid raising inside background task
             pass
@@ -84,53 +65,39 @@ class ArkRaidersUpdatesCog(commands.Cog):
         ):
             return self._latest_cache
 
-        if not self._session:
-            return self._latest_cache
-
-        headers: Dict[str, str] = {}
-        if (etag := self._state.get("etag")) and not force_refresh:
-            headers["If-None-Match"] = etag
-
+        # bot.web revalidates with the stored ETag; a 304 comes back as the cached body.
         try:
-            async with self._session.get(self.news_url, headers=headers) as resp:
-                # 304 Not Modified → keep existing cache
-                if resp.status == 304:
-                    self._last_check_epoch = now_epoch
-                    return self._latest_cache
-
-                if resp.status != 200:
-                    return self._latest_cache
-
-                # Update ETag if provided
-                if (new_etag := resp.headers.get("ETag")):
-                    self._state["etag"] = new_etag
-
-                data = await resp.json()
-                if not isinstance(data, dict) or "appnews" not in data:
-                    return self._latest_cache
-
-                appnews = data["appnews"]
-                if not isinstance(appnews, dict) or "newsitems" not in appnews:
-                    return self._latest_cache
-
-                newsitems = appnews["newsitems"]
-                if not isinstance(newsitems, list) or not newsitems:
-                    return self._latest_cache
-
-                # Get the most recent news item
-                latest = newsitems[0]
-
-                news_info = {
-                    "gid": latest.get("gid"),
-                    "title": latest.get("title") or "ARC Raiders Update",
-                    "contents": latest.get("contents") or "",
-                    "url": latest.get("url") or f"https://store.steampowered.com/news/app/{self.app_id}",
-                    "date": latest.get("date") or 0,
-                }
-
-                self._latest_cache = news_info
-                self._last_check_epoch = now_epoch
-                return news_info
+            resp = await self.bot.web.get(self.news_url, headers=self._headers, timeout=20,
+                                          cache=not force_refresh)
+            if resp.status != 200:
+                return self._latest_cache
+
+            data = resp.json()
+            if not isinstance(data, dict) or "appnews" not in data:
+                return self._latest_cache
+
+            appnews = data["appnews"]
+            if not isinstance(appnews, dict) or "newsitems" not in appnews:
+                return self._latest_cache
+
+            newsitems = appnews["newsitems"]
+            if not isinstance(newsitems, list) or not newsitems:
+                return self._latest_cache
+
+            # Get the most recent news item
+            latest = newsitems[0]
+
+            news_info = {
+                "gid": latest.get("gid"),
+                "title": latest.get("title") or "ARC Raiders Update",
+                "contents": latest.get("contents") or "",
+                "url": latest.get("url") or f"https://store.steampowered.com/news/app/{self.app_id}",
+                "date": latest.get("date") or 0,
+            }
+
+            self._latest_cache = news_info
+            self._last_check_epoch = now_epoch
+            return news_info
         except Exception:
             return self._latest_cache
 
@@ -158,55 +125,36 @@ class ArkRaidersUpdatesCog(commands.Cog):
         await channel.send(embed=embed)
 
     # ---- Task ----
-    @tasks.loop(seconds=3600)
     async def check_for_updates(self) -> None:
-        try:
-            news = await self._fetch_latest_news()
-            if not news:
-                return
-
-            last_gid = self._state.get("last_news_gid")
-            current_gid = news.get("gid")
-
-            if last_gid == current_gid:
-                return
-
-            # Find all ark-raiders-updates channels across guilds
-            channels = []
-            for guild in self.bot.guilds:
-                channel = discord.utils.get(guild.text_channels, name=self.update_channel_name)
-                if channel:
-                    channels.append(channel)
-
-            if not channels:
-                return
-
-            for channel in channels:
-                try:
-                    await self._post_news(channel, news)
-                except Exception:
-                    continue
-
-            self._state["last_news_gid"] = current_gid
-            await self._save_state()
-        finally:
-            # Jitter to avoid synchronized polling across shards/instances
-            await asyncio.sleep(async_jitter_seconds(300))
-
-    @check_for_updates.before_loop
-    async def before_check_for_updates(self) -> None:
         await self.bot.wait_until_ready()
-
-
-def async_jitter_seconds(max_abs_seconds: int) -> int:
-    """Return a small positive jitter up to max_abs_seconds.
-
-    Using a simple deterministic variant based on current epoch to avoid importing random.
-    """
-    epoch = int(datetime.now().timestamp())
-    if max_abs_seconds <= 0:
-        return 0
-    return (epoch % max_abs_seconds)
+        news = await self._fetch_latest_news()
+        if not news:
+            return
+
+        last_gid = self._state.get("last_news_gid")
+        current_gid = news.get("gid")
+
+        if last_gid == current_gid:
+            return
+
+        # Find all ark-raiders-updates channels across guilds
+        channels = []
+        for guild in self.bot.guilds:
+            channel = discord.utils.get(guild.text_channels, name=self.update_channel_name)
+            if channel:
+                channels.append(channel)
+
+        if not channels:
+            return
+
+        for channel in channels:
+            try:
+                await self._post_news(channel, news)
+            except Exception:
+                continue
+
+        self._state["last_news_gid"] = current_gid
+        await self._save_state()
 
 
 async def setup(bot: commands.Bot) -> None:
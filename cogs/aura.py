@@ -1,23 +1,33 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import random
 import asyncio
-from datetime import datetime
-from PIL import Image
-import aiohttp
+from datetime import datetime, timedelta
 import io
-import math
-import json
-import os
 import groq
+from cogs.utils.render import aura_gif
+from cogs.utils.uploads import TooLarge, gif_ladder
 
-TWO_PI = 2 * math.pi
+_GUILD_PREFIX = 'guild:'
+
+
+def _split_legacy(data):
+    """Convert the old aura_data.json layout into per-guild store rows."""
+    rows = {'last_reset': data.get('last_reset')}
+    daily_info = data.get('daily_info', {})
+    used_values = data.get('used_values', {})
+    for guild_id in set(daily_info) | set(used_values):
+        rows[f'{_GUILD_PREFIX}{guild_id}'] = {
+            'daily_info': daily_info.get(guild_id, {}),
+            'used_values': used_values.get(guild_id, {}),
+        }
+    return rows
 
 class AuraCommands(commands.Cog):
     __slots__ = ('bot', 'groq_client', 'data_file', 'daily_info', 'used_values',
                  'last_reset', 'initial_size', 'final_size', 'frame_count',
-                 'frame_duration', 'zoom_factors', 'paste_offsets', 'session', 'aura_categories',
-                 '_save_pending')
+                 'frame_duration', 'aura_categories',
+                 'store', 'reset_job')
 
     def __init__(self, bot):
         self.bot = bot
@@ -26,72 +36,59 @@ class AuraCommands(commands.Cog):
         self.daily_info = {}
         self.used_values = {}
         self.last_reset = None
-        self._save_pending = False
 
-        self.initial_size = 512
         self.final_size = 128
+        # The pulse is drawn at the GIF's own size, so the cached avatar thumbnail
+        # (and what is shipped to the render worker) is 64KB rather than 1MB at 512px.
+        self.initial_size = self.final_size
         self.frame_count = 48
         self.frame_duration = 42
 
-        self.zoom_factors = []
-        self.paste_offsets = []
-        for i in range(self.frame_count):
-            zoom = 1 + 0.1 * math.sin(TWO_PI * i / self.frame_count)
-            zoomed_size = int(self.initial_size * zoom)
-            paste_pos = (self.initial_size - zoomed_size) >> 1
-            self.zoom_factors.append(zoomed_size)
-            self.paste_offsets.append(paste_pos)
-
-        self.session = None
         self.aura_categories = ('todays_crush', 'fattest_user', 'horniness_level',
                                'penis_length', 'weight_amount', 'height_amount', 'aura_reading')
-        self.load_data()
+        self.reset_job = None
 
     async def cog_load(self):
-        self.session = aiohttp.ClientSession()
-        self.refresh_daily_info.start()
+        await self.load_data()
+        await self.refresh_daily_info()
 
     def cog_unload(self):
-        self.refresh_daily_info.cancel()
-        self._save_data_sync()
-        if self.session:
-            asyncio.create_task(self.session.close())
-
-    def load_data(self):
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r') as f:
-                data = json.load(f)
-                self.daily_info = {int(k): {int(uk): uv for uk, uv in v.items()} for k, v in data.get('daily_info', {}).items()}
-                self.used_values = {int(k): {kk: set(vv) for kk, vv in v.items()} for k, v in data.get('used_values', {}).items()}
-                self.last_reset = datetime.fromisoformat(data['last_reset']) if data.get('last_reset') else None
-
-    def _save_data_sync(self):
-        data = {
-            'daily_info': {str(k): {str(uk): uv for uk, uv in v.items()} for k, v in self.daily_info.items()},
-            'used_values': {str(k): {kk: list(vv) for kk, vv in v.items()} for k, v in self.used_values.items()},
-            'last_reset': self.last_reset.isoformat() if self.last_reset else None
-        }
-        with open(self.data_file, 'w') as f:
-            json.dump(data, f, separators=(',', ':'))
-
-    async def save_data(self):
-        if self._save_pending:
-            return
-        self._save_pending = True
-        await asyncio.sleep(1)
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, self._save_data_sync)
-        self._save_pending = False
+        if self.reset_job is not None:
+            self.reset_job.cancel()
+
+    async def load_data(self):
+        self.store = await self.bot.store.load('aura', legacy_path=self.data_file, transform=_split_legacy)
+        prefix_len = len(_GUILD_PREFIX)
+        for key, value in self.store.items():
+            if not key.startswith(_GUILD_PREFIX):
+                continue
+            guild_id = int(key[prefix_len:])
+            self.daily_info[guild_id] = {int(uk): uv for uk, uv in value.get('daily_info', {}).items()}
+            self.used_values[guild_id] = {kk: set(vv) for kk, vv in value.get('used_values', {}).items()}
+        last_reset = self.store.get('last_reset')
+        self.last_reset = datetime.fromisoformat(last_reset) if last_reset else None
+
+    def save_guild(self, guild_id):
+        """Persist one guild's readings; other guilds' rows are untouched."""
+        self.store.put(f'{_GUILD_PREFIX}{guild_id}', {
+            'daily_info': {str(uk): uv for uk, uv in self.daily_info.get(guild_id, {}).items()},
+            'used_values': {kk: list(vv) for kk, vv in self.used_values.get(guild_id, {}).items()},
+        })
 
-    @tasks.loop(minutes=1)
     async def refresh_daily_info(self):
-        await self.bot.wait_until_ready()
+        """Reset readings on a new day, then schedule the next check for just after midnight."""
         now = datetime.now()
         if self.last_reset is None or now.date() > self.last_reset.date():
             self.daily_info.clear()
             self.used_values.clear()
             self.last_reset = now
-            await self.save_data()
+            # The namespace is shared by every cluster; each one only clears its own copy.
+            if getattr(self.bot, 'cluster_id', 0) == 0:
+                self.store.clear()
+                self.store.put('last_reset', now.isoformat())
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        self.reset_job = self.bot.scheduler.call_later('aura.daily_reset', (midnight - now).total_seconds() + 1,
+                                                       self.refresh_daily_info)
 
     def get_unique_value(self, guild_id, key, value_generator):
         if guild_id not in self.used_values:
@@ -129,17 +126,17 @@ class AuraCommands(commands.Cog):
             if not guild:
                 return None
 
-            if not guild.chunked:
+            index = self.bot.member_index
+            if index.count(guild_id) < 2 and not guild.chunked:
+                # Too few members seen yet to pick from; seed the index once from a chunk.
                 await guild.chunk()
+                index.add_many(guild_id, [m.id for m in guild.members])
 
-            members = list(guild.members)
-
-            if len(members) < 2:
+            if index.count(guild_id) < 2:
                 todays_crush = fattest_user = None
             else:
-                todays_crush = self.get_unique_value(guild_id, 'todays_crush', lambda: random.choice(members).id)
-                available_members = [m for m in members if m.id != todays_crush]
-                fattest_user = self.get_unique_value(guild_id, 'fattest_user', lambda: random.choice(available_members).id)
+                todays_crush = self.get_unique_value(guild_id, 'todays_crush', lambda: index.random_member(guild_id))
+                fattest_user = self.get_unique_value(guild_id, 'fattest_user', lambda: index.random_member(guild_id, (todays_crush,)))
 
             aura_reading = await self.generate_aura_reading()
 
@@ -152,33 +149,29 @@ class AuraCommands(commands.Cog):
                 "height_amount": self.get_unique_value(guild_id, 'height_amount', lambda: f"{random.randint(3, 8)}'{random.randint(0, 11)}\""),
                 "aura_reading": aura_reading
             }
-            asyncio.create_task(self.save_data())
+            self.save_guild(guild_id)
 
         return self.daily_info[guild_id][user_id]
 
-    async def create_animated_avatar(self, avatar_url):
-        async with self.session.get(avatar_url) as resp:
-            if resp.status != 200:
-                return None
-            data = await resp.read()
-
-        avatar = Image.open(io.BytesIO(data)).resize((self.initial_size, self.initial_size), Image.LANCZOS)
-        frames = []
-
-        for i in range(self.frame_count):
-            zoomed_size = self.zoom_factors[i]
-            paste_pos = self.paste_offsets[i]
-
-            zoomed = avatar.resize((zoomed_size, zoomed_size), Image.LANCZOS)
-            frame = Image.new('RGBA', (self.initial_size, self.initial_size), (0, 0, 0, 0))
-            frame.paste(zoomed, (paste_pos, paste_pos))
-            frames.append(frame.resize((self.final_size, self.final_size), Image.LANCZOS))
-
-        output = io.BytesIO()
-        frames[0].save(output, format='GIF', save_all=True, append_images=frames[1:],
-                      duration=self.frame_duration, loop=0)
-        output.seek(0)
-        return discord.File(output, filename="animated_avatar.gif")
+    async def create_animated_avatar(self, user, guild):
+        data = await self.bot.avatars.get(user, self.initial_size)
+        if data is None:
+            return None
+
+        async def encode(rung):
+            params = rung.params
+            return await self.bot.render.submit('aura', aura_gif, data, self.initial_size, params['size'],
+                                                params['frames'], params['frame_duration'])
+
+        # Fewer frames or a smaller GIF in guilds whose upload limit the full one would not fit
+        uploads = self.bot.uploads
+        budget = uploads.budget(guild)
+        try:
+            _, gif = await uploads.fit('aura', gif_ladder(self.final_size, self.frame_count, self.frame_duration),
+                                       encode, budget)
+        except TooLarge:
+            return None
+        return discord.File(io.BytesIO(gif), filename="animated_avatar.gif")
 
     @commands.command(name='aura')
     async def today(self, ctx):
@@ -193,11 +186,12 @@ class AuraCommands(commands.Cog):
             color=0x0099FF
         )
 
-        todays_crush = ctx.guild.get_member(user_info["todays_crush"])
-        fattest_user = ctx.guild.get_member(user_info["fattest_user"])
+        todays_crush = user_info["todays_crush"]
+        fattest_user = user_info["fattest_user"]
 
-        embed.add_field(name="Today's Crush", value=todays_crush.mention if todays_crush else "N/A", inline=False)
-        embed.add_field(name="Fattest User", value=fattest_user.mention if fattest_user else "N/A", inline=False)
+        # Mention by ID so the members don't need to be cached
+        embed.add_field(name="Today's Crush", value=f"<@{todays_crush}>" if todays_crush else "N/A", inline=False)
+        embed.add_field(name="Fattest User", value=f"<@{fattest_user}>" if fattest_user else "N/A", inline=False)
         embed.add_field(name="Horniness", value=f"`{user_info['horniness_level']}%`", inline=True)
         embed.add_field(name="Penis Length", value=f"`{user_info['penis_length']} inches`", inline=True)
         embed.add_field(name="Height Today", value=f"`{user_info['height_amount']}`", inline=True)
@@ -205,12 +199,12 @@ class AuraCommands(commands.Cog):
 
         if 'aura_reading' not in user_info:
             user_info['aura_reading'] = await self.generate_aura_reading()
-            asyncio.create_task(self.save_data())
+            self.save_guild(ctx.guild.id)
 
         embed.add_field(name="Daily Aura Reading", value=f"`{user_info['aura_reading']}`", inline=False)
         embed.set_footer(text=f"Requested by {ctx.author.name} | Refreshes at midnight")
 
-        animated_avatar = await self.create_animated_avatar(ctx.author.display_avatar.url)
+        animated_avatar = await self.create_animated_avatar(ctx.author, ctx.guild)
         if animated_avatar:
             embed.set_thumbnail(url="attachment://animated_avatar.gif")
             await ctx.reply(embed=embed, file=animated_avatar)
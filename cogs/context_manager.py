@@ -4,6 +4,11 @@ import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List
 from collections import deque
+import logging
+
+log = logging.getLogger('jackybot.context')
+# One line per request; bot.py samples this logger (JACKYBOT_LOG_SAMPLE_CONTEXT)
+budget_log = logging.getLogger('jackybot.context.budget')
 
 class ContextManager(commands.Cog):
     __slots__ = ('bot', 'conversation_contexts', 'cleanup_task', 'context_token_budget',
@@ -15,7 +20,7 @@ class ContextManager(commands.Cog):
         self.context_token_budget = 8000
         self.estimated_tokens_per_message = 150
         self.groq_chat_cog = None
-        self.cleanup_task = asyncio.create_task(self.cleanup_old_contexts())
+        self.cleanup_task = bot.scheduler.every('context.cleanup', 3600, self.cleanup_old_contexts, align=60)
 
     def cog_unload(self):
         self.cleanup_task.cancel()
@@ -25,23 +30,14 @@ class ContextManager(commands.Cog):
         self.groq_chat_cog = self.bot.get_cog("GroqChat")
 
     async def cleanup_old_contexts(self):
-        while True:
-            try:
-                await asyncio.sleep(3600)
-                now = datetime.now()
-                cutoff_time = now - timedelta(hours=1)
-
-                expired_guilds = [guild_id for guild_id, context_data in self.conversation_contexts.items()
-                                if context_data["last_updated"] < cutoff_time]
+        cutoff_time = datetime.now() - timedelta(hours=1)
 
-                for guild_id in expired_guilds:
-                    del self.conversation_contexts[guild_id]
-                    print(f"Cleared conversation context for guild {guild_id}")
+        expired_guilds = [guild_id for guild_id, context_data in self.conversation_contexts.items()
+                        if context_data["last_updated"] < cutoff_time]
 
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                print(f"Error in cleanup task: {e}")
+        for guild_id in expired_guilds:
+            del self.conversation_contexts[guild_id]
+            log.info("Cleared conversation context for guild %s", guild_id)
 
     def estimate_tokens(self, text: str) -> int:
         if not text:
@@ -111,7 +107,8 @@ class ContextManager(commands.Cog):
         if context["estimated_tokens"] > max_context_tokens:
             messages[:] = self.edit_context_for_token_budget(messages, max_context_tokens)
             context["estimated_tokens"] = self.estimate_message_tokens(messages)
-            print(f"Context editing applied for guild {guild_id}. Token estimate: {context['estimated_tokens']}/{max_context_tokens}")
+            log.info("Context editing applied for guild %s. Token estimate: %d/%d",
+                     guild_id, context['estimated_tokens'], max_context_tokens)
 
     async def get_conversation_messages(self, guild_id: int, current_prompt: str, message: discord.Message = None) -> List[Dict]:
         if not self.groq_chat_cog:
@@ -146,12 +143,15 @@ class ContextManager(commands.Cog):
             history_tokens = self.estimate_message_tokens(conversation_history)
             if history_tokens > max_history_tokens:
                 conversation_history = self.edit_context_for_token_budget(conversation_history, max_history_tokens)
-                print(f"Context trimmed for API call. Estimated tokens: System={system_tokens}, History={self.estimate_message_tokens(conversation_history)}, Current={current_tokens}")
+                log.info("Context trimmed for API call. Estimated tokens: System=%d, History=%d, Current=%d",
+                         system_tokens, self.estimate_message_tokens(conversation_history), current_tokens)
 
         messages = [system_message] + conversation_history + [current_message]
 
         total_estimated = self.estimate_message_tokens(messages)
-        print(f"<budget:token_estimate>{total_estimated}/{self.context_token_budget}; {self.context_token_budget - total_estimated} estimated remaining</budget>")
+        budget_log.info("Context budget: %d/%d tokens, %d remaining",
+                        total_estimated, self.context_token_budget, self.context_token_budget - total_estimated,
+                        extra={'tokens': total_estimated, 'budget': self.context_token_budget})
 
         return messages
 
@@ -1,12 +1,9 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import datetime
-import aiohttp
-import json
-import os
-import aiofiles
 from collections import defaultdict
 import logging
+from cogs.utils import schemas, serial
 
 class EpicGamesCog(commands.Cog):
     def __init__(self, bot):
@@ -17,40 +14,29 @@ class EpicGamesCog(commands.Cog):
         self.epic_api_url = "https://store-site-backend-static-ipv4.ak.epicgames.com/freeGamesPromotions?locale=en-US&country=US&allowCountries=US"
         self.epic_store_base = "https://store.epicgames.com/en-US/p/"
         self.epic_free_games_url = "https://store.epicgames.com/en-US/free-games"
-        # Don't start the task here - let it start after the bot is ready
+        self.started = False
+        self.check_job = None
 
     async def cog_load(self):
         """Called when the cog is loaded"""
         await self.load_announced_games()
-        # Task will start automatically via before_loop when bot is ready
+        # Hourly, jittered so it does not poll in step with the other update cogs
+        self.check_job = self.bot.scheduler.every('freegames.check', 3600, self.check_free_games, delay=60, jitter=300)
 
     async def cog_unload(self):
-        if self.check_free_games.is_running():
-            self.check_free_games.cancel()
+        if self.check_job is not None:
+            self.check_job.cancel()
         await self.save_announced_games()
 
-    async def cog_load(self):
-        """Called when the cog is loaded"""
-        # Task will start automatically via before_loop when bot is ready
-        pass
-
     async def load_announced_games(self):
-        try:
-            async with aiofiles.open(self.announced_games_file, 'r') as f:
-                content = await f.read()
-                if content.strip():
-                    data = json.loads(content)
-                    # Convert string keys back to defaultdict structure
-                    for guild_id, games in data.items():
-                        self.announced_games[guild_id] = games
-        except (FileNotFoundError, json.JSONDecodeError):
-            pass
+        data = await serial.load(self.announced_games_file, schemas.ANNOUNCED_GAMES)
+        # Convert string keys back to defaultdict structure
+        for guild_id, games in data.items():
+            self.announced_games[guild_id] = games
 
     async def save_announced_games(self):
         try:
-            os.makedirs(os.path.dirname(self.announced_games_file), exist_ok=True)
-            async with aiofiles.open(self.announced_games_file, 'w') as f:
-                await f.write(json.dumps(dict(self.announced_games), separators=(',', ':')))
+            await serial.save(self.announced_games_file, self.announced_games)
         except Exception as e:
             print(f"Error saving announced games: {e}")
 
@@ -73,53 +59,52 @@ class EpicGamesCog(commands.Cog):
 
     async def get_epic_free_games(self):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.epic_api_url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                    if response.status != 200:
-                        print(f"Epic API returned status {response.status}")
-                        return []
-                    
-                    data = await response.json()
-                    current_time = datetime.datetime.now(datetime.timezone.utc)
+            response = await self.bot.web.get(self.epic_api_url, timeout=30)
+            if response.status != 200:
+                print(f"Epic API returned status {response.status}")
+                return []
+            
+            data = response.json()
+            current_time = datetime.datetime.now(datetime.timezone.utc)
+            
+            free_games = []
+            for element in data['data']['Catalog']['searchStore']['elements']:
+                promotions = element.get('promotions')
+                if not (promotions and promotions.get('promotionalOffers')):
+                    continue
+                
+                # Check if there are active promotional offers
+                if not promotions['promotionalOffers']:
+                    continue
                     
-                    free_games = []
-                    for element in data['data']['Catalog']['searchStore']['elements']:
-                        promotions = element.get('promotions')
-                        if not (promotions and promotions.get('promotionalOffers')):
-                            continue
-                        
-                        # Check if there are active promotional offers
-                        if not promotions['promotionalOffers']:
-                            continue
-                            
-                        promo = promotions['promotionalOffers'][0]['promotionalOffers'][0]
-                        
-                        # Parse dates more safely
-                        try:
-                            start_date = promo['startDate'].replace('Z', '+00:00')
-                            end_date = promo['endDate'].replace('Z', '+00:00')
-                            start_time = datetime.datetime.fromisoformat(start_date)
-                            end_time = datetime.datetime.fromisoformat(end_date)
-                        except (ValueError, KeyError) as e:
-                            print(f"Error parsing dates for {element.get('title', 'Unknown')}: {e}")
-                            continue
-                        
-                        # Check if the offer is currently active
-                        if start_time <= current_time <= end_time:
-                            mappings = element.get('catalogNs', {}).get('mappings', [])
-                            link = f"{self.epic_store_base}{mappings[0]['pageSlug']}" if mappings else self.epic_free_games_url
-                            thumbnail = next((img['url'] for img in element.get('keyImages', []) if img['type'] == 'Thumbnail'), None)
-                            
-                            free_games.append({
-                                'id': element['id'],
-                                'title': element['title'],
-                                'start_time': start_time,
-                                'end_time': end_time,
-                                'link': link,
-                                'thumbnail': thumbnail
-                            })
+                promo = promotions['promotionalOffers'][0]['promotionalOffers'][0]
+                
+                # Parse dates more safely
+                try:
+                    start_date = promo['startDate'].replace('Z', '+00:00')
+                    end_date = promo['endDate'].replace('Z', '+00:00')
+                    start_time = datetime.datetime.fromisoformat(start_date)
+                    end_time = datetime.datetime.fromisoformat(end_date)
+                except (ValueError, KeyError) as e:
+                    print(f"Error parsing dates for {element.get('title', 'Unknown')}: {e}")
+                    continue
+                
+                # Check if the offer is currently active
+                if start_time <= current_time <= end_time:
+                    mappings = element.get('catalogNs', {}).get('mappings', [])
+                    link = f"{self.epic_store_base}{mappings[0]['pageSlug']}" if mappings else self.epic_free_games_url
+                    thumbnail = next((img['url'] for img in element.get('keyImages', []) if img['type'] == 'Thumbnail'), None)
                     
-                    return free_games
+                    free_games.append({
+                        'id': element['id'],
+                        'title': element['title'],
+                        'start_time': start_time,
+                        'end_time': end_time,
+                        'link': link,
+                        'thumbnail': thumbnail
+                    })
+            
+            return free_games
         except Exception as e:
             print(f"Error fetching Epic Games data: {e}")
             return []
@@ -203,28 +188,18 @@ class EpicGamesCog(commands.Cog):
         if changes:
             await self.save_announced_games()
 
-    @tasks.loop(hours=1)
     async def check_free_games(self):
+        await self.bot.wait_until_ready()
+        if not self.started:
+            self.started = True
+            print("Epic Games task started")
+            # Populate active_games on startup to prevent duplicate announcements
+            await self.populate_active_games_on_startup()
         try:
             await self.process_free_games()
         except Exception as e:
             print(f"Error in check_free_games: {e}")
 
-    @check_free_games.before_loop
-    async def before_check_free_games(self):
-        await self.bot.wait_until_ready()
-        print("Epic Games task started")
-        # Populate active_games on startup to prevent duplicate announcements
-        await self.populate_active_games_on_startup()
-
-    @check_free_games.error
-    async def check_free_games_error(self, error):
-        print(f"Task error: {error}")
-        # Restart the task if it fails
-        if not self.check_free_games.is_running():
-            print("Restarting Epic Games task...")
-            self.check_free_games.restart()
-
     @commands.command(name='freegames')
     async def list_free_games(self, ctx):
         guild_id = str(ctx.guild.id)
@@ -270,9 +245,12 @@ class EpicGamesCog(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def task_status(self, ctx):
         """Check if the task is running (admin only)"""
-        status = "running" if self.check_free_games.is_running() else "stopped"
-        next_run = self.check_free_games.next_iteration
-        await ctx.send(f"Epic Games task is currently: **{status}**\nNext run: {next_run}")
+        job = self.check_job
+        if job is None or job.cancelled:
+            return await ctx.send("Epic Games task is currently: **stopped**")
+        status = "running" if job.running else "scheduled"
+        await ctx.send(f"Epic Games task is currently: **{status}**\nNext run: in {job.next_in / 60:.0f} minutes "
+                       f"({job.runs} runs, {job.failures} failed)")
 
 async def setup(bot):
     await bot.add_cog(EpicGamesCog(bot))
\ No newline at end of file
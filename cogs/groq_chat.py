@@ -11,6 +11,10 @@ import time
 from collections import deque
 from functools import lru_cache, partial
 import aiofiles
+import logging
+from cogs.utils.overload import Overloaded
+
+log = logging.getLogger('jackybot.groq')
 
 class SimpleCache:
     """Simple async-safe cache with TTL."""
@@ -20,6 +24,9 @@ class SimpleCache:
         self._cache = {}
         self._lock = asyncio.Lock()
 
+    def __len__(self):
+        return len(self._cache)
+
     async def get(self, key: str, default=None):
         async with self._lock:
             if key in self._cache:
@@ -39,13 +46,13 @@ class GroqChat(commands.Cog):
                  'queue_processors', '_bot_id', '_bot_mentions', '_think_pattern', 'system_prompt',
                  'user_rate_limits', 'guild_rate_limits', 'request_queue', 'global_request_times', 'last_request_time',
                  'consecutive_rate_limits', 'adaptive_delay', 'last_successful_request', 'context_manager', '_cache',
-                 'active_requests', 'max_concurrent_requests', 'min_request_interval')
+                 'active_requests', 'max_concurrent_requests', 'min_request_interval', 'ipc')
 
     def __init__(self, bot):
         self.bot = bot
         self.groq_api_key = os.environ.get("GROQ_API_KEY")
         if not self.groq_api_key:
-            print("WARNING: GROQ_API_KEY not set. Groq integration will not work.")
+            log.warning("GROQ_API_KEY not set. Groq integration will not work.")
             self.groq_client = None
         else:
             self.groq_client = groq.Client(
@@ -81,9 +88,15 @@ class GroqChat(commands.Cog):
         self._cache = SimpleCache()
 
         self.cleanup_task = asyncio.create_task(self._start_queue_processors())
-        self.rate_limit_cleanup_task = asyncio.create_task(self._cleanup_rate_limits())
+        self.rate_limit_cleanup_task = bot.scheduler.every('groq.rate_limit_cleanup', 300, self._cleanup_rate_limits, align=60)
         self.queue_processors = []
 
+        # A user can talk to the bot in guilds on other clusters; their requests count here too.
+        # Guilds live on a single cluster, so the guild limit stays local.
+        self.ipc = getattr(bot, 'ipc', None)
+        if self.ipc is not None:
+            self.ipc.on('groq.user_request', self._on_remote_request)
+
     async def _load_system_prompt(self) -> str:
         """Load system prompt from file with fallback."""
         try:
@@ -91,9 +104,9 @@ class GroqChat(commands.Cog):
                 content = await f.read()
                 return content.strip()
         except FileNotFoundError:
-            print("WARNING: jackybot_system_prompt.md not found. Using default system prompt.")
+            log.warning("jackybot_system_prompt.md not found. Using default system prompt.")
         except Exception as e:
-            print(f"WARNING: Error reading system prompt file: {e}. Using default system prompt.")
+            log.warning("Error reading system prompt file: %s. Using default system prompt.", e)
 
         return "You are JackyBot, a Discord bot assistant created by FakeJason. You help users with various queries ranging from server management to gaming news and creative support. Keep your total response under 2000 characters."
 
@@ -103,6 +116,8 @@ class GroqChat(commands.Cog):
         self.rate_limit_cleanup_task.cancel()
         for processor in self.queue_processors:
             processor.cancel()
+        if self.ipc is not None:
+            self.ipc.off('groq.user_request')
 
     async def cog_load(self):
         """Initialize async resources after cog is loaded."""
@@ -139,37 +154,37 @@ class GroqChat(commands.Cog):
         """Check if a user has exceeded their rate limit."""
         return self._check_rate_limit(self.user_rate_limits, user_id, max_requests, window_seconds)
 
+    def _on_remote_request(self, user_id: int):
+        """Count a request the user made on another cluster against their limit here."""
+        now = time.time()
+        entry = self.user_rate_limits.get(user_id)
+        if entry is None:
+            entry = (deque(), now)
+        entry[0].append(now)
+        self.user_rate_limits[user_id] = (entry[0], now)
+
     def check_guild_rate_limit(self, guild_id: int, max_requests: int = 10, window_seconds: int = 60) -> Tuple[bool, int]:
         """Check if a guild has exceeded its rate limit."""
         return self._check_rate_limit(self.guild_rate_limits, guild_id, max_requests, window_seconds)
     
     async def _cleanup_rate_limits(self):
-        """Periodically clean up old rate limit entries to prevent memory leaks."""
-        while True:
-            try:
-                await asyncio.sleep(300)
-                now = time.time()
-                cleanup_threshold = now - 3600
-
-                user_cleanup_count = 0
-                for user_id, (requests, last_access) in list(self.user_rate_limits.items()):
-                    if last_access < cleanup_threshold:
-                        del self.user_rate_limits[user_id]
-                        user_cleanup_count += 1
-
-                guild_cleanup_count = 0
-                for guild_id, (requests, last_access) in list(self.guild_rate_limits.items()):
-                    if last_access < cleanup_threshold:
-                        del self.guild_rate_limits[guild_id]
-                        guild_cleanup_count += 1
-
-                if user_cleanup_count or guild_cleanup_count:
-                    print(f"Rate limit cleanup: Removed {user_cleanup_count} users, {guild_cleanup_count} guilds")
-
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                print(f"Error in rate limit cleanup: {e}")
+        """Drop rate limit entries idle for an hour so they do not leak (runs every 5 minutes)."""
+        cleanup_threshold = time.time() - 3600
+
+        user_cleanup_count = 0
+        for user_id, (requests, last_access) in list(self.user_rate_limits.items()):
+            if last_access < cleanup_threshold:
+                del self.user_rate_limits[user_id]
+                user_cleanup_count += 1
+
+        guild_cleanup_count = 0
+        for guild_id, (requests, last_access) in list(self.guild_rate_limits.items()):
+            if last_access < cleanup_threshold:
+                del self.guild_rate_limits[guild_id]
+                guild_cleanup_count += 1
+
+        if user_cleanup_count or guild_cleanup_count:
+            log.info("Rate limit cleanup: Removed %d users, %d guilds", user_cleanup_count, guild_cleanup_count)
     
     async def _start_queue_processors(self):
         """Start multiple concurrent queue processors."""
@@ -211,12 +226,14 @@ class GroqChat(commands.Cog):
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                print(f"Error in queue processor {worker_id}: {e}")
+                log.exception("Error in queue processor %s: %s", worker_id, e)
                 await asyncio.sleep(1)
     
     async def _groq_request_with_retry(self, messages: List[Dict], max_retries: int = 3) -> str:
         """Make a Groq API request with exponential backoff retry logic."""
         loop = asyncio.get_event_loop()
+        # Shorter answers while the bot is under pressure
+        max_tokens = self.bot.overload.scale(512, 256)
 
         for attempt in range(max_retries):
             try:
@@ -226,7 +243,7 @@ class GroqChat(commands.Cog):
                     lambda: self.groq_client.chat.completions.create(
                         model=self.model,
                         messages=messages,
-                        max_completion_tokens=512,
+                        max_completion_tokens=max_tokens,
                         reasoning_effort=self.reasoning_effort,
                         stream=False,
                         stop=None,
@@ -241,7 +258,7 @@ class GroqChat(commands.Cog):
                 if "429" in error_str or "Too Many Requests" in error_str:
                     if attempt < max_retries - 1:
                         wait_time = 60  # Wait 60 seconds for rate limit reset
-                        print(f"Rate limited by Groq API. Waiting {wait_time}s (attempt {attempt + 1}/{max_retries})")
+                        log.warning("Rate limited by Groq API. Waiting %ss (attempt %d/%d)", wait_time, attempt + 1, max_retries)
                         await asyncio.sleep(wait_time)
                         continue
                     else:
@@ -250,7 +267,7 @@ class GroqChat(commands.Cog):
                 # Handle other errors with exponential backoff
                 if attempt < max_retries - 1:
                     wait_time = 2 ** attempt
-                    print(f"API error: {error_str}. Retrying in {wait_time}s")
+                    log.warning("API error: %s. Retrying in %ss", error_str, wait_time)
                     await asyncio.sleep(wait_time)
                 else:
                     raise
@@ -371,6 +388,8 @@ class GroqChat(commands.Cog):
         user_allowed, user_wait = self.check_user_rate_limit(message.author.id, max_requests=6, window_seconds=60)
         if not user_allowed:
             return False, f"⏱️ You're sending requests too quickly! Please wait {user_wait} seconds."
+        if self.ipc is not None:
+            self.ipc.publish('groq.user_request', message.author.id)
 
         # Check guild rate limit (5 requests per minute)
         guild_allowed, guild_wait = self.check_guild_rate_limit(message.guild.id, max_requests=5, window_seconds=60)
@@ -416,9 +435,9 @@ class GroqChat(commands.Cog):
             await self._handle_image_request(message, image_prompt)
             return
 
-        # Check for direct command intent
+        # Check for direct command intent; shortcuts to commands that are not loaded fall through to the AI
         command_name, command_args = self._detect_command_intent(prompt)
-        if command_name:
+        if command_name and self.bot.registry.snapshot.get(command_name) is not None:
             await self._handle_command_request(message, command_name, command_args)
             return
 
@@ -432,6 +451,12 @@ class GroqChat(commands.Cog):
             await message.reply(error_msg)
             return
 
+        try:
+            self.bot.overload.admit('groq')
+        except Overloaded as e:
+            await message.reply(e.user_message())
+            return
+
         # Process the AI request
         await self._process_ai_request(message, guild_id, prompt)
 
@@ -471,7 +496,7 @@ class GroqChat(commands.Cog):
                 await ctx.invoke(create_command, prompt=image_prompt)
                 return
         except Exception as e:
-            print(f"Failed to invoke create command: {e}")
+            log.error("Failed to invoke create command: %s", e)
 
         # Fall back to normal response if image generation fails
         await message.reply("Image generation failed. Please try again or use a different prompt.")
@@ -494,7 +519,7 @@ class GroqChat(commands.Cog):
             
             return True
         except Exception as e:
-            print(f"Failed to invoke {command_name} command: {e}")
+            log.error("Failed to invoke %s command: %s", command_name, e)
             await message.reply(f"Sorry, I couldn't execute that command: {str(e)}")
             return False
 
@@ -549,11 +574,15 @@ class GroqChat(commands.Cog):
     async def _get_bot_stats(self) -> str:
         """Get compact bot statistics for context."""
         try:
-            command_stats = await self.load_json_file("data/command_stats.json")
+            analytics = self.bot.get_cog("CommandAnalytics")
+            if analytics is not None:
+                total_commands = analytics.total
+            else:
+                command_stats = await self.load_json_file("data/command_stats.json")
+                total_commands = sum(command_stats.values())
             guilds = self.bot.guilds
             total_servers = len(guilds)
             total_users = sum(guild.member_count for guild in guilds)
-            total_commands = sum(command_stats.values())
             return f"STATS: {total_servers} servers, {total_users} users, {total_commands} commands used"
         except:
             return ""
@@ -627,7 +656,7 @@ class GroqChat(commands.Cog):
                     await self._cache.set(cache_key, data, ttl_seconds=300)
                     return data
         except Exception as e:
-            print(f"Error loading JSON file {filename}: {e}")
+            log.error("Error loading JSON file %s: %s", filename, e)
         return {}
 
     def get_all_bot_commands(self) -> Dict:
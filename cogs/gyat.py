@@ -1,38 +1,17 @@
 import discord
 from discord.ext import commands
-from PIL import Image, ImageDraw
 import io
-import aiohttp
-import json
-import os
 from datetime import datetime, timedelta
 import random
 import asyncio
+from cogs.utils.render import GYAT_AVATAR_SIZE, GYAT_BACKGROUNDS, gyat_png
 
 class DailyRandomAvatar(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.user_avatars = {}
         self.json_file = 'data/user_avatars.json'
-        self.background_images = ['v1.png', 'v2.png', 'v3.png', 'v4.png', 'v5.png', 'v6.png']
-        
-        # Pre-load background images into memory
-        self.backgrounds = {name: Image.open(os.path.join('assets/images', name)) for name in self.background_images}
-        
-        # Precompute constants and masks
-        self.avatar_size = 300
-        self.border_size = 6
-        self.total_size = 312  # avatar_size + 2 * border_size
-        self.avatar_pos = (304, 84)  # Pre-calculated position
-        
-        # Precompute masks once
-        self.border_mask = Image.new('L', (self.total_size, self.total_size), 0)
-        draw = ImageDraw.Draw(self.border_mask)
-        draw.ellipse((0, 0, self.total_size, self.total_size), fill=255)
-        
-        self.avatar_mask = Image.new('L', (self.avatar_size, self.avatar_size), 0)
-        draw = ImageDraw.Draw(self.avatar_mask)
-        draw.ellipse((0, 0, self.avatar_size, self.avatar_size), fill=255)
+        # Backgrounds and masks are preloaded in the render workers
+        self.background_images = GYAT_BACKGROUNDS
         
         # Pre-generate compliments list
         self.compliments = [
@@ -43,39 +22,33 @@ class DailyRandomAvatar(commands.Cog):
             "Bringing that cake to the party! 🎂"
         ]
         
-        # Single session for all HTTP requests
-        self.session = aiohttp.ClientSession()
-        
-        self.load_user_avatars()
         self.bot.loop.create_task(self.daily_reset())
 
-    def load_user_avatars(self):
-        if os.path.exists(self.json_file):
-            with open(self.json_file, 'r') as f:
-                self.user_avatars = json.load(f)
-
-    def save_user_avatars(self):
-        with open(self.json_file, 'w') as f:
-            json.dump(self.user_avatars, f)
+    async def cog_load(self):
+        # Per-user rows are written from every cluster, so they are read from the store each time.
+        await self.bot.store.prepare('user_avatars', legacy_path=self.json_file)
 
-    def get_user_background(self, user_id):
+    async def get_user_background(self, user_id):
         today = datetime.now().date().isoformat()
-        user_data = self.user_avatars.get(user_id)
-        if not user_data or user_data['date'] != today:
-            self.user_avatars[user_id] = {
+
+        def todays(user_data):
+            if user_data and user_data['date'] == today:
+                return user_data
+            return {
                 'background': random.choice(self.background_images),
                 'date': today
             }
-            self.save_user_avatars()
-        return self.user_avatars[user_id]['background']
+
+        return (await self.bot.store.update('user_avatars', user_id, todays))['background']
 
     async def daily_reset(self):
         while True:
             now = datetime.now()
             next_midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
             await asyncio.sleep((next_midnight - now).total_seconds())
-            self.user_avatars.clear()
-            self.save_user_avatars()
+            # Stale rows are replaced on use anyway; the purge only needs to run once.
+            if getattr(self.bot, 'cluster_id', 0) == 0:
+                self.bot.store.clear('user_avatars')
 
     @commands.command(name="gyat")
     async def gyat(self, ctx):
@@ -84,28 +57,16 @@ class DailyRandomAvatar(commands.Cog):
     async def send_gyat_image(self, ctx):
         user = ctx.author
         user_id = str(user.id)
-        background_key = self.get_user_background(user_id)
-        img = self.backgrounds[background_key].copy()
+        background_key = await self.get_user_background(user_id)
 
-        # Download and process avatar
-        avatar_url = user.avatar.with_size(512).url
-        async with self.session.get(avatar_url) as resp:
-            avatar_data = await resp.read()
-            avatar = Image.open(io.BytesIO(avatar_data)).resize((self.avatar_size, self.avatar_size))
+        # Decoded avatar from the shared cache, composited in a render worker
+        avatar = await self.bot.avatars.get(user, GYAT_AVATAR_SIZE)
+        if avatar is None:
+            await ctx.reply("Couldn't fetch your avatar. Please try again later.")
+            return
 
-        # Create bordered avatar in one operation
-        bordered_avatar = Image.new('RGBA', (self.total_size, self.total_size), (0, 0, 0, 255))
-        bordered_avatar.paste(avatar, (self.border_size, self.border_size), self.avatar_mask)
-        
-        # Apply mask and composite directly
-        output = Image.new('RGBA', (self.total_size, self.total_size), (0, 0, 0, 0))
-        output.paste(bordered_avatar, mask=self.border_mask)
-        img.paste(output, self.avatar_pos, output)
-
-        # Optimize image saving
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG', optimize=True, compress_level=1)
-        buffer.seek(0)
+        png = await self.bot.render.submit('gyat', gyat_png, avatar, background_key)
+        buffer = io.BytesIO(png)
 
         # Create embed with pre-selected compliment
         embed = discord.Embed(
@@ -119,8 +80,5 @@ class DailyRandomAvatar(commands.Cog):
 
         await ctx.reply(file=discord.File(buffer, filename="daily_avatar.png"), embed=embed)
 
-    def cog_unload(self):
-        asyncio.create_task(self.session.close())
-
 async def setup(bot):
     await bot.add_cog(DailyRandomAvatar(bot))
\ No newline at end of file
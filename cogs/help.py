@@ -2,7 +2,6 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from discord.ui import View, Button, Select
-from functools import lru_cache
 
 class CustomHelpCommand(commands.Cog):
     def __init__(self, bot):
@@ -27,104 +26,68 @@ class CustomHelpCommand(commands.Cog):
         embed.set_footer(text="We apologize for the inconvenience")
         await ctx.reply(embed=embed)
 
-    @lru_cache(maxsize=1)
-    def get_commands_by_category(self):
-        """Organize commands by category with emojis"""
-        return {
-            "🔧 General": {
-                "!help": "Show bot commands",
-                "!roles": "Manage server roles quickly",
-                "!ping": "Check bot connection to Discord",
-                "!stats": "Display bot statistics",
-                "!botinfo": "Display basic bot info"
-            },
-            "🎨 Media": {
-                "@JackyBot": "ChatGPT",
-                "!music": "AI Music Generation (MusicGen)",
-                "!quote": "Reply to a message to create a meme quote",
-                "!avatar": "Fullscreen user avatar"
-            },
-            "🎵 Music": {
-                "!play": "Play music in voice channel",
-                "!skip": "Skip current song",
-                "!leave": "Kick bot from voice channel",
-                "!queue": "Show all items in music queue"
-            },
-            "📋 Playlist": {
-                "!playlist delete": "Delete a playlist",
-                "!pl create [name]": "Create a new playlist",
-                "!pl list": "Show all playlists",
-                "!pl view [name]": "View a playlist",
-                "!pl delete [name]": "Delete a playlist"
-            },
-            "🎮 Fun and Games": {
-                "!gyat": "Check how your body is looking today",
-                "!aura": "Daily Aura Reading",
-                "!love": "Check connection between users",
-                "!triggered": "Reply to an image with this command to trigger",
-                "!tts": "Text to speech message",
-                "!deaf": "Bot will TTS every message in chat",
-                "!trivia": "Start trivia game",
-                "!steamos_latest": "Get latest SteamOS info"
-            },
-            "😂 Meme Templates": {
-                "!punisher": "Punisher meme template",
-                "!homelander": "Homelander meme template"
-            },
-            "💡 Suggestions": {
-                "!suggestions": "Create a suggestion request (Admin only)",
-                "!clear_suggestions": "Clear suggestion data (Admin only)"
-            }
-        }
-    
-    def create_category_embed(self, category, commands_dict):
-        """Create an embed for a specific category"""
-        embed = discord.Embed(
-            title=f"{category} Commands", 
-            color=0x2b2d31,
-            description="Select a category from the dropdown menu to view commands."
-        )
-        
-        for command, description in commands_dict.items():
-            embed.add_field(name=f"`{command}`", value=description, inline=False)
-            
-        embed.set_footer(text="Navigate between categories using the dropdown menu")
-        return embed
+    def create_category_embed(self, category):
+        """The pre-rendered embed for a category from the current command registry snapshot, or None"""
+        return self.bot.registry.snapshot.embeds.get(category)
     
     class HelpView(View):
         def __init__(self, help_cog, timeout=60):
             super().__init__(timeout=timeout)
             self.help_cog = help_cog
-            self.commands_by_category = help_cog.get_commands_by_category()
+            self.select = None
             
             # Add category selector
             self.add_category_selector()
             
         def add_category_selector(self):
+            # Categories come from the snapshot current when the menu is built or refreshed
+            snapshot = self.help_cog.bot.registry.snapshot
             options = [
-                discord.SelectOption(label=category.split(" ", 1)[1], emoji=category.split(" ", 1)[0], value=category)
-                for category in self.commands_by_category.keys()
-            ]
-            
-            select = Select(
+                discord.SelectOption(label=category, emoji=snapshot.icons[category] or None, value=category,
+                                     description=f"{len(commands)} commands")
+                for category, commands in snapshot.categories.items()
+            ][:25]
+            
+            if self.select is not None:
+                self.remove_item(self.select)
+            self.select = Select(
                 placeholder="Select command category",
                 options=options,
                 custom_id="category_select"
             )
             
-            select.callback = self.category_callback
-            self.add_item(select)
+            self.select.callback = self.category_callback
+            self.add_item(self.select)
             
         async def category_callback(self, interaction: discord.Interaction):
             selected_category = interaction.data["values"][0]
-            category_commands = self.commands_by_category[selected_category]
-            embed = self.help_cog.create_category_embed(selected_category, category_commands)
+            embed = self.help_cog.create_category_embed(selected_category)
+            if embed is None:
+                # Cogs were unloaded since this menu was sent; offer what exists now
+                self.add_category_selector()
+                await interaction.response.edit_message(view=self)
+                return await interaction.followup.send(
+                    f"The {selected_category} category is no longer available.", ephemeral=True)
             await interaction.response.edit_message(embed=embed, view=self)
-    
+
+    async def command_help(self, ctx, name):
+        """Help for one command, or the closest matches when the name is unknown"""
+        snapshot = self.bot.registry.snapshot
+        info = snapshot.get(name.lstrip(ctx.prefix or '!'))
+        if info is not None:
+            return await ctx.send(embed=snapshot.command_embeds[info.name])
+        suggestions = snapshot.suggest(name)
+        hint = ("Did you mean " + ", ".join(f"`{s.usage}`" for s in suggestions) + "?") if suggestions else \
+            "Use `!help` to browse every command."
+        await ctx.send(f"No command called `{name}`. {hint}")
+
     @commands.command(name="help")
-    async def custom_help(self, ctx, command=None):
-        """Custom help command directing users to web UI"""
+    async def custom_help(self, ctx, *, command=None):
+        """Show bot commands, or details for one command"""
         try:
+            if command:
+                return await self.command_help(ctx, command)
+
             web_ui_url = "https://jackybot.xyz"
             
             embed = discord.Embed(
@@ -153,7 +116,7 @@ class CustomHelpCommand(commands.Cog):
             embed.set_footer(text="For support, visit jackybot.xyz", icon_url=self.bot.user.avatar.url if self.bot.user.avatar else None)
             embed.set_thumbnail(url=self.bot.user.avatar.url if self.bot.user.avatar else None)
             
-            view = View()
+            view = self.HelpView(self)
             view.add_item(Button(label="Open Web UI", url=web_ui_url, style=discord.ButtonStyle.link, emoji="🌐"))
             
             await ctx.send(embed=embed, view=view)
@@ -226,6 +189,9 @@ class CustomHelpCommand(commands.Cog):
             embed.add_field(name="Servers", value=str(guild_count), inline=True)
             embed.add_field(name="Users", value=str(user_count), inline=True)
             embed.add_field(name="Commands", value=str(len(self.bot.commands)), inline=True)
+            analytics = self.bot.get_cog("CommandAnalytics")
+            if analytics is not None:
+                embed.add_field(name="Commands Run", value=str(analytics.total), inline=True)
             embed.add_field(name="Uptime", value=str(uptime).split('.')[0], inline=True)
             embed.add_field(name="Latency", value=f"{round(self.bot.latency * 1000)}ms", inline=True)
             
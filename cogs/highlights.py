@@ -2,43 +2,41 @@ import discord
 from discord.ext import commands
 import asyncio
 from datetime import datetime
-import json
-import os
 
 class HighlightsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.star_emoji = "⭐"
+        self.star_threshold = 1
         self.data_file = 'data/highlights_data.json'
         self.highlighted_messages = set()
         self._image_extensions = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
         self._video_extensions = ('.mp4', '.mov', '.avi', '.webm')
-        self.load_data()
+        self._subscription = None
+
+    async def cog_load(self):
+        await self.load_data()
+        # Raw events, so stars on messages outside the message cache still count
+        self._subscription = self.bot.reactions.subscribe(
+            self.on_star, emoji=self.star_emoji, threshold=self.star_threshold,
+            check=lambda payload: payload.guild_id is not None
+            and f"{payload.guild_id}-{payload.message_id}" not in self.highlighted_messages)
 
     def cog_unload(self):
-        self.save_data()
+        if self._subscription is not None:
+            self.bot.reactions.unsubscribe(self._subscription)
 
-    def load_data(self):
+    async def load_data(self):
         """Load previously highlighted messages to avoid duplicates."""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-                    self.highlighted_messages = set(data.get('highlighted_messages', []))
-            except Exception as e:
-                print(f"Error loading highlights data: {e}")
-                self.highlighted_messages = set()
+        self.store = await self.bot.store.load(
+            'highlights', legacy_path=self.data_file,
+            transform=lambda data: dict.fromkeys(data.get('highlighted_messages', []), 1))
+        self.highlighted_messages = set(self.store.keys())
 
-    def save_data(self):
-        """Save highlighted messages data."""
-        try:
-            data = {
-                'highlighted_messages': list(self.highlighted_messages)
-            }
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f)
-        except Exception as e:
-            print(f"Error saving highlights data: {e}")
+    def save_highlight(self, message_id):
+        """Record a highlighted message; only that row is written."""
+        self.highlighted_messages.add(message_id)
+        self.store.put(message_id, 1)
 
     def get_highlight_channel_name(self, guild_id):
         """Get the configured highlight channel name for a server."""
@@ -145,19 +143,13 @@ class HighlightsCog(commands.Cog):
         
         return embed, files_to_send
 
-    @commands.Cog.listener()
-    async def on_reaction_add(self, reaction, user):
-        """Handle star reactions added to messages."""
-        # Ignore bot reactions
-        if user.bot:
+    async def on_star(self, event):
+        """Highlight a message once it has collected enough star reactions."""
+        message = event.message
+        user = event.member or self.bot.get_user(event.user_id)
+        if user is None:
             return
-        
-        # Check if it's a star emoji
-        if str(reaction.emoji) != self.star_emoji:
-            return
-        
-        message = reaction.message
-        
+
         # Don't highlight messages from the highlights channel itself
         highlight_channel_name = self.get_highlight_channel_name(message.guild.id)
         if message.channel.name == highlight_channel_name:
@@ -179,20 +171,13 @@ class HighlightsCog(commands.Cog):
             await highlight_channel.send(embed=embed, files=files)
             
             # Mark message as highlighted
-            self.highlighted_messages.add(message_id)
+            self.save_highlight(message_id)
             
         except discord.Forbidden:
             print(f"No permission to send message to highlights channel in {message.guild.name}")
         except Exception as e:
             print(f"Error sending highlight message: {e}")
 
-    @commands.Cog.listener()
-    async def on_reaction_remove(self, reaction, user):
-        """Handle star reactions removed from messages (optional cleanup)."""
-        # This could be used to remove highlights if the star count drops to 0
-        # For now, we'll keep highlights permanent once created
-        pass
-
     @commands.command(name='highlight_stats')
     @commands.has_permissions(manage_messages=True)
     async def highlight_stats(self, ctx):
@@ -5,7 +5,9 @@ import os
 import tempfile
 from PIL import ImageFont
 import textwrap
+import asyncio
 from functools import lru_cache
+from cogs.utils.uploads import TooLarge, probe_video, video_ladder, x264_args
 
 class VideoTextCog2(commands.Cog):
     def __init__(self, bot):
@@ -45,13 +47,7 @@ class VideoTextCog2(commands.Cog):
         
         return wrapped_text, estimated_height < height
 
-    def add_text_to_video(self, text, template_file):
-        if not os.path.exists(template_file):
-            raise FileNotFoundError(f"{template_file} not found")
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_output:
-            output_path = temp_output.name
-
+    def add_text_to_video(self, text, template_file, output_path, rung):
         try:
             input_video = ffmpeg.input(template_file)
             
@@ -71,6 +67,9 @@ class VideoTextCog2(commands.Cog):
                 drawtext_params['fontfile'] = self.font_path
             
             video_with_text = input_video.video.filter('drawtext', **drawtext_params)
+            width, height = rung.params['width'], rung.params['height']
+            if (width, height) != self.get_video_dimensions(template_file):
+                video_with_text = video_with_text.filter('scale', width, height)
             
             out = ffmpeg.output(
                 video_with_text,
@@ -80,17 +79,13 @@ class VideoTextCog2(commands.Cog):
                 acodec='aac',
                 preset='faster',
                 crf=23,
-                audio_bitrate='128k',
-                movflags='+faststart'
+                movflags='+faststart',
+                **x264_args(rung)
             )
             
             ffmpeg.run(out, quiet=True, overwrite_output=True)
             
         except ffmpeg.Error as e:
-            try:
-                os.remove(output_path)
-            except OSError:
-                pass
             error_details = e.stderr.decode() if e.stderr else 'Unknown ffmpeg error'
             raise Exception(f"FFmpeg processing failed: {error_details}")
         
@@ -101,21 +96,38 @@ class VideoTextCog2(commands.Cog):
             await ctx.send(f"Error: Your text exceeds the {self.char_limit} character limit. Please shorten your message.")
             return
 
-        async with ctx.typing():
+        async with self.bot.overload.slot('video'), ctx.typing():
             try:
                 wrapped_text, fits = self.check_text_fit(text, template_file)
                 if not fits:
                     await ctx.send("Error: The text is too long to fit in the video. Please use a shorter message.")
                     return
 
-                output_path = self.add_text_to_video(wrapped_text, template_file)
-                await ctx.reply("Here's your video with text and audio:", file=discord.File(output_path))
-                
+                if not os.path.exists(template_file):
+                    raise FileNotFoundError(f"{template_file} not found")
+
+                # Bitrate and size are picked for the guild's upload limit before encoding
+                uploads = self.bot.uploads
+                budget = uploads.budget(ctx.guild)
+                duration, width, height, fps = await asyncio.to_thread(probe_video, template_file)
+                rungs = video_ladder(budget, duration, width, height, fps)
+
+                with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_output:
+                    output_path = temp_output.name
                 try:
-                    os.remove(output_path)
-                except OSError:
-                    pass
+                    async def encode(rung):
+                        await asyncio.to_thread(self.add_text_to_video, wrapped_text, template_file, output_path, rung)
+                        return output_path
+                    await uploads.fit('homelander', rungs, encode, budget)
+                    await ctx.reply("Here's your video with text and audio:", file=discord.File(output_path))
+                finally:
+                    try:
+                        os.remove(output_path)
+                    except OSError:
+                        pass
                     
+            except TooLarge as e:
+                await ctx.send(e.user_message())
             except FileNotFoundError as e:
                 await ctx.send(f"Error: Template file not found - {str(e)}")
             except Exception as e:
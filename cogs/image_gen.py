@@ -7,6 +7,8 @@ import gc
 import time
 from functools import partial
 from .model_manager import model_manager
+from cogs.utils.cluster import shared_cooldown
+from cogs.utils.uploads import TooLarge, encode_image, image_ladder
 
 class ImageGeneration(commands.Cog):
     def __init__(self, bot):
@@ -52,8 +54,18 @@ class ImageGeneration(commands.Cog):
             
             return img_bytes.getvalue()
     
+    async def _fit_upload(self, guild, image_bytes, width, height):
+        """The PNG, or a JPEG (downscaled if need be) when the PNG would not fit the guild's upload limit."""
+        uploads = self.bot.uploads
+        budget = uploads.budget(guild)
+
+        async def encode(rung):
+            return await asyncio.to_thread(encode_image, image_bytes, rung)
+        rung, data = await uploads.fit('image_gen', image_ladder(width, height), encode, budget)
+        return data, 'jpg' if rung.format == 'jpeg' else 'png'
+    
     @commands.command(name='create')
-    @commands.cooldown(1, 30, commands.BucketType.user)
+    @shared_cooldown(1, 30, commands.BucketType.user)
     async def create_image(self, ctx, *, prompt: str):
         """Generate an AI image using Stable Diffusion 1.5.
 
@@ -82,7 +94,7 @@ class ImageGeneration(commands.Cog):
             await ctx.reply("❌ Prompt is too long. Please keep it under 500 characters.")
             return
         
-        if self.generation_lock.locked():
+        async def queued():
             queue_embed = discord.Embed(
                 title="⏳ Generation Queue",
                 description=f"**Your prompt:** {prompt}\n\n🔄 Another image is currently being generated. Your request has been added to the queue.\n\n⏱️ Please wait for the current generation to complete...",
@@ -91,7 +103,7 @@ class ImageGeneration(commands.Cog):
             queue_embed.set_footer(text="You'll be notified when generation starts")
             await ctx.reply(embed=queue_embed)
         
-        async with self.generation_lock:
+        async with self.bot.overload.slot('image_gen', on_wait=queued), self.generation_lock:
             try:
                 embed = discord.Embed(
                     title="🎨 Generating Image...",
@@ -109,10 +121,11 @@ class ImageGeneration(commands.Cog):
                     prompt
                 )
                 generation_time = time.time() - start_time
+                image_bytes, extension = await self._fit_upload(ctx.guild, image_bytes, 800, 800)
                 
                 file = discord.File(
                     io.BytesIO(image_bytes), 
-                    filename=f"generated_image_{int(time.time())}.png"
+                    filename=f"generated_image_{int(time.time())}.{extension}"
                 )
                 
                 success_embed = discord.Embed(
@@ -159,7 +172,7 @@ class ImageGeneration(commands.Cog):
                     gc.collect()
     
     @commands.command(name='create_advanced')
-    @commands.cooldown(1, 45, commands.BucketType.user)
+    @shared_cooldown(1, 45, commands.BucketType.user)
     async def create_image_advanced(self, ctx, *, params: str):
         """Advanced image generation with custom parameters.
 
@@ -200,6 +213,8 @@ class ImageGeneration(commands.Cog):
             
             steps_match = re.search(r'steps=(\d+)', params)
             steps = max(10, min(50, int(steps_match.group(1)) if steps_match else 20))
+            # Fewer steps while the bot is under pressure
+            steps = self.bot.overload.scale(steps, 10)
             
             guidance_match = re.search(r'guidance=([\d.]+)', params)
             guidance = max(1.0, min(20.0, float(guidance_match.group(1)) if guidance_match else 7.5))
@@ -216,7 +231,7 @@ class ImageGeneration(commands.Cog):
             await ctx.reply(f"❌ Error parsing parameters: {str(e)}\nExample: `!create_advanced prompt=\"a cat\" steps=25 guidance=8.0`")
             return
         
-        if self.generation_lock.locked():
+        async def queued():
             queue_embed = discord.Embed(
                 title="⏳ Advanced Generation Queue",
                 description=f"**Your prompt:** {prompt}\n**Settings:** Steps: {steps} | Guidance: {guidance} | Size: {width}x{height}\n\n🔄 Another image is currently being generated. Your advanced request has been added to the queue.\n\n⏱️ Please wait for the current generation to complete...",
@@ -227,7 +242,7 @@ class ImageGeneration(commands.Cog):
             queue_embed.set_footer(text="Advanced generation will start once queue is clear")
             await ctx.reply(embed=queue_embed)
         
-        async with self.generation_lock:
+        async with self.bot.overload.slot('image_gen', on_wait=queued), self.generation_lock:
             try:
                 embed = discord.Embed(
                     title="🎨 Generating Advanced Image...",
@@ -247,10 +262,11 @@ class ImageGeneration(commands.Cog):
                     prompt, negative_prompt, width, height, steps, guidance
                 )
                 generation_time = time.time() - start_time
+                image_bytes, extension = await self._fit_upload(ctx.guild, image_bytes, width, height)
                 
                 file = discord.File(
                     io.BytesIO(image_bytes),
-                    filename=f"advanced_generated_{int(time.time())}.png"
+                    filename=f"advanced_generated_{int(time.time())}.{extension}"
                 )
                 
                 success_embed = discord.Embed(
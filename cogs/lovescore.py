@@ -1,82 +1,18 @@
 import discord
 from discord.ext import commands
-import aiohttp
-from PIL import Image, ImageDraw, ImageFont
-import os
 import io
-import random
 import datetime
 import asyncio
-import functools
-import weakref
-import time
+from cogs.utils.render import LOVE_AVATAR_SIZE, love_png
 
 class LoveCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.love_scores = {}
-        self.font = None
-        self.heart_image = None
-        self.background = None
-        self.mask = None
-        self.avatar_cache = {}
-        self.avatar_cache_time = {}
-        self.cache_ttl = 3600
-        self.session = None
-        self.assets_loaded = False
-        
-    async def cog_load(self):
-        loop = asyncio.get_event_loop()
-        try:
-            await loop.run_in_executor(None, self._preload_assets)
-            self.assets_loaded = True
-        except Exception as e:
-            print(f"Failed to preload assets: {e}")
-            self.assets_loaded = False
-            raise
-        self.session = aiohttp.ClientSession()
-
-    async def cog_unload(self):
-        if self.session:
-            await self.session.close()
-
-    def _preload_assets(self):
-        # Preload assets in a separate thread
-        try:
-            # Try to load a common system font that works on both Windows and Linux
-            self.font = ImageFont.truetype("DejaVuSans.ttf", 36)
-        except OSError:
-            try:
-                # Fallback to Arial if available (Windows)
-                self.font = ImageFont.truetype("arial.ttf", 36)
-            except OSError:
-                # Final fallback to default font
-                self.font = ImageFont.load_default()
-
-        # Load and optimize heart image
-        heart_path = os.path.join("assets", "images", "heart.png")
-        try:
-            heart = Image.open(heart_path)
-            self.heart_image = heart.convert("RGBA").resize((120, 120), Image.LANCZOS)
-        except (OSError, FileNotFoundError) as e:
-            raise OSError(f"Could not load heart image from {heart_path}: {e}. Make sure the file exists and is accessible.")
-        
-        # Create background once
-        self.background = Image.new('RGBA', (600, 400), color=(255, 255, 255, 255))
-        draw = ImageDraw.Draw(self.background)
-        draw.rounded_rectangle([0, 0, 600, 400], radius=20, fill=(255, 255, 255, 255))
-        
-        # Create reusable avatar mask
-        avatar_size = (150, 150)
-        self.mask = Image.new('L', avatar_size, 0)
-        ImageDraw.Draw(self.mask).ellipse([0, 0, avatar_size[0], avatar_size[1]], fill=255)
 
     @commands.command()
     async def love(self, ctx, member1: discord.Member, member2: discord.Member):
         async with ctx.typing():
-            if not self.assets_loaded:
-                await self._ensure_assets_loaded()
-            
             pair_key = frozenset([member1.id, member2.id])
             current_date = datetime.date.today()
             today_str = current_date.strftime("%Y%m%d")
@@ -92,103 +28,16 @@ class LoveCog(commands.Cog):
 
             await ctx.reply(file=discord.File(fp=image_bytes, filename='love_match.png'))
 
-    async def _ensure_assets_loaded(self):
-        if self.font is None:
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self._preload_assets)
-            self.assets_loaded = True
-
     async def _create_love_image(self, member1, member2, love_score):
-        loop = asyncio.get_event_loop()
-        
-        avatar_size = (150, 150)
-        avatar_tasks = [
-            self._get_avatar(self.session, member1.display_avatar.url, avatar_size),
-            self._get_avatar(self.session, member2.display_avatar.url, avatar_size)
-        ]
-        avatars = await asyncio.gather(*avatar_tasks)
-        
-        return await loop.run_in_executor(
-            None, 
-            functools.partial(self._render_image, avatars, love_score)
+        # Avatars come pre-decoded from the shared cache; heart, background,
+        # mask and font are preloaded in the render workers
+        avatars = self.bot.avatars
+        avatar1, avatar2 = await asyncio.gather(
+            avatars.get(member1, LOVE_AVATAR_SIZE),
+            avatars.get(member2, LOVE_AVATAR_SIZE),
         )
-
-    def _render_image(self, avatars, love_score):
-        # Start with a copy of the preloaded background
-        image = self.background.copy()
-        draw = ImageDraw.Draw(image)
-
-        # Paste avatars using the preloaded mask
-        image.paste(avatars[0], (60, 50), self.mask)
-        image.paste(avatars[1], (390, 50), self.mask)
-
-        # Paste heart image
-        heart_x = (600 - 120) // 2
-        heart_y = 75
-        image.paste(self.heart_image, (heart_x, heart_y), self.heart_image)
-
-        # Draw love meter more efficiently
-        meter_width = 400
-        meter_height = 40
-        meter_x = 100
-        meter_y = 250
-        
-        # Draw background meter
-        draw.rounded_rectangle(
-            [meter_x, meter_y, meter_x + meter_width, meter_y + meter_height], 
-            radius=10, fill=(200, 200, 200, 255)
-        )
-        
-        # Draw filled meter portion
-        fill_width = int(meter_width * love_score / 100)
-        if fill_width > 0:
-            draw.rounded_rectangle(
-                [meter_x, meter_y, meter_x + fill_width, meter_y + meter_height], 
-                radius=10, fill=(255, 105, 180, 255)
-            )
-
-        # Add text
-        text = f"{love_score}% Match"
-        text_width = draw.textlength(text, font=self.font)
-        draw.text((300 - text_width/2, 310), text, font=self.font, fill=(0, 0, 0, 255))
-
-        # Convert to bytes with optimized settings
-        output_buffer = io.BytesIO()
-        image.save(output_buffer, format='PNG', optimize=True, compress_level=6)
-        output_buffer.seek(0)
-
-        return output_buffer
-
-    async def _get_avatar(self, session, url, size):
-        current_time = time.time()
-        
-        if url in self.avatar_cache:
-            if self.avatar_cache_time[url] + self.cache_ttl > current_time:
-                return self.avatar_cache[url]
-            else:
-                del self.avatar_cache[url]
-                del self.avatar_cache_time[url]
-            
-        async with session.get(url) as response:
-            if response.status != 200:
-                avatar = Image.new('RGBA', size, (200, 200, 200, 255))
-            else:
-                avatar_data = await response.read()
-                loop = asyncio.get_event_loop()
-                avatar = await loop.run_in_executor(
-                    None,
-                    functools.partial(self._process_avatar, avatar_data, size)
-                )
-                
-        self.avatar_cache[url] = avatar
-        self.avatar_cache_time[url] = current_time
-        return avatar
-        
-    def _process_avatar(self, avatar_data, size):
-        # Process avatar data in a thread
-        with io.BytesIO(avatar_data) as data_buffer:
-            avatar = Image.open(data_buffer).convert("RGBA")
-            return avatar.resize(size, Image.LANCZOS)
+        png = await self.bot.render.submit('love', love_png, avatar1, avatar2, love_score)
+        return io.BytesIO(png)
 
 async def setup(bot):
     await bot.add_cog(LoveCog(bot))
\ No newline at end of file
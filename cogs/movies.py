@@ -1,13 +1,10 @@
 import discord
 from discord.ext import commands
 from discord import ui
-import json
-import os
-import aiohttp
 import asyncio
-import aiofiles
 from typing import Dict, List, Optional
 import re
+from cogs.utils import schemas, serial
 
 
 class MovieSuggestionModal(ui.Modal):
@@ -72,76 +69,41 @@ class MoviesCog(commands.Cog):
         await self.load_data()
 
     async def load_data(self):
-        """Load data from JSON files, creating them if they don't exist"""
-        # Load suggestions
-        if os.path.exists(self.suggestions_file):
-            async with aiofiles.open(self.suggestions_file, 'r') as f:
-                content = await f.read()
-                self.suggestions = json.loads(content) if content.strip() else []
-        else:
-            self.suggestions = []
-            async with aiofiles.open(self.suggestions_file, 'w') as f:
-                await f.write(json.dumps(self.suggestions, separators=(',', ':')))
-
-        # Load watchlist
-        if os.path.exists(self.watchlist_file):
-            async with aiofiles.open(self.watchlist_file, 'r') as f:
-                content = await f.read()
-                self.watchlist = json.loads(content) if content.strip() else []
-        else:
-            self.watchlist = []
-            async with aiofiles.open(self.watchlist_file, 'w') as f:
-                await f.write(json.dumps(self.watchlist, separators=(',', ':')))
-
-        # Load finished movies
-        if os.path.exists(self.finished_file):
-            async with aiofiles.open(self.finished_file, 'r') as f:
-                content = await f.read()
-                self.finished = json.loads(content) if content.strip() else []
-        else:
-            self.finished = []
-            async with aiofiles.open(self.finished_file, 'w') as f:
-                await f.write(json.dumps(self.finished, separators=(',', ':')))
+        """Load data from JSON files; missing files start as empty lists"""
+        self.suggestions = await serial.load(self.suggestions_file, schemas.MOVIES, default=list)
+        self.watchlist = await serial.load(self.watchlist_file, schemas.MOVIES, default=list)
+        self.finished = await serial.load(self.finished_file, schemas.MOVIES, default=list)
 
     async def save_data(self):
         """Save data to JSON files"""
-        # Save suggestions
-        async with aiofiles.open(self.suggestions_file, 'w') as f:
-            await f.write(json.dumps(self.suggestions, separators=(',', ':')))
-
-        # Save watchlist
-        async with aiofiles.open(self.watchlist_file, 'w') as f:
-            await f.write(json.dumps(self.watchlist, separators=(',', ':')))
-
-        # Save finished movies
-        async with aiofiles.open(self.finished_file, 'w') as f:
-            await f.write(json.dumps(self.finished, separators=(',', ':')))
+        await serial.save(self.suggestions_file, self.suggestions)
+        await serial.save(self.watchlist_file, self.watchlist)
+        await serial.save(self.finished_file, self.finished)
 
     async def fetch_movie_details(self, movie_title: str) -> Optional[Dict]:
         """Fetch movie details from OMDB API"""
         api_key = "6e563951"
 
-        url = f"http://www.omdbapi.com/?t={movie_title}&apikey={api_key}"
-
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get('Response') == 'True':
-                            return {
-                                'title': data.get('Title', movie_title),
-                                'year': data.get('Year', 'N/A'),
-                                'poster': data.get('Poster', ''),
-                                'plot': data.get('Plot', 'No plot available'),
-                                'runtime': data.get('Runtime', 'N/A'),
-                                'genre': data.get('Genre', 'N/A'),
-                                'director': data.get('Director', 'N/A'),
-                                'actors': data.get('Actors', 'N/A'),
-                                'imdb_rating': data.get('imdbRating', 'N/A')
-                            }
-            except Exception as e:
-                print(f"Error fetching movie details: {e}")
+        url = "http://www.omdbapi.com/"
+
+        try:
+            response = await self.bot.web.get(url, params={'t': movie_title, 'apikey': api_key})
+            if response.status == 200:
+                data = response.json()
+                if data.get('Response') == 'True':
+                    return {
+                        'title': data.get('Title', movie_title),
+                        'year': data.get('Year', 'N/A'),
+                        'poster': data.get('Poster', ''),
+                        'plot': data.get('Plot', 'No plot available'),
+                        'runtime': data.get('Runtime', 'N/A'),
+                        'genre': data.get('Genre', 'N/A'),
+                        'director': data.get('Director', 'N/A'),
+                        'actors': data.get('Actors', 'N/A'),
+                        'imdb_rating': data.get('imdbRating', 'N/A')
+                    }
+        except Exception as e:
+            print(f"Error fetching movie details: {e}")
 
         return None
 
@@ -4,6 +4,7 @@ import os
 import re
 import io
 import time
+from collections import deque
 from typing import Optional
 from urllib.parse import quote
 from functools import partial
@@ -12,6 +13,8 @@ import discord
 from discord.ext import commands
 from discord.ui import Button, View
 import wavelink
+from cogs.utils.voice import PRIORITY_MUSIC, ClipCancelled, VoiceBusy, VoiceProducer
+from cogs.utils.overload import COSMETIC
 
 LYRICS_CLEANUP_REGEX = re.compile(r'[\[\(\{].*?[\]\)\}]')
 LYRICS_WHITESPACE_REGEX = re.compile(r'\s+')
@@ -21,6 +24,8 @@ YOUTUBE_PATTERNS = [
     re.compile(r'youtube\.com\/embed\/([a-zA-Z0-9_-]{11})'),
     re.compile(r'youtube\.com\/v\/([a-zA-Z0-9_-]{11})')
 ]
+# How long a play request waits for a TTS clip (or other higher priority voice use) to finish.
+VOICE_WAIT = 15
 
 
 class MusicWavelinkCog(commands.Cog):
@@ -29,29 +34,15 @@ class MusicWavelinkCog(commands.Cog):
         self.session = None
         self.bot.loop.create_task(self.connect_nodes())
         self.logger = logging.getLogger(__name__)
+        self.voice_producer = VoiceProducer('music', PRIORITY_MUSIC, wavelink.Player,
+                                            suspend=self._suspend_player, resume=self._resume_player,
+                                            share=self._share_player)
 
     async def connect_nodes(self):
         await self.bot.wait_until_ready()
         
-        connector = aiohttp.TCPConnector(
-            limit=100,
-            limit_per_host=10,
-            ttl_dns_cache=300,
-            enable_cleanup_closed=True,
-            force_close=False
-        )
-        
-        timeout = aiohttp.ClientTimeout(
-            total=10,
-            connect=3,
-            sock_read=5
-        )
-        
-        self.session = aiohttp.ClientSession(
-            connector=connector,
-            timeout=timeout,
-            headers={'User-Agent': 'JackyBot-MusicPlayer/1.0'}
-        )
+        # Shared, pooled session from bot.web; owned (and closed) by the bot
+        self.session = self.bot.web.session
         
         host = os.getenv('LAVALINK_HOST', '127.0.0.1')
         port = int(os.getenv('LAVALINK_PORT', '2333'))
@@ -70,7 +61,7 @@ class MusicWavelinkCog(commands.Cog):
             try:
                 await asyncio.sleep(30)
                 if player.connected and not player.playing and len(player.queue) == 0:
-                    await player.disconnect()
+                    await self.bot.voice.release(player.guild, self.voice_producer, disconnect=True)
             except Exception:
                 pass
         player.idle_timer = asyncio.create_task(idle_disconnect())
@@ -86,8 +77,14 @@ class MusicWavelinkCog(commands.Cog):
             delattr(player, 'idle_timer')
 
     async def cog_unload(self):
-        if self.session:
-            await self.session.close()
+        self.session = None
+
+    def memory_containers(self):
+        """Per-player jobs and tasks for the memory accountant (they live on the players, not the cog)."""
+        def player_tasks():
+            return [task for vc in self.bot.voice_clients
+                    for task in (getattr(vc, 'update_job', None), getattr(vc, 'idle_timer', None)) if task is not None]
+        return {'player_tasks': player_tasks}
 
 
     @commands.Cog.listener()
@@ -99,6 +96,8 @@ class MusicWavelinkCog(commands.Cog):
         try:
             player = payload.player
             await self._cancel_idle_timer(player)
+            if getattr(player, 'clip_overlay', None) is not None:
+                return
             await self._stop_periodic_updates(player)
             player.track_start_time = time.time()
             channel = getattr(player, 'text_channel', None)
@@ -111,6 +110,10 @@ class MusicWavelinkCog(commands.Cog):
     async def on_wavelink_track_end(self, payload: wavelink.TrackEndEventPayload):
         try:
             player = payload.player
+            overlay = getattr(player, 'clip_overlay', None)
+            if overlay is not None and payload.reason != 'replaced':
+                await self._next_overlay_clip(player, overlay, payload.reason)
+                return
             await self._stop_periodic_updates(player)
             if hasattr(player, 'current_message'):
                 try:
@@ -260,61 +263,43 @@ class MusicWavelinkCog(commands.Cog):
 
         UPDATE_INTERVAL = 30
         MAX_CONSECUTIVE_ERRORS = 3
+        error_count = 0
+        last_state = None
 
         async def periodic_update():
-            error_count = 0
-            last_state = None
-            last_embed = None
-            last_view = None
-            try:
-                while player.connected and player.current and hasattr(player, 'current_message'):
-                    await asyncio.sleep(UPDATE_INTERVAL)
-
-                    if not player.connected or not player.current or not hasattr(player, 'current_message'):
-                        break
+            nonlocal error_count, last_state
+            if not player.connected or not player.current or not hasattr(player, 'current_message'):
+                return await self._stop_periodic_updates(player)
 
-                    paused = getattr(player, 'paused', False)
-                    if not paused:
-                        current_state = self._embed_state(player)
-                        if current_state == last_state:
-                            continue
-                        try:
-                            embed = self._create_now_playing_embed(player.current, player, show_progress=True)
-                            view = self._create_controls(player)
-                            await player.current_message.edit(embed=embed, view=view)
-                            last_state = current_state
-                            last_embed = embed
-                            last_view = view
-                            error_count = 0
-                        except discord.NotFound:
-                            break
-                        except discord.HTTPException as e:
-                            error_count += 1
-                            if error_count >= MAX_CONSECUTIVE_ERRORS:
-                                break
-                            if e.status == 429:
-                                await asyncio.sleep(60)
-            except asyncio.CancelledError:
-                pass
-            except Exception:
-                self.logger.exception("Periodic update failed")
-            finally:
-                if hasattr(player, 'update_task'):
-                    delattr(player, 'update_task')
-                if hasattr(player, 'last_embed_state'):
-                    delattr(player, 'last_embed_state')
-        
-        player.update_task = asyncio.create_task(periodic_update())
+            # Progress refreshes are cosmetic; skip them while the bot is under load
+            if getattr(player, 'paused', False) or not self.bot.overload.allows(COSMETIC):
+                return
+            current_state = self._embed_state(player)
+            if current_state == last_state:
+                return
+            try:
+                embed = self._create_now_playing_embed(player.current, player, show_progress=True)
+                view = self._create_controls(player)
+                await player.current_message.edit(embed=embed, view=view)
+                last_state = current_state
+                error_count = 0
+            except discord.NotFound:
+                await self._stop_periodic_updates(player)
+            except discord.HTTPException as e:
+                error_count += 1
+                if error_count >= MAX_CONSECUTIVE_ERRORS:
+                    await self._stop_periodic_updates(player)
+                elif e.status == 429:
+                    player.update_job.defer(60)
+
+        # One wheel job per player; the 5s alignment lets players share wakeups
+        player.update_job = self.bot.scheduler.every(f'music.now_playing.{player.guild.id}', UPDATE_INTERVAL,
+                                                     periodic_update, align=5, group='music.now_playing')
 
     async def _stop_periodic_updates(self, player: wavelink.Player):
-        if hasattr(player, 'update_task') and not player.update_task.done():
-            player.update_task.cancel()
-            try:
-                await player.update_task
-            except asyncio.CancelledError:
-                pass
-        if hasattr(player, 'update_task'):
-            delattr(player, 'update_task')
+        if hasattr(player, 'update_job'):
+            player.update_job.cancel()
+            delattr(player, 'update_job')
         if hasattr(player, 'last_embed_state'):
             delattr(player, 'last_embed_state')
 
@@ -376,33 +361,131 @@ class MusicWavelinkCog(commands.Cog):
     async def _ensure_player(self, ctx: commands.Context) -> wavelink.Player:
         if not ctx.author.voice:
             raise commands.CommandError("Join a voice channel first.")
-        player = ctx.voice_client
-        if player and player.connected:
-            player.text_channel = ctx.channel
-            if player.channel != ctx.author.voice.channel:
-                await player.move_to(ctx.author.voice.channel)
-            return player
-
+        channel = ctx.author.voice.channel
         for attempt in range(2):
             try:
-                new_player = await ctx.author.voice.channel.connect(cls=wavelink.Player)
-                if new_player.channel != ctx.author.voice.channel:
-                    await new_player.move_to(ctx.author.voice.channel)
-                new_player.text_channel = ctx.channel
-                player = new_player
-                break
+                # Reuses (or moves) a connected player; waits out a TTS clip before taking over voice
+                player = await self.bot.voice.acquire(channel, self.voice_producer, wait=VOICE_WAIT)
+                player.text_channel = ctx.channel
+                return player
+            except VoiceBusy as e:
+                raise commands.CommandError(f"Voice is busy with {e.holder} right now.")
             except Exception as e:
                 if attempt == 1:
                     raise commands.CommandError(f"Failed to connect to voice channel: {e}")
                 await asyncio.sleep(1)
-        return player
 
     def _get_player(self, ctx: commands.Context) -> wavelink.Player:
         player = ctx.voice_client
-        if not player:
+        if not isinstance(player, wavelink.Player):
             raise commands.CommandError("Not connected to voice.")
         return player
 
+    async def _share_player(self, player: wavelink.Player, url: str, after):
+        """Play a clip (TTS) through Lavalink over this connection, then go back to the track.
+
+        The track is replaced by the clip and restarted at the same position
+        afterwards, so the clip costs no voice disconnect or handshake.
+        """
+        try:
+            tracks = await wavelink.Playable.search(url)
+        except wavelink.LavalinkLoadException:
+            self.logger.exception("Lavalink could not load clip %s", url)
+            return False
+        if not tracks:
+            return False
+        clip = tracks[0]
+        overlay = getattr(player, 'clip_overlay', None)
+        if overlay is not None:
+            overlay['clips'].append((clip, after))
+            return True
+        track = player.current
+        player.clip_overlay = {
+            'track': track,
+            'position': int(player.position) if track is not None else 0,
+            'paused': player.paused,
+            'after': after,
+            'clips': deque(),
+        }
+        await player.play(clip, replace=True, add_history=False, paused=False)
+        return True
+
+    async def _next_overlay_clip(self, player: wavelink.Player, overlay, reason):
+        """Report the clip that ended, then play the next one or restore the track."""
+        self._clip_done(overlay['after'], None if reason == 'finished' else ClipCancelled(f'clip {reason}'))
+        if overlay['clips']:
+            clip, overlay['after'] = overlay['clips'].popleft()
+            await player.play(clip, add_history=False)
+            return
+        player.clip_overlay = None
+        track = overlay['track']
+        if track is not None:
+            await player.play(track, start=overlay['position'], paused=overlay['paused'], add_history=False)
+        elif len(player.queue) > 0:
+            await player.play(player.queue.get())
+        else:
+            await self._start_idle_timer(player)
+
+    def _end_overlay(self, player: wavelink.Player):
+        """Drop an in-progress clip overlay, cancelling its clips; returns it, or None."""
+        overlay = getattr(player, 'clip_overlay', None)
+        if overlay is None:
+            return None
+        player.clip_overlay = None
+        self._clip_done(overlay['after'], ClipCancelled('voice connection taken over'))
+        for _, after in overlay['clips']:
+            self._clip_done(after, ClipCancelled('voice connection taken over'))
+        return overlay
+
+    def _clip_done(self, after, error):
+        if after is None:
+            return
+        try:
+            after(error)
+        except Exception:
+            self.logger.exception("Clip callback failed")
+
+    async def _suspend_player(self, player: wavelink.Player):
+        """Save what the player was doing before another producer takes the voice connection."""
+        overlay = self._end_overlay(player)
+        track = overlay['track'] if overlay is not None else player.current
+        if track is None and not player.queue:
+            return None
+        await self._cancel_idle_timer(player)
+        await self._stop_periodic_updates(player)
+        message = getattr(player, 'current_message', None)
+        if message is not None:
+            try:
+                await message.delete()
+            except discord.HTTPException:
+                pass
+        if overlay is not None:
+            position = overlay['position']
+        else:
+            position = int(player.position) if track is not None else 0
+        return {
+            'track': track,
+            'position': position,
+            'queue': list(player.queue),
+            'text_channel': getattr(player, 'text_channel', None),
+            'loop_mode': getattr(player, 'loop_mode', False),
+            'volume': player.volume,
+            'paused': overlay['paused'] if overlay is not None else player.paused,
+        }
+
+    async def _resume_player(self, channel, state):
+        """Reconnect and carry on from where ``_suspend_player`` left off."""
+        player = await self.bot.voice.acquire(channel, self.voice_producer, wait=VOICE_WAIT)
+        player.text_channel = state['text_channel']
+        player.loop_mode = state['loop_mode']
+        queue = state['queue']
+        track = state['track']
+        if track is None:
+            track, queue = queue[0], queue[1:]
+        for queued in queue:
+            player.queue.put(queued)
+        await player.play(track, start=state['position'], volume=state['volume'], paused=state['paused'])
+
     def _remove_from_queue(self, player: wavelink.Player, index: int) -> wavelink.Playable:
         if index < 1 or index > player.queue.count:
             raise ValueError("Invalid index")
@@ -10,12 +10,17 @@ PROGRESS_FILLED = "🔹"
 PROGRESS_EMPTY = "🔸"
 
 class PollCog(commands.Cog):
-    __slots__ = ('bot', 'active_polls', 'user_votes')
+    __slots__ = ('bot', 'active_polls', 'user_votes', '_subscription')
 
     def __init__(self, bot):
         self.bot = bot
         self.active_polls = {}
         self.user_votes = {}
+        self._subscription = bot.reactions.subscribe(
+            self.on_vote, emoji=EMOJI_NUMBERS, check=lambda payload: payload.message_id in self.active_polls)
+
+    def cog_unload(self):
+        self.bot.reactions.unsubscribe(self._subscription)
 
     def create_glass_embed(self, title, description="", color=0x2B2D31):
         return discord.Embed(title=title, description=description, color=color, timestamp=datetime.datetime.now())
@@ -137,26 +142,27 @@ class PollCog(commands.Cog):
         success_embed.set_footer(text="💫 Powered by glass morphism design")
         await ctx.reply(embed=success_embed, delete_after=20)
 
-    @commands.Cog.listener()
-    async def on_reaction_add(self, reaction, user):
-        if user.bot or reaction.message.id not in self.active_polls:
+    async def on_vote(self, event):
+        message_id = event.message_id
+        poll_data = self.active_polls.get(message_id)
+        if poll_data is None:
             return
 
-        emoji_str = str(reaction.emoji)
-        if emoji_str not in EMOJI_NUMBERS:
+        option_index = EMOJI_NUMBERS.index(event.emoji)
+        if option_index >= len(poll_data["choices"]):
             return
 
-        option_index = EMOJI_NUMBERS.index(emoji_str)
-        poll_data = self.active_polls[reaction.message.id]
-
-        if option_index >= len(poll_data["choices"]):
+        user = event.member or self.bot.get_user(event.user_id)
+        if user is None:
             return
 
-        poll_votes = self.user_votes[reaction.message.id]
+        poll_votes = self.user_votes[message_id]
 
         if user.id in poll_votes:
             prev_emoji = EMOJI_NUMBERS[poll_votes[user.id]]
-            await reaction.message.remove_reaction(prev_emoji, user)
+            # A partial message is enough to remove a reaction; no fetch needed
+            partial = self.bot.get_partial_messageable(event.channel_id).get_partial_message(message_id)
+            await partial.remove_reaction(prev_emoji, user)
 
         poll_votes[user.id] = option_index
 
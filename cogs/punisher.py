@@ -8,6 +8,8 @@ import textwrap
 from functools import lru_cache
 import asyncio
 import contextlib
+from cogs.utils.overload import Overloaded
+from cogs.utils.uploads import TooLarge, probe_video, video_ladder, x264_args
 
 class VideoTextCog(commands.Cog):
     def __init__(self, bot):
@@ -36,19 +38,32 @@ class VideoTextCog(commands.Cog):
             return
 
         try:
-            async with ctx.typing():
+            async with self.bot.overload.slot('video'), ctx.typing():
+                # Bitrate and size are picked for the guild's upload limit before encoding
+                uploads = self.bot.uploads
+                budget = uploads.budget(ctx.guild)
+                duration, width, height, fps = await asyncio.to_thread(probe_video, "assets/videos/template.mp4")
+                rungs = video_ladder(budget, duration, width, height, fps)
                 with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_output:
                     output_path = temp_output.name
                     try:
-                        await self.process_video(text, output_path)
+                        async def encode(rung):
+                            await self.process_video(text, output_path, rung)
+                            return output_path
+                        await uploads.fit('punisher', rungs, encode, budget)
                         await ctx.reply(file=discord.File(output_path))
                     finally:
                         with contextlib.suppress(OSError):
                             os.remove(output_path)
+        except TooLarge as e:
+            await ctx.reply(e.user_message())
+        except Overloaded:
+            # Answered by the overload controller's error handler
+            raise
         except Exception as e:
             await ctx.send(f"Error: {str(e)}")
 
-    async def process_video(self, text, output_path):
+    async def process_video(self, text, output_path, rung):
         # Direct text wrapping without escaping (ffmpeg handles most cases)
         wrapped_text = textwrap.fill(text, width=self.wrap_width)
         
@@ -70,12 +85,19 @@ class VideoTextCog(commands.Cog):
         if self.font_path:
             drawtext_params['fontfile'] = self.font_path.replace("\\", "/")
         
-        try:
+        def video_stream():
             video = input_video.video.filter('drawtext', **drawtext_params)
+            width, height = rung.params['width'], rung.params['height']
+            if (width, height) != (self.video_width, self.video_height):
+                video = video.filter('scale', width, height)
+            return video
+
+        try:
+            video = video_stream()
             output = ffmpeg.output(
                 video, input_video.audio, output_path,
                 vcodec='libx264', acodec='aac', preset='ultrafast',
-                crf=28, bufsize='2M', threads=0
+                crf=28, threads=0, **x264_args(rung)
             )
             
             await asyncio.to_thread(ffmpeg.run, output, quiet=True, overwrite_output=True)
@@ -84,11 +106,11 @@ class VideoTextCog(commands.Cog):
             # Fallback without font
             if 'fontfile' in drawtext_params:
                 del drawtext_params['fontfile']
-                video = input_video.video.filter('drawtext', **drawtext_params)
+                video = video_stream()
                 output = ffmpeg.output(
                     video, input_video.audio, output_path,
                     vcodec='libx264', acodec='aac', preset='ultrafast',
-                    crf=28, bufsize='2M', threads=0
+                    crf=28, threads=0, **x264_args(rung)
                 )
                 await asyncio.to_thread(ffmpeg.run, output, quiet=True, overwrite_output=True)
             else:
@@ -5,6 +5,13 @@ import asyncio
 import numpy as np
 from discord.ext import commands, voice_recv
 from datetime import datetime
+from cogs.utils.voice import PRIORITY_RECORD, VoiceBusy, VoiceProducer
+from cogs.utils.overload import Overloaded
+from cogs.utils.uploads import TooLarge, audio_ladder
+
+# Highest MP3 bitrate by overload level (normal, elevated, overloaded): a busy bot
+# uploads smaller files and spends less time encoding them.
+_MAX_KBPS = (192, 128, 64)
 
 class MyAudioSink(voice_recv.AudioSink):
     def __init__(self, record_cog):
@@ -42,6 +49,7 @@ class Record(commands.Cog):
         self.voice_clients = {}
         self.audio_sinks = {}
         self._lock = asyncio.Lock()  # Thread-safe access to recording state
+        self.voice_producer = VoiceProducer('record', PRIORITY_RECORD, voice_recv.VoiceRecvClient)
 
         # Audio settings
         self.CHANNELS = 2
@@ -64,18 +72,17 @@ class Record(commands.Cog):
 
         await asyncio.get_event_loop().run_in_executor(self.bot.executor, save_wav)
 
-    async def _convert_to_mp3(self, wav_filename, mp3_filename):
-        """Convert WAV file to MP3 using ffmpeg."""
+    async def _convert_to_mp3(self, wav_filename, mp3_filename, kbps, channels):
+        """Convert WAV file to MP3 at a constant bitrate using ffmpeg."""
         def convert_to_mp3():
             try:
                 import subprocess
                 result = subprocess.run([
                     'ffmpeg', '-i', wav_filename, '-codec:a', 'libmp3lame',
-                    '-qscale:a', '2', mp3_filename, '-y'
+                    '-b:a', f'{kbps}k', '-ac', str(channels), mp3_filename, '-y'
                 ], capture_output=True, text=True, timeout=30)
 
                 if result.returncode == 0:
-                    os.remove(wav_filename)  # Remove WAV file if conversion successful
                     return True
                 else:
                     print(f"FFmpeg conversion failed: {result.stderr}")
@@ -162,8 +169,8 @@ class Record(commands.Cog):
                 return await ctx.reply("Already recording in this server!")
 
             try:
-                # Connect to voice channel with voice_recv
-                vc = await voice_channel.connect(cls=voice_recv.VoiceRecvClient)
+                # Shared connection: reuses the TTS client (also a VoiceRecvClient) if one is in this channel
+                vc = await self.bot.voice.acquire(voice_channel, self.voice_producer)
                 self.voice_clients[guild_id] = vc
 
                 # Create and setup audio sink
@@ -176,6 +183,9 @@ class Record(commands.Cog):
 
                 await ctx.reply(f"🎤 Started recording audio in {voice_channel.name}. Use `!stop` to stop recording.")
 
+            except VoiceBusy as e:
+                await ctx.reply(f"Voice is busy with {e.holder} right now.")
+                self._cleanup_guild(guild_id)
             except Exception as e:
                 await ctx.reply(f"Failed to start recording: {e}")
                 self._cleanup_guild(guild_id)
@@ -194,19 +204,24 @@ class Record(commands.Cog):
                 audio_sink = self.audio_sinks[guild_id]
                 audio_frames = audio_sink.stop_recording()
 
-                # Disconnect voice client if it exists
+                # Stop listening and hand the connection back; it is only closed if nothing else holds it
                 if guild_id in self.voice_clients:
                     try:
-                        await self.voice_clients[guild_id].disconnect()
+                        self.voice_clients[guild_id].stop_listening()
+                        await self.bot.voice.release(ctx.guild, self.voice_producer, disconnect=True)
                     except Exception as disconnect_error:
                         print(f"Warning: Error disconnecting voice client for guild {guild_id}: {disconnect_error}")
 
                 # Clean up all resources
                 self._cleanup_guild(guild_id)
 
-                # Process the audio frames
-                await self._process_audio_frames(ctx, audio_frames, guild_id)
+                # Process the audio frames, one recording at a time
+                async with self.bot.overload.slot('record'):
+                    await self._process_audio_frames(ctx, audio_frames, guild_id)
 
+            except Overloaded:
+                # Answered by the overload controller's error handler
+                raise
             except Exception as e:
                 print(f"Error stopping recording for guild {guild_id}: {type(e).__name__}: {e}")
                 await ctx.reply("Error stopping recording. Please check the console for details.")
@@ -239,11 +254,30 @@ class Record(commands.Cog):
             print(f"Error saving WAV file for guild {guild_id}: {save_error}")
             return await ctx.reply("Error saving audio file.")
 
-        # Convert to MP3 using ffmpeg (if available)
-        conversion_success = await self._convert_to_mp3(wav_filename, mp3_filename)
+        # MP3 at a bitrate that fits the guild's upload limit, capped lower while the bot is under load
+        uploads = self.bot.uploads
+        budget = uploads.budget(ctx.guild)
+        duration = len(audio_data) / (self.RATE * self.CHANNELS * 2)
+        rungs = audio_ladder(budget, duration, self.CHANNELS, self.RATE,
+                             max_kbps=_MAX_KBPS[self.bot.overload.level])
 
-        final_filename = mp3_filename if conversion_success else wav_filename
-        await self._send_and_cleanup_file(ctx, final_filename)
+        async def encode(rung):
+            if not await self._convert_to_mp3(wav_filename, mp3_filename, rung.params['kbps'],
+                                              rung.params['channels']):
+                # Without ffmpeg the WAV is all there is
+                return wav_filename
+            return mp3_filename
+
+        try:
+            _, final_filename = await uploads.fit('record', rungs, encode, budget)
+        except TooLarge as e:
+            await ctx.reply(e.user_message())
+            final_filename = None
+        for filename in (wav_filename, mp3_filename):
+            if filename != final_filename and os.path.exists(filename):
+                os.remove(filename)
+        if final_filename is not None:
+            await self._send_and_cleanup_file(ctx, final_filename)
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
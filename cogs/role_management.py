@@ -2,8 +2,6 @@ import asyncio
 import discord
 from discord.ext import commands
 from typing import List
-import json
-import os
 from functools import partial
 
 
@@ -376,22 +374,19 @@ class RoleManagement(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.auto_roles_file = "json/auto_roles.json"
-        self.auto_roles = self.load_auto_roles()
-    
-    def load_auto_roles(self) -> dict:
-        if os.path.exists(self.auto_roles_file):
-            try:
-                with open(self.auto_roles_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                pass
-        return {}
+        self.auto_roles = {}
+
+    async def cog_load(self):
+        self.auto_roles = await self.load_auto_roles()
+
+    async def load_auto_roles(self) -> dict:
+        self.store = await self.bot.store.load('auto_roles', legacy_path=self.auto_roles_file)
+        return self.store.to_dict()
     
     async def save_auto_roles(self, guild_id: int, role_ids: List[int]):
-        self.auto_roles[str(guild_id)] = role_ids
-        os.makedirs(os.path.dirname(self.auto_roles_file), exist_ok=True)
-        with open(self.auto_roles_file, 'w') as f:
-            json.dump(self.auto_roles, f, indent=2)
+        key = str(guild_id)
+        self.auto_roles[key] = role_ids
+        self.store.put(key, role_ids)
     
     def get_auto_roles(self, guild_id: int) -> List[int]:
         return self.auto_roles.get(str(guild_id), [])
@@ -1,15 +1,13 @@
 import discord
-from discord.ext import commands, tasks
-import asyncio
+from discord.ext import commands
 from bs4 import BeautifulSoup
 import re
 from datetime import datetime
-import json
 import os
 import logging
 from playwright.async_api import async_playwright
 from packaging import version
-import random
+from cogs.utils import schemas, serial
 
 class SteamOSUpdatesCog(commands.Cog):
     def __init__(self, bot):
@@ -27,10 +25,9 @@ class SteamOSUpdatesCog(commands.Cog):
         self.playwright = None
         self.browser = None
         self.page = None
+        self.check_job = None
         
-        # Logging
-        logging.basicConfig(filename='steamos_bot.log', level=logging.INFO,
-                          format='%(asctime)s - %(levelname)s - %(message)s')
+        # Logging (bot.py routes this logger to steamos_bot.log)
         self.logger = logging.getLogger('SteamOSUpdates')
 
     async def cog_load(self):
@@ -40,14 +37,16 @@ class SteamOSUpdatesCog(commands.Cog):
             self.browser = await self.playwright.chromium.launch(
                 headless=True, args=['--disable-gpu', '--disable-dev-shm-usage'])
             self.page = await (await self.browser.new_context()).new_page()
-            self.check_for_updates.start()
+            # Hourly, jittered so it does not poll in step with the other update cogs
+            self.check_job = self.bot.scheduler.every('steamos.poll', 3600, self.check_for_updates, delay=60, jitter=300)
             self.logger.info("SteamOS cog loaded successfully")
         except Exception as e:
             self.logger.error(f"Failed to setup browser: {e}")
 
     async def cog_unload(self):
         """Clean shutdown"""
-        self.check_for_updates.cancel()
+        if self.check_job is not None:
+            self.check_job.cancel()
         if self.browser:
             await self.browser.close()
         if self.playwright:
@@ -56,22 +55,12 @@ class SteamOSUpdatesCog(commands.Cog):
     def load_updates(self):
         """Load updates history from JSON"""
         os.makedirs(self.json_dir, exist_ok=True)
-        try:
-            with open(self.updates_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+        return serial.read(self.updates_file, schemas.GUILD_UPDATES)
 
     async def save_updates(self):
-        """Save updates asynchronously"""
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, self._save_sync)
-
-    def _save_sync(self):
-        """Synchronous save operation"""
+        """Save updates off the event loop"""
         try:
-            with open(self.updates_file, 'w') as f:
-                json.dump(self.server_updates, f, indent=2)
+            await serial.save(self.updates_file, self.server_updates)
         except Exception as e:
             self.logger.error(f"Save failed: {e}")
 
@@ -149,22 +138,15 @@ class SteamOSUpdatesCog(commands.Cog):
             
         return self.latest_update_cache
 
-    @tasks.loop(seconds=3600)
     async def check_for_updates(self):
-        """Check for updates every hour with jitter"""
+        """Check for updates (hourly, jittered, from the bot scheduler)"""
+        await self.bot.wait_until_ready()
         try:
             update_info = await self.fetch_latest_update()
             if update_info:
                 await self.post_to_channels(update_info)
         except Exception as e:
             self.logger.error(f"Update check failed: {e}")
-        
-        # Add jitter to prevent synchronized requests
-        await asyncio.sleep(random.randint(-300, 300))
-
-    @check_for_updates.before_loop
-    async def before_check_for_updates(self):
-        await self.bot.wait_until_ready()
 
     async def post_to_channels(self, update_info):
         """Post update to all steamos-update channels"""
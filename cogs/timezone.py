@@ -2,7 +2,6 @@ import discord
 from discord.ext import commands
 import pytz
 from datetime import datetime
-import json
 import os
 from discord import ButtonStyle, SelectOption, TextStyle
 from discord.ui import View, Button, Select, Modal, TextInput
@@ -27,10 +26,7 @@ class TimezoneSearchModal(Modal, title="Search Timezone"):
         matching_tz = next((tz for tz in self.cog.all_timezones_cached if search_term in tz.lower()), None)
 
         if matching_tz:
-            user_timezones = self.cog.user_timezones.setdefault(user_id, [])
-            if matching_tz not in user_timezones:
-                user_timezones.append(matching_tz)
-                self.cog.save_data()
+            if await self.cog.add_timezone(user_id, matching_tz):
                 await interaction.response.edit_message(content=f"Added {matching_tz} successfully!", embed=None, view=None)
                 await self.cog.show_user_timezones(self.ctx)
             else:
@@ -57,19 +53,35 @@ class TimezoneCog(commands.Cog):
         ]
         self.all_timezones_cached = list(pytz.all_timezones)
         self.timezone_objects = {}  # Cache timezone objects
-        self.load_data()
 
-    def load_data(self):
-        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-        try:
-            with open(self.data_file, 'r') as f:
-                self.user_timezones = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.user_timezones = {}
+    async def cog_load(self):
+        # Per-user rows are written from every cluster, so they are read from the store each time.
+        await self.bot.store.prepare('timezone', legacy_path=self.data_file)
 
-    def save_data(self):
-        with open(self.data_file, 'w') as f:
-            json.dump(self.user_timezones, f)
+    async def get_timezones(self, user_id):
+        return await self.bot.store.fetch('timezone', user_id, [])
+
+    async def add_timezone(self, user_id, timezone_str):
+        """Add a timezone to the user's list; False if it was already there."""
+        added = False
+
+        def add(current):
+            nonlocal added
+            if current and timezone_str in current:
+                return current
+            added = True
+            return (current or []) + [timezone_str]
+
+        await self.bot.store.update('timezone', user_id, add)
+        return added
+
+    async def remove_timezone(self, user_id, timezone_str):
+        """Remove a timezone and return what is left."""
+        def remove(current):
+            remaining = [tz for tz in current or () if tz != timezone_str]
+            return remaining or None
+
+        return await self.bot.store.update('timezone', user_id, remove) or []
 
     def get_timezone_object(self, timezone_str):
         if timezone_str not in self.timezone_objects:
@@ -84,7 +96,7 @@ class TimezoneCog(commands.Cog):
     @commands.command(name="time")
     async def time_command(self, ctx):
         user_id = str(ctx.author.id)
-        if user_id in self.user_timezones and self.user_timezones[user_id]:
+        if await self.get_timezones(user_id):
             await self.show_user_timezones(ctx)
         else:
             await self.show_timezone_selection(ctx)
@@ -97,7 +109,7 @@ class TimezoneCog(commands.Cog):
             color=discord.Color.blue()
         )
 
-        for tz in self.user_timezones[user_id]:
+        for tz in await self.get_timezones(user_id):
             time_str = self.get_user_time(tz)
             embed.add_field(name=tz, value=time_str, inline=False)
 
@@ -122,7 +134,7 @@ class TimezoneCog(commands.Cog):
 
     async def show_delete_selection(self, ctx, original_message):
         user_id = str(ctx.author.id)
-        options = [SelectOption(label=tz, value=tz) for tz in self.user_timezones[user_id]]
+        options = [SelectOption(label=tz, value=tz) for tz in await self.get_timezones(user_id)]
         
         embed = discord.Embed(
             title="Delete a Timezone",
@@ -137,12 +149,9 @@ class TimezoneCog(commands.Cog):
         async def select_callback(interaction):
             if interaction.user.id == ctx.author.id:
                 selected_tz = interaction.data['values'][0]
-                self.user_timezones[user_id].remove(selected_tz)
-                if not self.user_timezones[user_id]:
-                    del self.user_timezones[user_id]
-                self.save_data()
+                remaining = await self.remove_timezone(user_id, selected_tz)
                 await interaction.response.edit_message(content=f"Removed {selected_tz} successfully!", embed=None, view=None)
-                if user_id in self.user_timezones:
+                if remaining:
                     await self.show_user_timezones(ctx)
                 else:
                     await self.show_timezone_selection(ctx)
@@ -152,7 +161,7 @@ class TimezoneCog(commands.Cog):
 
     async def show_timezone_selection(self, ctx, original_message=None, page=0):
         user_id = str(ctx.author.id)
-        selected_tz = self.user_timezones.get(user_id, [])
+        selected_tz = await self.get_timezones(user_id)
 
         if page == 0:
             available_timezones = [tz for tz in self.common_timezones if tz not in selected_tz]
@@ -182,8 +191,7 @@ class TimezoneCog(commands.Cog):
         async def select_callback(interaction):
             if interaction.user.id == ctx.author.id:
                 selected_tz = interaction.data['values'][0]
-                self.user_timezones.setdefault(user_id, []).append(selected_tz)
-                self.save_data()
+                await self.add_timezone(user_id, selected_tz)
                 await interaction.response.edit_message(content="Timezone added successfully!", embed=None, view=None)
                 await self.show_user_timezones(ctx)
 
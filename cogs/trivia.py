@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-import aiohttp
 import html
 import random
 import asyncio
@@ -13,20 +12,12 @@ CATEGORY_DICT = {
 CATEGORY_LIST = tuple(CATEGORY_DICT.keys())
 
 class TriviaCog(commands.Cog):
-    __slots__ = ('bot', 'trivia_active', 'handled_message_ids', 'session')
+    __slots__ = ('bot', 'trivia_active', 'handled_message_ids')
 
     def __init__(self, bot):
         self.bot = bot
         self.trivia_active = {}
         self.handled_message_ids = set()
-        self.session = None
-
-    async def cog_load(self):
-        self.session = aiohttp.ClientSession()
-
-    async def cog_unload(self):
-        if self.session:
-            await self.session.close()
 
     @commands.command()
     async def trivia(self, ctx):
@@ -65,12 +56,12 @@ class TriviaCog(commands.Cog):
 
         url = f'https://opentdb.com/api.php?amount=5&category={category_number}&type=multiple'
         try:
-            async with self.session.get(url) as response:
-                if response.status != 200:
-                    self.trivia_active[ctx.guild.id] = False
-                    await ctx.send("Failed to fetch trivia questions. Please try again later.")
-                    return
-                data = await response.json()
+            response = await self.bot.web.get(url, cache=False)
+            if response.status != 200:
+                self.trivia_active[ctx.guild.id] = False
+                await ctx.send("Failed to fetch trivia questions. Please try again later.")
+                return
+            data = response.json()
         except Exception:
             self.trivia_active[ctx.guild.id] = False
             await ctx.send("Failed to fetch trivia questions. Please try again later.")
@@ -0,0 +1,154 @@
+"""Shared avatar thumbnail cache.
+
+Avatars are cached as raw RGBA pixel bytes (``size * size * 4``) keyed by
+``(user_id, avatar_key, size)``, so a repeat render skips both the download
+and the decode/resize. Decoding happens in the render pool; the cached
+bytes are passed straight to the render workers, which rebuild the image
+with ``Image.frombuffer``. ``avatar_key`` is Discord's avatar hash, so a new
+avatar naturally misses the cache.
+
+Callers ask for the size they draw at (150px for !love, 128px for !aura),
+never a larger source to be scaled down later, so an entry is tens of KB
+and the default 32MB budget holds hundreds of users.
+"""
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+
+import aiohttp
+
+from cogs.utils.render import avatar_rgba
+
+log = logging.getLogger('jackybot.avatars')
+
+_DEFAULT_BUDGET = 32 << 20
+
+
+def _cdn_size(size):
+    """Smallest CDN size (a power of two, 16..4096) that covers ``size``."""
+    cdn = 16
+    while cdn < size and cdn < 4096:
+        cdn <<= 1
+    return cdn
+
+
+class AvatarCache:
+    """In-memory LRU of RGBA thumbnails with a byte budget and an optional disk tier."""
+
+    def __init__(self, web, render, budget_bytes=_DEFAULT_BUDGET, disk_dir=None):
+        self.web = web
+        self.render = render
+        self.budget_bytes = budget_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._pending = {}
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def get(self, user, size):
+        """Return ``user``'s avatar as ``size``x``size`` RGBA bytes, or ``None`` if it can't be fetched."""
+        asset = user.display_avatar
+        key = (user.id, asset.key, size)
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(self._load(key, asset))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _load(self, key, asset):
+        if self.disk_dir is not None:
+            data = await asyncio.to_thread(self._read_disk, key)
+            if data is not None:
+                self.disk_hits += 1
+                self._store(key, data)
+                return data
+
+        self.misses += 1
+        size = key[2]
+        url = asset.with_static_format('png').with_size(_cdn_size(size)).url
+        try:
+            resp = await self.web.get(url, cache=False)
+            if resp.status != 200:
+                return None
+            data = await self.render.submit('avatar', avatar_rgba, resp.body, size)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError) as e:
+            # PIL's UnidentifiedImageError is an OSError
+            log.warning("Avatar fetch failed for user %s: %r", key[0], e)
+            return None
+        self._store(key, data)
+        if self.disk_dir is not None:
+            try:
+                await asyncio.to_thread(self._write_disk, key, data)
+            except OSError as e:
+                log.warning("Avatar disk write failed for user %s: %r", key[0], e)
+        return data
+
+    def _store(self, key, data):
+        entries = self._entries
+        old = entries.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old)
+        entries[key] = data
+        self.bytes += len(data)
+        while self.bytes > self.budget_bytes and len(entries) > 1:
+            _, evicted = entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+    # ---- Disk tier ----
+    def _disk_path(self, key):
+        user_id, avatar_key, size = key
+        return os.path.join(self.disk_dir, f'{user_id}_{size}_{avatar_key}.rgba')
+
+    def _read_disk(self, key):
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        size = key[2]
+        return data if len(data) == size * size * 4 else None
+
+    def _write_disk(self, key, data):
+        os.makedirs(self.disk_dir, exist_ok=True)
+        path = self._disk_path(key)
+        # Drop this user's older avatars at the same size
+        prefix = f'{key[0]}_{key[2]}_'
+        for name in os.listdir(self.disk_dir):
+            if name.startswith(prefix) and os.path.join(self.disk_dir, name) != path:
+                try:
+                    os.remove(os.path.join(self.disk_dir, name))
+                except OSError:
+                    pass
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def invalidate(self, user_id):
+        for key in [k for k in self._entries if k[0] == user_id]:
+            self.bytes -= len(self._entries.pop(key))
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'budget_bytes': self.budget_bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,176 @@
+"""Multi-process sharding: supervisor, shard layout and cross-cluster cooldowns.
+
+``ClusterSupervisor`` runs the ``IPCHub`` and starts one ``bot.py`` worker
+per cluster. Each worker runs an ``AutoShardedBot`` over a contiguous range
+of shards. Workers learn their role from the environment:
+
+    JACKYBOT_CLUSTER_ID   index of this worker
+    JACKYBOT_CLUSTERS     number of workers
+    JACKYBOT_SHARD_IDS    comma-separated shard ids owned by this worker
+    JACKYBOT_SHARD_COUNT  total shards across all workers
+    JACKYBOT_IPC_PORT     localhost port of the supervisor's IPC hub
+"""
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+from cogs.utils.ipc import IPCHub
+
+# Discord allows one IDENTIFY per 5 seconds per rate-limit bucket
+_IDENTIFY_INTERVAL = 5.0
+_RESTART_DELAY = 5.0
+_MAX_RESTART_DELAY = 300.0
+# Guild-, channel- and role-scoped buckets already live on a single cluster.
+_SHARED_BUCKETS = (commands.BucketType.default, commands.BucketType.user)
+
+
+def shard_ranges(shard_count, clusters):
+    """Split ``range(shard_count)`` into ``clusters`` contiguous, near-equal runs."""
+    clusters = max(1, min(clusters, shard_count))
+    base, extra = divmod(shard_count, clusters)
+    ranges = []
+    start = 0
+    for i in range(clusters):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def shard_for_guild(guild_id, shard_count):
+    return (guild_id >> 22) % shard_count
+
+
+async def recommended_shard_count(token):
+    """Ask Discord how many shards it recommends for this bot."""
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shards, _, _ = await http.get_bot_gateway()
+        return shards
+    finally:
+        await http.close()
+
+
+def shared_cooldown(rate, per, type=commands.BucketType.user):
+    """``commands.cooldown`` as a check whose uses are mirrored to the other clusters.
+
+    The check charges its own ``CooldownMapping`` when its command is invoked
+    (not when help merely asks whether it could run) and raises
+    ``CommandOnCooldown`` like the stock cooldown. With ``bot.ipc`` set,
+    user- and global-scoped uses are published; ``share_cooldowns`` charges
+    them on the receiving side.
+    """
+    mapping = commands.CooldownMapping.from_cooldown(rate, per, type)
+
+    def decorator(func):
+        callback = func.callback if isinstance(func, commands.Command) else func
+
+        async def predicate(ctx):
+            if ctx.command is None or ctx.command.callback is not callback:
+                return True
+            now = time.time()
+            bucket = mapping.get_bucket(ctx.message, now)
+            retry_after = bucket.update_rate_limit(now)
+            if retry_after:
+                raise commands.CommandOnCooldown(bucket, retry_after, type)
+            ipc = getattr(ctx.bot, 'ipc', None)
+            if ipc is not None and type in _SHARED_BUCKETS:
+                ipc.publish('cooldown', {'command': ctx.command.qualified_name, 'user_id': ctx.author.id})
+            return True
+
+        predicate.cooldown_mapping = mapping
+        return commands.check(predicate)(func)
+
+    return decorator
+
+
+def share_cooldowns(bot, ipc):
+    """Charge ``shared_cooldown`` buckets for uses published by other clusters."""
+    def apply_use(data):
+        command = bot.get_command(data['command'])
+        if command is None:
+            return
+        message = SimpleNamespace(author=SimpleNamespace(id=data['user_id']))
+        now = time.time()
+        for check in command.checks:
+            mapping = getattr(check, 'cooldown_mapping', None)
+            if mapping is not None:
+                mapping.get_bucket(message, now).update_rate_limit(now)
+
+    ipc.on('cooldown', apply_use)
+
+
+class ClusterSupervisor:
+    """Starts and restarts the worker processes and hosts their IPC hub."""
+
+    def __init__(self, script, clusters, shard_count, host='127.0.0.1', port=0, persist=None,
+                 identify_interval=_IDENTIFY_INTERVAL):
+        self.script = script
+        self.ranges = shard_ranges(shard_count, clusters)
+        self.shard_count = shard_count
+        self.hub = IPCHub(host, port, persist)
+        self.identify_interval = identify_interval
+        self.processes = {}
+        self.restarts = 0
+        self._stopping = False
+
+    def _env(self, cluster_id):
+        env = dict(os.environ)
+        env.update({
+            'JACKYBOT_CLUSTER_ID': str(cluster_id),
+            'JACKYBOT_CLUSTERS': str(len(self.ranges)),
+            'JACKYBOT_SHARD_IDS': ','.join(map(str, self.ranges[cluster_id])),
+            'JACKYBOT_SHARD_COUNT': str(self.shard_count),
+            'JACKYBOT_IPC_PORT': str(self.hub.port),
+        })
+        return env
+
+    async def _spawn(self, cluster_id):
+        process = await asyncio.create_subprocess_exec(sys.executable, self.script, env=self._env(cluster_id))
+        self.processes[cluster_id] = process
+        print(f"Cluster {cluster_id} started (pid {process.pid}, shards {self.ranges[cluster_id]})")
+        return process
+
+    async def _keep_alive(self, cluster_id, delay):
+        await asyncio.sleep(delay)
+        backoff = _RESTART_DELAY
+        while not self._stopping:
+            started = time.monotonic()
+            process = await self._spawn(cluster_id)
+            code = await process.wait()
+            if self._stopping:
+                return
+            if time.monotonic() - started > _MAX_RESTART_DELAY:
+                backoff = _RESTART_DELAY
+            print(f"Cluster {cluster_id} exited with code {code}; restarting in {backoff:.0f}s")
+            self.restarts += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, _MAX_RESTART_DELAY)
+
+    async def run(self):
+        await self.hub.start()
+        print(f"IPC hub listening on {self.hub.host}:{self.hub.port}; "
+              f"{self.shard_count} shards across {len(self.ranges)} clusters")
+        # Stagger start-up so each cluster's IDENTIFYs don't collide with the previous one's.
+        delays = []
+        delay = 0.0
+        for shard_ids in self.ranges:
+            delays.append(delay)
+            delay += self.identify_interval * len(shard_ids)
+        try:
+            await asyncio.gather(*(self._keep_alive(i, d) for i, d in enumerate(delays)))
+        finally:
+            await self.hub.close()
+
+    async def stop(self):
+        self._stopping = True
+        for process in self.processes.values():
+            if process.returncode is None:
+                process.terminate()
+        await asyncio.gather(*(p.wait() for p in self.processes.values()), return_exceptions=True)
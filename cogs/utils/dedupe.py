@@ -0,0 +1,102 @@
+import time
+
+
+class MessageDedupe:
+    """Time-windowed, fixed-capacity set of recently seen message keys.
+
+    Keys live in a ring of generation sets, each covering ``window / generations``
+    seconds. Lookups and inserts touch a constant number of sets, expiry drops a
+    whole generation at once, and a generation is rotated early when it would
+    push the index past ``max_entries``, so memory stays bounded under bursts
+    while the effective window only shrinks gradually.
+    """
+    __slots__ = ('window', 'max_entries', '_span', '_gen_cap', '_gens', '_gen_start',
+                 '_clock', 'hits', 'misses', 'evictions')
+
+    def __init__(self, window=1800.0, max_entries=100_000, generations=4, clock=time.monotonic):
+        if generations < 2:
+            raise ValueError("generations must be at least 2")
+        self.window = window
+        self.max_entries = max_entries
+        self._span = window / generations
+        self._gen_cap = max(1, max_entries // generations)
+        self._gens = [set() for _ in range(generations)]
+        self._clock = clock
+        self._gen_start = clock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(channel_id, msg_id):
+        return (channel_id << 64) | msg_id
+
+    def __len__(self):
+        return sum(len(g) for g in self._gens)
+
+    def __contains__(self, key):
+        self._expire(self._clock())
+        for gen in self._gens:
+            if key in gen:
+                return True
+        return False
+
+    def add(self, key):
+        self._expire(self._clock())
+        current = self._gens[0]
+        if len(current) >= self._gen_cap:
+            self._rotate()
+            current = self._gens[0]
+        current.add(key)
+
+    def check_and_add(self, key):
+        """Return True if ``key`` was already seen, otherwise record it and return False."""
+        self._expire(self._clock())
+        gens = self._gens
+        for gen in gens:
+            if key in gen:
+                self.hits += 1
+                return True
+        self.misses += 1
+        current = gens[0]
+        if len(current) >= self._gen_cap:
+            self._rotate()
+            current = gens[0]
+        current.add(key)
+        return False
+
+    def expire(self):
+        """Drop generations that have aged out; safe to call from an idle timer."""
+        self._expire(self._clock())
+
+    def clear(self):
+        for gen in self._gens:
+            gen.clear()
+        self._gen_start = self._clock()
+
+    def stats(self):
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'window': self.window,
+            'max_entries': self.max_entries,
+        }
+
+    def _expire(self, now):
+        elapsed = now - self._gen_start
+        if elapsed < self._span:
+            return
+        steps = int(elapsed // self._span)
+        for _ in range(min(steps, len(self._gens))):
+            self._rotate()
+        self._gen_start = now - (elapsed - steps * self._span)
+
+    def _rotate(self):
+        gens = self._gens
+        oldest = gens.pop()
+        self.evictions += len(oldest)
+        oldest.clear()
+        gens.insert(0, oldest)
+        self._gen_start = self._clock()
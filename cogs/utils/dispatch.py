@@ -0,0 +1,386 @@
+import asyncio
+import time
+from collections import deque
+
+import discord
+
+from cogs.utils import schemas, serial
+
+_MAX_EMBEDS = 10
+_MAX_EMBED_CHARS = 6000
+_ROUTE_LIMIT = 5
+_ROUTE_PER = 5.0
+_GLOBAL_LIMIT = 50
+_GLOBAL_PER = 1.0
+_GLOBAL_HEADROOM = 10
+_MAX_QUEUE = 50
+_MAX_RETRIES = 3
+_LATENCY_ALPHA = 0.2
+_WEBHOOK_NAME = "JackyBot Relay"
+# How long a channel where webhook creation was refused stays on bot sends
+# before trying again, in case the bot has since been given Manage Webhooks.
+_DENIED_TTL = 600.0
+
+
+class RateBucket:
+    """Fixed-window rate-limit bucket mirroring Discord's per-route accounting."""
+    __slots__ = ('limit', 'per', 'remaining', 'reset_at')
+
+    def __init__(self, limit, per):
+        self.limit = limit
+        self.per = per
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def acquire(self, now):
+        """Take a slot and return 0.0, or return how long to wait for the next window."""
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per
+        if self.remaining > 0:
+            self.remaining -= 1
+            return 0.0
+        return self.reset_at - now
+
+    def update(self, headers, now):
+        """Sync the bucket with X-RateLimit-* headers from a Discord response."""
+        if headers is None:
+            return
+        limit = headers.get('X-RateLimit-Limit')
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After')
+        if limit is not None:
+            self.limit = int(limit)
+        if remaining is not None:
+            self.remaining = int(remaining)
+        if reset_after is not None:
+            self.reset_at = now + float(reset_after)
+
+    def exhaust(self, retry_after, now):
+        self.remaining = 0
+        self.reset_at = now + retry_after
+
+
+class WebhookCache:
+    """One relay webhook per target channel, persisted so restarts reuse them.
+
+    Webhooks are deleted from Discord when their channel leaves the relay
+    (``discard``/``prune``) or when webhook fan-out is turned off (``purge``).
+    """
+    __slots__ = ('client', 'path', '_hooks', '_denied', '_lock')
+
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self._hooks = {}
+        self._denied = {}
+        self._lock = asyncio.Lock()
+
+    async def load(self):
+        data = await serial.load(self.path, schemas.RELAY_WEBHOOKS)
+        partial = discord.Webhook.partial
+        client = self.client
+        for channel_id_str, info in data.items():
+            self._hooks[int(channel_id_str)] = partial(info['id'], info['token'], client=client)
+
+    async def save(self):
+        try:
+            await serial.save(self.path, {str(cid): {'id': hook.id, 'token': hook.token}
+                                          for cid, hook in self._hooks.items()})
+        except Exception as e:
+            print(f"Error saving relay webhooks: {e}")
+
+    async def get(self, channel):
+        """Return the cached webhook for ``channel``, creating it if needed.
+
+        Returns None when the bot lacks Manage Webhooks in that channel, in which
+        case the caller should fall back to a normal bot send. The refusal is
+        remembered for ``_DENIED_TTL`` seconds, then creation is tried again.
+        """
+        channel_id = channel.id
+        hook = self._hooks.get(channel_id)
+        if hook is not None:
+            return hook
+        denied_until = self._denied.get(channel_id)
+        if denied_until is not None:
+            if time.monotonic() < denied_until:
+                return None
+            del self._denied[channel_id]
+        async with self._lock:
+            hook = self._hooks.get(channel_id)
+            if hook is not None:
+                return hook
+            try:
+                hook = await channel.create_webhook(name=_WEBHOOK_NAME)
+            except (discord.Forbidden, AttributeError):
+                self._denied[channel_id] = time.monotonic() + _DENIED_TTL
+                return None
+            except discord.HTTPException as e:
+                print(f"Failed to create relay webhook in {channel_id}: {e}")
+                return None
+            self._hooks[channel_id] = hook
+        await self.save()
+        return hook
+
+    def invalidate(self, channel_id):
+        """Forget a webhook that returned 404 so the next send re-creates it."""
+        if self._hooks.pop(channel_id, None) is not None:
+            asyncio.create_task(self.save())
+
+    def discard(self, channel_id):
+        """Delete the webhook of a channel that left the relay; returns the deleting task, if any."""
+        self._denied.pop(channel_id, None)
+        hook = self._hooks.pop(channel_id, None)
+        if hook is None:
+            return None
+        return asyncio.create_task(self._delete(channel_id, hook))
+
+    async def prune(self, channel_ids):
+        """Delete the webhooks of every channel not in ``channel_ids``."""
+        tasks = [self.discard(cid) for cid in list(self._hooks) if cid not in channel_ids]
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def purge(self):
+        """Delete every webhook saved at ``path``; used when webhook fan-out is off."""
+        await self.load()
+        if self._hooks:
+            await self.prune(())
+
+    async def _delete(self, channel_id, hook):
+        try:
+            await hook.delete(reason='Channel left the JackyChat relay')
+        except discord.NotFound:
+            pass
+        except discord.HTTPException as e:
+            print(f"Failed to delete relay webhook in {channel_id}: {e}")
+        await self.save()
+
+    @property
+    def identity(self):
+        user = self.client.user
+        if user is None:
+            return {}
+        return {'username': user.display_name, 'avatar_url': user.display_avatar.url}
+
+
+class RelayDispatcher:
+    """Central outbound queue for relayed embeds.
+
+    Each target channel gets its own bounded queue drained by a single worker,
+    so a broadcast costs one deque append per target instead of one task per
+    send. Workers respect a per-route bucket and a shared global bucket that
+    keeps headroom for regular command replies, and pending embeds for the
+    same channel are coalesced into one multi-embed message.
+
+    When a WebhookCache is supplied, sends go through one webhook per channel
+    instead; those use their own buckets and skip the bot's global budget.
+    """
+    __slots__ = ('_queues', '_targets', '_workers', '_buckets', '_global', '_global_reset', 'webhooks',
+                 'max_queue', 'sent', 'messages', 'coalesced', 'dropped', 'failed',
+                 'rate_limited', 'latency_ms', 'max_latency_ms', 'queue_ms', 'max_depth')
+
+    def __init__(self, max_queue=_MAX_QUEUE, global_limit=_GLOBAL_LIMIT - _GLOBAL_HEADROOM, webhooks=None):
+        self.webhooks = webhooks
+        self._queues = {}
+        self._targets = {}
+        self._workers = {}
+        self._buckets = {}
+        self._global = RateBucket(global_limit, _GLOBAL_PER)
+        self._global_reset = 0.0
+        self.max_queue = max_queue
+        self.sent = 0
+        self.messages = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.queue_ms = 0.0
+        self.max_depth = 0
+
+    def broadcast(self, channels, embed):
+        """Queue ``embed`` for every channel in ``channels`` without awaiting delivery."""
+        now = time.perf_counter()
+        queues = self._queues
+        workers = self._workers
+        for channel in channels:
+            channel_id = channel.id
+            queue = queues.get(channel_id)
+            if queue is None:
+                queue = queues[channel_id] = deque(maxlen=self.max_queue)
+            if len(queue) == self.max_queue:
+                self.dropped += 1
+            queue.append((embed, now))
+            self._targets[channel_id] = channel
+            depth = len(queue)
+            if depth > self.max_depth:
+                self.max_depth = depth
+            if channel_id not in workers:
+                workers[channel_id] = asyncio.create_task(self._drain(channel_id))
+
+    def forget(self, channel_id):
+        """Drop any pending sends for a channel that is no longer linked."""
+        self._queues.pop(channel_id, None)
+        self._targets.pop(channel_id, None)
+        self._buckets.pop(channel_id, None)
+        if self.webhooks is not None:
+            self.webhooks.discard(channel_id)
+        worker = self._workers.pop(channel_id, None)
+        if worker is not None:
+            worker.cancel()
+
+    @property
+    def queue_depth(self):
+        return sum(len(q) for q in self._queues.values())
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue_depth,
+            'max_depth': self.max_depth,
+            'active_workers': len(self._workers),
+            'sent': self.sent,
+            'messages': self.messages,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'rate_limited': self.rate_limited,
+            'latency_ms': round(self.latency_ms, 1),
+            'max_latency_ms': round(self.max_latency_ms, 1),
+            'queue_ms': round(self.queue_ms, 1),
+        }
+
+    async def close(self):
+        workers = list(self._workers.values())
+        self._workers.clear()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def _take_batch(self, queue):
+        embeds = []
+        enqueued = []
+        chars = 0
+        while queue and len(embeds) < _MAX_EMBEDS:
+            embed, queued_at = queue[0]
+            size = len(embed)
+            if embeds and chars + size > _MAX_EMBED_CHARS:
+                break
+            queue.popleft()
+            embeds.append(embed)
+            enqueued.append(queued_at)
+            chars += size
+        return embeds, enqueued
+
+    def _bucket(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = RateBucket(_ROUTE_LIMIT, _ROUTE_PER)
+        return bucket
+
+    async def _wait_for_slot(self, bucket, use_global=True):
+        sleep = asyncio.sleep
+        perf = time.perf_counter
+        while True:
+            now = perf()
+            if now < self._global_reset:
+                await sleep(self._global_reset - now)
+                continue
+            delay = bucket.acquire(now)
+            if delay:
+                await sleep(delay)
+                continue
+            delay = self._global.acquire(now) if use_global else 0.0
+            if delay:
+                bucket.remaining += 1
+                await sleep(delay)
+                continue
+            return
+
+    async def _drain(self, channel_id):
+        queues = self._queues
+        perf = time.perf_counter
+        webhooks = self.webhooks
+        try:
+            while True:
+                queue = queues.get(channel_id)
+                if not queue:
+                    break
+                channel = self._targets[channel_id]
+                embeds, enqueued = self._take_batch(queue)
+                count = len(embeds)
+                for attempt in range(_MAX_RETRIES):
+                    hook = await webhooks.get(channel) if webhooks is not None else None
+                    if hook is None:
+                        bucket = self._bucket(channel_id)
+                        await self._wait_for_slot(bucket)
+                    else:
+                        bucket = self._bucket(hook.id)
+                        await self._wait_for_slot(bucket, use_global=False)
+                    start = perf()
+                    try:
+                        if hook is None:
+                            await channel.send(embeds=embeds)
+                        else:
+                            await hook.send(embeds=embeds, **webhooks.identity)
+                    except discord.Forbidden:
+                        self.failed += count
+                        break
+                    except discord.NotFound:
+                        if hook is not None:
+                            self._buckets.pop(hook.id, None)
+                            webhooks.invalidate(channel_id)
+                            continue
+                        self.failed += count
+                        queues.pop(channel_id, None)
+                        break
+                    except discord.HTTPException as e:
+                        if e.status != 429:
+                            self.failed += count
+                            break
+                        self._on_rate_limited(e, bucket)
+                        continue
+                    done = perf()
+                    self._record(count, done - start, done - enqueued[0])
+                    break
+                else:
+                    self.failed += count
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Relay dispatcher error for channel {channel_id}: {e}")
+        finally:
+            if self._workers.get(channel_id) is asyncio.current_task():
+                del self._workers[channel_id]
+            queue = queues.get(channel_id)
+            if queue is not None and not queue:
+                del queues[channel_id]
+
+    def _on_rate_limited(self, error, bucket):
+        self.rate_limited += 1
+        now = time.perf_counter()
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None)
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is None and headers is not None:
+            retry_after = float(headers.get('Retry-After', 5))
+        if retry_after is None:
+            retry_after = 5.0
+        if headers is not None and headers.get('X-RateLimit-Global'):
+            self._global_reset = now + retry_after
+        else:
+            bucket.update(headers, now)
+            bucket.exhaust(retry_after, now)
+
+    def _record(self, count, send_s, queued_s):
+        self.sent += count
+        self.messages += 1
+        if count > 1:
+            self.coalesced += count - 1
+        send_ms = send_s * 1000
+        alpha = _LATENCY_ALPHA
+        self.latency_ms += alpha * (send_ms - self.latency_ms)
+        self.queue_ms += alpha * (queued_s * 1000 - self.queue_ms)
+        if send_ms > self.max_latency_ms:
+            self.max_latency_ms = send_ms
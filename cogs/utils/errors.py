@@ -0,0 +1,59 @@
+"""The bot's one ``on_command_error``.
+
+Any listener registered for ``on_command_error`` makes discord.py's default
+handler return early, so unhandled command exceptions stop being logged.
+Features therefore never add listeners for it. They register here instead:
+
+- observers (metrics, analytics) are called with every error and never
+  decide what happens to it,
+- handlers are awaited in registration order and return True when they have
+  answered the error (a busy reply, a "did you mean"),
+
+and anything no handler claims goes to discord.py's default handler, which
+logs it unless the command or its cog has its own error handler.
+"""
+import logging
+
+from discord.ext.commands.bot import BotBase
+
+log = logging.getLogger('jackybot.errors')
+
+
+class CommandErrors:
+    def __init__(self, bot):
+        self.bot = bot
+        self._observers = []
+        self._handlers = []
+
+    def install(self):
+        """Become the bot's ``on_command_error`` event."""
+        self.bot.event(self.on_command_error)
+
+    def observe(self, func):
+        """Call ``func(ctx, error)`` for every command error."""
+        self._observers.append(func)
+        return func
+
+    def handle(self, func):
+        """Await ``func(ctx, error)`` for unanswered errors; it returns True when it answered one."""
+        self._handlers.append(func)
+        return func
+
+    def remove(self, func):
+        for funcs in (self._observers, self._handlers):
+            if func in funcs:
+                funcs.remove(func)
+
+    async def on_command_error(self, ctx, error):
+        for observer in tuple(self._observers):
+            try:
+                observer(ctx, error)
+            except Exception:
+                log.exception('Command error observer %r failed', observer)
+        for handler in tuple(self._handlers):
+            try:
+                if await handler(ctx, error):
+                    return
+            except Exception:
+                log.exception('Command error handler %r failed', handler)
+        await BotBase.on_command_error(self.bot, ctx, error)
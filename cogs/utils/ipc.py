@@ -0,0 +1,240 @@
+"""Local IPC between cluster processes.
+
+The supervisor runs an ``IPCHub`` on localhost; every worker connects an
+``IPCClient``. Messages are newline-delimited JSON objects:
+
+- ``publish``: fan a ``topic``/``data`` pair out to every other worker.
+- ``update``: merge a dict into a hub-side namespace. Namespaces listed in
+  ``persist`` are written to their JSON file (atomically) on every change.
+- ``fetch``: read a namespace back; answered with a ``reply``.
+
+Everything is best effort: messages published while the hub is unreachable
+are dropped and counted, and the client reconnects in the background.
+"""
+import asyncio
+import itertools
+
+from cogs.utils import serial
+
+_RECONNECT_DELAY = 1.0
+_MAX_RECONNECT_DELAY = 30.0
+
+
+def _encode(message):
+    return serial.dumps(message) + b'\n'
+
+
+class IPCHub:
+    """Message hub run by the cluster supervisor."""
+
+    def __init__(self, host='127.0.0.1', port=0, persist=None):
+        self.host = host
+        self.port = port
+        self.persist = dict(persist or {})
+        self.namespaces = {}
+        self._clients = {}
+        self._server = None
+        self.messages = 0
+
+    async def start(self):
+        for ns, path in self.persist.items():
+            try:
+                self.namespaces[ns] = serial.read(path)
+            except OSError:
+                self.namespaces[ns] = {}
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    @property
+    def clusters(self):
+        return sorted(self._clients)
+
+    async def _handle(self, reader, writer):
+        cluster = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = serial.loads(line)
+                except ValueError:
+                    continue
+                self.messages += 1
+                op = message.get('op')
+                if op == 'hello':
+                    cluster = message['cluster']
+                    self._clients[cluster] = writer
+                elif op == 'publish':
+                    payload = _encode(message)
+                    for other, other_writer in self._clients.items():
+                        if other != cluster:
+                            other_writer.write(payload)
+                elif op == 'update':
+                    ns = message['ns']
+                    data = self.namespaces.setdefault(ns, {})
+                    data.update(message['data'])
+                    path = self.persist.get(ns)
+                    if path is not None:
+                        try:
+                            await serial.save(path, data)
+                        except OSError as e:
+                            print(f"IPC hub could not save {path}: {e}")
+                elif op == 'fetch':
+                    writer.write(_encode({'op': 'reply', 'id': message['id'],
+                                          'data': self.namespaces.get(message['ns'], {})}))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if cluster is not None and self._clients.get(cluster) is writer:
+                del self._clients[cluster]
+            writer.close()
+
+    async def close(self):
+        server = self._server
+        self._server = None
+        if server is not None:
+            server.close()
+            for writer in list(self._clients.values()):
+                writer.close()
+            self._clients.clear()
+            await server.wait_closed()
+
+
+class IPCClient:
+    """Worker-side connection to the ``IPCHub``.
+
+    Handlers registered with ``on`` receive the ``data`` of every message
+    published on their topic by another worker; coroutine handlers are
+    scheduled as tasks.
+    """
+
+    def __init__(self, cluster_id, host='127.0.0.1', port=0):
+        self.cluster_id = cluster_id
+        self.host = host
+        self.port = port
+        self._handlers = {}
+        self._replies = {}
+        self._ids = itertools.count(1)
+        self._writer = None
+        self._task = None
+        self._connected = asyncio.Event()
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+
+    @property
+    def connected(self):
+        return self._writer is not None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def wait_connected(self, timeout=None):
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    def on(self, topic, handler):
+        self._handlers[topic] = handler
+
+    def off(self, topic):
+        self._handlers.pop(topic, None)
+
+    def _send(self, message):
+        writer = self._writer
+        if writer is None:
+            self.dropped += 1
+            return False
+        writer.write(_encode(message))
+        self.sent += 1
+        return True
+
+    def publish(self, topic, data):
+        return self._send({'op': 'publish', 'topic': topic, 'data': data})
+
+    def update(self, ns, data):
+        return self._send({'op': 'update', 'ns': ns, 'data': data})
+
+    async def fetch(self, ns, timeout=5.0):
+        request_id = next(self._ids)
+        future = self._replies[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            if not self._send({'op': 'fetch', 'ns': ns, 'id': request_id}):
+                raise ConnectionError('IPC hub is not connected')
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._replies.pop(request_id, None)
+
+    async def _run(self):
+        delay = _RECONNECT_DELAY
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _MAX_RECONNECT_DELAY)
+                continue
+            delay = _RECONNECT_DELAY
+            writer.write(_encode({'op': 'hello', 'cluster': self.cluster_id}))
+            self._writer = writer
+            self._connected.set()
+            try:
+                await self._read(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                self._writer = None
+                self._connected.clear()
+                writer.close()
+            await asyncio.sleep(delay)
+
+    async def _read(self, reader):
+        handlers = self._handlers
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            try:
+                message = serial.loads(line)
+            except ValueError:
+                continue
+            self.received += 1
+            op = message.get('op')
+            if op == 'publish':
+                handler = handlers.get(message.get('topic'))
+                if handler is None:
+                    continue
+                try:
+                    result = handler(message.get('data'))
+                    if asyncio.iscoroutine(result):
+                        asyncio.create_task(result)
+                except Exception as e:
+                    print(f"IPC handler for {message.get('topic')!r} failed: {e}")
+            elif op == 'reply':
+                future = self._replies.get(message.get('id'))
+                if future is not None and not future.done():
+                    future.set_result(message.get('data'))
+
+    def stats(self):
+        return {
+            'cluster': self.cluster_id,
+            'connected': self.connected,
+            'sent': self.sent,
+            'received': self.received,
+            'dropped': self.dropped,
+        }
+
+    async def close(self):
+        task = self._task
+        self._task = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        writer = self._writer
+        self._writer = None
+        if writer is not None:
+            writer.close()
@@ -0,0 +1,182 @@
+import ast
+import asyncio
+import logging
+import os
+
+from discord.ext import commands
+
+log = logging.getLogger('jackybot.lazy')
+
+_COMMAND_DECORATORS = frozenset(('commands.command', 'commands.group',
+                                 'commands.hybrid_command', 'commands.hybrid_group'))
+_LISTENER_DECORATOR = 'commands.Cog.listener'
+
+
+def _dotted(node):
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+
+def _constant(node):
+    return node.value if isinstance(node, ast.Constant) else None
+
+
+def scan_cog(path):
+    """Statically collect the top-level commands and listeners a cog file defines.
+
+    Returns ``(commands, listeners)`` where commands is a list of
+    ``(name, aliases, help)`` tuples and listeners is a list of event names.
+    Nothing in the file is imported or executed.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    found_commands = []
+    listeners = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for dec in node.decorator_list:
+            call = dec if isinstance(dec, ast.Call) else None
+            path_name = _dotted(call.func if call else dec)
+            if path_name in _COMMAND_DECORATORS:
+                name = node.name
+                aliases = []
+                if call:
+                    if call.args and _constant(call.args[0]):
+                        name = call.args[0].value
+                    for kw in call.keywords:
+                        if kw.arg == 'name' and _constant(kw.value):
+                            name = kw.value.value
+                        elif kw.arg == 'aliases' and isinstance(kw.value, (ast.List, ast.Tuple)):
+                            aliases = [v for v in map(_constant, kw.value.elts) if v]
+                found_commands.append((name, aliases, ast.get_docstring(node)))
+            elif path_name == _LISTENER_DECORATOR:
+                event = node.name
+                if call:
+                    if call.args and _constant(call.args[0]):
+                        event = call.args[0].value
+                    for kw in call.keywords:
+                        if kw.arg == 'name' and _constant(kw.value):
+                            event = kw.value.value
+                listeners.append(event)
+    return found_commands, listeners
+
+
+class LazyCogLoader:
+    """Defers importing heavy cogs until one of their commands or listeners is used.
+
+    ``register`` parses the cog file and installs lightweight stub commands (and
+    optionally stub listeners) under the real names. The first time a stub fires
+    the stubs are removed, the real extension is loaded, and the triggering
+    message or event is replayed against it. If the load fails the stubs are put
+    back and the error is kept in ``errors``, so the next use tries again.
+    """
+    __slots__ = ('bot', 'cog_dir', '_stubs', '_locks', 'loaded', 'errors')
+
+    def __init__(self, bot, cog_dir='cogs'):
+        self.bot = bot
+        self.cog_dir = cog_dir
+        self._stubs = {}
+        self._locks = {}
+        self.loaded = set()
+        self.errors = {}
+
+    @property
+    def pending(self):
+        return tuple(self._stubs)
+
+    def stub_module(self, command):
+        """The cog module a stub ``command`` stands in for, or None for a real command."""
+        for module, (stub_commands, _) in self._stubs.items():
+            if command in stub_commands:
+                return module
+        return None
+
+    def register(self, module, listeners=True):
+        path = os.path.join(self.cog_dir, f'{module}.py')
+        found_commands, events = scan_cog(path)
+        bot = self.bot
+        stub_commands = []
+        for name, aliases, help_text in found_commands:
+            if bot.get_command(name) is not None:
+                continue
+            command = commands.Command(self._command_stub(module), name=name, aliases=aliases,
+                                       help=help_text)
+            stub_commands.append(command)
+        stub_listeners = []
+        if listeners:
+            stub_listeners = [(self._listener_stub(module, event), event) for event in events]
+        self._install(module, stub_commands, stub_listeners)
+        self._locks[module] = asyncio.Lock()
+
+    def _install(self, module, stub_commands, stub_listeners):
+        bot = self.bot
+        for command in stub_commands:
+            bot.add_command(command)
+        for func, event in stub_listeners:
+            bot.add_listener(func, event)
+        self._stubs[module] = (stub_commands, stub_listeners)
+
+    async def ensure_loaded(self, module):
+        """Import and set up ``module`` if it is still stubbed; returns True once loaded.
+
+        On failure the stubs are reinstalled and the exception is stored in
+        ``errors[module]``; the next call retries the import.
+        """
+        if module in self.loaded:
+            return True
+        lock = self._locks.get(module)
+        if lock is None:
+            return False
+        async with lock:
+            if module in self.loaded:
+                return True
+            stub_commands, stub_listeners = self._stubs.pop(module, ((), ()))
+            bot = self.bot
+            for command in stub_commands:
+                bot.remove_command(command.name)
+            for func, event in stub_listeners:
+                bot.remove_listener(func, event)
+            try:
+                await bot.load_extension(f'{self.cog_dir}.{module}')
+            except Exception as e:
+                log.error('Failed to lazily load %s', module, exc_info=e)
+                self.errors[module] = e
+                self._install(module, [c for c in stub_commands if bot.get_command(c.name) is None], stub_listeners)
+                return False
+            self.errors.pop(module, None)
+            self.loaded.add(module)
+            return True
+
+    def _command_stub(self, module):
+        async def stub(ctx):
+            if not await self.ensure_loaded(module):
+                await ctx.reply("That feature is unavailable right now.")
+                error = self.errors.get(module)
+                if error is not None:
+                    # Reaches the error handlers (and the log) like any other command failure.
+                    raise error
+                return
+            bot = self.bot
+            new_ctx = await bot.get_context(ctx.message)
+            if new_ctx.command is not None and new_ctx.command.callback is not stub:
+                await bot.invoke(new_ctx)
+        return stub
+
+    def _listener_stub(self, module, event):
+        async def stub(*args, **kwargs):
+            if module in self.loaded or not await self.ensure_loaded(module):
+                return
+            for cog in self.bot.cogs.values():
+                if cog.__module__ != f'{self.cog_dir}.{module}':
+                    continue
+                for name, method in cog.get_listeners():
+                    if name == event:
+                        await method(*args, **kwargs)
+        return stub
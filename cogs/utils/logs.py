@@ -0,0 +1,265 @@
+"""Non-blocking logging: one ``QueueHandler`` on the root logger, I/O on a listener thread.
+
+``setup_logging`` installs the pipeline. On the calling (event-loop) thread a
+record costs a rate-limit check, an optional sampling check, ``%`` formatting
+of the message and a ``put_nowait``. Console and file output, JSON encoding
+and traceback rendering all happen on the ``QueueListener`` thread. When the
+queue is full, records are dropped and counted rather than blocking the loop.
+
+- ``RateLimitFilter`` is a token bucket per call site (logger, level and
+  message template). It reports how many records were suppressed on the next
+  record that gets through.
+- ``SampleFilter`` keeps one record in ``every`` on a hot-path logger.
+- ``JSONFormatter`` writes one structured object per line. ``extra=`` fields
+  are kept as keys.
+- With ``capture_prints``, ``sys.stdout`` is swapped for a line-buffered
+  writer that feeds the same queue, so legacy ``print`` calls stop writing
+  to the terminal from the loop thread.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+_QUEUE_SIZE = 10_000
+_RATE = 5.0
+_BURST = 20
+_MAX_KEYS = 4096
+_TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+# Attributes every LogRecord has; anything else came from ``extra=``.
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per (logger, level, template): ``rate`` records/s with bursts of ``burst``."""
+
+    def __init__(self, rate=_RATE, burst=_BURST, clock=time.monotonic, max_keys=_MAX_KEYS):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.max_keys = max_keys
+        self._buckets = {}
+        self.suppressed = 0
+
+    def filter(self, record):
+        key = (record.name, record.levelno, record.msg if isinstance(record.msg, str) else id(record.msg))
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.clear()
+            bucket = self._buckets[key] = [self.burst, now, 0]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            bucket[2] += 1
+            self.suppressed += 1
+            return False
+        bucket[0] = tokens - 1
+        if bucket[2]:
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """Pass one record in ``every``; the kept record carries ``sampled=every``.
+
+    Warnings and errors always pass and are not counted.
+    """
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(1, int(every))
+        self._count = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        count = self._count
+        self._count = count + 1
+        if count % self.every:
+            return False
+        if self.every > 1:
+            record.sampled = self.every
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', None)
+        if suppressed:
+            text += f' (+{suppressed} similar suppressed)'
+        return text
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Drops instead of blocking when the listener falls behind."""
+
+    def __init__(self, log_queue, max_size):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge args now (they may be mutated later) but leave exc_info for the
+        # listener to render. No copy: this is the root handler, so it runs last.
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        q = self.queue
+        if q.qsize() >= self.max_size:
+            self.dropped += 1
+        else:
+            q.put_nowait(record)
+
+
+class _PrintRedirect:
+    """File-like ``sys.stdout`` replacement that logs complete lines."""
+
+    def __init__(self, logger, stream):
+        self._logger = logger
+        self._stream = stream
+        self._buffer = ''
+
+    def write(self, text):
+        if '\n' not in text:
+            self._buffer += text
+            return len(text)
+        *lines, self._buffer = (self._buffer + text).split('\n')
+        log = self._logger.info
+        for line in lines:
+            if line:
+                log(line)
+        return len(text)
+
+    def flush(self):
+        if self._buffer:
+            self._logger.info(self._buffer)
+            self._buffer = ''
+
+    def isatty(self):
+        return False
+
+    def fileno(self):
+        return self._stream.fileno()
+
+    @property
+    def encoding(self):
+        return self._stream.encoding
+
+
+class LogPipeline:
+    """Handle to the installed pipeline; ``stop()`` drains the queue, restores stdout and removes the samplers."""
+
+    def __init__(self, handler, listener, filters, stdout, samplers=()):
+        self.handler = handler
+        self.listener = listener
+        self.filters = filters
+        self._stdout = stdout
+        self._samplers = list(samplers)
+
+    @property
+    def queue_depth(self):
+        return self.handler.queue.qsize()
+
+    def stats(self):
+        return {
+            'queued': self.queue_depth,
+            'dropped': self.handler.dropped,
+            'suppressed': sum(getattr(f, 'suppressed', 0) for f in self.filters),
+        }
+
+    def stop(self):
+        if self._stdout is not None:
+            sys.stdout.flush()
+            sys.stdout = self._stdout
+            self._stdout = None
+        for logger, sampler in self._samplers:
+            logger.removeFilter(sampler)
+        self._samplers.clear()
+        root = logging.getLogger()
+        if self.handler in root.handlers:
+            root.removeHandler(self.handler)
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+
+def setup_logging(level=logging.INFO, path=None, files=None, sample=None, rate=_RATE, burst=_BURST,
+                  capture_prints=False, queue_size=_QUEUE_SIZE, stream=None):
+    """Route every logger through a queue drained by a background thread.
+
+    ``path`` gets JSON lines for everything; ``files`` maps logger names to
+    extra text log files (e.g. ``{'SteamOSUpdates': 'steamos_bot.log'}``);
+    ``sample`` maps hot-path logger names to a keep-one-in-N rate; give
+    hot lines their own child logger so the rest of a module is not sampled.
+    """
+    stream = stream or sys.stdout
+    log_queue = queue.SimpleQueue()
+
+    console = logging.StreamHandler(stream)
+    console.setFormatter(TextFormatter(_TEXT_FORMAT))
+    outputs = [console]
+    if path:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        structured = logging.FileHandler(path, encoding='utf-8')
+        structured.setFormatter(JSONFormatter())
+        outputs.append(structured)
+    for name, file_path in (files or {}).items():
+        handler = logging.FileHandler(file_path, encoding='utf-8')
+        handler.setFormatter(TextFormatter(_TEXT_FORMAT))
+        handler.addFilter(logging.Filter(name))
+        outputs.append(handler)
+
+    handler = _QueueHandler(log_queue, queue_size)
+    limiter = RateLimitFilter(rate, burst)
+    handler.addFilter(limiter)
+    filters = [limiter]
+    samplers = []
+    for name, every in (sample or {}).items():
+        sampler = SampleFilter(every)
+        logger = logging.getLogger(name)
+        logger.addFilter(sampler)
+        filters.append(sampler)
+        samplers.append((logger, sampler))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if isinstance(existing, logging.handlers.QueueHandler):
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, *outputs, respect_handler_level=True)
+    listener.start()
+
+    stdout = None
+    if capture_prints:
+        stdout = sys.stdout
+        sys.stdout = _PrintRedirect(logging.getLogger('print'), stdout)
+    return LogPipeline(handler, listener, filters, stdout, samplers)
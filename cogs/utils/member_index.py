@@ -0,0 +1,209 @@
+"""Compact per-guild index of member IDs for random sampling.
+
+Each guild keeps its user IDs sorted in a packed ``array('Q')``, and
+nothing else: 8 bytes per member. Membership checks are a binary search,
+uniform random picks are O(1), and adds and removes shift the tail of the
+array (a memmove, a few microseconds even for large guilds). A per-member
+position dict would make those O(1) but cost ~100 bytes per member. The
+index is fed incrementally from member joins/leaves and message authors,
+which lets random-member features work without the member cache or a full
+``guild.chunk()``.
+
+The optional snapshot file is a flat run of ``guild_id, count, ids...``
+records, each a native-endian unsigned 64-bit integer.
+"""
+import asyncio
+import os
+import random
+import sys
+from array import array
+from bisect import bisect_left
+
+_MAGIC = 0x4A4B4D4944580001  # "JKMIDX" v1
+
+
+def _is_sorted(ids):
+    return all(a < b for a, b in zip(ids, ids[1:]))
+
+
+class MemberIndex:
+    """Per-guild sets of user IDs backed by sorted packed arrays."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._ids = {}
+        self.dirty = False
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, key):
+        guild_id, user_id = key
+        ids = self._ids.get(guild_id)
+        if ids is None:
+            return False
+        i = bisect_left(ids, user_id)
+        return i < len(ids) and ids[i] == user_id
+
+    def count(self, guild_id):
+        ids = self._ids.get(guild_id)
+        return len(ids) if ids is not None else 0
+
+    def total(self):
+        return sum(len(ids) for ids in self._ids.values())
+
+    def add(self, guild_id, user_id):
+        ids = self._ids.get(guild_id)
+        if ids is None:
+            ids = self._ids[guild_id] = array('Q')
+        i = bisect_left(ids, user_id)
+        if i < len(ids) and ids[i] == user_id:
+            return False
+        ids.insert(i, user_id)
+        self.dirty = True
+        return True
+
+    def add_many(self, guild_id, user_ids):
+        """Add ``user_ids`` with one merge and sort rather than an insert per ID."""
+        ids = self._ids.get(guild_id)
+        before = len(ids) if ids is not None else 0
+        merged = set(user_ids)
+        if ids is not None:
+            merged.update(ids)
+        if len(merged) == before:
+            return 0
+        self._ids[guild_id] = array('Q', sorted(merged))
+        self.dirty = True
+        return len(merged) - before
+
+    def remove(self, guild_id, user_id):
+        ids = self._ids.get(guild_id)
+        if ids is None:
+            return False
+        i = bisect_left(ids, user_id)
+        if i == len(ids) or ids[i] != user_id:
+            return False
+        del ids[i]
+        self.dirty = True
+        return True
+
+    def drop_guild(self, guild_id):
+        if self._ids.pop(guild_id, None) is not None:
+            self.dirty = True
+
+    def sample(self, guild_id, k=1, exclude=()):
+        """Return up to ``k`` distinct random user IDs from ``guild_id`` not in ``exclude``."""
+        ids = self._ids.get(guild_id)
+        if not ids or k <= 0:
+            return []
+        n = len(ids)
+        if n <= 4 * (k + len(exclude)):
+            candidates = [uid for uid in ids if uid not in exclude]
+            return random.sample(candidates, min(k, len(candidates)))
+        # At least three quarters of the array is eligible, so rejection ends quickly.
+        randrange = random.randrange
+        picked = []
+        seen = set(exclude)
+        while len(picked) < k:
+            uid = ids[randrange(n)]
+            if uid not in seen:
+                seen.add(uid)
+                picked.append(uid)
+        return picked
+
+    def random_member(self, guild_id, exclude=()):
+        picked = self.sample(guild_id, 1, exclude)
+        return picked[0] if picked else None
+
+    # ---- Event feed ----
+    def install(self, bot):
+        """Keep the index current from the gateway; message authors are fed by ``on_message``."""
+        async def on_member_join(member):
+            self.add(member.guild.id, member.id)
+
+        async def on_raw_member_remove(payload):
+            # Fires whether or not the member was cached
+            self.remove(payload.guild_id, payload.user.id)
+
+        async def on_guild_available(guild):
+            # Whatever the member cache already holds (e.g. from an earlier chunk) is free to index.
+            self.add_many(guild.id, [m.id for m in guild.members])
+
+        async def on_guild_remove(guild):
+            self.drop_guild(guild.id)
+
+        bot.add_listener(on_member_join)
+        bot.add_listener(on_raw_member_remove)
+        bot.add_listener(on_guild_available)
+        bot.add_listener(on_guild_available, 'on_guild_join')
+        bot.add_listener(on_guild_remove)
+
+    # ---- Persistence ----
+    def _snapshot(self):
+        out = array('Q', (_MAGIC,))
+        for guild_id, ids in self._ids.items():
+            out.append(guild_id)
+            out.append(len(ids))
+            out.extend(ids)
+        return out
+
+    def _write(self, snapshot):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'wb') as f:
+            snapshot.tofile(f)
+        os.replace(tmp, self.path)
+
+    def _read(self):
+        data = array('Q')
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+        except OSError:
+            return None
+        if len(raw) % data.itemsize:
+            return None
+        data.frombytes(raw)
+        if not data or data[0] != _MAGIC:
+            return None
+        return data
+
+    async def load(self):
+        if self.path is None:
+            return 0
+        data = await asyncio.to_thread(self._read)
+        if data is None:
+            return 0
+        i, end = 1, len(data)
+        while i + 2 <= end:
+            guild_id, n = data[i], data[i + 1]
+            i += 2
+            chunk = data[i:i + n]
+            i += n
+            if guild_id in self._ids:
+                self.add_many(guild_id, chunk)
+            else:
+                # Snapshots are written sorted; older ones were in insertion order.
+                self._ids[guild_id] = chunk if _is_sorted(chunk) else array('Q', sorted(set(chunk)))
+        self.dirty = False
+        return self.total()
+
+    async def save(self):
+        if self.path is None or not self.dirty:
+            return
+        # Snapshot on the loop so the worker thread never sees a half-applied update.
+        snapshot = self._snapshot()
+        self.dirty = False
+        try:
+            await asyncio.to_thread(self._write, snapshot)
+        except OSError as e:
+            self.dirty = True
+            print(f"Could not save member index to {self.path}: {e}")
+
+    def stats(self):
+        return {
+            'guilds': len(self._ids),
+            'members': self.total(),
+            # Everything the index holds: the arrays, with their spare capacity, and the guild dict.
+            'bytes': sys.getsizeof(self._ids) + sum(sys.getsizeof(ids) for ids in self._ids.values()),
+        }
@@ -0,0 +1,384 @@
+"""Per-cog memory accounting: retained size of each cog's containers, growth and budgets.
+
+Every snapshot measures a set of containers:
+
+- Container attributes that each loaded cog holds: dicts, lists, sets, deques,
+  and objects of classes defined under ``cogs.`` (such as ``SimpleCache`` or
+  a poll's state). These are found automatically.
+- Extra containers a cog reports from ``memory_containers()``, a mapping of
+  name -> object or zero-argument callable. Use this for state that lives
+  outside the cog, such as tasks attached to voice players.
+- Bot-wide structures registered with ``MemoryAccountant.register``.
+
+Retained size is the ``sys.getsizeof`` sum over the container's object
+graph. The walk goes into builtin containers and into instances of project
+classes. Other objects (discord models, tasks, modules) are counted shallowly.
+Cogs, the bot and bot-wide services are never entered from inside another
+container. The walk runs on the event loop in chunks and yields between
+them. Each container stops at ``max_objects``; a truncated size is a lower
+bound.
+
+With ``tracemalloc_frames`` set, each snapshot also groups live allocations
+by the cog module whose code made them. This catches memory held where no
+registered container can see it.
+
+The accountant keeps a short history per container. It logs a warning when
+a container goes over its budget (bytes or items), and when it grows in
+every snapshot across a full history window.
+"""
+import asyncio
+import logging
+import re
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+from discord.ext import commands
+
+log = logging.getLogger('jackybot.memory')
+
+_INTERVAL = 600.0
+_HISTORY = 6
+_MAX_OBJECTS = 200_000
+_CHUNK = 5_000
+_DEFAULT_BUDGET = 64 << 20
+_CONTAINER_TYPES = (dict, list, set, frozenset, deque)
+_LEAVES = frozenset((str, bytes, bytearray, int, float, bool, complex, type(None), memoryview))
+_COG_FILE = re.compile(r'(cogs(?:[\\/]utils)?)[\\/](\w+)\.py$')
+_SEPARATORS = re.compile(r'[\\/]')
+_UNITS = {'b': 1, 'kb': 1 << 10, 'mb': 1 << 20, 'gb': 1 << 30}
+_MISSING = object()
+
+
+def parse_budgets(spec):
+    """Parse ``"GroqChat._cache=64MB,ContextManager.conversation_contexts=5000items"``.
+
+    Returns ``{name: (max_bytes, max_items)}``; either may be None.
+    """
+    budgets = {}
+    for part in filter(None, (p.strip() for p in (spec or '').split(','))):
+        name, _, value = part.partition('=')
+        match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*(items|[kmg]?b)?\s*', value.lower())
+        if not name or match is None:
+            raise ValueError(f"Bad memory budget {part!r}; use name=64MB or name=5000items")
+        number, unit = float(match.group(1)), match.group(2) or 'b'
+        max_bytes, max_items = budgets.get(name.strip(), (None, None))
+        if unit == 'items':
+            max_items = int(number)
+        else:
+            max_bytes = int(number * _UNITS[unit])
+        budgets[name.strip()] = (max_bytes, max_items)
+    return budgets
+
+
+def _slot_names(cls):
+    names = []
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get('__slots__', ())
+        names.extend((slots,) if isinstance(slots, str) else slots)
+    return names
+
+
+def _is_project_object(obj):
+    module = type(obj).__module__ or ''
+    return module.startswith('cogs.') and not isinstance(obj, commands.Cog)
+
+
+class _Sizer:
+    """Incremental object-graph walk; call ``step`` until it returns True."""
+    __slots__ = ('stack', 'seen', 'exclude', 'max_objects', 'size', 'objects', 'truncated')
+
+    def __init__(self, root, exclude, max_objects):
+        self.stack = []
+        self.seen = set()
+        self.exclude = exclude
+        self.max_objects = max_objects
+        self.size = 0
+        self.objects = 0
+        self.truncated = False
+        self._visit(root)
+
+    def _visit(self, obj):
+        self.seen.add(id(obj))
+        self.objects += 1
+        self.size += sys.getsizeof(obj, 0)
+        if type(obj) in _LEAVES:
+            return
+        stack = self.stack
+        if isinstance(obj, dict):
+            stack.extend(obj)
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        elif _is_project_object(obj):
+            attrs = getattr(obj, '__dict__', None)
+            if attrs is not None:
+                stack.append(attrs)
+            for name in _slot_names(type(obj)):
+                value = getattr(obj, name, _MISSING)
+                if value is not _MISSING:
+                    stack.append(value)
+
+    def step(self, budget):
+        stack = self.stack
+        seen = self.seen
+        exclude = self.exclude
+        visit = self._visit
+        while stack and budget > 0:
+            obj = stack.pop()
+            oid = id(obj)
+            if oid in seen or oid in exclude:
+                continue
+            budget -= 1
+            visit(obj)
+            if self.objects >= self.max_objects:
+                self.truncated = bool(stack)
+                stack.clear()
+        return not stack
+
+
+def deep_size(obj, exclude=(), max_objects=_MAX_OBJECTS):
+    """``(bytes, objects, truncated)`` for ``obj``'s object graph, measured in one go."""
+    sizer = _Sizer(obj, frozenset(exclude), max_objects)
+    sizer.step(max_objects)
+    return sizer.size, sizer.objects, sizer.truncated
+
+
+class Container:
+    __slots__ = ('name', 'owner', 'target', 'max_bytes', 'max_items', 'history', 'over_budget', 'growing')
+
+    def __init__(self, name, owner, target, max_bytes=None, max_items=None, history=_HISTORY):
+        self.name = name
+        self.owner = owner
+        self.target = target
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.history = deque(maxlen=history)
+        self.over_budget = False
+        self.growing = False
+
+    def resolve(self):
+        target = self.target
+        if callable(target) and not isinstance(target, _CONTAINER_TYPES) and not _is_project_object(target):
+            target = target()
+        return target
+
+    def growth_per_hour(self):
+        """Bytes per hour across the recorded history, or None with fewer than two samples."""
+        history = self.history
+        if len(history) < 2:
+            return None
+        (t0, b0, _), (t1, b1, _) = history[0], history[-1]
+        return (b1 - b0) / (t1 - t0) * 3600 if t1 > t0 else 0.0
+
+
+class MemoryAccountant:
+    """Attributes retained memory to cogs and watches it over time."""
+
+    def __init__(self, bot, budgets=None, default_budget=_DEFAULT_BUDGET, interval=_INTERVAL,
+                 history=_HISTORY, max_objects=_MAX_OBJECTS, tracemalloc_frames=0):
+        self.bot = bot
+        self.budgets = dict(budgets or {})
+        self.default_budget = default_budget
+        self.interval = interval
+        self.history = history
+        self.max_objects = max_objects
+        self.tracemalloc_frames = tracemalloc_frames
+        self._registered = {}
+        self._containers = {}
+        self._job = None
+        self._lock = asyncio.Lock()
+        self.rows = []
+        self.allocations = {}
+        self.taken_at = None
+        self.duration = 0.0
+        self.snapshots = 0
+        self.warnings = 0
+
+    # ---- Registration ----
+    def register(self, owner, name, target, max_bytes=None, max_items=None):
+        """Track ``target`` (an object or a zero-argument callable) as ``owner.name``."""
+        full_name = f'{owner}.{name}'
+        if max_bytes is not None or max_items is not None:
+            self.budgets[full_name] = (max_bytes, max_items)
+        self._registered[full_name] = (owner, target)
+
+    def unregister(self, owner, name):
+        self._registered.pop(f'{owner}.{name}', None)
+
+    def _discover(self):
+        """``{name: (owner, target)}`` for every registered and discovered container."""
+        found = dict(self._registered)
+        shared = self._shared_ids()
+        for cog_name, cog in self.bot.cogs.items():
+            names = list(getattr(cog, '__dict__', {}))
+            names.extend(n for n in _slot_names(type(cog)) if n not in names)
+            for attr in names:
+                if attr.startswith('__'):
+                    continue
+                value = getattr(cog, attr, None)
+                if id(value) in shared:
+                    continue
+                if isinstance(value, _CONTAINER_TYPES) or _is_project_object(value):
+                    found[f'{cog_name}.{attr}'] = (cog_name, value)
+            extra = getattr(cog, 'memory_containers', None)
+            if callable(extra):
+                try:
+                    for name, target in extra().items():
+                        found[f'{cog_name}.{name}'] = (cog_name, target)
+                except Exception as e:
+                    log.warning("%s.memory_containers() failed: %s", cog_name, e)
+        return found
+
+    def _shared_ids(self):
+        """Objects owned by the bot itself; never attributed to (or entered from) a cog."""
+        bot = self.bot
+        ids = {id(bot), id(self)}
+        ids.update(id(cog) for cog in bot.cogs.values())
+        ids.update(id(value) for value in getattr(bot, '__dict__', {}).values()
+                   if not isinstance(value, (str, int, float, bool, type(None))))
+        return ids
+
+    # ---- Snapshots ----
+    async def snapshot(self):
+        """Measure every container (yielding to the loop between chunks) and check budgets."""
+        async with self._lock:
+            start = time.perf_counter()
+            now = time.monotonic()
+            found = self._discover()
+            exclude = frozenset(self._shared_ids())
+            containers = self._containers
+            for name in [n for n in containers if n not in found]:
+                del containers[name]
+
+            rows = []
+            for name, (owner, target) in found.items():
+                container = containers.get(name)
+                if container is None:
+                    max_bytes, max_items = self.budgets.get(name, (self.default_budget, None))
+                    container = containers[name] = Container(name, owner, target, max_bytes, max_items, self.history)
+                else:
+                    # Same logical container even if the attribute was reassigned.
+                    container.target = target
+                try:
+                    obj = container.resolve()
+                except Exception as e:
+                    log.warning("Could not resolve memory container %s: %s", name, e)
+                    continue
+                sizer = _Sizer(obj, exclude, self.max_objects)
+                while not sizer.step(_CHUNK):
+                    await asyncio.sleep(0)
+                try:
+                    items = len(obj)
+                except TypeError:
+                    items = None
+                container.history.append((now, sizer.size, items))
+                rows.append(self._row(container, sizer, items))
+                self._check(container, sizer.size, items)
+                await asyncio.sleep(0)
+
+            if tracemalloc.is_tracing():
+                self.allocations = await asyncio.to_thread(self._allocations_by_module, self.allocations)
+            rows.sort(key=lambda row: row['bytes'], reverse=True)
+            self.rows = rows
+            self.taken_at = time.time()
+            self.duration = time.perf_counter() - start
+            self.snapshots += 1
+            return rows
+
+    @staticmethod
+    def _row(container, sizer, items):
+        return {
+            'name': container.name, 'owner': container.owner, 'bytes': sizer.size, 'items': items,
+            'objects': sizer.objects, 'truncated': sizer.truncated, 'growth_per_hour': container.growth_per_hour(),
+            'max_bytes': container.max_bytes, 'max_items': container.max_items, 'over_budget': container.over_budget,
+            'growing': container.growing,
+        }
+
+    def _check(self, container, size, items):
+        over = ((container.max_bytes is not None and size > container.max_bytes)
+                or (container.max_items is not None and items is not None and items > container.max_items))
+        if over and not container.over_budget:
+            self.warnings += 1
+            log.warning("Memory budget exceeded: %s holds %s in %s items (budget %s / %s items)",
+                        container.name, format_bytes(size), items, format_bytes(container.max_bytes),
+                        container.max_items, extra={'container': container.name, 'bytes': size})
+        container.over_budget = over
+
+        history = container.history
+        growing = len(history) == history.maxlen and all(b[1] > a[1] for a, b in zip(history, list(history)[1:]))
+        if growing and not container.growing:
+            self.warnings += 1
+            log.warning("Possible leak: %s grew in each of the last %d snapshots (%s/h, now %s)",
+                        container.name, len(history), format_bytes(container.growth_per_hour()), format_bytes(size),
+                        extra={'container': container.name, 'bytes': size})
+        container.growing = growing
+
+    def _allocations_by_module(self, previous):
+        """Live traced bytes per cog module, with the change since the last snapshot."""
+        snapshot = tracemalloc.take_snapshot()
+        totals = {}
+        for stat in snapshot.statistics('filename'):
+            match = _COG_FILE.search(stat.traceback[0].filename)
+            if match is None:
+                continue
+            module = _SEPARATORS.sub('.', match.group(1)) + '.' + match.group(2)
+            size, count = totals.get(module, (0, 0))
+            totals[module] = (size + stat.size, count + stat.count)
+        return {module: {'bytes': size, 'blocks': count, 'delta': size - previous.get(module, {}).get('bytes', size)}
+                for module, (size, count) in totals.items()}
+
+    # ---- Reporting ----
+    def by_cog(self):
+        """``{owner: bytes}`` from the last snapshot."""
+        totals = {}
+        for row in self.rows:
+            totals[row['owner']] = totals.get(row['owner'], 0) + row['bytes']
+        return totals
+
+    def container_bytes(self):
+        return {row['name']: row['bytes'] for row in self.rows}
+
+    def allocations_by_cog(self):
+        """Tracemalloc totals keyed by cog name (modules that define no cog keep their module name)."""
+        owners = {type(cog).__module__: name for name, cog in self.bot.cogs.items()}
+        return {owners.get(module, module): stats for module, stats in self.allocations.items()}
+
+    # ---- Lifecycle ----
+    def start(self):
+        if self.tracemalloc_frames and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+        if self._job is None and self.interval:
+            self._job = self.bot.scheduler.every('memory.snapshot', self.interval, self.snapshot, align=60)
+
+    def stop(self):
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+        if self.tracemalloc_frames and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def process_rss():
+    """Resident set size of this process in bytes, or None where /proc is unavailable."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def format_bytes(n):
+    if n is None:
+        return 'n/a'
+    sign = '-' if n < 0 else ''
+    n = abs(n)
+    for unit in ('B', 'KB', 'MB'):
+        if n < 1024:
+            return f'{sign}{n:.0f}{unit}' if unit == 'B' else f'{sign}{n:.1f}{unit}'
+        n /= 1024
+    return f'{sign}{n:.2f}GB'
@@ -0,0 +1,254 @@
+import asyncio
+import bisect
+import time
+
+from aiohttp import web
+
+# Upper bounds in seconds; the implicit last bucket is +Inf.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUANTILES = (0.5, 0.95, 0.99)
+_LAG_INTERVAL = 1.0
+_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``observe`` is a bisect plus two adds."""
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile by interpolating inside the matching bucket."""
+        total = self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        bounds = self.bounds
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = bounds[i - 1] if i > 0 else 0.0
+                if i == len(bounds):
+                    return lower
+                return lower + (bounds[i] - lower) * ((rank - seen) / n)
+            seen += n
+        return bounds[-1]
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """Process-local metrics for commands, listeners, loop lag and feature gauges.
+
+    ``install`` wraps ``Bot.invoke`` (commands) and the client's event runner
+    (every listener and ``@bot.event`` handler) so no cog needs to opt in.
+    Gauges are callables registered by name and evaluated only at scrape time.
+    """
+    __slots__ = ('commands', 'events', 'command_errors', 'event_errors', 'loop_lag', 'lag_last',
+                 'lag_max', '_gauges', '_histograms', '_routes', '_lag_task', '_runner', 'started_at')
+
+    def __init__(self):
+        self.commands = {}
+        self.events = {}
+        self.command_errors = {}
+        self.event_errors = {}
+        self.loop_lag = Histogram(LAG_BUCKETS)
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self._gauges = {}
+        self._histograms = {}
+        self._routes = []
+        self._lag_task = None
+        self._runner = None
+        self.started_at = time.time()
+
+    def install(self, bot):
+        perf = time.perf_counter
+        commands = self.commands
+        events = self.events
+        invoke = bot.invoke
+        run_event = bot._run_event
+        on_error = bot.on_error
+
+        async def timed_invoke(ctx):
+            start = perf()
+            try:
+                await invoke(ctx)
+            finally:
+                command = ctx.command
+                if command is not None:
+                    name = command.qualified_name
+                    hist = commands.get(name)
+                    if hist is None:
+                        hist = commands[name] = Histogram()
+                    hist.observe(perf() - start)
+
+        async def timed_run_event(coro, event_name, *args, **kwargs):
+            start = perf()
+            try:
+                await run_event(coro, event_name, *args, **kwargs)
+            finally:
+                hist = events.get(event_name)
+                if hist is None:
+                    hist = events[event_name] = Histogram()
+                hist.observe(perf() - start)
+
+        async def counted_on_error(event_method, *args, **kwargs):
+            errors = self.event_errors
+            errors[event_method] = errors.get(event_method, 0) + 1
+            await on_error(event_method, *args, **kwargs)
+
+        bot.invoke = timed_invoke
+        bot._run_event = timed_run_event
+        bot.on_error = counted_on_error
+        bot.errors.observe(self._count_command_error)
+
+    def _count_command_error(self, ctx, error):
+        command = ctx.command.qualified_name if ctx.command is not None else ''
+        key = (command, type(error).__name__)
+        errors = self.command_errors
+        errors[key] = errors.get(key, 0) + 1
+
+    def gauge(self, name, func, help_text=''):
+        """Register ``func`` (returning a number or ``{label_value: number}``) as a gauge."""
+        self._gauges[name] = (func, help_text, 'gauge')
+
+    def counter(self, name, func, help_text=''):
+        """Like ``gauge``, for values that only go up; ``name`` should end in ``_total``."""
+        self._gauges[name] = (func, help_text, 'counter')
+
+    def histogram(self, name, histograms, label_name, help_text=''):
+        """Register a live ``{label_value: Histogram}`` dict owned by a feature."""
+        self._histograms[name] = (histograms, label_name, help_text)
+
+    def start_lag_monitor(self, interval=_LAG_INTERVAL):
+        # Its own sleep, not a scheduler job: how late that sleep wakes is the lag being
+        # measured, and a block anywhere in the interval shows up in the next sample.
+        if self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._sample_lag(interval))
+
+    async def _sample_lag(self, interval):
+        perf = time.perf_counter
+        sleep = asyncio.sleep
+        hist = self.loop_lag
+        while True:
+            expected = perf() + interval
+            await sleep(interval)
+            lag = perf() - expected
+            if lag < 0.0:
+                lag = 0.0
+            hist.observe(lag)
+            self.lag_last = lag
+            if lag > self.lag_max:
+                self.lag_max = lag
+
+    def command_summary(self):
+        """``{command: (count, p50, p95, p99)}`` in seconds."""
+        return {name: (h.count,) + tuple(h.quantile(q) for q in QUANTILES)
+                for name, h in self.commands.items()}
+
+    def render(self):
+        lines = []
+        add = lines.append
+        self._render_histograms(lines, 'jackybot_command_latency_seconds', 'command',
+                                self.commands, 'Command dispatch latency.')
+        self._render_histograms(lines, 'jackybot_event_latency_seconds', 'event',
+                                self.events, 'Listener dispatch latency.')
+
+        add('# HELP jackybot_command_errors_total Command errors by command and type.')
+        add('# TYPE jackybot_command_errors_total counter')
+        for (command, error), count in self.command_errors.items():
+            add(f'jackybot_command_errors_total{{command="{_label(command)}",error="{_label(error)}"}} {count}')
+        add('# HELP jackybot_event_errors_total Unhandled listener exceptions by event.')
+        add('# TYPE jackybot_event_errors_total counter')
+        for event, count in self.event_errors.items():
+            add(f'jackybot_event_errors_total{{event="{_label(event)}"}} {count}')
+
+        self._render_histograms(lines, 'jackybot_loop_lag_seconds', None,
+                                {None: self.loop_lag}, f'Event loop lag sampled every {_LAG_INTERVAL:g}s.')
+        add('# TYPE jackybot_loop_lag_max_seconds gauge')
+        add(f'jackybot_loop_lag_max_seconds {self.lag_max}')
+        add('# TYPE jackybot_uptime_seconds gauge')
+        add(f'jackybot_uptime_seconds {time.time() - self.started_at:.0f}')
+
+        for name, (histograms, label_name, help_text) in self._histograms.items():
+            self._render_histograms(lines, name, label_name, histograms, help_text)
+
+        for name, (func, help_text, kind) in self._gauges.items():
+            try:
+                value = func()
+            except Exception:
+                continue
+            if help_text:
+                add(f'# HELP {name} {help_text}')
+            add(f'# TYPE {name} {kind}')
+            if isinstance(value, dict):
+                for label, v in value.items():
+                    add(f'{name}{{name="{_label(label)}"}} {v}')
+            else:
+                add(f'{name} {value}')
+        add('')
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _render_histograms(lines, metric, label_name, histograms, help_text):
+        add = lines.append
+        add(f'# HELP {metric} {help_text}')
+        add(f'# TYPE {metric} histogram')
+        for key, hist in histograms.items():
+            base = f'{label_name}="{_label(key)}",' if label_name else ''
+            cumulative = 0
+            for bound, n in zip(hist.bounds, hist.counts):
+                cumulative += n
+                add(f'{metric}_bucket{{{base}le="{bound}"}} {cumulative}')
+            add(f'{metric}_bucket{{{base}le="+Inf"}} {hist.count}')
+            labels = f'{{{base[:-1]}}}' if base else ''
+            add(f'{metric}_sum{labels} {hist.sum}')
+            add(f'{metric}_count{labels} {hist.count}')
+        if metric.endswith('_seconds'):
+            quantile_metric = f'{metric[:-len("_seconds")]}_quantile_seconds'
+        else:
+            quantile_metric = f'{metric}_quantile'
+        add(f'# TYPE {quantile_metric} gauge')
+        for key, hist in histograms.items():
+            base = f'{label_name}="{_label(key)}",' if label_name else ''
+            for q in QUANTILES:
+                add(f'{quantile_metric}{{{base}quantile="{q}"}} {hist.quantile(q):.6f}')
+
+    def route(self, path, handler):
+        """Serve ``handler`` for GET ``path`` alongside ``/metrics``; call before ``start_server``."""
+        self._routes.append((path, handler))
+
+    async def start_server(self, host, port):
+        """Serve ``/metrics`` in Prometheus text format; bind to localhost only."""
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        for path, handler in self._routes:
+            app.router.add_get(path, handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        self._runner = runner
+
+    async def _handle(self, request):
+        return web.Response(body=self.render().encode('utf-8'), headers={'Content-Type': _CONTENT_TYPE})
+
+    async def close(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,253 @@
+"""Admission control for heavy work: reject or degrade it by priority under pressure.
+
+A scheduler job reads the event loop lag ``Metrics`` last sampled and
+measures process CPU (all cores) and RSS once per interval. Each signal is divided by its limit and the worst one, smoothed,
+is the *pressure*. Pressure sets a level, with hysteresis so the level does
+not flap:
+
+    normal  < 0.7 <=  elevated  < 1.0 <=  overloaded
+
+Each subsystem (Groq chat, model generation, ffmpeg renders, ...) is
+registered with a priority, a concurrency and a queue bound:
+
+- CRITICAL and INTERACTIVE work is only limited by its own queue bound, and
+  INTERACTIVE queues are halved while overloaded.
+- HEAVY work is degraded while elevated: ``scale`` shrinks generation lengths
+  and step counts. It is rejected while overloaded.
+- COSMETIC work (embed refreshes) is skipped unless the level is normal.
+
+Rejected work raises ``Overloaded`` at once, carrying a retry estimate made
+from the subsystem's backlog and its average service time. ``install``
+answers commands that fail that way with "busy, try again in N s" rather
+than letting the user wait on a timeout, so commands let ``Overloaded``
+propagate; only work outside a command (Groq chat replies) catches it.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+
+from discord.ext import commands
+
+from cogs.utils.memory import process_rss
+
+CRITICAL, INTERACTIVE, HEAVY, COSMETIC = range(4)
+NORMAL, ELEVATED, OVERLOADED = range(3)
+LEVELS = ('normal', 'elevated', 'overloaded')
+_THRESHOLDS = (0.0, 0.7, 1.0)
+# A level is left once pressure falls below this share of its threshold.
+_RECOVERY = 0.8
+_SERVICE_SMOOTHING = 0.2
+
+log = logging.getLogger('jackybot.overload')
+
+
+class Overloaded(commands.CommandError):
+    def __init__(self, subsystem, retry_after, reason):
+        self.subsystem = subsystem
+        self.retry_after = retry_after
+        self.reason = reason
+        super().__init__(f'{subsystem} rejected work ({reason}); retry in {retry_after:.0f}s')
+
+    def user_message(self):
+        return f"⏳ I'm too busy for that right now ({self.reason}). Try again in {math.ceil(self.retry_after)}s."
+
+
+class Subsystem:
+    __slots__ = ('name', 'priority', 'concurrency', 'max_queue', 'depth', 'service_time',
+                 'active', 'waiting', 'admitted', 'rejected', '_semaphore')
+
+    def __init__(self, name, priority, concurrency, max_queue, depth, service_time):
+        self.name = name
+        self.priority = priority
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.depth = depth
+        self.service_time = service_time
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def queued(self):
+        return self.depth() if self.depth is not None else self.waiting
+
+
+class OverloadController:
+    """Process-wide pressure level plus per-subsystem admission."""
+
+    def __init__(self, lag_limit=0.25, cpu_limit=0.9, rss_limit=None, interval=1.0,
+                 smoothing=0.3, degrade=0.5, retry_after=15.0):
+        self.lag_limit = lag_limit
+        self.cpu_limit = cpu_limit
+        self.rss_limit = rss_limit
+        self.interval = interval
+        self.smoothing = smoothing
+        self.degrade = degrade
+        self.retry_after = retry_after
+        self.subsystems = {}
+        self.signals = {'lag': 0.0, 'cpu': 0.0, 'rss': 0.0}
+        self.pressure = 0.0
+        self.level = NORMAL
+        self.deferred = 0
+        self._job = None
+        self._metrics = None
+        self._last = None
+        self._cpus = os.cpu_count() or 1
+
+    def register(self, name, priority=HEAVY, concurrency=1, max_queue=4, depth=None, service_time=5.0):
+        """Declare a subsystem. ``depth()`` reports an external queue; otherwise ``slot`` counts waiters.
+
+        ``max_queue=None`` never rejects for backlog.
+        """
+        self.subsystems[name] = Subsystem(name, priority, concurrency, max_queue, depth, service_time)
+
+    # ---- Pressure ----
+    def update(self, lag=0.0, cpu=0.0, rss=None):
+        """Fold one sample into the pressure and return the resulting level."""
+        signals = self.signals
+        signals['lag'] = lag / self.lag_limit
+        signals['cpu'] = cpu / self.cpu_limit if self.cpu_limit else 0.0
+        signals['rss'] = rss / self.rss_limit if rss is not None and self.rss_limit else 0.0
+        self.pressure += self.smoothing * (max(signals.values()) - self.pressure)
+
+        level = self.level
+        while level < OVERLOADED and self.pressure >= _THRESHOLDS[level + 1]:
+            level += 1
+        while level > NORMAL and self.pressure < _THRESHOLDS[level] * _RECOVERY:
+            level -= 1
+        if level != self.level:
+            worst = max(signals, key=signals.get)
+            log_fn = log.warning if level > self.level else log.info
+            log_fn('Load level %s -> %s (pressure %.2f, worst signal %s)',
+                   LEVELS[self.level], LEVELS[level], self.pressure, worst)
+            self.level = level
+        return level
+
+    async def sample(self):
+        """Fold the latest loop lag and the CPU used since the previous sample into the pressure."""
+        now, cpu = time.perf_counter(), sum(os.times()[:2])
+        last, self._last = self._last, (now, cpu)
+        if last is None:
+            return
+        usage = (cpu - last[1]) / ((now - last[0]) * self._cpus)
+        lag = self._metrics.lag_last if self._metrics is not None else 0.0
+        self.update(lag, usage, process_rss() if self.rss_limit else None)
+
+    def start(self, scheduler, metrics):
+        """Sample every ``interval`` seconds on ``scheduler``; the loop lag comes from ``metrics``."""
+        if self._job is None:
+            self._metrics = metrics
+            self._last = None
+            self._job = scheduler.every('overload.sample', self.interval, self.sample, delay=0)
+
+    def stop(self):
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+
+    # ---- Admission ----
+    def allows(self, priority):
+        """Whether work of ``priority`` should run at the current level."""
+        if priority == COSMETIC:
+            allowed = self.level == NORMAL
+            if not allowed:
+                self.deferred += 1
+            return allowed
+        if priority == HEAVY:
+            return self.level < OVERLOADED
+        return True
+
+    def scale(self, value, minimum=1):
+        """``value`` at normal load, shrunk by the degrade factor otherwise."""
+        if self.level == NORMAL:
+            return value
+        return max(minimum, int(value * self.degrade))
+
+    def admit(self, name):
+        """Raise ``Overloaded`` unless subsystem ``name`` can take one more piece of work."""
+        sub = self.subsystems[name]
+        if not self.allows(sub.priority):
+            sub.rejected += 1
+            raise Overloaded(name, self.retry_after, 'the bot is overloaded')
+        limit = sub.max_queue
+        if limit is not None:
+            if sub.priority == INTERACTIVE and self.level == OVERLOADED:
+                limit //= 2
+            queued = sub.queued()
+            if sub.active + queued >= sub.concurrency + limit:
+                sub.rejected += 1
+                retry = max(1.0, sub.service_time * (queued + 1) / sub.concurrency)
+                raise Overloaded(name, retry, 'the queue is full')
+        sub.admitted += 1
+
+    def slot(self, name, on_wait=None):
+        """``async with`` admission plus a concurrency slot; timings feed the retry estimate.
+
+        ``on_wait()`` is awaited once admitted work has to queue for a slot.
+        """
+        return _Slot(self, self.subsystems[name], on_wait)
+
+    def stats(self):
+        return {
+            'level': LEVELS[self.level],
+            'pressure': self.pressure,
+            'signals': dict(self.signals),
+            'deferred': self.deferred,
+            'subsystems': {name: {'active': sub.active, 'queued': sub.queued(), 'admitted': sub.admitted,
+                                  'rejected': sub.rejected, 'service_time': sub.service_time}
+                           for name, sub in self.subsystems.items()},
+        }
+
+    def queue_depths(self):
+        return {name: sub.active + sub.queued() for name, sub in self.subsystems.items()}
+
+    def rejections(self):
+        return {name: sub.rejected for name, sub in self.subsystems.items()}
+
+    # ---- Commands ----
+    def install(self, bot):
+        bot.errors.handle(self._on_command_error)
+
+    async def _on_command_error(self, ctx, error):
+        error = getattr(error, 'original', error)
+        if not isinstance(error, Overloaded):
+            return False
+        try:
+            await ctx.reply(error.user_message())
+        except Exception:
+            pass
+        return True
+
+
+class _Slot:
+    __slots__ = ('controller', 'sub', 'on_wait', 'start')
+
+    def __init__(self, controller, sub, on_wait):
+        self.controller = controller
+        self.sub = sub
+        self.on_wait = on_wait
+        self.start = 0.0
+
+    async def __aenter__(self):
+        sub = self.sub
+        self.controller.admit(sub.name)
+        sub.waiting += 1
+        try:
+            if self.on_wait is not None and sub._semaphore.locked():
+                await self.on_wait()
+            await sub._semaphore.acquire()
+        finally:
+            sub.waiting -= 1
+        sub.active += 1
+        self.start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        sub = self.sub
+        sub.active -= 1
+        sub._semaphore.release()
+        sub.service_time += _SERVICE_SMOOTHING * (time.perf_counter() - self.start - sub.service_time)
+        return False
@@ -0,0 +1,197 @@
+"""Raw reaction dispatch that doesn't depend on the message cache.
+
+``on_reaction_add`` only fires for messages still in discord.py's message
+cache (``max_messages=50`` here), so reactions on older messages were lost.
+``ReactionDispatcher`` listens to the raw events instead and routes them to
+subscriptions filtered by emoji and a payload predicate.
+
+A subscription either fires on every matching reaction (``threshold=None``)
+or once a message's count for that emoji reaches ``threshold``. Counts live
+in a bounded LRU keyed by ``(message_id, emoji)``. The message itself is
+fetched only when a threshold subscription fires, and concurrent fetches of
+the same message are shared.
+"""
+import asyncio
+from collections import OrderedDict
+
+import discord
+
+_MAX_COUNTERS = 20_000
+
+
+class ReactionEvent:
+    __slots__ = ('payload', 'emoji', 'added', 'count', 'message')
+
+    def __init__(self, payload, emoji, added, count, message=None):
+        self.payload = payload
+        self.emoji = emoji
+        self.added = added
+        self.count = count
+        self.message = message
+
+    @property
+    def message_id(self):
+        return self.payload.message_id
+
+    @property
+    def channel_id(self):
+        return self.payload.channel_id
+
+    @property
+    def guild_id(self):
+        return self.payload.guild_id
+
+    @property
+    def user_id(self):
+        return self.payload.user_id
+
+    @property
+    def member(self):
+        """The reacting member (guild reaction adds only)."""
+        return self.payload.member
+
+
+class Subscription:
+    __slots__ = ('handler', 'emoji', 'check', 'threshold', 'removes', 'ignore_bots')
+
+    def __init__(self, handler, emoji, check, threshold, removes, ignore_bots):
+        self.handler = handler
+        self.emoji = emoji
+        self.check = check
+        self.threshold = threshold
+        self.removes = removes
+        self.ignore_bots = ignore_bots
+
+    def matches(self, emoji, payload):
+        if self.emoji is not None and emoji not in self.emoji:
+            return False
+        return self.check is None or self.check(payload)
+
+
+class ReactionDispatcher:
+    """Routes raw reaction events to cog subscriptions."""
+
+    def __init__(self, bot, max_counters=_MAX_COUNTERS):
+        self.bot = bot
+        self.max_counters = max_counters
+        self._subs = []
+        self._counts = OrderedDict()
+        self._fetching = {}
+        self.events = 0
+        self.dispatched = 0
+        self.fetches = 0
+        self.evictions = 0
+
+    def install(self):
+        self.bot.add_listener(self.on_raw_reaction_add)
+        self.bot.add_listener(self.on_raw_reaction_remove)
+
+    def subscribe(self, handler, *, emoji=None, check=None, threshold=None, removes=False, ignore_bots=True):
+        """Call ``handler(ReactionEvent)`` for matching reactions.
+
+        ``emoji`` is a string or an iterable of strings (``str(payload.emoji)``);
+        ``check(payload)`` filters on message, channel or guild IDs. With a
+        ``threshold`` the handler runs once the count reaches it and
+        ``event.message`` is the fetched message; otherwise it runs for every
+        add (and every remove if ``removes``) without fetching anything.
+        """
+        if isinstance(emoji, str):
+            emoji = frozenset((emoji,))
+        elif emoji is not None:
+            emoji = frozenset(emoji)
+        sub = Subscription(handler, emoji, check, threshold, removes, ignore_bots)
+        self._subs.append(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        try:
+            self._subs.remove(sub)
+        except ValueError:
+            pass
+
+    def _is_bot(self, payload):
+        bot_user = self.bot.user
+        if bot_user is not None and payload.user_id == bot_user.id:
+            return True
+        member = payload.member
+        if member is not None:
+            return member.bot
+        user = self.bot.get_user(payload.user_id)
+        return user is not None and user.bot
+
+    def _bump(self, key, delta):
+        counts = self._counts
+        count = max(0, counts.pop(key, 0) + delta)
+        if count:
+            counts[key] = count
+            if len(counts) > self.max_counters:
+                counts.popitem(last=False)
+                self.evictions += 1
+        return count
+
+    async def on_raw_reaction_add(self, payload):
+        await self._dispatch(payload, True)
+
+    async def on_raw_reaction_remove(self, payload):
+        await self._dispatch(payload, False)
+
+    async def _dispatch(self, payload, added):
+        self.events += 1
+        emoji = str(payload.emoji)
+        subs = [s for s in self._subs if s.matches(emoji, payload)]
+        if not subs:
+            return
+        is_bot = self._is_bot(payload)
+        count = None
+        if any(s.threshold is not None for s in subs) and not is_bot:
+            count = self._bump((payload.message_id, emoji), 1 if added else -1)
+
+        for sub in subs:
+            if sub.ignore_bots and is_bot:
+                continue
+            if sub.threshold is None:
+                if added or sub.removes:
+                    await self._call(sub, ReactionEvent(payload, emoji, added, count))
+            elif added and count == sub.threshold:
+                message = await self.fetch_message(payload.channel_id, payload.message_id)
+                if message is not None:
+                    await self._call(sub, ReactionEvent(payload, emoji, added, count, message))
+
+    async def _call(self, sub, event):
+        self.dispatched += 1
+        try:
+            await sub.handler(event)
+        except Exception as e:
+            print(f"Reaction handler {getattr(sub.handler, '__qualname__', sub.handler)} failed: {e}")
+
+    async def fetch_message(self, channel_id, message_id):
+        """Return the message from the cache, or fetch it (once, however many callers)."""
+        for message in self.bot.cached_messages:
+            if message.id == message_id:
+                return message
+        pending = self._fetching.get(message_id)
+        if pending is None:
+            pending = self._fetching[message_id] = asyncio.ensure_future(self._fetch(channel_id, message_id))
+            pending.add_done_callback(lambda _: self._fetching.pop(message_id, None))
+        return await asyncio.shield(pending)
+
+    async def _fetch(self, channel_id, message_id):
+        self.fetches += 1
+        try:
+            channel = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id)
+            return await channel.fetch_message(message_id)
+        except (discord.NotFound, discord.Forbidden):
+            return None
+        except discord.HTTPException as e:
+            print(f"Could not fetch message {message_id}: {e}")
+            return None
+
+    def stats(self):
+        return {
+            'subscriptions': len(self._subs),
+            'counters': len(self._counts),
+            'events': self.events,
+            'dispatched': self.dispatched,
+            'fetches': self.fetches,
+            'evictions': self.evictions,
+        }
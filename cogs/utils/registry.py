@@ -0,0 +1,336 @@
+"""One precomputed view of the bot's commands for help, suggestions and the dashboard.
+
+The help cog kept a hand-written command list, GroqChat matched phrases to
+names it then looked up with ``bot.get_command``, and the web dashboard only
+had cog_metadata.json. ``CommandRegistry`` builds a ``Snapshot`` from
+``bot.walk_commands()`` (lazy cog stubs included) the first time it is read
+after a change, and every reader shares it:
+
+- commands by lowercased name and alias, grouped into the dashboard's
+  categories from cog_metadata.json,
+- usage lines, one-line summaries and help embeds, rendered once,
+- a "did you mean" index of every name with one character deleted, plus its
+  prefixes, so a typo is matched with a handful of dict lookups however many
+  commands there are.
+
+A snapshot is replaced, never changed; callers must not mutate its embeds.
+discord.py has no cog or command events, so the bot is built from ``Bot``
+or ``AutoShardedBot`` here, which dispatch ``on_cog_add``/``on_cog_remove``
+and ``on_command_add``/``on_command_remove`` and count command changes in
+``command_version``. A snapshot older than that count is rebuilt on its next
+read, and the JSON export the dashboard reads is rewritten, debounced
+through the scheduler, after each command event.
+
+Unknown commands get a "did you mean" reply only for a close typo (one
+edit, two for longer names, none for very short ones), at most once a
+minute per channel, so the bot does not answer every ``!`` command meant
+for another bot in a shared guild.
+"""
+import logging
+import time
+
+import discord
+from discord.ext import commands
+
+from cogs.utils import schemas, serial
+
+_FEATURED = 'Recently Updated'
+_BOT_CATEGORY = 'General'
+_OTHER_CATEGORY = 'Other'
+_CATEGORY_ICONS = {
+    'General': '🔧', 'AI': '🤖', 'Music': '🎵', 'Text Channels': '📰', 'Fun': '🎮', 'Utilities': '🧰',
+    'Other': '📦',
+}
+_MIN_PREFIX = 3
+_MAX_SUGGESTION_DISTANCE = 2
+# Unknown-command replies: nothing under _REPLY_MIN_NAME characters, one edit
+# off up to _REPLY_LONG_NAME, two beyond.
+_REPLY_MIN_NAME = 4
+_REPLY_LONG_NAME = 6
+_REPLY_COOLDOWN = 60.0
+_EXPORT_DELAY = 5.0
+_EMBED_COLOR = 0x2b2d31
+_DESCRIPTION_LIMIT = 4096
+
+log = logging.getLogger('jackybot.registry')
+
+
+def _distance(a, b):
+    """Edit distance counting a swap of adjacent letters as one edit; names are short enough for the plain table."""
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class CommandInfo:
+    __slots__ = ('name', 'aliases', 'usage', 'summary', 'cog', 'module', 'category')
+
+    def __init__(self, name, aliases, usage, summary, cog, module, category):
+        self.name = name
+        self.aliases = aliases
+        self.usage = usage
+        self.summary = summary
+        self.cog = cog
+        self.module = module
+        self.category = category
+
+    def __repr__(self):
+        return f'<CommandInfo {self.name} ({self.category})>'
+
+    def to_dict(self):
+        return {'name': self.name, 'aliases': list(self.aliases), 'usage': self.usage,
+                'summary': self.summary, 'category': self.category}
+
+
+class Snapshot:
+    """Immutable command tables built by ``CommandRegistry``."""
+    __slots__ = ('version', 'commands', 'categories', 'icons', 'embeds', 'command_embeds',
+                 '_lookup', '_index')
+
+    def __init__(self, version, infos, icons):
+        self.version = version
+        self.commands = tuple(sorted(infos, key=lambda info: info.name))
+        lookup = {}
+        index = {}
+        categories = {}
+        for info in self.commands:
+            categories.setdefault(info.category, []).append(info)
+            for name in (info.name, *info.aliases):
+                key = name.lower()
+                lookup.setdefault(key, info)
+                for variant in _deletes(key) | {key[:n] for n in range(_MIN_PREFIX, len(key))}:
+                    index.setdefault(variant, set()).add(key)
+        self._lookup = lookup
+        self._index = {variant: tuple(sorted(keys)) for variant, keys in index.items()}
+        self.categories = {category: tuple(infos) for category, infos in sorted(categories.items())}
+        self.icons = {category: icons.get(category, '') for category in self.categories}
+        self.embeds = {category: self._render_category(category, infos, self.icons[category])
+                       for category, infos in self.categories.items()}
+        self.command_embeds = {info.name: self._render_command(info) for info in self.commands}
+
+    # ---- Lookups ----
+    def get(self, name):
+        """The command called ``name`` (or aliased to it), or None."""
+        return self._lookup.get(name.lower())
+
+    def suggest(self, name, limit=3):
+        """Commands whose name or alias is within two edits of ``name``, or starts with it."""
+        key = name.lower()
+        candidates = set()
+        index = self._index
+        for variant in (key, *_deletes(key)):
+            candidates.update(index.get(variant, ()))
+            if variant in self._lookup:
+                candidates.add(variant)
+        ranked = []
+        for candidate in candidates:
+            distance = _distance(key, candidate)
+            if distance <= _MAX_SUGGESTION_DISTANCE or (len(key) >= _MIN_PREFIX and candidate.startswith(key)):
+                ranked.append((distance, candidate))
+        ranked.sort()
+        found = []
+        for _, candidate in ranked:
+            info = self._lookup[candidate]
+            if info not in found:
+                found.append(info)
+                if len(found) == limit:
+                    break
+        return found
+
+    # ---- Rendering ----
+    @staticmethod
+    def _render_category(category, infos, icon):
+        lines = []
+        size = 0
+        for info in infos:
+            line = f"`{info.usage}`" + (f" — {info.summary}" if info.summary else "")
+            if size + len(line) + 1 > _DESCRIPTION_LIMIT - 32:
+                lines.append(f"…and {len(infos) - len(lines)} more")
+                break
+            lines.append(line)
+            size += len(line) + 1
+        embed = discord.Embed(title=f"{icon} {category} Commands".strip(), color=_EMBED_COLOR,
+                              description="\n".join(lines))
+        embed.set_footer(text="Navigate between categories using the dropdown menu")
+        return embed
+
+    @staticmethod
+    def _render_command(info):
+        embed = discord.Embed(title=f"`{info.usage}`", color=_EMBED_COLOR,
+                              description=info.summary or "No description yet.")
+        if info.aliases:
+            embed.add_field(name="Aliases", value=", ".join(f"`!{alias}`" for alias in info.aliases), inline=False)
+        embed.set_footer(text=f"Category: {info.category}")
+        return embed
+
+
+class CommandEventsMixin:
+    """Bot mixin: cog and command events, and a ``command_version`` bumped on every command change."""
+
+    command_version = 0
+
+    async def add_cog(self, cog, /, **kwargs):
+        await super().add_cog(cog, **kwargs)
+        self.dispatch('cog_add', cog)
+
+    async def remove_cog(self, name, /, **kwargs):
+        cog = await super().remove_cog(name, **kwargs)
+        if cog is not None:
+            self.dispatch('cog_remove', cog)
+        return cog
+
+    def add_command(self, command, /):
+        super().add_command(command)
+        self.command_version += 1
+        self.dispatch('command_add', command)
+
+    def remove_command(self, name, /):
+        command = super().remove_command(name)
+        if command is not None:
+            self.command_version += 1
+            self.dispatch('command_remove', command)
+        return command
+
+
+class Bot(CommandEventsMixin, commands.Bot):
+    pass
+
+
+class AutoShardedBot(CommandEventsMixin, commands.AutoShardedBot):
+    pass
+
+
+class CommandRegistry:
+    """Builds and caches the command ``Snapshot``; rebuilt lazily after cogs or commands change."""
+
+    def __init__(self, bot, metadata_path='cogs/cog_metadata.json', export_path=None):
+        self.bot = bot
+        self.metadata_path = metadata_path
+        self.export_path = export_path
+        self.builds = 0
+        self._snapshot = None
+        self._version = None
+        self._modules = None
+        self._installed = False
+        self._replied = {}
+
+    @property
+    def snapshot(self):
+        snapshot = self._snapshot
+        version = self.bot.command_version
+        if snapshot is None or self._version != version:
+            snapshot = self._snapshot = self._build()
+            self._version = version
+        return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+        if self._installed and self.export_path:
+            self.bot.scheduler.call_later('registry.export', _EXPORT_DELAY, self.export)
+
+    # ---- Building ----
+    def _cog_modules(self):
+        """Module name -> (category, display name) from cog_metadata.json, read once."""
+        if self._modules is None:
+            modules = {}
+            try:
+                entries = serial.read(self.metadata_path, schemas.COG_METADATA, default=list)
+            except Exception:
+                log.exception('Could not read %s', self.metadata_path)
+                entries = []
+            for entry in entries:
+                category = entry.get('category')
+                if category and category != _FEATURED:
+                    modules.setdefault(entry['name'], category)
+            self._modules = modules
+        return self._modules
+
+    def _build(self):
+        bot = self.bot
+        modules = self._cog_modules()
+        lazy = getattr(bot, 'lazy_cogs', None)
+        prefix = bot.command_prefix if isinstance(bot.command_prefix, str) else '!'
+        infos = []
+        for command in bot.walk_commands():
+            if command.hidden:
+                continue
+            module = lazy.stub_module(command) if lazy is not None else None
+            if module is None:
+                module = command.module.rpartition('.')[2] if command.module.startswith('cogs.') else None
+            if module is None:
+                category = _BOT_CATEGORY
+            else:
+                category = modules.get(module, _OTHER_CATEGORY)
+            signature = command.signature
+            usage = f"{prefix}{command.qualified_name}" + (f" {signature}" if signature else "")
+            infos.append(CommandInfo(command.qualified_name, tuple(command.aliases), usage, command.short_doc,
+                                     command.cog_name, module, category))
+        self.builds += 1
+        return Snapshot(self.builds, infos, _CATEGORY_ICONS)
+
+    async def export(self):
+        """Write the snapshot for the web dashboard: cog module -> its commands."""
+        by_module = {}
+        for info in self.snapshot.commands:
+            by_module.setdefault(info.module or 'bot', []).append(info.to_dict())
+        await serial.save(self.export_path, by_module)
+
+    # ---- Hooks ----
+    def install(self):
+        """Export after command changes and answer close typos of command names."""
+        if not isinstance(self.bot, CommandEventsMixin):
+            raise TypeError('CommandRegistry needs a bot built from cogs.utils.registry.Bot or AutoShardedBot')
+        bot = self.bot
+        bot.add_listener(self._on_command_change, 'on_command_add')
+        bot.add_listener(self._on_command_change, 'on_command_remove')
+        bot.errors.handle(self._on_command_error)
+        self._installed = True
+        self.invalidate()
+
+    async def _on_command_change(self, command):
+        self.invalidate()
+
+    def _close_match(self, name):
+        """The command ``name`` is a near-certain typo of, or None."""
+        key = name.lower()
+        if len(key) < _REPLY_MIN_NAME:
+            return None
+        limit = 2 if len(key) >= _REPLY_LONG_NAME else 1
+        for info in self.snapshot.suggest(key, limit=1):
+            if min(_distance(key, alias.lower()) for alias in (info.name, *info.aliases)) <= limit:
+                return info
+        return None
+
+    def _may_reply(self, channel_id):
+        now = time.monotonic()
+        if now < self._replied.get(channel_id, 0.0):
+            return False
+        if len(self._replied) > 1024:
+            self._replied = {cid: until for cid, until in self._replied.items() if until > now}
+        self._replied[channel_id] = now + _REPLY_COOLDOWN
+        return True
+
+    async def _on_command_error(self, ctx, error):
+        if not isinstance(error, commands.CommandNotFound) or not ctx.invoked_with:
+            return False
+        info = self._close_match(ctx.invoked_with)
+        if info is None or not self._may_reply(ctx.channel.id):
+            return False
+        try:
+            await ctx.reply(f"Unknown command `{ctx.prefix}{ctx.invoked_with}`. "
+                            f"Did you mean `{info.usage}`?", mention_author=False)
+        except discord.HTTPException:
+            pass
+        return True
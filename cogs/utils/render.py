@@ -0,0 +1,346 @@
+"""Process-pool image rendering shared by the PIL/NumPy cogs.
+
+Render functions in this module run inside worker processes. Each worker
+preloads the static assets (backgrounds, overlays, masks, fonts) once in
+``_init_worker``, and jobs pass raw image bytes in and get encoded PNG/GIF
+bytes back, so nothing heavier than a ``bytes`` object crosses the pipe.
+"""
+import asyncio
+import io
+import math
+import multiprocessing
+import os
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_IMAGE_DIR = os.path.join(_PROJECT_ROOT, 'assets', 'images')
+GYAT_BACKGROUNDS = ('v1.png', 'v2.png', 'v3.png', 'v4.png', 'v5.png', 'v6.png')
+_DEFAULT_LIMITS = {'aura': 2, 'triggered': 2, 'gyat': 2, 'love': 2, 'quote': 2, 'avatar': 4}
+_TWO_PI = 2 * math.pi
+
+# Gyat layout
+GYAT_AVATAR_SIZE = 300
+_GYAT_BORDER = 6
+_GYAT_TOTAL = GYAT_AVATAR_SIZE + 2 * _GYAT_BORDER
+_GYAT_POS = (304, 84)
+
+# Love layout
+LOVE_AVATAR_SIZE = 150
+_LOVE_AVATAR = (LOVE_AVATAR_SIZE, LOVE_AVATAR_SIZE)
+_LOVE_HEART = 120
+
+# Triggered layout
+_TRIGGERED_SIZE = 512
+_TRIGGERED_OVERLAY_HEIGHT = 102
+_TRIGGERED_FRAMES = 24
+
+_assets = {}
+
+
+def _circle_mask(size):
+    mask = Image.new('L', size, 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size[0], size[1]), fill=255)
+    return mask
+
+
+def _load_font(size):
+    for name in ("DejaVuSans.ttf", "arial.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _init_worker():
+    """Preload every static asset the render functions need (runs once per worker)."""
+    assets = _assets
+    assets['gyat_backgrounds'] = {
+        name: Image.open(os.path.join(_IMAGE_DIR, name)) for name in GYAT_BACKGROUNDS
+    }
+    assets['gyat_border_mask'] = _circle_mask((_GYAT_TOTAL, _GYAT_TOTAL))
+    assets['gyat_avatar_mask'] = _circle_mask((GYAT_AVATAR_SIZE, GYAT_AVATAR_SIZE))
+
+    overlay = Image.open(os.path.join(_IMAGE_DIR, 'triggered.png')).convert('RGBA')
+    assets['triggered_overlay'] = overlay.resize((_TRIGGERED_SIZE, _TRIGGERED_OVERLAY_HEIGHT))
+
+    heart = Image.open(os.path.join(_IMAGE_DIR, 'heart.png')).convert('RGBA')
+    assets['love_heart'] = heart.resize((_LOVE_HEART, _LOVE_HEART), Image.LANCZOS)
+    background = Image.new('RGBA', (600, 400), color=(255, 255, 255, 255))
+    ImageDraw.Draw(background).rounded_rectangle([0, 0, 600, 400], radius=20, fill=(255, 255, 255, 255))
+    assets['love_background'] = background
+    assets['love_mask'] = _circle_mask(_LOVE_AVATAR)
+    assets['love_font'] = _load_font(36)
+
+
+def _asset(name):
+    if not _assets:
+        _init_worker()
+    return _assets[name]
+
+
+def _decode(data, size=None):
+    with io.BytesIO(data) as buffer:
+        image = Image.open(buffer).convert('RGBA')
+    if size is not None:
+        image = image.resize(size, Image.LANCZOS)
+    return image
+
+
+def _rgba(data, size):
+    """Rebuild a ``size``x``size`` image from raw RGBA bytes (see ``avatar_rgba``)."""
+    return Image.frombuffer('RGBA', (size, size), data, 'raw', 'RGBA', 0, 1)
+
+
+def avatar_rgba(avatar_data, size):
+    """Decode an avatar and return it as raw ``size``x``size`` RGBA bytes for ``AvatarCache``."""
+    return _decode(avatar_data, (size, size)).tobytes()
+
+
+@lru_cache(maxsize=4)
+def _aura_geometry(initial_size, frame_count):
+    sizes = []
+    offsets = []
+    for i in range(frame_count):
+        zoomed = int(initial_size * (1 + 0.1 * math.sin(_TWO_PI * i / frame_count)))
+        sizes.append(zoomed)
+        offsets.append((initial_size - zoomed) >> 1)
+    return tuple(sizes), tuple(offsets)
+
+
+def aura_gif(avatar, initial_size=512, final_size=128, frame_count=48, frame_duration=42):
+    """Pulsing avatar GIF for !aura; ``avatar`` is ``initial_size`` RGBA bytes."""
+    avatar = _rgba(avatar, initial_size)
+    sizes, offsets = _aura_geometry(initial_size, frame_count)
+    frames = []
+    for zoomed_size, pos in zip(sizes, offsets):
+        zoomed = avatar.resize((zoomed_size, zoomed_size), Image.LANCZOS)
+        frame = Image.new('RGBA', (initial_size, initial_size), (0, 0, 0, 0))
+        frame.paste(zoomed, (pos, pos))
+        frames.append(frame.resize((final_size, final_size), Image.LANCZOS))
+    output = io.BytesIO()
+    frames[0].save(output, format='GIF', save_all=True, append_images=frames[1:],
+                   duration=frame_duration, loop=0)
+    return output.getvalue()
+
+
+def triggered_gif(image_data):
+    """Shaking 'triggered' GIF for !triggered."""
+    import imageio
+    import numpy as np
+
+    size = _TRIGGERED_SIZE
+    overlay_height = _TRIGGERED_OVERLAY_HEIGHT
+    img = _decode(image_data)
+
+    original_width, original_height = img.size
+    zoomed_width = int(original_width * 1.1)
+    zoomed_height = int(original_height * 1.1)
+    img = img.resize((zoomed_width, zoomed_height), Image.LANCZOS)
+    left = (zoomed_width - original_width) >> 1
+    top = (zoomed_height - original_height) >> 1
+    img = img.crop((left, top, left + original_width, top + original_height))
+    img = img.resize((size, size), Image.LANCZOS)
+
+    img_array = np.array(img)
+    overlay_array = np.array(_asset('triggered_overlay'))
+    overlay_y = size - overlay_height
+
+    rng = np.random.default_rng()
+    offsets = rng.integers(-15, 16, size=(_TRIGGERED_FRAMES, 2))
+    overlay_offsets = rng.integers(-5, 6, size=_TRIGGERED_FRAMES)
+
+    frames = []
+    for i in range(_TRIGGERED_FRAMES):
+        frame = np.zeros((size, size, 4), dtype=np.uint8)
+
+        ox, oy = int(offsets[i, 0]), int(offsets[i, 1])
+        src_x1 = max(0, -ox)
+        src_y1 = max(0, -oy)
+        src_x2 = min(size, size - ox)
+        src_y2 = min(size, size - oy)
+        dst_x1 = max(0, ox)
+        dst_y1 = max(0, oy)
+        frame[dst_y1:dst_y1 + (src_y2 - src_y1), dst_x1:dst_x1 + (src_x2 - src_x1)] = \
+            img_array[src_y1:src_y2, src_x1:src_x2]
+
+        oox = int(overlay_offsets[i])
+        ov_src_x1 = max(0, -oox)
+        ov_src_x2 = min(size, size - oox)
+        ov_dst_x1 = max(0, oox)
+        ov_dst_x2 = ov_dst_x1 + (ov_src_x2 - ov_src_x1)
+
+        overlay_slice = overlay_array[:, ov_src_x1:ov_src_x2]
+        alpha = overlay_slice[:, :, 3:4].astype(np.float32) / 255.0
+        bg = frame[overlay_y:, ov_dst_x1:ov_dst_x2]
+        blended = (overlay_slice[:, :, :3] * alpha + bg[:, :, :3] * (1 - alpha)).astype(np.uint8)
+        frame[overlay_y:, ov_dst_x1:ov_dst_x2, :3] = blended
+        frame[overlay_y:, ov_dst_x1:ov_dst_x2, 3] = np.maximum(bg[:, :, 3], overlay_slice[:, :, 3])
+
+        frames.append(Image.fromarray(frame))
+
+    output = io.BytesIO()
+    imageio.mimsave(output, frames, format='GIF', duration=1/72, loop=0)
+    return output.getvalue()
+
+
+def gyat_png(avatar, background_name):
+    """Avatar on one of the daily backgrounds for !gyat; ``avatar`` is ``GYAT_AVATAR_SIZE`` RGBA bytes."""
+    img = _asset('gyat_backgrounds')[background_name].copy()
+    avatar = _rgba(avatar, GYAT_AVATAR_SIZE)
+
+    bordered = Image.new('RGBA', (_GYAT_TOTAL, _GYAT_TOTAL), (0, 0, 0, 255))
+    bordered.paste(avatar, (_GYAT_BORDER, _GYAT_BORDER), _asset('gyat_avatar_mask'))
+    output = Image.new('RGBA', (_GYAT_TOTAL, _GYAT_TOTAL), (0, 0, 0, 0))
+    output.paste(bordered, mask=_asset('gyat_border_mask'))
+    img.paste(output, _GYAT_POS, output)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', optimize=True, compress_level=1)
+    return buffer.getvalue()
+
+
+def love_png(avatar1, avatar2, love_score):
+    """Two avatars (``LOVE_AVATAR_SIZE`` RGBA bytes), a heart and a match meter for !love.
+
+    Missing avatars render grey.
+    """
+    image = _asset('love_background').copy()
+    draw = ImageDraw.Draw(image)
+    mask = _asset('love_mask')
+    for data, pos in ((avatar1, (60, 50)), (avatar2, (390, 50))):
+        if data:
+            avatar = _rgba(data, LOVE_AVATAR_SIZE)
+        else:
+            avatar = Image.new('RGBA', _LOVE_AVATAR, (200, 200, 200, 255))
+        image.paste(avatar, pos, mask)
+
+    heart = _asset('love_heart')
+    image.paste(heart, ((600 - _LOVE_HEART) // 2, 75), heart)
+
+    meter_width = 400
+    meter_height = 40
+    meter_x = 100
+    meter_y = 250
+    draw.rounded_rectangle([meter_x, meter_y, meter_x + meter_width, meter_y + meter_height],
+                           radius=10, fill=(200, 200, 200, 255))
+    fill_width = int(meter_width * love_score / 100)
+    if fill_width > 0:
+        draw.rounded_rectangle([meter_x, meter_y, meter_x + fill_width, meter_y + meter_height],
+                               radius=10, fill=(255, 105, 180, 255))
+
+    font = _asset('love_font')
+    text = f"{love_score}% Match"
+    text_width = draw.textlength(text, font=font)
+    draw.text((300 - text_width / 2, 310), text, font=font, fill=(0, 0, 0, 255))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True, compress_level=6)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=16)
+def _quote_template(path):
+    return Image.open(path).copy()
+
+
+@lru_cache(maxsize=4)
+def _quote_font(path, size):
+    return ImageFont.truetype(path, size)
+
+
+def quote_png(text, author, template_path, font_path, text_area=(450, 1150)):
+    """Meme-style quote card for !quote."""
+    base_image = _quote_template(template_path).copy()
+    draw = ImageDraw.Draw(base_image)
+    font = _quote_font(font_path, 50)
+    author_font = _quote_font(font_path, 40)
+    area_left, area_right = text_area
+    area_width = area_right - area_left
+
+    max_chars = int(area_width / draw.textlength("x", font=font) * 0.9)
+    current_h = 200
+    for line in textwrap.fill(text, width=max_chars).split('\n'):
+        bbox = draw.textbbox((0, 0), line, font=font)
+        width = bbox[2] - bbox[0]
+        draw.text((area_left + (area_width - width) // 2, current_h), line, font=font, fill="white")
+        current_h += bbox[3] - bbox[1] + 10
+
+    author_text = f"- {author}"
+    author_bbox = draw.textbbox((0, 0), author_text, font=author_font)
+    author_x = area_left + (area_width - (author_bbox[2] - author_bbox[0])) // 2
+    draw.text((author_x, 400), author_text, font=author_font, fill="white")
+
+    output = io.BytesIO()
+    base_image.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+
+class RenderService:
+    """Bot-wide ``ProcessPoolExecutor`` for rendering with a per-cog concurrency cap.
+
+    The pool is created on first use and uses the ``spawn`` start method so
+    workers never inherit the bot's threads or sockets. If a worker dies the
+    pool is rebuilt and the job retried once.
+    """
+    __slots__ = ('max_workers', 'limits', '_pool', '_semaphores', '_active', 'jobs', 'failures')
+
+    def __init__(self, max_workers=None, limits=None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.limits = dict(_DEFAULT_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self._pool = None
+        self._semaphores = {}
+        self._active = {}
+        self.jobs = 0
+        self.failures = 0
+
+    def _get_pool(self):
+        pool = self._pool
+        if pool is None:
+            pool = self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return pool
+
+    def _semaphore(self, cog):
+        sem = self._semaphores.get(cog)
+        if sem is None:
+            sem = self._semaphores[cog] = asyncio.Semaphore(self.limits.get(cog, self.max_workers))
+        return sem
+
+    @property
+    def active(self):
+        return dict(self._active)
+
+    async def submit(self, cog, func, *args):
+        """Run ``func(*args)`` in a worker, at most ``limits[cog]`` at a time for ``cog``."""
+        loop = asyncio.get_running_loop()
+        active = self._active
+        async with self._semaphore(cog):
+            self.jobs += 1
+            active[cog] = active.get(cog, 0) + 1
+            pool = self._get_pool()
+            try:
+                return await loop.run_in_executor(pool, func, *args)
+            except BrokenProcessPool:
+                self.failures += 1
+                if self._pool is pool:
+                    self._pool = None
+                return await loop.run_in_executor(self._get_pool(), func, *args)
+            finally:
+                active[cog] -= 1
+
+    def close(self):
+        pool = self._pool
+        self._pool = None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
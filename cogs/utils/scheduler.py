@@ -0,0 +1,339 @@
+"""One timer wheel for the bot's periodic background work.
+
+Cleanup sweeps, update pollers and embed refreshes each used to own a task
+sleeping in a loop: a wakeup per task per period, hourly pollers that all
+fired together shortly after startup, and nothing recording how long a run
+took. ``Scheduler`` files every job in a hierarchical timer wheel (levels of
+64 slots, one tick of ``resolution`` seconds at the bottom, so four levels
+at 1s cover about six months) driven by a single ``loop.call_later`` handle
+armed for the next occupied slot. An idle bot wakes only when a job is due.
+
+- Jobs due in the same tick run from the same wakeup. ``align`` rounds a
+  job's deadlines up to a multiple of that many seconds, so cheap
+  maintenance jobs share wakeups.
+- ``jitter`` moves each run by up to that many seconds either way, so
+  pollers do not hit their APIs in step. Deadlines advance from the schedule
+  rather than from when the last run ended, so jitter does not drift, and
+  runs missed while the loop was blocked collapse into one.
+- A job still running when it falls due again is skipped, not stacked.
+- Run times are recorded per job group for the metrics endpoint and ``!jobs``.
+"""
+import asyncio
+import logging
+import math
+import random
+import time
+
+from cogs.utils.metrics import Histogram
+
+_BITS = 6
+_SLOTS = 1 << _BITS
+_MASK = _SLOTS - 1
+# Tolerates a timer firing a hair before its tick because of float rounding.
+_EARLY = 1e-6
+
+log = logging.getLogger('jackybot.scheduler')
+
+
+class Job:
+    """A scheduled coroutine function; ``interval`` None means it runs once."""
+    __slots__ = ('scheduler', 'name', 'func', 'interval', 'jitter', 'align', 'group', 'skip_if_running',
+                 'base', 'tick', 'slot', 'task', 'cancelled', 'runs', 'skipped', 'failures',
+                 'last_runtime', 'max_runtime', 'total_runtime', 'last_error')
+
+    def __init__(self, scheduler, name, func, interval, jitter, align, group, skip_if_running):
+        self.scheduler = scheduler
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.align = align
+        self.group = group
+        self.skip_if_running = skip_if_running
+        self.base = 0.0
+        self.tick = 0
+        self.slot = None
+        self.task = None
+        self.cancelled = False
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_runtime = 0.0
+        self.max_runtime = 0.0
+        self.total_runtime = 0.0
+        self.last_error = None
+
+    def __repr__(self):
+        return f'<Job {self.name} interval={self.interval}>'
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    @property
+    def next_in(self):
+        """Seconds until the next run."""
+        scheduler = self.scheduler
+        return max(0.0, self.tick * scheduler.resolution - scheduler.clock())
+
+    def cancel(self):
+        self.scheduler.cancel(self)
+
+    def defer(self, delay):
+        """Move the next run to ``delay`` seconds from now; later runs follow on from it."""
+        scheduler = self.scheduler
+        scheduler._reschedule(self, scheduler.clock() + delay)
+
+
+class Scheduler:
+    """Periodic and one-shot jobs on a hierarchical timer wheel."""
+
+    def __init__(self, resolution=1.0, levels=4, clock=None, rng=None):
+        self.resolution = resolution
+        self.levels = levels
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.jobs = {}
+        self.runtimes = {}
+        self.skips = {}
+        self.failures = {}
+        self.wakeups = 0
+        self.current = 0
+        self._wheel = [[{} for _ in range(_SLOTS)] for _ in range(levels)]
+        self._loop = None
+        self._handle = None
+        self._armed = None
+
+    def _bind(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            if self.clock is None:
+                self.clock = self._loop.time
+            self.current = int(self.clock() / self.resolution)
+
+    # ---- Jobs ----
+    def every(self, name, interval, func, *, delay=None, jitter=0.0, align=0.0, group=None,
+              skip_if_running=True):
+        """Run ``await func()`` every ``interval`` seconds, first after ``delay`` (default: one interval).
+
+        A job already registered under ``name`` is replaced. ``group`` (default
+        ``name``) keys the run-time histogram, so per-guild jobs can share one.
+        """
+        return self._add(name, func, interval, interval if delay is None else delay, jitter, align,
+                         group, skip_if_running)
+
+    def call_later(self, name, delay, func, *, group=None):
+        """Run ``await func()`` once, ``delay`` seconds from now."""
+        return self._add(name, func, None, delay, 0.0, 0.0, group, False)
+
+    def _add(self, name, func, interval, delay, jitter, align, group, skip_if_running):
+        self._bind()
+        self.cancel(name)
+        job = Job(self, name, func, interval, jitter, max(1, round(align / self.resolution)),
+                  group or name, skip_if_running)
+        job.base = self.clock() + delay
+        self.jobs[name] = job
+        self._schedule(job, job.base)
+        self._arm()
+        return job
+
+    def cancel(self, job):
+        """Drop a job (or the job called ``job``) and cancel its run if one is in progress."""
+        if isinstance(job, str):
+            job = self.jobs.get(job)
+            if job is None:
+                return
+        job.cancelled = True
+        if self.jobs.get(job.name) is job:
+            del self.jobs[job.name]
+        self._remove(job)
+        task = job.task
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+        self._arm()
+
+    def stop(self):
+        for job in list(self.jobs.values()):
+            self.cancel(job)
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+            self._armed = None
+
+    # ---- Wheel ----
+    def _schedule(self, job, when):
+        if job.jitter:
+            when += self.rng.uniform(-job.jitter, job.jitter)
+        tick = math.ceil(when / self.resolution)
+        align = job.align
+        if align > 1:
+            tick = -(-tick // align) * align
+        job.tick = max(tick, self.current + 1)
+        self._insert(job)
+
+    def _reschedule(self, job, when):
+        if job.cancelled:
+            return
+        self._remove(job)
+        job.base = when
+        self._schedule(job, when)
+        self._arm()
+
+    def _insert(self, job):
+        # A job sits on the lowest level whose parent block it shares with the current tick.
+        tick, current = job.tick, self.current
+        level = 0
+        while level < self.levels - 1 and tick >> (_BITS * (level + 1)) != current >> (_BITS * (level + 1)):
+            level += 1
+        index = (tick >> (_BITS * level)) & _MASK
+        self._wheel[level][index][job] = None
+        job.slot = (level, index)
+
+    def _remove(self, job):
+        if job.slot is not None:
+            level, index = job.slot
+            self._wheel[level][index].pop(job, None)
+            job.slot = None
+
+    def _advance(self, target):
+        """Move the wheel to tick ``target`` and return the jobs that fell due, in order."""
+        wheel = self._wheel
+        due = []
+        if target - self.current > _SLOTS:
+            # After a long sleep, re-filing every job is cheaper than stepping tick by tick.
+            jobs = []
+            for row in wheel:
+                for slot in row:
+                    jobs.extend(slot)
+                    slot.clear()
+            self.current = target
+            for job in sorted(jobs, key=lambda job: job.tick):
+                job.slot = None
+                if job.tick <= target:
+                    due.append(job)
+                else:
+                    self._insert(job)
+            return due
+        while self.current < target:
+            self.current = current = self.current + 1
+            # Cascade from the top so jobs can fall through several levels in one tick.
+            for level in range(self.levels - 1, 0, -1):
+                if not current & ((1 << (_BITS * level)) - 1):
+                    slot = wheel[level][(current >> (_BITS * level)) & _MASK]
+                    if slot:
+                        jobs = list(slot)
+                        slot.clear()
+                        for job in jobs:
+                            self._insert(job)
+            slot = wheel[0][current & _MASK]
+            if slot:
+                for job in slot:
+                    job.slot = None
+                due.extend(slot)
+                slot.clear()
+        return due
+
+    def _next_tick(self):
+        """The earliest tick holding a job, or None when the wheel is empty."""
+        current = self.current
+        for level, row in enumerate(self._wheel):
+            start = ((current >> (_BITS * level)) & _MASK) + 1
+            for index in range(start, _SLOTS):
+                slot = row[index]
+                if slot:
+                    return min(job.tick for job in slot)
+        # Only jobs beyond the top level's range are left.
+        ticks = [job.tick for job in self.jobs.values() if job.slot is not None]
+        return min(ticks) if ticks else None
+
+    def _arm(self):
+        if self._loop is None:
+            return
+        tick = self._next_tick()
+        if tick == self._armed and self._handle is not None:
+            return
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._armed = tick
+        if tick is not None:
+            delay = max(0.0, tick * self.resolution - self.clock())
+            self._handle = self._loop.call_later(delay, self._fire)
+
+    def _fire(self):
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = None
+        self._armed = None
+        self.wakeups += 1
+        for job in self._advance(int(self.clock() / self.resolution + _EARLY)):
+            self._dispatch(job)
+        self._arm()
+
+    # ---- Runs ----
+    def _dispatch(self, job):
+        if job.cancelled:
+            return
+        if job.interval is None:
+            if self.jobs.get(job.name) is job:
+                del self.jobs[job.name]
+        else:
+            now = self.clock()
+            base = job.base + job.interval
+            if base <= now:
+                # Runs missed while the loop was blocked collapse into this one.
+                base += (int((now - base) // job.interval) + 1) * job.interval
+            job.base = base
+            self._schedule(job, base)
+        if job.skip_if_running and job.running:
+            job.skipped += 1
+            self.skips[job.group] = self.skips.get(job.group, 0) + 1
+            log.debug('Skipped %s: the previous run is still going', job.name)
+            return
+        job.task = asyncio.create_task(self._run(job), name=f'job:{job.name}')
+
+    async def _run(self, job):
+        start = time.perf_counter()
+        try:
+            await job.func()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = f'{type(e).__name__}: {e}'
+            self.failures[job.group] = self.failures.get(job.group, 0) + 1
+            log.exception('Scheduled job %s failed', job.name)
+        finally:
+            elapsed = time.perf_counter() - start
+            job.runs += 1
+            job.last_runtime = elapsed
+            job.total_runtime += elapsed
+            if elapsed > job.max_runtime:
+                job.max_runtime = elapsed
+            hist = self.runtimes.get(job.group)
+            if hist is None:
+                hist = self.runtimes[job.group] = Histogram()
+            hist.observe(elapsed)
+
+    # ---- Reporting ----
+    def job_counts(self):
+        counts = {}
+        for job in self.jobs.values():
+            counts[job.group] = counts.get(job.group, 0) + 1
+        return counts
+
+    def stats(self):
+        return [{
+            'name': job.name,
+            'group': job.group,
+            'interval': job.interval,
+            'runs': job.runs,
+            'skipped': job.skipped,
+            'failures': job.failures,
+            'running': job.running,
+            'last': job.last_runtime,
+            'max': job.max_runtime,
+            'mean': job.total_runtime / job.runs if job.runs else 0.0,
+            'next_in': job.next_in,
+            'last_error': job.last_error,
+        } for job in sorted(self.jobs.values(), key=lambda job: job.tick)]
@@ -0,0 +1,97 @@
+"""Schemas of the JSON state files, checked by ``cogs.utils.serial`` on load.
+
+Discord IDs are object keys, so they are strings in the files even when the
+code holds ints.
+"""
+from typing import Any, Dict, List, Optional, TypedDict, Union
+
+
+class RelayChannel(TypedDict):
+    channel_id: int
+
+
+class RelayWebhook(TypedDict):
+    id: int
+    token: str
+
+
+class UserStat(TypedDict):
+    name: str
+    count: int
+
+
+class ServerStat(UserStat, total=False):
+    last_used: str
+
+
+class _Movie(TypedDict):
+    title: str
+
+
+class Movie(_Movie, total=False):
+    suggested_by: str
+    suggested_by_id: int
+    added_by: str
+    added_by_id: int
+    timestamp: str
+    watched_date: str
+
+
+class ReleaseState(TypedDict, total=False):
+    last_release_id: Optional[int]
+    etag: str
+
+
+class NewsState(TypedDict, total=False):
+    last_news_gid: Union[str, int, None]
+
+
+class GuildUpdate(TypedDict):
+    last_update: Optional[str]
+
+
+class CommandEntry(TypedDict):
+    name: str
+    aliases: List[str]
+    usage: str
+    summary: str
+    category: str
+
+
+class _CogInfo(TypedDict):
+    name: str
+
+
+class CogInfo(_CogInfo, total=False):
+    display_name: str
+    description: str
+    category: str
+    icon: str
+
+
+# data/jackychat_channels.json and the IPC hub's 'relay' namespace: guild ID -> channel.
+RELAY_CHANNELS = Dict[str, RelayChannel]
+# data/jackychat_webhooks*.json: channel ID -> webhook.
+RELAY_WEBHOOKS = Dict[str, RelayWebhook]
+# data/command_stats.json, data/error_stats.json: "!command" / exception name -> count.
+COUNTS = Dict[str, int]
+# data/user_stats.json: user ID -> stats.
+USER_STATS = Dict[str, UserStat]
+# data/server_command_stats.json: guild ID -> stats.
+SERVER_STATS = Dict[str, ServerStat]
+# data/movie_suggestions.json, data/movie_watchlist.json, data/movie_finished.json.
+MOVIES = List[Movie]
+# announced_games.json (freegames): guild ID -> game ID -> announcement time.
+ANNOUNCED_GAMES = Dict[str, Dict[str, str]]
+# json/zen_updates.json
+ZEN_STATE = ReleaseState
+# json/ark_raiders_updates.json
+ARK_STATE = NewsState
+# json/steamos_updates.json: guild ID -> last posted update.
+GUILD_UPDATES = Dict[str, GuildUpdate]
+# data/cog_settings.json (web dashboard): guild ID -> cog -> setting -> value.
+COG_SETTINGS = Dict[str, Dict[str, Dict[str, Any]]]
+# cogs/cog_metadata.json
+COG_METADATA = List[CogInfo]
+# data/commands.json (written by the bot's command registry): cog module -> its commands.
+COMMAND_REGISTRY = Dict[str, List[CommandEntry]]
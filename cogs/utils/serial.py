@@ -0,0 +1,359 @@
+"""JSON serialization for persisted state: fastest available codec, schema checks, atomic writes.
+
+The backend is chosen at import: orjson, then msgspec, then the stdlib
+``json`` module. All three write the same compact UTF-8 JSON, so files move
+freely between installs. ``pretty=True`` is only for files people edit by hand.
+
+``write`` goes through a temporary file in the same directory and
+``os.replace``, so a crash mid-save leaves the previous file intact. ``read``
+treats a missing or empty file as ``default()``. A file that fails to decode
+is renamed to ``<path>.bad`` rather than overwritten by the next save. A file
+that decodes but does not match its schema is repaired instead: optional
+fields with the wrong type are dropped, then entries still invalid, and the
+original is copied to ``<path>.bad``. Unknown keys are ignored throughout.
+
+Schemas are ordinary typing types (``Dict[str, int]``, ``List[...]``,
+``Optional``, ``TypedDict``); see ``cogs.utils.schemas``. They are compiled to
+checker functions once per type.
+"""
+import asyncio
+import os
+import threading
+import typing
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+import json
+
+_JSON_SEP = (',', ':')
+
+
+class SchemaError(ValueError):
+    def __init__(self, problem, path=()):
+        self.problem = problem
+        self.path = list(path)
+        super().__init__(problem)
+
+    def __str__(self):
+        where = '$' + ''.join(f"[{part}]" if isinstance(part, int) else f".{part}" for part in self.path)
+        return f"{where}: {self.problem}"
+
+if orjson is not None:
+    BACKEND = 'orjson'
+    _OPTS = orjson.OPT_NON_STR_KEYS
+    _PRETTY_OPTS = _OPTS | orjson.OPT_INDENT_2
+
+    def dumps(obj, pretty=False):
+        return orjson.dumps(obj, option=_PRETTY_OPTS if pretty else _OPTS)
+
+    loads = orjson.loads
+elif msgspec is not None:
+    BACKEND = 'msgspec'
+    _encode = msgspec.json.Encoder().encode
+    _decode = msgspec.json.Decoder().decode
+
+    def dumps(obj, pretty=False):
+        data = _encode(obj)
+        return msgspec.json.format(data, indent=2) if pretty else data
+
+    def loads(data):
+        try:
+            return _decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+else:
+    BACKEND = 'json'
+
+    def dumps(obj, pretty=False):
+        if pretty:
+            return json.dumps(obj, indent=2, ensure_ascii=False).encode()
+        return json.dumps(obj, separators=_JSON_SEP, ensure_ascii=False).encode()
+
+    loads = json.loads
+
+
+# ---- Schemas ----
+# Decoded JSON only ever holds these exact types, so scalars are checked with
+# ``type(value) in types`` rather than isinstance (which would also let bools
+# through as ints).
+_checkers = {}
+_MISSING = object()
+_SCALARS = {
+    str: frozenset((str,)),
+    int: frozenset((int,)),
+    float: frozenset((int, float)),
+    bool: frozenset((bool,)),
+    type(None): frozenset((type(None),)),
+}
+
+
+def _describe(schema):
+    return getattr(schema, '__name__', None) or str(schema).replace('typing.', '')
+
+
+def _mismatch(schema, value, *path):
+    return SchemaError(f"expected {_describe(schema)}, got {type(value).__name__}", path)
+
+
+def _scalar_types(schema):
+    """The accepted types if ``schema`` is a scalar or a union of scalars, else None."""
+    if schema is None:
+        schema = type(None)
+    types = _SCALARS.get(schema)
+    if types is None and typing.get_origin(schema) is Union:
+        options = [_scalar_types(arg) for arg in typing.get_args(schema)]
+        if None not in options:
+            types = frozenset().union(*options)
+    return types
+
+
+def _element(schema):
+    """``(types, check)`` for a container's elements; at most one is set."""
+    types = _scalar_types(schema)
+    return (types, None) if types is not None else (None, _checker(schema))
+
+
+def _compile(schema):
+    """Return ``check(value)`` for ``schema``, or None when anything goes.
+
+    Checkers build no path strings on success; a failing checker's parents
+    prepend their key or index to ``SchemaError.path`` on the way out.
+    """
+    if schema is Any or schema is object:
+        return None
+    types = _scalar_types(schema)
+    if types is not None:
+        def check_scalar(value):
+            if type(value) not in types:
+                raise _mismatch(schema, value)
+        return check_scalar
+
+    origin = typing.get_origin(schema)
+    args = typing.get_args(schema)
+    if origin is Union:
+        options = [_checker(arg) for arg in args]
+        if None in options:
+            return None
+
+        def check_union(value):
+            for option in options:
+                try:
+                    option(value)
+                    return
+                except SchemaError:
+                    pass
+            raise _mismatch(schema, value)
+        return check_union
+
+    if origin is list or schema is list:
+        item_types, item = _element(args[0]) if args else (None, None)
+
+        def check_list(value):
+            if type(value) is not list:
+                raise _mismatch(list, value)
+            if item_types is not None:
+                for i, entry in enumerate(value):
+                    if type(entry) not in item_types:
+                        raise _mismatch(args[0], entry, i)
+            elif item is not None:
+                for i, entry in enumerate(value):
+                    try:
+                        item(entry)
+                    except SchemaError as e:
+                        e.path.insert(0, i)
+                        raise
+        return check_list
+
+    if origin is dict or schema is dict:
+        if args and args[0] is not str:
+            raise TypeError(f"JSON object keys are strings; {_describe(schema)} cannot be checked")
+        member_types, member = _element(args[1]) if args else (None, None)
+
+        def check_dict(value):
+            if type(value) is not dict:
+                raise _mismatch(dict, value)
+            if member_types is not None:
+                for key, entry in value.items():
+                    if type(entry) not in member_types:
+                        raise _mismatch(args[1], entry, key)
+            elif member is not None:
+                for key, entry in value.items():
+                    try:
+                        member(entry)
+                    except SchemaError as e:
+                        e.path.insert(0, key)
+                        raise
+        return check_dict
+
+    if typing.is_typeddict(schema):
+        required = schema.__required_keys__
+        fields = []
+        for key, hint in typing.get_type_hints(schema).items():
+            field_types, check = _element(hint)
+            if field_types is not None or check is not None or key in required:
+                fields.append((key, key in required, field_types, check, hint))
+
+        def check_typeddict(value):
+            if type(value) is not dict:
+                raise _mismatch(schema, value)
+            get = value.get
+            for key, needed, field_types, check, hint in fields:
+                entry = get(key, _MISSING)
+                if entry is _MISSING:
+                    if needed:
+                        raise SchemaError(f"missing {key!r}")
+                elif field_types is not None:
+                    if type(entry) not in field_types:
+                        raise _mismatch(hint, entry, key)
+                elif check is not None:
+                    try:
+                        check(entry)
+                    except SchemaError as e:
+                        e.path.insert(0, key)
+                        raise
+        return check_typeddict
+
+    raise TypeError(f"Unsupported schema type: {schema!r}")
+
+
+def _checker(schema):
+    try:
+        return _checkers[schema]
+    except KeyError:
+        check = _checkers[schema] = _compile(schema)
+        return check
+
+
+def validate(data, schema):
+    """Raise ``SchemaError`` unless ``data`` matches ``schema``; return ``data``."""
+    check = _checker(schema)
+    if check is not None:
+        check(data)
+    return data
+
+
+def _child_schema(schema, key):
+    if typing.is_typeddict(schema):
+        return typing.get_type_hints(schema).get(key, Any)
+    args = typing.get_args(schema)
+    origin = typing.get_origin(schema)
+    if origin is dict and args:
+        return args[1]
+    if origin is list and args:
+        return args[0]
+    return Any
+
+
+def repair(data, schema):
+    """Make ``data`` match ``schema`` by dropping what does not; return ``(data, dropped)``.
+
+    Each ``SchemaError`` path is walked from the root: a bad optional field
+    of a TypedDict is removed on its own, while a bad required field takes
+    its whole object with it, up to the nearest list item or dict member.
+    Raises ``SchemaError`` when the root itself is the wrong shape.
+    """
+    dropped = []
+    while True:
+        try:
+            validate(data, schema)
+            return data, dropped
+        except SchemaError as e:
+            error = e
+        nodes = [(data, schema)]
+        for key in error.path[:-1]:
+            node, node_schema = nodes[-1]
+            nodes.append((node[key], _child_schema(node_schema, key)))
+        path = list(error.path)
+        while path:
+            parent, parent_schema = nodes[len(path) - 1]
+            if typing.is_typeddict(parent_schema) and path[-1] in parent_schema.__required_keys__:
+                path.pop()
+                continue
+            del parent[path[-1]]
+            dropped.append(SchemaError(error.problem, error.path))
+            break
+        else:
+            raise error
+
+
+# ---- Files ----
+def write_bytes(path, payload, fsync=False):
+    """Atomically replace ``path`` with ``payload``."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write(path, data, pretty=False, fsync=False):
+    """Serialize ``data`` and atomically replace ``path`` with it."""
+    write_bytes(path, dumps(data, pretty), fsync)
+
+
+def decode(content, schema=None):
+    data = loads(content)
+    if schema is not None:
+        validate(data, schema)
+    return data
+
+
+def read(path, schema=None, default=dict):
+    """Load ``path``; missing, empty or undecodable files give ``default()``, mismatches are repaired."""
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return default()
+    if not content.strip():
+        return default()
+    bad_path = f"{path}.bad"
+    try:
+        data = loads(content)
+        if schema is None:
+            return data
+        data, dropped = repair(data, schema)
+    except ValueError as e:
+        try:
+            os.replace(path, bad_path)
+            print(f"Could not load {path} ({e}). Moved it to {bad_path}; starting fresh.")
+        except OSError:
+            print(f"Could not load {path} ({e}). Starting fresh.")
+        return default()
+    if dropped:
+        try:
+            write_bytes(bad_path, content)
+            kept = f"the original is in {bad_path}"
+        except OSError:
+            kept = "the original could not be backed up"
+        print(f"Dropped {len(dropped)} invalid part(s) of {path} (first: {dropped[0]}); {kept}.")
+    return data
+
+
+async def load(path, schema=None, default=dict):
+    """``read`` off the event loop."""
+    return await asyncio.to_thread(read, path, schema, default)
+
+
+async def save(path, data, pretty=False, fsync=False):
+    """Serialize on the loop (a consistent snapshot of ``data``), write in a thread."""
+    await asyncio.to_thread(write_bytes, path, dumps(data, pretty), fsync)
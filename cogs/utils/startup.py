@@ -0,0 +1,145 @@
+import asyncio
+import importlib
+import json
+import os
+import time
+
+from discord.ext import commands
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_MB = 1024 * 1024
+_STATM = '/proc/self/statm'
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or 0 if it cannot be read."""
+    try:
+        with open(_STATM, 'r') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    return 0
+
+
+def process_start_time():
+    """Wall-clock time the process was created, falling back to now."""
+    if psutil is not None:
+        try:
+            return psutil.Process().create_time()
+        except Exception:
+            pass
+    return time.time()
+
+
+def discover_cogs(cog_dir, disabled, lazy):
+    """Split the cog files in ``cog_dir`` into ``(eager, lazy)`` module names."""
+    cog_files = sorted(f[:-3] for f in os.listdir(cog_dir) if f[-3:] == '.py' and f[:-3] not in disabled)
+    return [f for f in cog_files if f not in lazy], [f for f in cog_files if f in lazy]
+
+
+class StartupProfiler:
+    """Records per-cog import time, setup time and RSS delta during setup_hook.
+
+    Extensions are loaded sequentially. Each module is imported on its own
+    first, which is timed as the import (including transitive imports), and
+    then loaded with ``Bot.load_extension``. That executes the module body
+    again, but with its dependencies already in ``sys.modules``, so the
+    setup time is ``setup()``/``cog_load`` plus a cheap re-execution.
+    """
+    __slots__ = ('started_at', 'ready_at', 'records', 'process_rss')
+
+    def __init__(self, started_at=None):
+        self.started_at = process_start_time() if started_at is None else started_at
+        self.ready_at = None
+        self.records = []
+        self.process_rss = 0
+
+    async def load_extension(self, bot, name):
+        rss_before = current_rss()
+        start = time.perf_counter()
+        error = None
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            error = commands.ExtensionFailed(name, e)
+            error.__cause__ = e
+        imported = time.perf_counter()
+        if error is None:
+            try:
+                await bot.load_extension(name)
+            except Exception as e:
+                error = e
+        end = time.perf_counter()
+        self.records.append({
+            'cog': name.rsplit('.', 1)[-1],
+            'import_ms': round((imported - start) * 1000, 2),
+            'setup_ms': round((end - imported) * 1000, 2),
+            'total_ms': round((end - start) * 1000, 2),
+            'rss_delta_mb': round((current_rss() - rss_before) / _MB, 2),
+            'error': None if error is None else f"{type(error).__name__}: {error.__cause__ or error}",
+        })
+        if error is not None:
+            raise error
+
+    def record_step(self, cog, kind, seconds, rss_delta=0):
+        """Record a non-extension startup step such as lazy stub registration."""
+        self.records.append({
+            'cog': f'{cog} ({kind})',
+            'import_ms': 0.0,
+            'setup_ms': round(seconds * 1000, 2),
+            'total_ms': round(seconds * 1000, 2),
+            'rss_delta_mb': round(rss_delta / _MB, 2),
+            'error': None,
+        })
+
+    def mark_ready(self):
+        if self.ready_at is None:
+            self.ready_at = time.time()
+            self.process_rss = current_rss()
+
+    @property
+    def ready_ms(self):
+        if self.ready_at is None:
+            return None
+        return round((self.ready_at - self.started_at) * 1000, 2)
+
+    def sorted_records(self):
+        return sorted(self.records, key=lambda r: r['total_ms'], reverse=True)
+
+    def to_dict(self):
+        return {
+            'ready_ms': self.ready_ms,
+            'rss_mb': round(self.process_rss / _MB, 2),
+            'cogs_ms': round(sum(r['total_ms'] for r in self.records), 2),
+            'cogs': self.sorted_records(),
+        }
+
+    def table(self):
+        lines = [f"{'cog':<28}{'import ms':>12}{'setup ms':>12}{'total ms':>12}{'rss MB':>10}"]
+        for r in self.sorted_records():
+            suffix = '  FAILED' if r['error'] else ''
+            lines.append(f"{r['cog']:<28}{r['import_ms']:>12.1f}{r['setup_ms']:>12.1f}"
+                         f"{r['total_ms']:>12.1f}{r['rss_delta_mb']:>10.1f}{suffix}")
+        ready = self.ready_ms
+        lines.append(f"process start -> on_ready: {'n/a' if ready is None else f'{ready:.1f} ms'}"
+                     f" | RSS {self.process_rss / _MB:.1f} MB")
+        return '\n'.join(lines)
+
+    async def write(self, path):
+        data = json.dumps(self.to_dict(), indent=2)
+        await asyncio.to_thread(_write_text, path, data)
+
+
+def _write_text(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(data)
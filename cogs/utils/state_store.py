@@ -0,0 +1,371 @@
+"""SQLite (WAL) store for per-key cog state.
+
+Cogs whose state is a map of independent keys keep it here, so a change
+writes one row instead of rewriting a whole file: aura (per guild),
+highlights (per message), gyat (per user), auto roles (per guild) and
+timezones (per user). State that is one document read as a whole stays in
+its JSON file under ``cogs.utils.serial``: the movie lists, the analytics
+snapshots the web dashboard reads, the jackychat channel list, the announced free
+games and the update pollers' last-seen state.
+
+Cogs open their namespace with ``await bot.store.load(...)`` in ``cog_load``;
+the SQLite reads and the one-time legacy import run on the store's own
+thread rather than the event loop.
+
+In cluster mode every worker opens the same database, so a namespace's
+in-memory copy is only safe for keys one cluster owns (a guild lives on one
+cluster). Per-user state is written from every cluster and is read and
+changed with ``fetch`` and ``update`` instead, which go to SQLite each time;
+store-wide resets run on cluster 0 only.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cogs.utils import serial
+
+_FLUSH_INTERVAL = 1.0
+# A failed commit (usually another cluster holding the write lock past the busy
+# timeout) is retried with doubling delays up to this; close() gives up after
+# _CLOSE_ATTEMPTS failures so shutdown cannot hang on a broken database.
+_MAX_RETRY_DELAY = 30.0
+_CLOSE_ATTEMPTS = 3
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS kv (ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+    " PRIMARY KEY (ns, key)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS imported (ns TEXT PRIMARY KEY, source TEXT NOT NULL)",
+)
+
+
+def _dumps(value):
+    return serial.dumps(value).decode()
+
+
+class Namespace:
+    """In-memory view of one cog's keys, written back through the store's writer thread.
+
+    Reads never touch SQLite after the namespace is first opened. ``put`` must be
+    called again after mutating a stored value in place, since the value is
+    serialized at that point.
+    """
+    __slots__ = ('store', 'name', '_data')
+
+    def __init__(self, store, name, data):
+        self.store = store
+        self.name = name
+        self._data = data
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def keys(self):
+        return self._data.keys()
+
+    def items(self):
+        return self._data.items()
+
+    def to_dict(self):
+        return dict(self._data)
+
+    def put(self, key, value):
+        self._data[key] = value
+        self.store._enqueue(self.name, key, _dumps(value))
+
+    def delete(self, key):
+        if key in self._data:
+            del self._data[key]
+            self.store._enqueue(self.name, key, None)
+
+    def clear(self):
+        self.store.clear(self.name)
+
+
+class StateStore:
+    """Shared SQLite (WAL) key/value store for cog state.
+
+    All writes go through one dedicated thread that batches pending changes and
+    commits them in a single transaction every ``flush_interval`` seconds.
+    Repeated writes to the same key before a flush coalesce into one row
+    update, so saving costs O(changed keys) rather than rewriting a whole file.
+    """
+    __slots__ = ('path', 'flush_interval', '_namespaces', '_pending', '_clears', '_lock',
+                 '_wake', '_stopping', '_thread', '_read_conn', '_waiters', '_executor', 'writes', 'flushes')
+
+    def __init__(self, path, flush_interval=_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._namespaces = {}
+        self._pending = {}
+        self._clears = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._read_conn = None
+        self._waiters = []
+        # One thread, so namespace loads never share the read connection concurrently.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='state-store-read')
+        self.writes = 0
+        self.flushes = 0
+
+    def open(self):
+        if self._read_conn is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+        self._read_conn = conn
+        self._stopping = False
+        self._thread = threading.Thread(target=self._writer, name='state-store-writer', daemon=True)
+        self._thread.start()
+
+    def namespace(self, name, legacy_path=None, transform=None):
+        """Return the namespace ``name``, importing ``legacy_path`` the first time.
+
+        ``legacy_path`` is an old JSON state file; it is imported once (tracked in
+        the ``imported`` table) and then left alone. ``transform`` converts the
+        loaded JSON document into a ``{key: value}`` mapping; by default the
+        top-level object's items are used as-is.
+        """
+        ns = self._namespaces.get(name)
+        if ns is not None:
+            return ns
+        self.open()
+        conn = self._read_conn
+        if legacy_path is not None:
+            self._import_legacy(conn, name, legacy_path, transform)
+        rows = conn.execute("SELECT key, value FROM kv WHERE ns = ?", (name,)).fetchall()
+        loads = serial.loads
+        ns = self._namespaces[name] = Namespace(self, name, {key: loads(value) for key, value in rows})
+        return ns
+
+    async def load(self, name, legacy_path=None, transform=None):
+        """``namespace`` run on the store's read thread; use this from ``cog_load``."""
+        ns = self._namespaces.get(name)
+        if ns is not None:
+            return ns
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.namespace, name, legacy_path, transform)
+
+    async def prepare(self, name, legacy_path=None, transform=None):
+        """Import ``legacy_path`` into ``name`` once, without keeping an in-memory copy."""
+        await self._run(self._prepare, name, legacy_path, transform)
+
+    async def fetch(self, name, key, default=None):
+        """Read one key straight from SQLite."""
+        value = await self._run(self._fetch, name, str(key))
+        return default if value is None else value
+
+    async def update(self, name, key, func):
+        """Replace a key with ``func(current)`` in one transaction and return the result.
+
+        ``current`` is None for a missing key; returning None deletes the key and
+        returning ``current`` itself skips the write. The transaction holds the
+        database's write lock, so other clusters' updates to the key are not lost.
+        """
+        return await self._run(self._update, name, str(key), func)
+
+    def clear(self, name):
+        """Delete every key in ``name``, whether or not it is loaded."""
+        ns = self._namespaces.get(name)
+        if ns is not None:
+            ns._data.clear()
+        self._enqueue_clear(name)
+
+    async def flush(self):
+        """Wait until everything queued so far has been committed."""
+        if self._thread is None:
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            self._waiters.append((loop, future))
+        self._wake.set()
+        await future
+
+    def close(self):
+        """Flush pending writes and stop the writer and read threads (blocking)."""
+        self._executor.shutdown(wait=True)
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        thread.join()
+        self._thread = None
+        self._read_conn.close()
+        self._read_conn = None
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending) + len(self._clears)
+        return {'namespaces': len(self._namespaces), 'pending': pending,
+                'writes': self.writes, 'flushes': self.flushes}
+
+    def _run(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _prepare(self, name, legacy_path, transform):
+        self.open()
+        if legacy_path is not None:
+            self._import_legacy(self._read_conn, name, legacy_path, transform)
+
+    def _fetch(self, name, key):
+        self.open()
+        row = self._read_conn.execute("SELECT value FROM kv WHERE ns = ? AND key = ?", (name, key)).fetchone()
+        return serial.loads(row[0]) if row else None
+
+    def _update(self, name, key, func):
+        self.open()
+        conn = self._read_conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM kv WHERE ns = ? AND key = ?", (name, key)).fetchone()
+            current = serial.loads(row[0]) if row else None
+            value = func(current)
+            if value is None:
+                conn.execute("DELETE FROM kv WHERE ns = ? AND key = ?", (name, key))
+            elif value is not current:
+                conn.execute("INSERT OR REPLACE INTO kv (ns, key, value) VALUES (?, ?, ?)",
+                             (name, key, _dumps(value)))
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return value
+
+    def _enqueue(self, ns, key, value):
+        with self._lock:
+            self._pending[(ns, key)] = value
+
+    def _enqueue_clear(self, ns):
+        with self._lock:
+            for pending_key in [k for k in self._pending if k[0] == ns]:
+                del self._pending[pending_key]
+            self._clears.add(ns)
+
+    def _import_legacy(self, conn, name, path, transform):
+        if conn.execute("SELECT 1 FROM imported WHERE ns = ?", (name,)).fetchone():
+            return
+        data = None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            if content.strip():
+                data = serial.loads(content)
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            print(f"Could not import {path} into state store ({e}). Starting fresh.")
+        rows = ()
+        if data is not None:
+            mapping = transform(data) if transform is not None else data
+            rows = [(name, str(key), _dumps(value)) for key, value in mapping.items()]
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO kv (ns, key, value) VALUES (?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO imported (ns, source) VALUES (?, ?)", (name, path))
+        if rows:
+            print(f"Imported {len(rows)} {name} entries from {path}")
+
+    def _writer(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        wake = self._wake
+        lock = self._lock
+        delay = self.flush_interval
+        failures = 0
+        try:
+            while True:
+                wake.wait(delay)
+                wake.clear()
+                with lock:
+                    pending, self._pending = self._pending, {}
+                    clears, self._clears = self._clears, set()
+                    waiters, self._waiters = self._waiters, []
+                if pending or clears:
+                    try:
+                        self._commit(conn, pending, clears)
+                    except sqlite3.Error as e:
+                        failures += 1
+                        if self._stopping and failures >= _CLOSE_ATTEMPTS:
+                            print(f"State store write failed, dropping {len(pending)} changes: {e}")
+                            for loop, future in waiters:
+                                loop.call_soon_threadsafe(_fail, future, e)
+                            break
+                        print(f"State store write failed (attempt {failures}), retrying: {e}")
+                        self._requeue(pending, clears, waiters)
+                        delay = min(self.flush_interval * 2 ** failures, _MAX_RETRY_DELAY)
+                        if self._stopping:
+                            delay = self.flush_interval
+                        continue
+                failures = 0
+                delay = self.flush_interval
+                for loop, future in waiters:
+                    loop.call_soon_threadsafe(_resolve, future)
+                if self._stopping:
+                    with lock:
+                        if not self._pending and not self._clears:
+                            break
+        finally:
+            conn.close()
+
+    def _requeue(self, pending, clears, waiters):
+        """Put a batch that failed to commit back in front of what was queued since."""
+        with self._lock:
+            newer, newer_clears = self._pending, self._clears
+            for (ns, key), value in pending.items():
+                # A later write to the key, or a later clear of its namespace, wins.
+                if (ns, key) not in newer and ns not in newer_clears:
+                    newer[(ns, key)] = value
+            # Clears commit before upserts, so writes queued after them still land.
+            newer_clears |= clears
+            self._waiters[:0] = waiters
+
+    def _commit(self, conn, pending, clears):
+        upserts = []
+        deletes = []
+        for (ns, key), value in pending.items():
+            if value is None:
+                deletes.append((ns, key))
+            else:
+                upserts.append((ns, key, value))
+        with conn:
+            for ns in clears:
+                conn.execute("DELETE FROM kv WHERE ns = ?", (ns,))
+            if deletes:
+                conn.executemany("DELETE FROM kv WHERE ns = ? AND key = ?", deletes)
+            if upserts:
+                conn.executemany("INSERT OR REPLACE INTO kv (ns, key, value) VALUES (?, ?, ?)", upserts)
+        self.writes += len(upserts) + len(deletes)
+        self.flushes += 1
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _fail(future, error):
+    if not future.done():
+        future.set_exception(error)
@@ -0,0 +1,403 @@
+"""Text-to-speech pipeline: pluggable synthesizer, streamed decode, phrase cache.
+
+A ``TTSBackend`` turns text into encoded audio bytes (mp3 from gTTS, wav
+from a local engine such as piper or espeak-ng). ``TTSPipeline`` converts
+that to 48kHz stereo PCM without touching disk, either directly for
+48kHz 16-bit WAV or by piping it through ffmpeg's stdin/stdout. It then
+cuts the PCM into 20ms frames, Opus-encoding them when libopus is loaded.
+
+A clip is handed out as soon as synthesis is done: ffmpeg's output is
+framed and encoded block by block while the clip plays, and a source that
+catches up with the decoder waits for the next block. Text longer than one
+synthesizer request is split at sentence and word boundaries; ``clips``
+yields each part as it is ready, so the first one plays while the rest are
+synthesized.
+
+Finished clips are cached under a SHA-1 of ``(backend, lang, voice, text)``,
+so a repeated phrase plays straight from memory with no synthesis, ffmpeg
+or encode step. Each clip also keeps the synthesizer's own bytes, which
+``handle`` serves over HTTP so Lavalink can play the clip over the music
+player's connection (see ``cogs.utils.voice``).
+"""
+import abc
+import asyncio
+import hashlib
+import io
+import re
+import shlex
+import threading
+import wave
+from array import array
+from collections import OrderedDict
+
+import discord
+from aiohttp import web
+
+_SAMPLE_RATE = 48000
+_CHANNELS = 2
+_FRAME_BYTES = discord.opus.Encoder.FRAME_SIZE
+_FRAME_SAMPLES = discord.opus.Encoder.SAMPLES_PER_FRAME
+_DEFAULT_BUDGET = 16 << 20
+# Characters per synthesizer request; longer text is split into several clips.
+_MAX_TEXT = 500
+# Frames decoded and encoded per step while streaming (0.5s of audio).
+_STREAM_FRAMES = 25
+# How long a source waits for the decoder before giving up on the clip.
+_FRAME_WAIT = 5.0
+_CONTENT_TYPES = {'wav': 'audio/wav', 'mp3': 'audio/mpeg', 'ogg': 'audio/ogg'}
+_SENTENCE_END = re.compile(r'(?<=[.!?;:])\s+|\n+')
+
+
+class TTSError(Exception):
+    pass
+
+
+class TTSBackend(abc.ABC):
+    """Synthesizer interface. ``synthesize`` returns audio bytes in ``format``."""
+
+    name = 'base'
+    format = 'wav'
+
+    @abc.abstractmethod
+    async def synthesize(self, text, lang, voice):
+        """Return ``text`` spoken in ``lang`` (and ``voice``, if the engine has voices) as ``format`` bytes."""
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS. ``voice`` selects the accent via gTTS' ``tld``."""
+
+    name = 'gtts'
+    format = 'mp3'
+
+    def _synthesize(self, text, lang, voice):
+        from gtts import gTTS
+
+        buf = io.BytesIO()
+        gTTS(text=text, lang=lang, tld=voice or 'com').write_to_fp(buf)
+        return buf.getvalue()
+
+    async def synthesize(self, text, lang, voice):
+        return await asyncio.to_thread(self._synthesize, text, lang, voice)
+
+
+class CommandBackend(TTSBackend):
+    """Local engine run as a subprocess: text on stdin, audio on stdout.
+
+    ``{lang}`` and ``{voice}`` in the command are filled per request, e.g.
+    ``espeak-ng --stdout -v {voice}`` or
+    ``piper --model en_US-lessac-medium.onnx --output_file -``. Any other
+    braces are passed through as written.
+    """
+
+    def __init__(self, command, format='wav', name=None):
+        self.argv = shlex.split(command) if isinstance(command, str) else list(command)
+        self.format = format
+        self.name = name or self.argv[0]
+
+    async def synthesize(self, text, lang, voice):
+        argv = [arg.replace('{lang}', lang).replace('{voice}', voice or lang) for arg in self.argv]
+        process = await asyncio.create_subprocess_exec(
+            *argv, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        out, err = await process.communicate(text.encode())
+        if process.returncode != 0 or not out:
+            raise TTSError(f'{self.name} exited with {process.returncode}: {err.decode(errors="replace").strip()[:200]}')
+        return out
+
+
+def split_text(text, limit=_MAX_TEXT):
+    """Split ``text`` into parts of at most ``limit`` characters, at sentence ends where possible."""
+    parts = []
+    current = ''
+    for sentence in _SENTENCE_END.split(text.strip()):
+        for word in sentence.split():
+            while len(word) > limit:
+                if current:
+                    parts.append(current)
+                    current = ''
+                parts.append(word[:limit])
+                word = word[limit:]
+            if not current:
+                current = word
+            elif len(current) + 1 + len(word) <= limit:
+                current = f'{current} {word}'
+            else:
+                parts.append(current)
+                current = word
+        # Start the next sentence in a new part if this one is already past half full.
+        if len(current) > limit // 2:
+            parts.append(current)
+            current = ''
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _wav_pcm(data):
+    """Return 48kHz stereo s16le PCM from a WAV, or ``None`` if it needs resampling."""
+    try:
+        with wave.open(io.BytesIO(data)) as w:
+            if w.getframerate() != _SAMPLE_RATE or w.getsampwidth() != 2 or w.getnchannels() not in (1, 2):
+                return None
+            channels = w.getnchannels()
+            pcm = w.readframes(w.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    if channels == 1:
+        mono = array('h', pcm)
+        stereo = array('h', bytes(len(pcm) * 2))
+        stereo[0::2] = mono
+        stereo[1::2] = mono
+        pcm = stereo.tobytes()
+    return pcm
+
+
+def _frames(pcm):
+    """Split PCM into 20ms frames, zero-padding the last one."""
+    frames = [pcm[i:i + _FRAME_BYTES] for i in range(0, len(pcm), _FRAME_BYTES)]
+    if frames and len(frames[-1]) < _FRAME_BYTES:
+        frames[-1] = frames[-1].ljust(_FRAME_BYTES, b'\0')
+    return frames
+
+
+class Clip:
+    """A synthesized phrase, held as 20ms frames (Opus packets or raw PCM) plus the encoded audio.
+
+    ``frames`` grows while the clip is still being decoded; ``done`` is set
+    once it is complete (or decoding failed, with ``error`` set).
+    """
+
+    __slots__ = ('key', 'frames', 'opus', 'data', 'format', 'nbytes', 'done', 'error', '_ready', '_encoder')
+
+    def __init__(self, frames, opus, key=None, data=b'', format='wav', done=True):
+        self.key = key
+        self.frames = list(frames)
+        self.opus = opus
+        self.data = data
+        self.format = format
+        self.nbytes = sum(len(f) for f in self.frames) + len(data)
+        self.done = done
+        self.error = None
+        self._ready = threading.Condition()
+        self._encoder = None
+
+    @property
+    def duration(self):
+        return len(self.frames) * 0.02
+
+    def source(self):
+        return ClipSource(self)
+
+    def _encode(self, pcm_frames):
+        if not self.opus:
+            return pcm_frames
+        if self._encoder is None:
+            self._encoder = discord.opus.Encoder()
+        encode = self._encoder.encode
+        return [encode(frame, _FRAME_SAMPLES) for frame in pcm_frames]
+
+    def _extend(self, frames):
+        with self._ready:
+            self.frames.extend(frames)
+            self.nbytes += sum(len(f) for f in frames)
+            self._ready.notify_all()
+
+    def _finish(self, error=None):
+        with self._ready:
+            self.error = error
+            self.done = True
+            self._encoder = None
+            self._ready.notify_all()
+
+    def wait_frame(self, index, timeout=_FRAME_WAIT):
+        """Block until frame ``index`` exists or the clip is done; True if the frame exists."""
+        with self._ready:
+            self._ready.wait_for(lambda: index < len(self.frames) or self.done, timeout)
+            return index < len(self.frames)
+
+
+class ClipSource(discord.AudioSource):
+    """Plays a ``Clip``; each player gets its own cursor over shared frames.
+
+    ``read`` runs on discord.py's player thread, so waiting there for a
+    frame that is still being decoded does not block the event loop.
+    """
+
+    def __init__(self, clip):
+        self._clip = clip
+        self._frames = clip.frames
+        self._opus = clip.opus
+        self._index = 0
+
+    def read(self):
+        i = self._index
+        if i >= len(self._frames) and not self._clip.wait_frame(i):
+            return b''
+        self._index = i + 1
+        return self._frames[i]
+
+    def is_opus(self):
+        return self._opus
+
+
+class TTSPipeline:
+    """Synthesize, decode and frame phrases, with a byte-budgeted LRU of finished clips."""
+
+    def __init__(self, backend, budget_bytes=_DEFAULT_BUDGET, ffmpeg='ffmpeg', base_url=None):
+        self.backend = backend
+        # Where ``handle`` is mounted, as Lavalink reaches it; None disables sharing.
+        self.base_url = base_url
+        self.budget_bytes = budget_bytes
+        self.ffmpeg = ffmpeg
+        self._clips = OrderedDict()
+        self._pending = {}
+        self._decoding = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, text, lang, voice):
+        raw = '\0'.join((self.backend.name, lang, voice or '', text))
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    async def clip(self, text, lang='en', voice=None):
+        """Return the ``Clip`` for ``text``, synthesizing it on a cache miss.
+
+        The clip is returned once synthesis is done and may still be decoding.
+        ``text`` must fit one request (``_MAX_TEXT``); use ``clips`` for more.
+        """
+        text = text.strip()
+        if not text:
+            raise TTSError('Nothing to say')
+        if len(text) > _MAX_TEXT:
+            raise TTSError(f'Text is over {_MAX_TEXT} characters; use clips() to split it')
+        key = self.key(text, lang, voice)
+        clip = self._clips.get(key)
+        if clip is not None:
+            self._clips.move_to_end(key)
+            self.hits += 1
+            return clip
+        clip = self._decoding.get(key)
+        if clip is not None:
+            self.hits += 1
+            return clip
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(self._build(key, text, lang, voice))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def clips(self, text, lang='en', voice=None):
+        """Yield a clip per part of ``text`` (see ``split_text``), each as soon as it is synthesized."""
+        parts = split_text(text)
+        if not parts:
+            raise TTSError('Nothing to say')
+        for part in parts:
+            yield await self.clip(part, lang, voice)
+
+    async def source(self, text, lang='en', voice=None):
+        return (await self.clip(text, lang, voice)).source()
+
+    def url(self, clip):
+        """HTTP URL of ``clip`` for Lavalink, or None when clips are not served."""
+        if self.base_url is None or not clip.data:
+            return None
+        return f'{self.base_url.rstrip("/")}/{clip.key}.{clip.format}'
+
+    async def handle(self, request):
+        """aiohttp handler for ``/tts/{name}``: the encoded audio of a cached clip."""
+        key = request.match_info['name'].partition('.')[0]
+        clip = self._clips.get(key) or self._decoding.get(key)
+        if clip is None:
+            raise web.HTTPNotFound()
+        return web.Response(body=clip.data, content_type=_CONTENT_TYPES.get(clip.format, 'application/octet-stream'))
+
+    async def _build(self, key, text, lang, voice):
+        self.misses += 1
+        backend = self.backend
+        data = await backend.synthesize(text, lang, voice)
+        opus = discord.opus.is_loaded()
+        pcm = _wav_pcm(data) if backend.format == 'wav' else None
+        if pcm is not None:
+            clip = Clip((), opus, key, data, backend.format)
+            clip._extend(await asyncio.to_thread(clip._encode, _frames(pcm)))
+            clip._finish()
+            self._store(key, clip)
+            return clip
+        clip = Clip((), opus, key, data, backend.format, done=False)
+        self._decoding[key] = clip
+        asyncio.create_task(self._decode(clip))
+        return clip
+
+    async def _decode(self, clip):
+        """Pipe ``clip.data`` through ffmpeg, adding frames to the clip as they come out."""
+        error = None
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.ffmpeg, '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0',
+                '-f', 's16le', '-ar', str(_SAMPLE_RATE), '-ac', str(_CHANNELS), 'pipe:1',
+                stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            feed = asyncio.create_task(self._feed(process.stdin, clip.data))
+            block = _FRAME_BYTES * _STREAM_FRAMES
+            pending = b''
+            while True:
+                chunk = await process.stdout.read(block)
+                if not chunk:
+                    break
+                pending += chunk
+                whole = len(pending) - len(pending) % _FRAME_BYTES
+                if whole:
+                    clip._extend(await asyncio.to_thread(clip._encode, _frames(pending[:whole])))
+                    pending = pending[whole:]
+            if pending:
+                clip._extend(await asyncio.to_thread(clip._encode, _frames(pending)))
+            await feed
+            err = await process.stderr.read()
+            if await process.wait() != 0:
+                error = TTSError(f'ffmpeg exited with {process.returncode}: {err.decode(errors="replace").strip()[:200]}')
+        except Exception as e:
+            error = e
+        finally:
+            clip._finish(error)
+            self._decoding.pop(clip.key, None)
+        if error is None:
+            self._store(clip.key, clip)
+
+    @staticmethod
+    async def _feed(stdin, data):
+        try:
+            stdin.write(data)
+            await stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            stdin.close()
+
+    def _store(self, key, clip):
+        clips = self._clips
+        old = clips.pop(key, None)
+        if old is not None:
+            self.bytes -= old.nbytes
+        clips[key] = clip
+        self.bytes += clip.nbytes
+        while self.bytes > self.budget_bytes and len(clips) > 1:
+            _, evicted = clips.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        self._clips.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {
+            'backend': self.backend.name,
+            'clips': len(self._clips),
+            'decoding': len(self._decoding),
+            'bytes': self.bytes,
+            'budget_bytes': self.budget_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
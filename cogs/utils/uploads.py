@@ -0,0 +1,236 @@
+"""Fit media command output under the guild's upload limit on the first encode.
+
+``record``, ``homelander``/``punisher``, ``aura``, ``ai_audio`` and the image
+generators used to render at fixed settings and only learn from the failed
+upload that the file was too big for the guild. ``UploadGovernor`` reads
+``guild.filesize_limit`` before anything is encoded:
+
+- ``budget`` is the limit less some headroom (the DM limit outside guilds).
+- A ladder function turns the budget and what is known about the media
+  (duration, dimensions, frame count) into encoder settings ordered from
+  best to cheapest, each with an estimated output size: bitrate and then
+  resolution and frame rate for video, WAV or an MP3 bitrate for audio,
+  size and frame count for GIFs, PNG or JPEG quality and scale for images.
+- ``fit`` starts at the best rung estimated to fit, so the usual case is one
+  encode, and only steps down the ladder while the result is still too big.
+
+Planned and actual sizes are kept per cog for the metrics endpoint, along
+with encode, fallback and give-up counts.
+"""
+import io
+import logging
+import math
+import os
+from functools import lru_cache
+
+import discord
+from discord.ext import commands
+
+from cogs.utils.metrics import Histogram
+
+# Upper bounds in bytes; the implicit last bucket is +Inf.
+SIZE_BUCKETS = (1 << 18, 1 << 19, 1 << 20, 2 << 20, 4 << 20, 8 << 20, 10 << 20, 25 << 20, 50 << 20, 100 << 20)
+# Actual size over planned size.
+RATIO_BUCKETS = (0.25, 0.5, 0.75, 0.9, 1.0, 1.1, 1.25, 1.5, 2.0, 4.0)
+_HEADROOM = 0.97
+# Container and header overhead on top of the stream bitrates.
+_MUX_OVERHEAD = 0.97
+# Below this many bits per pixel per frame x264 output turns to mush; trade resolution instead.
+_MIN_BITS_PER_PIXEL = 0.06
+_MIN_VIDEO_HEIGHT = 240
+_MIN_VIDEO_KBPS = 64
+_FALLBACK_FPS = 15
+_MP3_KBPS = (320, 256, 192, 160, 128, 96, 64, 48, 32)
+_MONO_BELOW_KBPS = 96
+# Empirical bytes per pixel per frame for palette GIFs of avatars, and per pixel for stills.
+_GIF_BYTES_PER_PIXEL = 0.9
+_PNG_BYTES_PER_PIXEL = 1.6
+_JPEG_BYTES_PER_PIXEL = {92: 0.45, 85: 0.3, 75: 0.22}
+
+log = logging.getLogger('jackybot.uploads')
+
+
+class TooLarge(commands.CommandError):
+    def __init__(self, cog, budget, size):
+        self.cog = cog
+        self.budget = budget
+        self.size = size
+        super().__init__(f'{cog} output is {size} bytes, over the {budget} byte upload budget')
+
+    def user_message(self):
+        return (f"📦 Even the smallest version came out at {self.size / 1048576:.1f}MB, "
+                f"over this server's {self.budget / 1048576:.1f}MB upload limit.")
+
+
+class Rung:
+    """One set of encoder settings and the output size it is expected to produce."""
+    __slots__ = ('format', 'params', 'estimate')
+
+    def __init__(self, format, params, estimate):
+        self.format = format
+        self.params = params
+        self.estimate = int(estimate)
+
+    def __repr__(self):
+        return f'<Rung {self.format} {self.params} ~{self.estimate}B>'
+
+
+# ---- Ladders ----
+def video_ladder(budget, duration, width, height, fps, audio_kbps=128):
+    """H.264/AAC settings for ``duration`` seconds of ``width``x``height`` video.
+
+    Each rung carries ``video_kbps`` (a cap for capped CRF), ``audio_kbps``,
+    even output dimensions and a frame rate. The first spends the whole
+    budget; the fallbacks take 25% and 50% off it and the audio.
+    """
+    total_kbps = budget * 8 / 1000 / max(duration, 0.1) * _MUX_OVERHEAD
+    rungs = []
+    for share, audio_cap in ((1.0, audio_kbps), (0.75, 96), (0.5, 64)):
+        audio = min(audio_kbps, audio_cap)
+        video = max(_MIN_VIDEO_KBPS, int(total_kbps * share) - audio)
+        w, h, rate = _video_shape(video, width, height, fps)
+        rungs.append(Rung('mp4', {'video_kbps': video, 'audio_kbps': audio, 'width': w, 'height': h, 'fps': rate},
+                          duration * (video + audio) * 1000 / 8 / _MUX_OVERHEAD))
+    return rungs
+
+
+def _video_shape(video_kbps, width, height, fps):
+    """Largest size (then frame rate) that keeps enough bits per pixel at ``video_kbps``."""
+    bits = video_kbps * 1000
+    scale = min(1.0, math.sqrt(bits / (width * height * fps * _MIN_BITS_PER_PIXEL)))
+    if height * scale < _MIN_VIDEO_HEIGHT:
+        scale = min(1.0, _MIN_VIDEO_HEIGHT / height)
+        fps = min(fps, _FALLBACK_FPS)
+    return int(width * scale) & ~1, int(height * scale) & ~1, fps
+
+
+def audio_ladder(budget, duration, channels=2, rate=48000, sample_width=2, lossless=False, max_kbps=192):
+    """WAV (when ``lossless`` and it fits) then MP3 at the standard bitrates that fit, falling to mono."""
+    rungs = []
+    if lossless:
+        rungs.append(Rung('wav', {'channels': channels, 'kbps': None}, duration * rate * channels * sample_width + 44))
+    fitting = budget * 8 / 1000 / max(duration, 0.1) * _MUX_OVERHEAD
+    rates = [kbps for kbps in _MP3_KBPS if kbps <= max_kbps]
+    start = next((i for i, kbps in enumerate(rates) if kbps <= fitting), len(rates) - 1)
+    for kbps in rates[start:start + 3]:
+        mono = 1 if kbps < _MONO_BELOW_KBPS else min(channels, 2)
+        rungs.append(Rung('mp3', {'channels': mono, 'kbps': kbps}, duration * kbps * 1000 / 8 / _MUX_OVERHEAD))
+    return rungs
+
+
+def gif_ladder(size, frame_count, frame_duration):
+    """Square GIF sizes and frame counts, best first; the loop keeps its length as frames drop."""
+    period = frame_count * frame_duration
+    rungs = []
+    for scale, frames in ((1.0, frame_count), (1.0, frame_count // 2), (0.75, frame_count // 2),
+                          (0.5, frame_count // 3)):
+        side = max(16, int(size * scale))
+        frames = max(2, frames)
+        rungs.append(Rung('gif', {'size': side, 'frames': frames, 'frame_duration': round(period / frames)},
+                          side * side * frames * _GIF_BYTES_PER_PIXEL))
+    return rungs
+
+
+def image_ladder(width, height):
+    """PNG, then JPEG at falling quality and scale."""
+    rungs = [Rung('png', {'quality': None, 'scale': 1.0}, width * height * _PNG_BYTES_PER_PIXEL)]
+    for quality, scale in ((92, 1.0), (85, 0.75), (75, 0.5)):
+        rungs.append(Rung('jpeg', {'quality': quality, 'scale': scale},
+                          width * height * scale * scale * _JPEG_BYTES_PER_PIXEL[quality]))
+    return rungs
+
+
+def plan(rungs, budget):
+    """``rungs`` from the first one estimated to fit ``budget`` (just the last if none does)."""
+    for i, rung in enumerate(rungs):
+        if rung.estimate <= budget:
+            return rungs[i:]
+    return rungs[-1:]
+
+
+# ---- Encoders ----
+def encode_image(data, rung):
+    """Re-encode PNG bytes for ``rung``; the PNG itself is returned untouched."""
+    scale = rung.params['scale']
+    if rung.format == 'png' and scale == 1.0:
+        return data
+    from PIL import Image
+    image = Image.open(io.BytesIO(data))
+    if scale != 1.0:
+        image = image.resize((int(image.width * scale), int(image.height * scale)), Image.LANCZOS)
+    output = io.BytesIO()
+    if rung.format == 'jpeg':
+        image.convert('RGB').save(output, format='JPEG', quality=rung.params['quality'], optimize=True)
+    else:
+        image.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+
+def x264_args(rung):
+    """ffmpeg-python output options capping the video at ``rung``'s bitrate; CRF still sets quality below it."""
+    params = rung.params
+    video = params['video_kbps']
+    return {'maxrate': f'{video}k', 'bufsize': f'{video * 2}k', 'audio_bitrate': f"{params['audio_kbps']}k",
+            'r': params['fps']}
+
+
+@lru_cache(maxsize=16)
+def probe_video(path):
+    """``(duration, width, height, fps)`` of a template video, probed once."""
+    import ffmpeg
+    probe = ffmpeg.probe(path)
+    video = next(s for s in probe['streams'] if s['codec_type'] == 'video')
+    num, _, den = video.get('avg_frame_rate', '30/1').partition('/')
+    fps = float(num) / float(den or 1) if float(num) else 30.0
+    return float(probe['format']['duration']), int(video['width']), int(video['height']), fps
+
+
+def _size(payload):
+    if isinstance(payload, (bytes, bytearray)):
+        return len(payload)
+    return os.path.getsize(payload)
+
+
+class UploadGovernor:
+    """Per-guild upload budgets and the encode-until-it-fits loop, with size metrics by cog."""
+
+    def __init__(self, headroom=_HEADROOM):
+        self.headroom = headroom
+        self.planned = {}
+        self.actual = {}
+        self.accuracy = {}
+        self.encodes = {}
+        self.fallbacks = {}
+        self.oversize = {}
+
+    def budget(self, guild):
+        """Bytes an upload may take in ``guild``; pass None for DMs, which get Discord's default limit."""
+        limit = guild.filesize_limit if guild is not None else discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES
+        return int(limit * self.headroom)
+
+    async def fit(self, cog, rungs, encode, budget):
+        """Await ``encode(rung)`` down the planned ladder until its output fits.
+
+        ``encode`` returns bytes or a file path. Returns ``(rung, payload)``;
+        raises ``TooLarge`` when even the cheapest rung is over budget.
+        """
+        size = 0
+        for rung in plan(rungs, budget):
+            payload = await encode(rung)
+            size = _size(payload)
+            self._record(cog, rung, size)
+            if size <= budget:
+                return rung, payload
+            self.fallbacks[cog] = self.fallbacks.get(cog, 0) + 1
+            log.info('%s output of %d bytes is over the %d byte budget at %r', cog, size, budget, rung)
+        self.oversize[cog] = self.oversize.get(cog, 0) + 1
+        raise TooLarge(cog, budget, size)
+
+    def _record(self, cog, rung, size):
+        self.encodes[cog] = self.encodes.get(cog, 0) + 1
+        for table, value, bounds in ((self.planned, rung.estimate, SIZE_BUCKETS), (self.actual, size, SIZE_BUCKETS),
+                                     (self.accuracy, size / max(rung.estimate, 1), RATIO_BUCKETS)):
+            hist = table.get(cog)
+            if hist is None:
+                hist = table[cog] = Histogram(bounds)
+            hist.observe(value)
@@ -0,0 +1,365 @@
+"""Shared voice connections: one per guild, handed between producers by priority.
+
+Music (a wavelink ``Player``; Lavalink sends the audio), TTS and recording
+(local discord.py clients) each used to connect on their own, tearing down
+whatever ``guild.voice_client`` another feature had. ``VoiceManager`` owns
+that connection. A feature describes itself with a ``VoiceProducer`` (name,
+priority, client class, optional suspend/resume hooks) and calls ``acquire``:
+
+- If the guild's client is already of the right class it is reused, and
+  moved if the request is for another channel. Local producers share one
+  client class, ``VoiceRecvClient`` when discord-ext-voice-recv is installed,
+  so TTS can speak into a channel that is being recorded.
+- Otherwise the current holders are compared. A holder of equal or higher
+  priority keeps the connection; the request waits up to ``wait`` seconds for
+  it to be released, then fails with ``VoiceBusy``. Lower priority holders
+  are suspended (their ``suspend`` hook returns the state to come back to),
+  disconnected, and handed to their ``resume`` hook once the session is free.
+
+Lavalink holds the voice session while music plays, so a local clip cannot be
+mixed over it. A clip that is also served over HTTP (``play(..., url=...)``)
+is instead handed to the holder's ``share`` hook: music pauses its track,
+has Lavalink play the clip over the same connection and picks the track up
+where it left off, with no voice handshake either side. Without a URL, or
+when the holder cannot share, the holder is suspended as above.
+
+Clips queued with ``play`` go out one at a time, highest priority first, and
+the producer's lease is released when its last clip ends. Clips dropped from
+the queue (the connection was taken or lost) have their ``after`` callback
+called with ``ClipCancelled``.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+import discord
+
+from cogs.utils.metrics import Histogram
+
+try:
+    from discord.ext.voice_recv import VoiceRecvClient as LOCAL_CLIENT
+except ImportError:
+    LOCAL_CLIENT = discord.VoiceClient
+
+PRIORITY_MUSIC = 10
+PRIORITY_TTS = 20
+PRIORITY_RECORD = 30
+_CONNECT_TIMEOUT = 30.0
+
+log = logging.getLogger('jackybot.voice')
+
+
+class VoiceBusy(Exception):
+    def __init__(self, holder):
+        self.holder = holder
+        super().__init__(f'Voice is in use by {holder}')
+
+
+class ClipCancelled(Exception):
+    """Passed to a queued clip's ``after`` callback when it will never be played."""
+
+
+class VoiceProducer:
+    """A feature that uses voice.
+
+    ``suspend(client)`` is awaited before a higher priority producer takes the
+    connection and returns the state to restore, or None for nothing;
+    ``resume(channel, state)`` is awaited once the connection is free again.
+    ``share(client, url, after)`` is awaited when another producer wants to play
+    the clip at ``url`` in this producer's channel; it returns True once it has
+    taken the clip on over its own connection (calling ``after(error)`` when the
+    clip ends) or False to have the connection taken over instead.
+    """
+    __slots__ = ('name', 'priority', 'cls', 'suspend', 'resume', 'share')
+
+    def __init__(self, name, priority, cls=None, suspend=None, resume=None, share=None):
+        self.name = name
+        self.priority = priority
+        self.cls = cls or LOCAL_CLIENT
+        self.suspend = suspend
+        self.resume = resume
+        self.share = share
+
+    def __repr__(self):
+        return f'<VoiceProducer {self.name} priority={self.priority}>'
+
+
+class VoiceSession:
+    __slots__ = ('leases', 'suspended', 'queue', 'playing', 'cond', 'resume_task')
+
+    def __init__(self):
+        self.leases = {}
+        self.suspended = []
+        self.queue = []
+        self.playing = None
+        self.cond = asyncio.Condition()
+        self.resume_task = None
+
+
+def _connected(client):
+    is_connected = getattr(client, 'is_connected', None)
+    if is_connected is not None:
+        return is_connected()
+    return bool(getattr(client, 'connected', False))
+
+
+class VoiceManager:
+    """Per-guild voice sessions shared by every feature that joins voice."""
+
+    def __init__(self, bot, linger=2.0):
+        self.bot = bot
+        self.linger = linger
+        self.sessions = {}
+        self.connect_latency = {}
+        self.counters = {'connects': 0, 'reuses': 0, 'moves': 0, 'preemptions': 0, 'resumes': 0,
+                         'shares': 0, 'busy': 0, 'failures': 0}
+        self._seq = itertools.count()
+        bot.add_listener(self._on_voice_state_update, 'on_voice_state_update')
+
+    def _session(self, guild_id):
+        session = self.sessions.get(guild_id)
+        if session is None:
+            session = self.sessions[guild_id] = VoiceSession()
+        return session
+
+    def holders(self, guild):
+        session = self.sessions.get(guild.id)
+        return sorted(session.leases) if session is not None else []
+
+    # ---- Connections ----
+    async def acquire(self, channel, producer, wait=0.0):
+        """Return a connected client of ``producer.cls`` in ``channel``, reusing the guild's if possible."""
+        session = self._session(channel.guild.id)
+        async with session.cond:
+            return await self._acquire(session, channel, producer, wait)
+
+    async def _acquire(self, session, channel, producer, wait):
+        guild = channel.guild
+        deadline = time.monotonic() + wait
+        while True:
+            holder = self._blocking(session, guild.voice_client, channel, producer)
+            if holder is None:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.counters['busy'] += 1
+                raise VoiceBusy(holder.name)
+            try:
+                await asyncio.wait_for(session.cond.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        client = await self._attach(session, guild, channel, producer)
+        session.leases[producer.name] = producer
+        return client
+
+    def _blocking(self, session, client, channel, producer):
+        """The holder that keeps ``producer`` out, if any."""
+        if client is None or not _connected(client):
+            return None
+        if isinstance(client, producer.cls) and client.channel == channel:
+            return None
+        top = None
+        for name, holder in session.leases.items():
+            if name != producer.name and (top is None or holder.priority > top.priority):
+                top = holder
+        if top is not None and top.priority >= producer.priority:
+            return top
+        return None
+
+    async def _attach(self, session, guild, channel, producer):
+        client = guild.voice_client
+        if client is not None:
+            if _connected(client) and isinstance(client, producer.cls):
+                if client.channel != channel:
+                    await client.move_to(channel)
+                    self.counters['moves'] += 1
+                else:
+                    self.counters['reuses'] += 1
+                return client
+            await self._suspend(session, client)
+            try:
+                await client.disconnect(force=True)
+            except Exception:
+                log.exception('Voice disconnect failed in guild %s', guild.id)
+
+        start = time.perf_counter()
+        try:
+            client = await channel.connect(cls=producer.cls, timeout=_CONNECT_TIMEOUT)
+        except Exception:
+            self.counters['failures'] += 1
+            raise
+        hist = self.connect_latency.get(producer.name)
+        if hist is None:
+            hist = self.connect_latency[producer.name] = Histogram()
+        hist.observe(time.perf_counter() - start)
+        self.counters['connects'] += 1
+        return client
+
+    async def _suspend(self, session, client):
+        """Hand every holder of ``client`` to its suspend hook before it is disconnected."""
+        channel = client.channel
+        for producer in list(session.leases.values()):
+            state = None
+            if producer.suspend is not None and producer.resume is not None:
+                try:
+                    state = await producer.suspend(client)
+                except Exception:
+                    log.exception('Suspending %s failed', producer.name)
+            if state is not None:
+                session.suspended.append((producer, channel, state))
+                self.counters['preemptions'] += 1
+        session.leases.clear()
+        _cancel_queue(session)
+        session.playing = None
+
+    async def release(self, guild, producer, disconnect=False):
+        """Drop ``producer``'s lease; resume suspended producers or, if asked, disconnect when unused."""
+        session = self.sessions.get(guild.id)
+        if session is None:
+            return
+        async with session.cond:
+            await self._release(session, guild, producer, disconnect)
+
+    async def _release(self, session, guild, producer, disconnect):
+        session.leases.pop(producer.name, None)
+        session.cond.notify_all()
+        if session.leases:
+            return
+        if session.suspended:
+            if session.resume_task is None or session.resume_task.done():
+                session.resume_task = asyncio.create_task(self._resume(guild, session))
+        elif disconnect:
+            client = guild.voice_client
+            if client is not None:
+                await client.disconnect(force=True)
+
+    async def _resume(self, guild, session):
+        # Give back-to-back clips a moment to reuse the connection first.
+        await asyncio.sleep(self.linger)
+        async with session.cond:
+            if session.leases or not session.suspended:
+                return
+            pending = session.suspended
+            session.suspended = []
+        for producer, channel, state in pending:
+            try:
+                await producer.resume(channel, state)
+                self.counters['resumes'] += 1
+            except Exception:
+                log.exception('Resuming %s in guild %s failed', producer.name, guild.id)
+
+    async def disconnect(self, guild):
+        """Leave voice in ``guild`` and forget its session, suspended producers included."""
+        session = self.sessions.pop(guild.id, None)
+        if session is not None:
+            _cancel_queue(session)
+            if session.resume_task is not None:
+                session.resume_task.cancel()
+        client = guild.voice_client
+        if client is not None:
+            await client.disconnect(force=True)
+
+    async def _on_voice_state_update(self, member, before, after):
+        if after.channel is not None or self.bot.user is None or member.id != self.bot.user.id:
+            return
+        guild = member.guild
+        # A reconnect by acquire() has already registered the new client.
+        if guild.voice_client is not None:
+            return
+        session = self.sessions.get(guild.id)
+        if session is None:
+            return
+        session.leases.clear()
+        _cancel_queue(session)
+        session.playing = None
+        if not session.suspended:
+            del self.sessions[guild.id]
+
+    # ---- Local playback ----
+    async def play(self, channel, producer, source, after=None, wait=0.0, url=None):
+        """Queue ``source`` on the guild's local client; ``after(error)`` runs when it ends.
+
+        ``url`` serves the same clip over HTTP, so a holder with a ``share`` hook
+        can play it over its own connection instead of giving that up.
+        """
+        session = self._session(channel.guild.id)
+        async with session.cond:
+            if url is not None:
+                client = await self._share(session, channel, producer, url, after)
+                if client is not None:
+                    return client
+            client = await self._acquire(session, channel, producer, wait)
+            heapq.heappush(session.queue, (-producer.priority, next(self._seq), producer, source, after))
+            if session.playing is None:
+                self._play_next(channel.guild, session)
+        return client
+
+    async def _share(self, session, channel, producer, url, after):
+        client = channel.guild.voice_client
+        if client is None or not _connected(client) or client.channel != channel or isinstance(client, producer.cls):
+            return None
+        for holder in list(session.leases.values()):
+            if holder.share is None or not isinstance(client, holder.cls):
+                continue
+            try:
+                if await holder.share(client, url, after):
+                    self.counters['shares'] += 1
+                    return client
+            except Exception:
+                log.exception('%s could not share its connection with %s', holder.name, producer.name)
+            return None
+        return None
+
+    def _play_next(self, guild, session):
+        if not session.queue:
+            return
+        _, _, producer, source, after = heapq.heappop(session.queue)
+        session.playing = producer
+        loop = asyncio.get_running_loop()
+
+        def done(error):
+            loop.call_soon_threadsafe(self._finished, guild, session, producer, after, error)
+
+        client = guild.voice_client
+        try:
+            client.play(source, after=done)
+        except Exception as e:
+            self._finished(guild, session, producer, after, e)
+
+    def _finished(self, guild, session, producer, after, error):
+        session.playing = None
+        if after is not None:
+            try:
+                after(error)
+            except Exception:
+                log.exception('Voice after-callback failed')
+        if self.sessions.get(guild.id) is not session:
+            return
+        self._play_next(guild, session)
+        asyncio.create_task(self._release_idle(guild, session, producer))
+
+    async def _release_idle(self, guild, session, producer):
+        async with session.cond:
+            if session.playing is not producer and not any(item[2] is producer for item in session.queue):
+                await self._release(session, guild, producer, False)
+
+    def stats(self):
+        return {
+            'sessions': sum(1 for s in self.sessions.values() if s.leases),
+            'suspended': sum(len(s.suspended) for s in self.sessions.values()),
+            'queued': sum(len(s.queue) for s in self.sessions.values()),
+            **self.counters,
+        }
+
+
+def _cancel_queue(session):
+    queue, session.queue = session.queue, []
+    for _, _, producer, _, after in sorted(queue):
+        if after is None:
+            continue
+        try:
+            after(ClipCancelled(f'{producer.name} clip dropped before it played'))
+        except Exception:
+            log.exception('Voice after-callback failed')
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_SELF = os.path.abspath(__file__)
+_TICK_INTERVAL = 0.05
+_MAX_STACK = 25
+
+
+def _offender(stack):
+    """Innermost frame that belongs to this project, else the innermost frame."""
+    for frame in reversed(stack):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(_PROJECT_ROOT) and filename != _SELF and 'site-packages' not in filename:
+            return f"{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.lineno} in {frame.name}"
+    if stack:
+        frame = stack[-1]
+        return f"{frame.filename}:{frame.lineno} in {frame.name}"
+    return "<unknown>"
+
+
+class LoopWatchdog:
+    """Detects event-loop stalls from a separate thread and samples the loop's stack.
+
+    The loop reschedules a cheap ``call_later`` tick every 50ms. The watchdog
+    thread polls that heartbeat; once it is more than ``threshold_ms`` late it
+    grabs the loop thread's current frame, so the sampled stack shows the code
+    that is blocking, and keeps sampling until the loop catches up. Stalls are
+    aggregated by the innermost project frame and appended to ``log_path``.
+    """
+    __slots__ = ('threshold', 'log_path', 'offenders', 'stalls', 'worst_ms', '_last_tick',
+                 '_loop', '_loop_thread_id', '_handle', '_thread', '_stop')
+
+    def __init__(self, threshold_ms=250, log_path='loop_stalls.log'):
+        self.threshold = threshold_ms / 1000
+        self.log_path = log_path
+        self.offenders = {}
+        self.stalls = 0
+        self.worst_ms = 0.0
+        self._last_tick = time.perf_counter()
+        self._loop = None
+        self._loop_thread_id = None
+        self._handle = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._tick()
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=1)
+            self._thread = None
+
+    def _tick(self):
+        self._last_tick = time.perf_counter()
+        self._handle = self._loop.call_later(_TICK_INTERVAL, self._tick)
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return []
+        return traceback.extract_stack(frame, limit=_MAX_STACK)
+
+    def _watch(self):
+        perf = time.perf_counter
+        wait = self._stop.wait
+        limit = self.threshold + _TICK_INTERVAL
+        poll = min(self.threshold / 2, 0.1)
+        while not wait(poll):
+            stalled_since = self._last_tick
+            if perf() - stalled_since < limit:
+                continue
+            samples = {}
+            first_stack = None
+            while not self._stop.is_set() and self._last_tick == stalled_since:
+                stack = self._sample()
+                if first_stack is None:
+                    first_stack = stack
+                location = _offender(stack)
+                samples[location] = samples.get(location, 0) + 1
+                wait(poll)
+            if self._last_tick == stalled_since:
+                break
+            duration_ms = (self._last_tick - stalled_since - _TICK_INTERVAL) * 1000
+            self._record(samples, first_stack or [], duration_ms)
+
+    def _record(self, samples, stack, duration_ms):
+        self.stalls += 1
+        if duration_ms > self.worst_ms:
+            self.worst_ms = duration_ms
+        location = max(samples, key=samples.get) if samples else _offender(stack)
+        entry = self.offenders.get(location)
+        if entry is None:
+            entry = self.offenders[location] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'samples': 0}
+        entry['count'] += 1
+        entry['total_ms'] += duration_ms
+        entry['samples'] += sum(samples.values())
+        if duration_ms > entry['max_ms']:
+            entry['max_ms'] = duration_ms
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(f"{datetime.now().isoformat()} stall {duration_ms:.0f}ms at {location}\n")
+                f.write(''.join(traceback.format_list(stack)))
+                f.write('\n')
+        except OSError as e:
+            print(f"Could not write loop stall log: {e}")
+
+    def report(self, n=10):
+        """Top offenders by total stalled time: ``[(location, entry), ...]``."""
+        items = list(self.offenders.items())
+        items.sort(key=lambda item: item[1]['total_ms'], reverse=True)
+        return items[:n]
+
+    def reset(self):
+        self.offenders.clear()
+        self.stalls = 0
+        self.worst_ms = 0.0
@@ -0,0 +1,275 @@
+"""Bot-wide HTTP client: one pooled aiohttp session, conditional-GET cache, single-flight.
+
+``WebClient.get`` returns a fully read ``WebResponse``. Successful GETs that
+carry an ``ETag`` or ``Last-Modified`` validator are stored on disk and
+revalidated with ``If-None-Match`` / ``If-Modified-Since``; a ``304`` is
+answered from the stored body. Concurrent identical GETs share one request.
+
+Entries are keyed on the URL, the query parameters and the caller's request
+headers, so responses that vary by header (``Accept``, ``Authorization``) do
+not collide; responses with ``Vary: *`` are not stored. Query parameters that
+look like credentials (``apikey``, ``token``...) are redacted from the URL
+kept in the on-disk metadata.
+Cogs that need the raw session (streaming, custom handling) use
+``WebClient.session``, which shares the same connection pool.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+import aiohttp
+from yarl import URL
+
+_USER_AGENT = 'JackyBot/1.0'
+_MAX_BODY_CACHE = 1 << 20
+_MAX_ENTRIES = 512
+# Query parameters whose values never reach the disk cache.
+_SECRET_PARAMS = frozenset(('apikey', 'api_key', 'key', 'token', 'access_token', 'secret', 'client_secret',
+                            'password', 'sig', 'signature'))
+_VALIDATORS = frozenset(('if-none-match', 'if-modified-since'))
+
+
+class WebResponse:
+    __slots__ = ('url', 'status', 'headers', 'body', 'from_cache', 'not_modified')
+
+    def __init__(self, url, status, headers, body, from_cache=False, not_modified=False):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.from_cache = from_cache
+        self.not_modified = not_modified
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    def text(self, encoding='utf-8'):
+        return self.body.decode(encoding, errors='replace')
+
+    def json(self):
+        return json.loads(self.body)
+
+
+def _max_age(cache_control):
+    for part in cache_control.split(','):
+        name, _, value = part.strip().partition('=')
+        if name.lower() == 'max-age' and value.isdigit():
+            return int(value)
+    return 0
+
+
+def _cache_key(url, params, headers):
+    """Disk-cache key: URL, sorted query parameters and request headers (validators excluded)."""
+    varying = sorted((k.lower(), v) for k, v in (headers or {}).items() if k.lower() not in _VALIDATORS)
+    raw = f'{url}?{sorted((params or {}).items())}#{varying}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _redact(url, params):
+    """``url`` with ``params`` applied and credential-like parameter values replaced by ``***``."""
+    parsed = URL(url)
+    if params:
+        parsed = parsed.update_query(params)
+    query = [(k, '***' if k.lower() in _SECRET_PARAMS else v) for k, v in parsed.query.items()]
+    return str(parsed.with_query(query))
+
+
+class WebClient:
+    """Shared HTTP client with per-host connection limits and keep-alive.
+
+    ``cache_dir`` holds one ``<sha1>.json`` (validators, headers) and one
+    ``<sha1>.body`` per cached URL; the oldest entries beyond ``max_entries``
+    are pruned when the client opens.
+    """
+
+    def __init__(self, cache_dir='data/http_cache', limit=100, limit_per_host=10,
+                 timeout=30, max_entries=_MAX_ENTRIES, user_agent=_USER_AGENT):
+        self.cache_dir = cache_dir
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.user_agent = user_agent
+        self._session = None
+        self._meta = {}
+        self._inflight = {}
+        self._pruned = False
+        self.requests = 0
+        self.revalidated = 0
+        self.fresh_hits = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    @property
+    def session(self):
+        session = self._session
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=300,
+                keepalive_timeout=30,
+                enable_cleanup_closed=True,
+            )
+            session = self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': self.user_agent},
+            )
+        return session
+
+    @property
+    def inflight(self):
+        return len(self._inflight)
+
+    # ---- Disk cache ----
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return f'{base}.json', f'{base}.body'
+
+    def _read_meta(self, key):
+        try:
+            with open(self._paths(key)[0], 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_body(self, key):
+        try:
+            with open(self._paths(key)[1], 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_entry(self, key, meta, body):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta_path, body_path = self._paths(key)
+        for path, data, mode in ((body_path, body, 'wb'), (meta_path, json.dumps(meta).encode(), 'wb')):
+            tmp = f'{path}.tmp'
+            with open(tmp, mode) as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+    def _prune(self):
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith('.json')]
+        except OSError:
+            return
+        if len(names) <= self.max_entries:
+            return
+        paths = [os.path.join(self.cache_dir, n) for n in names]
+        paths.sort(key=lambda p: os.path.getmtime(p))
+        for meta_path in paths[:len(paths) - self.max_entries]:
+            for path in (meta_path, meta_path[:-5] + '.body'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    async def _lookup(self, key):
+        meta = self._meta.get(key)
+        if meta is None:
+            if not self._pruned:
+                self._pruned = True
+                await asyncio.to_thread(self._prune)
+            meta = await asyncio.to_thread(self._read_meta, key)
+            if meta is not None:
+                self._meta[key] = meta
+        return meta
+
+    # ---- Requests ----
+    async def get(self, url, *, params=None, headers=None, timeout=None, cache=True):
+        """GET ``url`` and return a ``WebResponse``; network errors propagate."""
+        flight = (url, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items())), cache)
+        pending = self._inflight.get(flight)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+        task = asyncio.ensure_future(self._fetch(url, params, headers, timeout, cache))
+        self._inflight[flight] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._inflight.pop(flight, None)
+            else:
+                task.add_done_callback(lambda _: self._inflight.pop(flight, None))
+
+    async def get_json(self, url, **kwargs):
+        """GET ``url`` and decode JSON, or return ``None`` on a non-2xx status."""
+        resp = await self.get(url, **kwargs)
+        return resp.json() if resp.ok else None
+
+    async def _fetch(self, url, params, headers, timeout, cache):
+        key = meta = None
+        request_headers = dict(headers or {})
+        if cache:
+            key = _cache_key(url, params, headers)
+            meta = await self._lookup(key)
+            if meta is not None:
+                if meta['expires'] > time.time():
+                    body = await asyncio.to_thread(self._read_body, key)
+                    if body is not None:
+                        self.fresh_hits += 1
+                        return WebResponse(url, 200, meta['headers'], body, from_cache=True)
+                if meta.get('etag'):
+                    request_headers['If-None-Match'] = meta['etag']
+                if meta.get('last_modified'):
+                    request_headers['If-Modified-Since'] = meta['last_modified']
+
+        self.requests += 1
+        options = {'timeout': aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+        try:
+            async with self.session.get(url, params=params, headers=request_headers, **options) as resp:
+                status = resp.status
+                resp_headers = resp.headers
+                body = b'' if status == 304 else await resp.read()
+        except Exception:
+            self.errors += 1
+            raise
+
+        if status == 304 and meta is not None:
+            cached = await asyncio.to_thread(self._read_body, key)
+            if cached is not None:
+                self.revalidated += 1
+                meta['expires'] = time.time() + _max_age(resp_headers.get('Cache-Control', ''))
+                await asyncio.to_thread(self._write_entry, key, meta, cached)
+                return WebResponse(url, 200, meta['headers'], cached, from_cache=True, not_modified=True)
+            # Body vanished from disk; refetch unconditionally.
+            self._meta.pop(key, None)
+            return await self._fetch(url, params, headers, timeout, False)
+
+        if cache and status == 200 and len(body) <= _MAX_BODY_CACHE:
+            cache_control = resp_headers.get('Cache-Control', '')
+            etag = resp_headers.get('ETag')
+            last_modified = resp_headers.get('Last-Modified')
+            if (etag or last_modified) and 'no-store' not in cache_control and resp_headers.get('Vary') != '*':
+                meta = {
+                    'url': _redact(url, params),
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'expires': time.time() + _max_age(cache_control),
+                    'headers': {k: v for k, v in resp_headers.items() if k.lower() == 'content-type'},
+                }
+                self._meta[key] = meta
+                await asyncio.to_thread(self._write_entry, key, meta, body)
+        return WebResponse(url, status, resp_headers, body)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'revalidated': self.revalidated,
+            'fresh_hits': self.fresh_hits,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'inflight': self.inflight,
+        }
+
+    async def close(self):
+        session = self._session
+        self._session = None
+        if session is not None and not session.closed:
+            await session.close()
@@ -57,7 +57,7 @@ def log_request_info():
         logger.info(f"  Cookies received: {list(request.cookies.keys())}")
         logger.info(f"  Session keys: {list(session.keys())}")
 
-cog_manager = CogManager(Config.COG_SETTINGS_PATH, Config.COG_METADATA_PATH)
+cog_manager = CogManager(Config.COG_SETTINGS_PATH, Config.COG_METADATA_PATH, Config.COMMAND_REGISTRY_PATH)
 
 # Global list to track running FFmpeg processes
 ffmpeg_processes = []
@@ -1,31 +1,29 @@
-import json
 import os
 from typing import Dict, List, Optional
 from threading import Lock
 
+# The bot's serialization layer, from the jackybot package (pip install --no-deps -e ../..).
+from cogs.utils import schemas, serial
+
 class CogManager:
-    def __init__(self, settings_path: str, metadata_path: str):
+    def __init__(self, settings_path: str, metadata_path: str, commands_path: Optional[str] = None):
         self.settings_path = settings_path
         self.metadata_path = metadata_path
+        self.commands_path = commands_path
         self.lock = Lock()
         self._ensure_files_exist()
     
     def _ensure_files_exist(self):
         if not os.path.exists(self.settings_path):
-            os.makedirs(os.path.dirname(self.settings_path), exist_ok=True)
-            with open(self.settings_path, 'w') as f:
-                json.dump({}, f)
+            serial.write(self.settings_path, {})
         
         if not os.path.exists(self.metadata_path):
-            os.makedirs(os.path.dirname(self.metadata_path), exist_ok=True)
-            with open(self.metadata_path, 'w') as f:
-                json.dump([], f)
+            serial.write(self.metadata_path, [])
     
     def load_settings(self) -> Dict:
         with self.lock:
             try:
-                with open(self.settings_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                return serial.read(self.settings_path, schemas.COG_SETTINGS)
             except Exception as e:
                 print(f"Error loading settings: {e}")
                 return {}
@@ -33,8 +31,7 @@ class CogManager:
     def save_settings(self, settings: Dict):
         with self.lock:
             try:
-                with open(self.settings_path, 'w', encoding='utf-8') as f:
-                    json.dump(settings, f, indent=2)
+                serial.write(self.settings_path, settings)
             except Exception as e:
                 print(f"Error saving settings: {e}")
     
@@ -87,14 +84,25 @@ class CogManager:
     def load_metadata(self) -> List[Dict]:
         with self.lock:
             try:
-                with open(self.metadata_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                return serial.read(self.metadata_path, schemas.COG_METADATA, default=list)
             except Exception as e:
                 print(f"Error loading metadata: {e}")
                 return []
     
+    def load_commands(self) -> Dict[str, List[Dict]]:
+        """Commands per cog as last exported by the bot; empty until the bot has run."""
+        if not self.commands_path or not os.path.exists(self.commands_path):
+            return {}
+        try:
+            return serial.read(self.commands_path, schemas.COMMAND_REGISTRY)
+        except Exception as e:
+            print(f"Error loading commands: {e}")
+            return {}
+
     def get_all_cogs(self) -> List[Dict]:
-        return self.load_metadata()
+        metadata = self.load_metadata()
+        commands = self.load_commands()
+        return [{**cog, 'commands': commands.get(cog['name'], [])} for cog in metadata]
     
     def initialize_server_settings(self, server_id: str) -> Dict:
         settings = self.load_settings()
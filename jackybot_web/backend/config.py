@@ -38,3 +38,10 @@ class Config:
     else:
         COG_METADATA_PATH = str(BASE_DIR / 'cogs' / 'cog_metadata.json')
 
+    # Command list exported by the bot's command registry (cogs/utils/registry.py)
+    COMMAND_REGISTRY_PATH_ENV = os.environ.get('COMMAND_REGISTRY_PATH')
+    if COMMAND_REGISTRY_PATH_ENV:
+        COMMAND_REGISTRY_PATH = COMMAND_REGISTRY_PATH_ENV if os.path.isabs(COMMAND_REGISTRY_PATH_ENV) else str(BASE_DIR / COMMAND_REGISTRY_PATH_ENV)
+    else:
+        COMMAND_REGISTRY_PATH = str(BASE_DIR / 'data' / 'commands.json')
+
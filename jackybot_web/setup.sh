@@ -79,6 +79,8 @@ source "$BACKEND_DIR/venv/bin/activate"
 pip install --upgrade pip --quiet
 echo ">>> Installing Python dependencies..."
 pip install -r "$BACKEND_DIR/requirements.txt" --quiet
+echo ">>> Installing the bot's shared modules (cogs.utils)..."
+pip install --no-deps -e "$BACKEND_DIR/../.." --quiet
 echo ">>> Python backend setup complete"
 echo ""
 
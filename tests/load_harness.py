@@ -0,0 +1,501 @@
+"""Synthetic Discord load harness: the real bot against a fake gateway, REST API and Groq API.
+
+The harness runs ``bot.py`` in a child process pointed at a local server,
+which plays Discord (REST and a websocket gateway for every shard) and
+Groq's chat-completions endpoint. It then replays a workload across many
+synthetic guilds:
+
+- relay: messages in ``jackybot-chat`` channels, fanned out to the others.
+- mention: messages mentioning the bot, answered through GroqChat and the stub API.
+- poll: ``!poll`` commands.
+- vote: reactions on the polls created in the run; each vote is DM-confirmed.
+
+Every injected event is matched to the first REST call it causes: the reply
+for mentions and polls, the first relayed embed for relay messages, and the
+DM for votes. From those matches the harness reports throughput and
+p50/p99 latency per workload. It also reports the child's RSS (current and
+peak), and loop lag scraped from the bot's ``/metrics`` endpoint.
+
+    python -m tests.load_harness --guilds 2000 --relay-guilds 50 --messages 500 \\
+        --mentions 40 --polls 20 --votes 400 --rate 200
+
+Nothing leaves localhost; the bot runs in a scratch copy of ``data/`` and ``json/``.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import re
+import shutil
+import socket
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# GroqChat only answers mentions of this ID, and bot.py announces itself in STATUS_CHANNEL.
+BOT_ID = 1128674354696310824
+STATUS_CHANNEL = 1132395937180950599
+OWNER_ID = 103873926622363648
+USER_BASE = 10 ** 15
+DM_BASE = 2 * 10 ** 15
+TIMESTAMP = '2025-01-01T00:00:00+00:00'
+_TOKEN = re.compile(r'load-(\d+)')
+
+WORKLOAD_COGS = {'relay': (), 'mention': ('groq_chat', 'context_manager'), 'poll': ('poll',), 'vote': ('poll',)}
+
+BOT_SCRIPT = """
+import asyncio, os, sys
+sys.path.insert(0, {root!r})
+import discord, yarl
+discord.http.Route.BASE = {base!r} + '/api/v10'
+discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL({base!r} + '/gateway')
+import bot as jackybot
+jackybot._DISABLED_COGS = frozenset(f[:-3] for f in os.listdir('cogs') if f.endswith('.py')) - set({cogs!r})
+jackybot._LAZY_COGS = {{}}
+jackybot._DEFERRED_COGS = ()
+asyncio.run(jackybot.main())
+"""
+
+
+def _json(data, status=200):
+    # discord.py only decodes bodies whose content type is exactly application/json
+    return web.Response(body=json.dumps(data).encode(), status=status, content_type='application/json')
+
+
+def _user(user_id, name, bot=False):
+    return {'id': str(user_id), 'username': name, 'discriminator': '0', 'global_name': None,
+            'avatar': None, 'bot': bot}
+
+
+def _member(user_id):
+    return {'user': _user(user_id, f'user{user_id % 100000}'), 'roles': [], 'joined_at': TIMESTAMP,
+            'deaf': False, 'mute': False, 'flags': 0}
+
+
+def guild_id(index):
+    # Spread consecutive guilds over shards: shard = (id >> 22) % shard_count
+    return (index + 1) << 22
+
+
+def _guild(index, relay):
+    gid = guild_id(index)
+    channels = [{'id': str(gid + 1), 'type': 0, 'name': 'jackybot-chat' if relay else 'general',
+                 'position': 0, 'permission_overwrites': [], 'guild_id': str(gid)}]
+    if index == 0:
+        channels.append({'id': str(STATUS_CHANNEL), 'type': 0, 'name': 'bot-status', 'position': 1,
+                         'permission_overwrites': [], 'guild_id': str(gid)})
+    return {
+        'id': str(gid), 'name': f'load-guild-{index}', 'icon': None, 'owner_id': str(OWNER_ID),
+        'roles': [{'id': str(gid), 'name': '@everyone', 'permissions': '0', 'position': 0,
+                   'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}],
+        'channels': channels, 'members': [], 'member_count': 50, 'features': [], 'emojis': [],
+        'stickers': [], 'threads': [], 'voice_states': [], 'presences': [], 'unavailable': False,
+        'large': False,
+    }
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class FakeDiscord:
+    """Discord REST + gateway and Groq chat completions, with per-event latency tracking."""
+
+    def __init__(self, guilds, relay_guilds, groq_latency=0.0):
+        self.guilds = guilds
+        self.relay_guilds = min(relay_guilds, guilds)
+        self.groq_latency = groq_latency
+        self.sockets = {}
+        self.shard_count = 1
+        self.ready = asyncio.Event()
+        self.pending = {}
+        self.pending_votes = {}
+        self.latencies = {}
+        self.polls = []
+        self.requests = 0
+        self.unknown = {}
+        self._ids = itertools.count(10 ** 17)
+        self._seq = itertools.count(1)
+        app = web.Application(client_max_size=8 << 20)
+        route = app.router
+        route.add_get('/api/v10/users/@me', self.me)
+        route.add_get('/api/v10/oauth2/applications/@me', self.application)
+        route.add_get('/api/v10/gateway', self.gateway_info)
+        route.add_get('/api/v10/gateway/bot', self.gateway_bot)
+        route.add_post('/api/v10/channels/{channel_id}/messages', self.create_message)
+        route.add_post('/api/v10/channels/{channel_id}/typing', self.no_content)
+        route.add_put('/api/v10/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/{user}', self.no_content)
+        route.add_delete('/api/v10/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/{user}', self.no_content)
+        route.add_delete('/api/v10/channels/{channel_id}/messages/{message_id}', self.no_content)
+        route.add_post('/api/v10/users/@me/channels', self.create_dm)
+        route.add_post('/openai/v1/chat/completions', self.chat_completion)
+        route.add_get('/gateway', self.gateway)
+        route.add_route('*', '/{tail:.*}', self.fallback)
+        self.runner = web.AppRunner(app, access_log=None)
+
+    async def start(self):
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    async def close(self):
+        for ws in list(self.sockets.values()):
+            await ws.close()
+        await self.runner.cleanup()
+
+    # ---- Latency bookkeeping ----
+    def _complete(self, message_id):
+        entry = self.pending.pop(message_id, None)
+        if entry is not None:
+            kind, started = entry
+            self.latencies.setdefault(kind, []).append(time.perf_counter() - started)
+
+    # ---- REST ----
+    async def me(self, request):
+        return _json(_user(BOT_ID, 'JackyBot', bot=True))
+
+    async def application(self, request):
+        return _json({'id': str(BOT_ID), 'name': 'JackyBot', 'description': '', 'icon': None,
+                      'bot_public': True, 'bot_require_code_grant': False, 'verify_key': '',
+                      'owner': _user(OWNER_ID, 'owner'), 'flags': 0})
+
+    async def gateway_info(self, request):
+        return _json({'url': f"{self.base.replace('http', 'ws')}/gateway"})
+
+    async def gateway_bot(self, request):
+        return _json({'url': f"{self.base.replace('http', 'ws')}/gateway", 'shards': self.shard_count,
+                      'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 0,
+                                              'max_concurrency': 16}})
+
+    async def no_content(self, request):
+        self.requests += 1
+        return web.Response(status=204)
+
+    async def fallback(self, request):
+        self.requests += 1
+        key = f'{request.method} {re.sub(r"[0-9]{5,}", "{id}", request.path)}'
+        self.unknown[key] = self.unknown.get(key, 0) + 1
+        return web.Response(status=204)
+
+    async def create_dm(self, request):
+        self.requests += 1
+        recipient = int((await request.json())['recipient_id'])
+        return _json({'id': str(DM_BASE + recipient), 'type': 1, 'last_message_id': None,
+                      'recipients': [_user(recipient, f'user{recipient % 100000}')]})
+
+    async def create_message(self, request):
+        self.requests += 1
+        payload = await request.json()
+        channel_id = int(request.match_info['channel_id'])
+        message_id = next(self._ids)
+        if channel_id == STATUS_CHANNEL:
+            self.ready.set()
+        elif channel_id >= DM_BASE:
+            started = self.pending_votes.pop(channel_id - DM_BASE, None)
+            if started is not None:
+                self.latencies.setdefault('vote', []).append(time.perf_counter() - started)
+
+        reference = payload.get('message_reference') or {}
+        if reference.get('message_id'):
+            self._complete(int(reference['message_id']))
+        for embed in payload.get('embeds') or ():
+            title = embed.get('title') or ''
+            match = _TOKEN.search(embed.get('description') or '')
+            if match:
+                self._complete(int(match.group(1)))
+            elif title.startswith('🗳️') and 'Vote' not in title:
+                self.polls.append((channel_id, message_id))
+
+        return _json({
+            'id': str(message_id), 'channel_id': str(channel_id), 'author': _user(BOT_ID, 'JackyBot', bot=True),
+            'content': payload.get('content') or '', 'timestamp': TIMESTAMP, 'edited_timestamp': None,
+            'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [],
+            'embeds': payload.get('embeds') or [], 'pinned': False, 'type': 0,
+        })
+
+    async def chat_completion(self, request):
+        self.requests += 1
+        if self.groq_latency:
+            await asyncio.sleep(self.groq_latency)
+        return _json({
+            'id': 'chatcmpl-load', 'object': 'chat.completion', 'created': int(time.time()), 'model': 'stub',
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': 'A stub answer from the load harness.'}}],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+        })
+
+    # ---- Gateway ----
+    async def gateway(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        await ws.send_json({'op': 10, 'd': {'heartbeat_interval': 45000}})
+        async for msg in ws:
+            data = json.loads(msg.data)
+            op = data['op']
+            if op == 1:
+                await ws.send_json({'op': 11, 'd': None})
+            elif op == 2:
+                shard_id, shard_count = data['d'].get('shard') or (0, 1)
+                self.sockets[shard_id] = ws
+                indexes = [i for i in range(self.guilds) if (guild_id(i) >> 22) % shard_count == shard_id]
+                await self._send(ws, 'READY', {
+                    'v': 10, 'user': _user(BOT_ID, 'JackyBot', bot=True),
+                    'guilds': [{'id': str(guild_id(i)), 'unavailable': True} for i in indexes],
+                    'session_id': f'session-{shard_id}', 'resume_gateway_url': f"{self.base}/gateway",
+                    'shard': [shard_id, shard_count], 'application': {'id': str(BOT_ID), 'flags': 0},
+                })
+                for i in indexes:
+                    await self._send(ws, 'GUILD_CREATE', _guild(i, i < self.relay_guilds))
+        return ws
+
+    async def _send(self, ws, event, data):
+        await ws.send_json({'op': 0, 's': next(self._seq), 't': event, 'd': data})
+
+    def _socket(self, gid):
+        return self.sockets[(gid >> 22) % self.shard_count]
+
+    async def send_message(self, kind, index, content, user_id, track=True):
+        gid = guild_id(index)
+        message_id = next(self._ids)
+        content = content.format(token=f'load-{message_id}', bot=BOT_ID)
+        if track:
+            self.pending[message_id] = (kind, time.perf_counter())
+        await self._send(self._socket(gid), 'MESSAGE_CREATE', {
+            'id': str(message_id), 'channel_id': str(gid + 1), 'guild_id': str(gid),
+            'author': _user(user_id, f'user{user_id % 100000}'),
+            'member': {'roles': [], 'joined_at': TIMESTAMP, 'deaf': False, 'mute': False, 'flags': 0},
+            'content': content, 'timestamp': TIMESTAMP, 'edited_timestamp': None, 'tts': False,
+            'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [], 'embeds': [],
+            'pinned': False, 'type': 0,
+        })
+
+    async def add_reaction(self, channel_id, message_id, user_id, emoji):
+        gid = channel_id - 1
+        self.pending_votes[user_id] = time.perf_counter()
+        await self._send(self._socket(gid), 'MESSAGE_REACTION_ADD', {
+            'user_id': str(user_id), 'channel_id': str(channel_id), 'message_id': str(message_id),
+            'guild_id': str(gid), 'emoji': {'id': None, 'name': emoji}, 'member': _member(user_id),
+            'burst': False, 'type': 0,
+        })
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _rss(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+    except OSError:
+        return None, None
+    kb = lambda key: int(fields[key].split()[0]) * 1024 if key in fields else None
+    return kb('VmRSS'), kb('VmHWM')
+
+
+def _parse_metrics(text):
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, _, value = line.rpartition(' ')
+            try:
+                values[name] = float(value)
+            except ValueError:
+                pass
+    return values
+
+
+def _scratch_dir():
+    workdir = tempfile.mkdtemp(prefix='jackybot_load_')
+    for name in ('data', 'json'):
+        shutil.copytree(os.path.join(REPO_ROOT, name), os.path.join(workdir, name))
+    for name in ('assets', 'cogs', 'jackybot_system_prompt.md'):
+        os.symlink(os.path.join(REPO_ROOT, name), os.path.join(workdir, name))
+    return workdir
+
+
+async def _paced(coros, rate):
+    """Await ``coros`` in order, starting them ``rate`` per second."""
+    start = time.perf_counter()
+    for i, coro in enumerate(coros):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await coro
+
+
+async def _drain(discord, timeout):
+    deadline = time.perf_counter() + timeout
+    while (discord.pending or discord.pending_votes) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+
+
+async def run_load(guilds=1000, relay_guilds=20, messages=200, mentions=20, polls=10, votes=100,
+                   rate=100.0, shards=1, groq_latency=0.05, timeout=60.0, ready_timeout=120.0, keep=False):
+    """Run one load test and return the report as a dict."""
+    kinds = [k for k, n in (('relay', messages), ('mention', mentions), ('poll', polls), ('vote', votes)) if n]
+    cogs = sorted({cog for kind in kinds for cog in WORKLOAD_COGS[kind]})
+    discord = FakeDiscord(guilds, relay_guilds, groq_latency)
+    discord.shard_count = shards
+    await discord.start()
+    workdir = _scratch_dir()
+    metrics_port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        'DISCORD_BOT_TOKEN': 'load-harness', 'GROQ_API_KEY': 'load-harness', 'GROQ_BASE_URL': discord.base,
+        'JACKYBOT_METRICS_PORT': str(metrics_port), 'NO_PROXY': '127.0.0.1,localhost', 'no_proxy': '127.0.0.1,localhost',
+    })
+    for key in ('JACKYBOT_CLUSTERS', 'JACKYBOT_SHARD_IDS', 'JACKYBOT_IPC_PORT'):
+        env.pop(key, None)
+    if shards > 1:
+        env['JACKYBOT_SHARD_COUNT'] = str(shards)
+    else:
+        env.pop('JACKYBOT_SHARD_COUNT', None)
+
+    log_path = os.path.join(workdir, 'bot.log')
+    log_file = open(log_path, 'wb')
+    script = BOT_SCRIPT.format(root=REPO_ROOT, base=discord.base, cogs=cogs)
+    process = await asyncio.create_subprocess_exec(sys.executable, '-c', script, cwd=workdir, env=env,
+                                                   stdout=log_file, stderr=asyncio.subprocess.STDOUT)
+    report = {'guilds': guilds, 'relay_guilds': discord.relay_guilds, 'shards': shards, 'rate': rate,
+              'cogs': cogs, 'workloads': {}}
+    try:
+        started = time.perf_counter()
+        ready = asyncio.ensure_future(discord.ready.wait())
+        exited = asyncio.ensure_future(process.wait())
+        await asyncio.wait((ready, exited), timeout=ready_timeout, return_when=asyncio.FIRST_COMPLETED)
+        exited.cancel()
+        if not ready.done():
+            ready.cancel()
+            with open(log_path, 'rb') as f:
+                tail = f.read()[-3000:].decode(errors='replace')
+            raise RuntimeError(f'Bot did not become ready:\n{tail}')
+        report['ready_s'] = time.perf_counter() - started
+        report['rss_ready'] = _rss(process.pid)[0]
+
+        # Warm-up: register every relay channel (bot.py learns them from traffic).
+        users = itertools.count(USER_BASE)
+        for i in range(discord.relay_guilds):
+            await discord.send_message('relay', i, 'hello {token}', next(users), track=False)
+        await asyncio.sleep(0.5)
+
+        events = []
+        relay_n = max(1, discord.relay_guilds)
+        for n in range(max(messages, mentions, polls)):
+            if n < messages:
+                events.append(discord.send_message('relay', n % relay_n, 'relay traffic {token}', next(users)))
+            if n < mentions:
+                events.append(discord.send_message('mention', (n * 7) % guilds,
+                                                   '<@{bot}> tell me something nice {token}', next(users)))
+            if n < polls:
+                events.append(discord.send_message('poll', (n * 13) % guilds,
+                                                   '!poll "Load question {token}?" "Yes" "No"', next(users)))
+        phase_start = time.perf_counter()
+        await _paced(events, rate)
+        await _drain(discord, timeout)
+        if votes and discord.polls:
+            vote_events = []
+            for n in range(votes):
+                channel_id, message_id = discord.polls[n % len(discord.polls)]
+                vote_events.append(discord.add_reaction(channel_id, message_id, next(users), '1️⃣' if n % 2 else '2️⃣'))
+            await _paced(vote_events, rate)
+            await _drain(discord, timeout)
+        elapsed = time.perf_counter() - phase_start
+
+        injected = {'relay': messages, 'mention': mentions, 'poll': polls, 'vote': votes if discord.polls else 0}
+        for kind in kinds:
+            lat = discord.latencies.get(kind, [])
+            report['workloads'][kind] = {
+                'sent': injected[kind], 'completed': len(lat),
+                'p50_ms': percentile(lat, 0.50) * 1000, 'p99_ms': percentile(lat, 0.99) * 1000,
+                'max_ms': max(lat, default=0.0) * 1000,
+            }
+        completed = sum(w['completed'] for w in report['workloads'].values())
+        report['elapsed_s'] = elapsed
+        report['throughput'] = completed / elapsed if elapsed else 0.0
+        report['rest_requests'] = discord.requests
+        report['unknown_routes'] = discord.unknown
+        report['rss'], report['rss_peak'] = _rss(process.pid)
+        try:
+            async with __import__('aiohttp').ClientSession() as session:
+                async with session.get(f'http://127.0.0.1:{metrics_port}/metrics') as resp:
+                    metrics = _parse_metrics(await resp.text())
+            report['loop_lag_p99_ms'] = metrics.get('jackybot_loop_lag_quantile_seconds{quantile="0.99"}', 0.0) * 1000
+            report['loop_lag_max_ms'] = metrics.get('jackybot_loop_lag_max_seconds', 0.0) * 1000
+        except OSError:
+            report['loop_lag_p99_ms'] = report['loop_lag_max_ms'] = None
+        return report
+    finally:
+        if process.returncode is None:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), 15)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        log_file.close()
+        await discord.close()
+        if keep:
+            report['workdir'] = workdir
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def format_report(report):
+    mb = lambda n: f'{n / (1 << 20):.1f} MB' if n else 'n/a'
+    ms = lambda v: 'n/a' if v is None else f'{v:.1f} ms'
+    lines = [
+        f"{report['guilds']} guilds ({report['relay_guilds']} relay), {report['shards']} shard(s), "
+        f"cogs: {', '.join(report['cogs']) or 'none'}; ready in {report['ready_s']:.1f}s",
+        f"{'workload':<10}{'sent':>8}{'done':>8}{'p50':>12}{'p99':>12}{'max':>12}",
+    ]
+    for kind, w in report['workloads'].items():
+        lines.append(f"{kind:<10}{w['sent']:>8}{w['completed']:>8}{w['p50_ms']:>10.1f}ms"
+                     f"{w['p99_ms']:>10.1f}ms{w['max_ms']:>10.1f}ms")
+    lines.append(f"throughput {report['throughput']:.1f} events/s over {report['elapsed_s']:.1f}s, "
+                 f"{report['rest_requests']} REST calls")
+    lines.append(f"RSS {mb(report['rss_ready'])} at ready, {mb(report['rss'])} after, peak {mb(report['rss_peak'])}")
+    lines.append(f"loop lag p99 {ms(report['loop_lag_p99_ms'])}, max {ms(report['loop_lag_max_ms'])}")
+    if report['unknown_routes']:
+        lines.append(f"unhandled routes: {report['unknown_routes']}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--guilds', type=int, default=1000)
+    parser.add_argument('--relay-guilds', type=int, default=20)
+    parser.add_argument('--messages', type=int, default=200, help='relay chat messages')
+    parser.add_argument('--mentions', type=int, default=20, help='Groq mentions')
+    parser.add_argument('--polls', type=int, default=10)
+    parser.add_argument('--votes', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=100.0, help='events injected per second')
+    parser.add_argument('--shards', type=int, default=1)
+    parser.add_argument('--groq-latency', type=float, default=0.05, help='stub Groq API response time (s)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for outstanding events')
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--keep', action='store_true', help="keep the scratch dir (with the bot's log)")
+    args = parser.parse_args(argv)
+    report = asyncio.run(run_load(
+        guilds=args.guilds, relay_guilds=args.relay_guilds, messages=args.messages, mentions=args.mentions,
+        polls=args.polls, votes=args.votes, rate=args.rate, shards=args.shards,
+        groq_latency=args.groq_latency, timeout=args.timeout, keep=args.keep))
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import asyncio
+import io
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import aiohttp
+from PIL import Image
+
+from cogs.utils.avatars import AvatarCache
+from cogs.utils.render import aura_gif
+
+
+def _png(color):
+    buffer = io.BytesIO()
+    Image.new('RGBA', (256, 256), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class FakeAsset:
+    def __init__(self, key):
+        self.key = key
+        self.url = f'https://cdn.example/{key}.png'
+
+    def with_static_format(self, fmt):
+        return self
+
+    def with_size(self, size):
+        asset = FakeAsset(self.key)
+        asset.url = f'{self.url}?size={size}'
+        return asset
+
+
+class FakeWeb:
+    def __init__(self, error=None, body=None):
+        self.urls = []
+        self.error = error
+        self.body = body
+
+    async def get(self, url, cache=True):
+        self.urls.append(url)
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(status=200, body=self.body or _png((255, 0, 0, 255)))
+
+
+class InlineRender:
+    """Runs render jobs in the test process and records what was sent to them."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def submit(self, cog, func, *args):
+        self.sent.append(sum(len(a) for a in args if isinstance(a, bytes)))
+        return func(*args)
+
+
+def user(user_id, avatar_key='a'):
+    return SimpleNamespace(id=user_id, display_avatar=FakeAsset(avatar_key))
+
+
+class AvatarCacheTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.web = FakeWeb()
+        self.render = InlineRender()
+        self.cache = AvatarCache(self.web, self.render)
+
+    async def test_miss_then_hit(self):
+        first = await self.cache.get(user(1), 128)
+        self.assertEqual(len(first), 128 * 128 * 4)
+        self.assertEqual(self.web.urls, ['https://cdn.example/a.png?size=128'])
+        self.assertIs(await self.cache.get(user(1), 128), first)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        # A new avatar hash or another size is a different entry.
+        await self.cache.get(user(1, 'b'), 128)
+        await self.cache.get(user(1), 150)
+        self.assertEqual(self.cache.misses, 3)
+        self.assertEqual(self.cache.bytes, 2 * 128 * 128 * 4 + 150 * 150 * 4)
+
+    async def test_concurrent_misses_fetch_once(self):
+        results = await asyncio.gather(*(self.cache.get(user(1), 64) for _ in range(5)))
+        self.assertEqual(len(self.web.urls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    async def test_budget_evicts_least_recently_used(self):
+        entry = 64 * 64 * 4
+        self.cache.budget_bytes = entry * 2
+        await self.cache.get(user(1), 64)
+        await self.cache.get(user(2), 64)
+        await self.cache.get(user(1), 64)
+        await self.cache.get(user(3), 64)
+        self.assertEqual((len(self.cache), self.cache.evictions, self.cache.bytes), (2, 1, entry * 2))
+        await self.cache.get(user(1), 64)
+        self.assertEqual(self.cache.misses, 3)
+        await self.cache.get(user(2), 64)
+        self.assertEqual(self.cache.misses, 4)
+
+    async def test_disk_tier_survives_restart(self):
+        disk = tempfile.mkdtemp(prefix='jackybot_avatars_')
+        self.addCleanup(shutil.rmtree, disk, True)
+        data = await AvatarCache(self.web, self.render, disk_dir=disk).get(user(1), 64)
+        cache = AvatarCache(self.web, self.render, disk_dir=disk)
+        self.assertEqual(await cache.get(user(1), 64), data)
+        self.assertEqual((cache.disk_hits, cache.misses, len(self.web.urls)), (1, 0, 1))
+
+    async def test_failed_fetch_or_decode_is_a_miss(self):
+        for web in (FakeWeb(error=aiohttp.ClientConnectionError()), FakeWeb(error=asyncio.TimeoutError()),
+                    FakeWeb(body=b'not an image')):
+            cache = AvatarCache(web, self.render)
+            with self.assertLogs('jackybot.avatars', 'WARNING'):
+                self.assertIsNone(await cache.get(user(1), 64))
+            self.assertEqual((cache.misses, len(cache)), (1, 0))
+
+    async def test_aura_renders_from_a_thumbnail_at_its_own_size(self):
+        data = await self.cache.get(user(1), 128)
+        gif = await self.render.submit('aura', aura_gif, data, 128, 128, 4, 42)
+        self.assertEqual(self.render.sent[-1], 128 * 128 * 4)
+        with Image.open(io.BytesIO(gif)) as image:
+            self.assertEqual((image.format, image.size), ('GIF', (128, 128)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,329 @@
+import asyncio
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import discord
+import yarl
+from aiohttp import web
+from discord.ext import commands
+
+from cogs.utils.cluster import shard_for_guild, shard_ranges, share_cooldowns, shared_cooldown
+from cogs.utils.ipc import IPCClient, IPCHub
+
+SHARD_COUNT = 2
+BOT_ID = 1000
+USER_ID = 4242
+# Snowflakes whose (id >> 22) % 2 land them on shard 0 and shard 1.
+GUILD_A = 2 << 22
+GUILD_B = 3 << 22
+CHANNEL_A = GUILD_A + 1
+CHANNEL_B = GUILD_B + 1
+TIMESTAMP = '2025-01-01T00:00:00+00:00'
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bot.py')
+
+
+def _worker_module(cluster_id):
+    """A private copy of bot.py, so each cluster has its own commands and cooldown state
+    the way separate worker processes would."""
+    os.environ.setdefault('GROQ_API_KEY', 'test')
+    spec = importlib.util.spec_from_file_location(f'jackybot_worker_{cluster_id}', BOT_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _json(data):
+    # discord.py only decodes bodies whose content type is exactly application/json
+    return web.Response(body=json.dumps(data).encode(), content_type='application/json')
+
+
+def _user(user_id, name, bot=False):
+    return {'id': str(user_id), 'username': name, 'discriminator': '0', 'global_name': None,
+            'avatar': None, 'bot': bot}
+
+
+def _guild(guild_id, channel_id):
+    return {
+        'id': str(guild_id), 'name': f'guild-{guild_id}', 'icon': None, 'owner_id': str(USER_ID),
+        'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0,
+                   'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}],
+        'channels': [{'id': str(channel_id), 'type': 0, 'name': 'general', 'position': 0,
+                      'permission_overwrites': [], 'guild_id': str(guild_id)}],
+        'members': [], 'member_count': 2, 'features': [], 'emojis': [], 'stickers': [],
+        'threads': [], 'voice_states': [], 'presences': [], 'unavailable': False, 'large': False,
+    }
+
+
+class FakeDiscord:
+    """Just enough of Discord's REST API and gateway for AutoShardedBot to log in,
+    identify per shard, receive its guilds and send messages."""
+
+    def __init__(self):
+        self.sockets = {}
+        self.sent = []
+        self.identified = {}
+        app = web.Application()
+        app.router.add_get('/api/v10/users/@me', self.me)
+        app.router.add_get('/api/v10/oauth2/applications/@me', self.application)
+        app.router.add_get('/api/v10/gateway', self.gateway_info)
+        app.router.add_post('/api/v10/channels/{channel_id}/messages', self.create_message)
+        app.router.add_get('/gateway', self.gateway)
+        self.runner = web.AppRunner(app)
+
+    async def start(self):
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    async def close(self):
+        for ws in list(self.sockets.values()):
+            await ws.close()
+        await self.runner.cleanup()
+
+    async def me(self, request):
+        return _json(_user(BOT_ID, 'JackyBot', bot=True))
+
+    async def application(self, request):
+        return _json({'id': str(BOT_ID), 'name': 'JackyBot', 'description': '', 'icon': None,
+                      'bot_public': True, 'bot_require_code_grant': False, 'verify_key': '',
+                      'owner': _user(USER_ID, 'owner'), 'flags': 0})
+
+    async def gateway_info(self, request):
+        return _json({'url': f"{self.base.replace('http', 'ws')}/gateway"})
+
+    async def create_message(self, request):
+        payload = await request.json()
+        channel_id = request.match_info['channel_id']
+        self.sent.append((int(channel_id), payload.get('content')))
+        return _json({
+            'id': str(len(self.sent) + 10_000), 'channel_id': channel_id, 'author': _user(BOT_ID, 'JackyBot', bot=True),
+            'content': payload.get('content') or '', 'timestamp': TIMESTAMP, 'edited_timestamp': None,
+            'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [],
+            'embeds': [], 'pinned': False, 'type': 0,
+        })
+
+    async def gateway(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({'op': 10, 'd': {'heartbeat_interval': 45000}})
+        seq = 0
+        async for msg in ws:
+            data = json.loads(msg.data)
+            op = data['op']
+            if op == 1:
+                await ws.send_json({'op': 11, 'd': None})
+            elif op == 2:
+                shard_id, shard_count = data['d']['shard']
+                self.sockets[shard_id] = ws
+                self.identified[shard_id] = shard_count
+                guilds = [(g, c) for g, c in ((GUILD_A, CHANNEL_A), (GUILD_B, CHANNEL_B))
+                          if shard_for_guild(g, shard_count) == shard_id]
+                seq += 1
+                await ws.send_json({'op': 0, 's': seq, 't': 'READY', 'd': {
+                    'v': 10, 'user': _user(BOT_ID, 'JackyBot', bot=True),
+                    'guilds': [{'id': str(g), 'unavailable': True} for g, _ in guilds],
+                    'session_id': f'session-{shard_id}', 'resume_gateway_url': f"{self.base}/gateway",
+                    'shard': [shard_id, shard_count], 'application': {'id': str(BOT_ID), 'flags': 0},
+                }})
+                for guild_id, channel_id in guilds:
+                    seq += 1
+                    await ws.send_json({'op': 0, 's': seq, 't': 'GUILD_CREATE', 'd': _guild(guild_id, channel_id)})
+        return ws
+
+    async def send_message(self, shard_id, guild_id, channel_id, content, message_id):
+        await self.sockets[shard_id].send_json({'op': 0, 's': None, 't': 'MESSAGE_CREATE', 'd': {
+            'id': str(message_id), 'channel_id': str(channel_id), 'guild_id': str(guild_id),
+            'author': _user(USER_ID, 'someone'), 'member': {'roles': [], 'joined_at': TIMESTAMP, 'deaf': False, 'mute': False},
+            'content': content, 'timestamp': TIMESTAMP, 'edited_timestamp': None, 'tts': False,
+            'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [], 'embeds': [],
+            'pinned': False, 'type': 0,
+        }})
+
+
+class ShardRangesTest(unittest.TestCase):
+    def test_contiguous_and_complete(self):
+        ranges = shard_ranges(10, 3)
+        self.assertEqual(ranges, [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]])
+
+    def test_more_clusters_than_shards(self):
+        self.assertEqual(shard_ranges(2, 4), [[0], [1]])
+
+
+class SharedCooldownTest(unittest.IsolatedAsyncioTestCase):
+    async def test_charges_only_when_its_command_runs(self):
+        bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+
+        @bot.command()
+        @shared_cooldown(1, 60, commands.BucketType.user)
+        async def hello(ctx):
+            pass
+
+        @bot.before_invoke
+        async def unrelated_hook(ctx):
+            pass
+
+        author = SimpleNamespace(id=USER_ID)
+        mapping = hello.checks[0].cooldown_mapping
+        bucket = mapping.get_bucket(SimpleNamespace(author=author))
+        # Help asking whether the command could run is not a use.
+        help_ctx = SimpleNamespace(bot=bot, command=bot.get_command('help'), author=author,
+                                   message=SimpleNamespace(author=author))
+        self.assertTrue(await hello.checks[0](help_ctx))
+        self.assertEqual(bucket.get_tokens(), 1)
+
+        ctx = SimpleNamespace(bot=bot, command=hello, author=author, message=SimpleNamespace(author=author))
+        self.assertTrue(await hello.checks[0](ctx))
+        with self.assertRaises(commands.CommandOnCooldown):
+            await hello.checks[0](ctx)
+
+
+class IPCTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='jackybot_ipc_')
+        self.registry = os.path.join(self.tmp, 'registry.json')
+        self.hub = IPCHub(persist={'relay': self.registry})
+        port = await self.hub.start()
+        self.a = IPCClient(0, port=port)
+        self.b = IPCClient(1, port=port)
+        for client in (self.a, self.b):
+            client.start()
+            await client.wait_connected(5)
+        while len(self.hub.clusters) < 2:
+            await asyncio.sleep(0.01)
+
+    async def asyncTearDown(self):
+        await self.a.close()
+        await self.b.close()
+        await self.hub.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    async def test_publish_reaches_other_clusters_only(self):
+        got_a, got_b = [], asyncio.Queue()
+        self.a.on('relay', got_a.append)
+        self.b.on('relay', got_b.put_nowait)
+        self.a.publish('relay', {'guild_id': 1})
+        self.assertEqual(await asyncio.wait_for(got_b.get(), 5), {'guild_id': 1})
+        self.assertEqual(got_a, [])
+
+    async def test_update_merges_and_persists(self):
+        self.a.update('relay', {'1': {'channel_id': 11}})
+        self.b.update('relay', {'2': {'channel_id': 22}})
+        await asyncio.sleep(0.05)
+        self.assertEqual(await self.a.fetch('relay'), {'1': {'channel_id': 11}, '2': {'channel_id': 22}})
+        with open(self.registry) as f:
+            self.assertEqual(json.load(f), {'1': {'channel_id': 11}, '2': {'channel_id': 22}})
+
+
+class FakeGatewayClusterTest(unittest.IsolatedAsyncioTestCase):
+    """Two AutoShardedBot clusters, one shard each, against a local fake gateway."""
+
+    async def asyncSetUp(self):
+        self.discord = FakeDiscord()
+        await self.discord.start()
+        self.patches = [
+            patch.object(discord.http.Route, 'BASE', f'{self.discord.base}/api/v10'),
+            patch.object(discord.gateway.DiscordWebSocket, 'DEFAULT_GATEWAY', yarl.URL(f'{self.discord.base}/gateway')),
+        ]
+        for p in self.patches:
+            p.start()
+
+        self.hub = IPCHub()
+        port = await self.hub.start()
+        self.errors = asyncio.Queue()
+        self.bots = []
+        self.runners = []
+        intents = discord.Intents.default()
+        intents.message_content = True
+        for cluster_id in range(SHARD_COUNT):
+            bot = commands.AutoShardedBot(command_prefix='!', intents=intents, shard_count=SHARD_COUNT,
+                                          shard_ids=[cluster_id], chunk_guilds_at_startup=False,
+                                          guild_ready_timeout=0.1)
+            bot.ipc = IPCClient(cluster_id, port=port)
+
+            @bot.command()
+            @shared_cooldown(1, 60, commands.BucketType.user)
+            async def hello(ctx):
+                await ctx.send('hi')
+
+            @bot.event
+            async def on_command_error(ctx, error, _errors=self.errors):
+                _errors.put_nowait(error)
+
+            bot.add_command(_worker_module(cluster_id).delete)
+            share_cooldowns(bot, bot.ipc)
+            bot.ipc.start()
+            await bot.ipc.wait_connected(5)
+            await bot.login('fake-token')
+            self.runners.append(asyncio.create_task(bot.connect(reconnect=False)))
+            self.bots.append(bot)
+        await asyncio.wait_for(asyncio.gather(*(bot.wait_until_ready() for bot in self.bots)), 15)
+
+    async def asyncTearDown(self):
+        for bot in self.bots:
+            await bot.close()
+            await bot.ipc.close()
+        for runner in self.runners:
+            runner.cancel()
+        await asyncio.gather(*self.runners, return_exceptions=True)
+        await self.hub.close()
+        await self.discord.close()
+        for p in self.patches:
+            p.stop()
+
+    async def test_each_cluster_owns_its_shard(self):
+        self.assertEqual(self.discord.identified, {0: SHARD_COUNT, 1: SHARD_COUNT})
+        self.assertEqual([g.id for g in self.bots[0].guilds], [GUILD_A])
+        self.assertEqual([g.id for g in self.bots[1].guilds], [GUILD_B])
+
+    async def test_cooldown_is_shared_across_clusters(self):
+        await self.discord.send_message(0, GUILD_A, CHANNEL_A, '!hello', 1)
+        for _ in range(200):
+            if self.discord.sent:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.discord.sent, [(CHANNEL_A, 'hi')])
+
+        # Wait for cluster 1 to have charged the user's bucket.
+        mapping = self.bots[1].get_command('hello').checks[0].cooldown_mapping
+        bucket = mapping.get_bucket(SimpleNamespace(author=SimpleNamespace(id=USER_ID)))
+        for _ in range(200):
+            if bucket.get_tokens() == 0:
+                break
+            await asyncio.sleep(0.01)
+
+        await self.discord.send_message(1, GUILD_B, CHANNEL_B, '!hello', 2)
+        error = await asyncio.wait_for(self.errors.get(), 5)
+        self.assertIsInstance(error, commands.CommandOnCooldown)
+        self.assertEqual(len(self.discord.sent), 1)
+
+    async def test_delete_cooldown_is_shared_across_clusters(self):
+        await self.discord.send_message(0, GUILD_A, CHANNEL_A, '!delete 1', 1)
+        for _ in range(200):
+            if self.discord.sent:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.discord.sent, [(CHANNEL_A, 'You are not authorized to use this command.')])
+
+        delete = self.bots[1].get_command('delete')
+        self.assertIsNot(delete, self.bots[0].get_command('delete'))
+        bucket = delete.checks[0].cooldown_mapping.get_bucket(SimpleNamespace(author=SimpleNamespace(id=USER_ID)))
+        for _ in range(200):
+            if bucket.get_tokens() == 0:
+                break
+            await asyncio.sleep(0.01)
+
+        await self.discord.send_message(1, GUILD_B, CHANNEL_B, '!delete 1', 2)
+        error = await asyncio.wait_for(self.errors.get(), 5)
+        self.assertIsInstance(error, commands.CommandOnCooldown)
+        self.assertEqual(len(self.discord.sent), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import discord
+
+os.environ.setdefault('GROQ_API_KEY', 'test')
+import bot as jackybot
+from cogs.utils import dispatch, schemas, serial
+from cogs.utils.dedupe import MessageDedupe
+from cogs.utils.dispatch import WebhookCache
+
+
+class FakeHook:
+    def __init__(self, hook_id):
+        self.id = hook_id
+        self.token = f'token-{hook_id}'
+        self.deleted = False
+
+    async def delete(self, reason=None):
+        self.deleted = True
+
+
+class FakeChannel:
+    def __init__(self, channel_id, allowed=True):
+        self.id = channel_id
+        self.allowed = allowed
+        self.created = 0
+
+    async def create_webhook(self, name):
+        self.created += 1
+        if not self.allowed:
+            raise discord.Forbidden(SimpleNamespace(status=403, reason='Forbidden'), 'Missing Permissions')
+        return FakeHook(self.id * 10)
+
+
+class WebhookCacheTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp(prefix='jackybot_webhooks_')
+        self.addCleanup(shutil.rmtree, tmp, True)
+        self.cache = WebhookCache(SimpleNamespace(user=None), os.path.join(tmp, 'webhooks.json'))
+
+    async def test_denied_channels_are_retried_after_the_ttl(self):
+        channel = FakeChannel(1, allowed=False)
+        with mock.patch.object(dispatch.time, 'monotonic', return_value=1000.0):
+            self.assertIsNone(await self.cache.get(channel))
+            self.assertIsNone(await self.cache.get(channel))
+        self.assertEqual(channel.created, 1)
+
+        channel.allowed = True
+        with mock.patch.object(dispatch.time, 'monotonic', return_value=1000.0 + dispatch._DENIED_TTL):
+            hook = await self.cache.get(channel)
+        self.assertEqual((hook.id, channel.created), (10, 2))
+
+    async def test_webhooks_of_channels_leaving_the_relay_are_deleted(self):
+        kept, dropped, left = [await self.cache.get(FakeChannel(i)) for i in (1, 2, 3)]
+        await self.cache.discard(3)
+        self.assertTrue(left.deleted)
+        await self.cache.prune({1})
+        self.assertEqual((kept.deleted, dropped.deleted), (False, True))
+        self.assertIs(await self.cache.get(FakeChannel(1)), kept)
+
+        saved = await serial.load(self.cache.path, schemas.RELAY_WEBHOOKS)
+        self.assertEqual(saved, {'1': {'id': 10, 'token': 'token-10'}})
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.sent = []
+
+    def broadcast(self, channels, embed):
+        self.sent.append(([ch.id for ch in channels], embed.description))
+
+    def forget(self, channel_id):
+        pass
+
+
+class RelayLoopTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dispatcher = FakeDispatcher()
+        self.channels = {1: SimpleNamespace(id=100, name='jackybot-chat'),
+                         2: SimpleNamespace(id=200, name='jackybot-chat')}
+        client = SimpleNamespace(ipc=None, process_commands=mock.AsyncMock())
+        members = SimpleNamespace(add=lambda guild_id, user_id: None)
+        patcher = mock.patch.multiple(
+            jackybot, bot=client, _bot_user=SimpleNamespace(id=1), _channels=self.channels,
+            _dispatcher=self.dispatcher, _member_index=members,
+            _processed=MessageDedupe(60, 100, 2),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def message(self, message_id, guild_id, author_id, webhook_id=None):
+        return SimpleNamespace(
+            id=message_id, author=SimpleNamespace(id=author_id, mention=f'<@{author_id}>'),
+            guild=SimpleNamespace(id=guild_id, name=f'guild {guild_id}'),
+            channel=self.channels[guild_id], webhook_id=webhook_id, content='hi', attachments=[],
+        )
+
+    async def test_relay_webhook_posts_are_not_broadcast_again(self):
+        await jackybot.on_message(self.message(1, 1, author_id=42))
+        self.assertEqual(self.dispatcher.sent, [([200], '<@42>: hi')])
+
+        # The copy the relay webhook posted in guild 2 comes back through on_message.
+        await jackybot.on_message(self.message(2, 2, author_id=900, webhook_id=900))
+        self.assertEqual(len(self.dispatcher.sent), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+from cogs.utils.errors import CommandErrors
+
+
+class CommandErrorsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+        self.errors = CommandErrors(self.bot)
+        self.errors.install()
+        self.seen = []
+        self.errors.observe(lambda ctx, error: self.seen.append(type(error).__name__))
+        self.ctx = SimpleNamespace(command=None, cog=None)
+
+    async def test_unclaimed_errors_keep_default_logging(self):
+        self.assertEqual(self.bot.on_command_error, self.errors.on_command_error)
+        self.assertNotIn('on_command_error', self.bot.extra_events)
+        with self.assertLogs('discord.ext.commands.bot', 'ERROR') as logs:
+            await self.bot.on_command_error(self.ctx, commands.CommandInvokeError(ValueError('boom')))
+        self.assertIn('Ignoring exception in command', logs.output[0])
+        self.assertEqual(self.seen, ['CommandInvokeError'])
+
+    async def test_handlers_claim_errors_in_order(self):
+        answered = []
+
+        async def busy(ctx, error):
+            if isinstance(error, commands.MaxConcurrencyReached):
+                answered.append('busy')
+                return True
+            return False
+
+        async def broken(ctx, error):
+            raise RuntimeError('handler bug')
+        self.errors.handle(broken)
+        self.errors.handle(busy)
+        with self.assertLogs('jackybot.errors', 'ERROR'):
+            await self.bot.on_command_error(self.ctx, commands.MaxConcurrencyReached(1, commands.BucketType.user))
+        self.assertEqual(answered, ['busy'])
+        self.errors.remove(busy)
+        with self.assertLogs('discord.ext.commands.bot', 'ERROR'):
+            await self.bot.on_command_error(self.ctx, commands.MaxConcurrencyReached(1, commands.BucketType.user))
+        self.assertEqual(answered, ['busy'])
+        self.assertEqual(len(self.seen), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import discord
+from discord.ext import commands
+
+from cogs.utils.lazy import LazyCogLoader
+
+COG = '''
+from discord.ext import commands
+{prelude}
+
+class Heavy(commands.Cog):
+    @commands.command()
+    async def heavy(self, ctx):
+        """Does heavy things"""
+
+
+async def setup(bot):
+    await bot.add_cog(Heavy())
+'''
+
+
+class LazyCogLoaderTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        tmp = tempfile.mkdtemp(prefix='jackybot_lazy_')
+        self.addCleanup(shutil.rmtree, tmp, True)
+        os.mkdir(os.path.join(tmp, 'lazycogs'))
+        open(os.path.join(tmp, 'lazycogs', '__init__.py'), 'w').close()
+        self.path = os.path.join(tmp, 'lazycogs', 'heavy.py')
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        self.addCleanup(os.chdir, cwd)
+        sys.path.insert(0, tmp)
+        self.addCleanup(sys.path.remove, tmp)
+        self.addCleanup(sys.modules.pop, 'lazycogs', None)
+        self.addCleanup(sys.modules.pop, 'lazycogs.heavy', None)
+        self.bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+        self.loader = LazyCogLoader(self.bot, cog_dir='lazycogs')
+
+    def write(self, prelude):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(COG.format(prelude=prelude))
+        importlib.invalidate_caches()
+
+    async def test_failed_import_keeps_the_stubs_and_retries(self):
+        self.write("raise ImportError('torch is missing')")
+        self.loader.register('heavy')
+        stub = self.bot.get_command('heavy')
+        self.assertEqual(self.loader.stub_module(stub), 'heavy')
+
+        self.assertFalse(await self.loader.ensure_loaded('heavy'))
+        self.assertIs(self.bot.get_command('heavy'), stub)
+        self.assertIn('torch is missing', str(self.loader.errors['heavy'].__cause__))
+
+        self.write("import os  # torch installed now")
+        self.assertTrue(await self.loader.ensure_loaded('heavy'))
+        self.assertIsNot(self.bot.get_command('heavy'), stub)
+        self.assertEqual((self.loader.pending, self.loader.errors), ((), {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
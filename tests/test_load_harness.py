@@ -0,0 +1,32 @@
+import asyncio
+import os
+import unittest
+
+from tests.load_harness import run_load
+
+# p99 latency budget per workload, generous enough for a loaded CI machine.
+# Override with JACKYBOT_LOAD_P99_MS.
+P99_BUDGET_MS = float(os.environ.get('JACKYBOT_LOAD_P99_MS', 1000))
+
+
+class LoadHarnessSmokeTest(unittest.TestCase):
+    """A tiny run of every workload, to keep the harness working as the bot changes."""
+
+    def test_small_mixed_workload(self):
+        report = asyncio.run(run_load(guilds=60, relay_guilds=3, messages=6, mentions=2, polls=2,
+                                      votes=4, rate=50, groq_latency=0, timeout=20, ready_timeout=60))
+
+        for kind, workload in report['workloads'].items():
+            self.assertEqual(workload['completed'], workload['sent'], kind)
+            self.assertGreater(workload['p99_ms'], 0, kind)
+            self.assertLessEqual(workload['p99_ms'], P99_BUDGET_MS, kind)
+        self.assertEqual(set(report['workloads']), {'relay', 'mention', 'poll', 'vote'})
+        self.assertFalse(report['unknown_routes'])
+        if report['rss'] is not None:
+            self.assertGreater(report['rss'], 0)
+        self.assertIsNotNone(report['loop_lag_p99_ms'])
+        self.assertLessEqual(report['loop_lag_p99_ms'], P99_BUDGET_MS)
+
+
+if __name__ == '__main__':
+    unittest.main()
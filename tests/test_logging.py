@@ -0,0 +1,165 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+from cogs.utils.logs import RateLimitFilter, SampleFilter, setup_logging
+
+# Wall-clock numbers depend on the machine, so the overhead benchmark only runs
+# with JACKYBOT_BENCHMARKS=1. Its mean event-loop time per log call through the
+# queue must stay under JACKYBOT_LOG_CALL_BUDGET_US.
+BENCHMARKS = bool(os.environ.get('JACKYBOT_BENCHMARKS'))
+LOG_CALL_BUDGET_US = float(os.environ.get('JACKYBOT_LOG_CALL_BUDGET_US', 50))
+SINK_DELAY = 0.0002
+TASKS = 20
+RECORDS_PER_TASK = 100
+
+
+class SlowSink(io.StringIO):
+    """A stream that is as slow as a busy terminal or disk."""
+
+    def write(self, text):
+        time.sleep(SINK_DELAY)
+        return super().write(text)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FilterTest(unittest.TestCase):
+    def _record(self, msg='hot path %s', name='jackybot.test', level=logging.INFO):
+        return logging.LogRecord(name, level, __file__, 1, msg, (1,), None)
+
+    def test_rate_limit_suppresses_and_reports(self):
+        clock = _Clock()
+        limiter = RateLimitFilter(rate=1.0, burst=3, clock=clock)
+        results = [limiter.filter(self._record()) for _ in range(10)]
+        self.assertEqual(results.count(True), 3)
+        self.assertEqual(limiter.suppressed, 7)
+        # Another call site has its own bucket.
+        self.assertTrue(limiter.filter(self._record('other %s')))
+
+        clock.now = 1.0
+        record = self._record()
+        self.assertTrue(limiter.filter(record))
+        self.assertEqual(record.suppressed, 7)
+
+    def test_sample_keeps_one_in_n(self):
+        sampler = SampleFilter(10)
+        kept = [r for r in (self._record() for _ in range(100)) if sampler.filter(r)]
+        self.assertEqual(len(kept), 10)
+        self.assertEqual(kept[0].sampled, 10)
+
+    def test_sample_passes_warnings_and_errors(self):
+        sampler = SampleFilter(10)
+        self.assertTrue(sampler.filter(self._record()))
+        for level in (logging.WARNING, logging.ERROR):
+            self.assertTrue(all(sampler.filter(self._record(level=level)) for _ in range(5)))
+        # Warnings are not counted against the info lines.
+        self.assertEqual(sum(sampler.filter(self._record()) for _ in range(10)), 1)
+
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='jackybot_logs_')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        root = logging.getLogger()
+        self.addCleanup(root.setLevel, root.level)
+
+    def test_structured_file_sampling_and_prints(self):
+        path = os.path.join(self.tmp, 'bot.jsonl')
+        sink = io.StringIO()
+        stdout = sys.stdout
+        pipeline = setup_logging(logging.INFO, path, sample={'jackybot.test.hot': 5},
+                                 capture_prints=True, stream=sink)
+        try:
+            self.assertIsNot(sys.stdout, stdout)
+            logging.getLogger('jackybot.test').info('budget %d/%d', 10, 20, extra={'tokens': 10})
+            for i in range(20):
+                logging.getLogger('jackybot.test.hot').info('hot %d', i)
+            logging.getLogger('jackybot.test.hot').error('hot failure')
+            print('legacy print')
+        finally:
+            pipeline.stop()
+        self.assertIs(sys.stdout, stdout)
+        self.assertEqual(logging.getLogger('jackybot.test.hot').filters, [])
+
+        with open(path, encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(entries[0]['msg'], 'budget 10/20')
+        self.assertEqual(entries[0]['tokens'], 10)
+        hot = [e for e in entries if e['logger'] == 'jackybot.test.hot']
+        self.assertEqual([e['msg'] for e in hot], ['hot 0', 'hot 5', 'hot 10', 'hot 15', 'hot failure'])
+        self.assertEqual(hot[0]['sampled'], 5)
+        self.assertIn('legacy print', sink.getvalue())
+
+
+@unittest.skipUnless(BENCHMARKS, 'set JACKYBOT_BENCHMARKS=1 to run timing benchmarks')
+class LoggingOverheadBenchmark(unittest.TestCase):
+    """Event-loop time spent in log calls, blocking handler vs. queue, against a slow sink."""
+
+    def setUp(self):
+        root = logging.getLogger()
+        self.addCleanup(root.setLevel, root.level)
+        root.setLevel(logging.INFO)
+        # Measure only our handlers, not the test runner's log capture.
+        handlers = root.handlers[:]
+        self.addCleanup(root.handlers.extend, handlers)
+        root.handlers.clear()
+
+    def _run(self, logger):
+        spent = 0.0
+        perf = time.perf_counter
+
+        async def worker(n):
+            nonlocal spent
+            for i in range(RECORDS_PER_TASK):
+                start = perf()
+                logger.info('request %d step %d', n, i)
+                spent += perf() - start
+                await asyncio.sleep(0)
+
+        async def main():
+            await asyncio.gather(*(worker(n) for n in range(TASKS)))
+
+        asyncio.run(main())
+        return spent / (TASKS * RECORDS_PER_TASK) * 1e6
+
+    def test_queue_keeps_logging_off_the_loop(self):
+        logger = logging.getLogger('jackybot.bench')
+
+        blocking = logging.StreamHandler(SlowSink())
+        logging.getLogger().addHandler(blocking)
+        try:
+            blocking_us = self._run(logger)
+        finally:
+            logging.getLogger().removeHandler(blocking)
+
+        sink = SlowSink()
+        # No rate limiting here: every record must reach the queue to be measured.
+        pipeline = setup_logging(logging.INFO, rate=1e9, burst=1e9, stream=sink)
+        try:
+            queued_us = self._run(logger)
+        finally:
+            pipeline.stop()
+
+        print(f"\nlog call on the loop: blocking {blocking_us:.1f} us, queued {queued_us:.1f} us "
+              f"({TASKS * RECORDS_PER_TASK} records, {SINK_DELAY * 1e6:.0f} us sink)")
+        self.assertEqual(sink.getvalue().count('\n'), TASKS * RECORDS_PER_TASK)
+        self.assertLess(queued_us, LOG_CALL_BUDGET_US)
+        self.assertLess(queued_us * 5, blocking_us)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from cogs.utils.member_index import _MAGIC, MemberIndex
+
+GUILD = 1234
+
+
+class MemberIndexTest(unittest.TestCase):
+    def test_add_and_remove_keep_the_array_sorted(self):
+        index = MemberIndex()
+        index.add_many(GUILD, (5, 1, 4))
+        self.assertEqual(index.add_many(GUILD, (3, 2, 4)), 2)
+        self.assertFalse(index.add(GUILD, 3))
+        self.assertTrue(index.add(GUILD, 0))
+        self.assertTrue(index.remove(GUILD, 2))
+        self.assertFalse(index.remove(GUILD, 2))
+        self.assertNotIn((GUILD, 2), index)
+        self.assertEqual(list(index._ids[GUILD]), [0, 1, 3, 4, 5])
+        for user_id in (0, 1, 3, 4, 5):
+            self.assertIn((GUILD, user_id), index)
+            self.assertTrue(index.remove(GUILD, user_id))
+        self.assertEqual(index.count(GUILD), 0)
+
+    def test_stats_count_everything_at_eight_bytes_per_member(self):
+        index = MemberIndex()
+        index.add_many(GUILD, range(100_000))
+        for user_id in range(100_000, 101_000):
+            index.add(GUILD, user_id)
+        members = index.stats()['members']
+        self.assertEqual(members, 101_000)
+        self.assertLess(index.stats()['bytes'], members * 8 * 1.2)
+
+    def test_sample_is_distinct_and_honours_exclude(self):
+        index = MemberIndex()
+        index.add_many(GUILD, range(1, 1001))
+        for _ in range(50):
+            picked = index.sample(GUILD, 5, exclude={1, 2, 3})
+            self.assertEqual(len(set(picked)), 5)
+            self.assertFalse({1, 2, 3} & set(picked))
+        index = MemberIndex()
+        index.add_many(GUILD, (1, 2))
+        self.assertEqual(index.random_member(GUILD, exclude=(1,)), 2)
+        self.assertEqual(sorted(index.sample(GUILD, 5)), [1, 2])
+        self.assertIsNone(index.random_member(GUILD + 1))
+
+    def test_round_trips_through_disk(self):
+        tmp = tempfile.mkdtemp(prefix='jackybot_members_')
+        self.addCleanup(shutil.rmtree, tmp, True)
+        path = os.path.join(tmp, 'member_index.bin')
+        index = MemberIndex(path)
+        index.add_many(GUILD, (10, 20, 30))
+        index.add(GUILD + 1, 2 ** 63 + 7)
+
+        async def roundtrip():
+            await index.save()
+            restored = MemberIndex(path)
+            await restored.load()
+            return restored
+
+        restored = asyncio.run(roundtrip())
+        self.assertEqual(sorted(restored.sample(GUILD, 10)), [10, 20, 30])
+        self.assertEqual(restored.random_member(GUILD + 1), 2 ** 63 + 7)
+        self.assertTrue(restored.remove(GUILD, 20))
+
+    def test_loads_unsorted_snapshots(self):
+        tmp = tempfile.mkdtemp(prefix='jackybot_members_')
+        self.addCleanup(shutil.rmtree, tmp, True)
+        path = os.path.join(tmp, 'member_index.bin')
+        with open(path, 'wb') as f:
+            array('Q', (_MAGIC, GUILD, 3, 30, 10, 20)).tofile(f)
+        restored = MemberIndex(path)
+        self.assertEqual(asyncio.run(restored.load()), 3)
+        self.assertIn((GUILD, 10), restored)
+        self.assertTrue(restored.remove(GUILD, 30))
+
+
+if __name__ == '__main__':
+    unittest.main()
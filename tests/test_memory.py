@@ -0,0 +1,88 @@
+import unittest
+
+import discord
+from discord.ext import commands
+
+from cogs.utils.dedupe import MessageDedupe
+from cogs.utils.memory import MemoryAccountant, deep_size, parse_budgets
+
+
+class Leaky(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.cache = {}
+        self.seen = MessageDedupe(60, 1000, 2)
+        self.limit = 5
+        self.outside = []
+
+    def memory_containers(self):
+        return {'outside': lambda: self.outside}
+
+
+class DeepSizeTest(unittest.TestCase):
+    def test_counts_nested_payloads_once(self):
+        blob = b'x' * 10_000
+        size, objects, truncated = deep_size({'a': [blob, blob], 'b': (blob,)})
+        self.assertGreater(size, 10_000)
+        self.assertLess(size, 11_000)
+        self.assertFalse(truncated)
+
+    def test_excluded_objects_are_not_entered(self):
+        shared = [b'y' * 50_000]
+        size, _, _ = deep_size({'ref': shared}, exclude={id(shared)})
+        self.assertLess(size, 1_000)
+        # The root itself is always measured.
+        self.assertGreater(deep_size(shared, exclude={id(shared)})[0], 50_000)
+
+    def test_walk_stops_at_max_objects(self):
+        _, objects, truncated = deep_size(list(range(1000)), max_objects=100)
+        self.assertEqual(objects, 100)
+        self.assertTrue(truncated)
+
+    def test_parse_budgets(self):
+        self.assertEqual(parse_budgets('GroqChat._cache=1.5MB, Poll.active_polls=200items,Poll.active_polls=2kb'),
+                         {'GroqChat._cache': (3 << 19, None), 'Poll.active_polls': (2048, 200)})
+        with self.assertRaises(ValueError):
+            parse_budgets('GroqChat._cache=lots')
+
+
+class MemoryAccountantTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+        self.cog = Leaky(self.bot)
+        await self.bot.add_cog(self.cog)
+        self.memory = MemoryAccountant(self.bot, budgets={'Leaky.cache': (None, 50)}, history=3, interval=0)
+        self.memory.register('bot', 'queue', lambda: [b'z' * 1000])
+
+    async def test_attributes_containers_to_cogs(self):
+        self.cog.cache.update((i, bytes(1000)) for i in range(20))
+        self.cog.outside.append(b'w' * 5000)
+        rows = {row['name']: row for row in await self.memory.snapshot()}
+
+        self.assertEqual(set(rows), {'Leaky.cache', 'Leaky.seen', 'Leaky.outside', 'bot.queue'})
+        self.assertEqual(rows['Leaky.cache']['items'], 20)
+        self.assertGreater(rows['Leaky.cache']['bytes'], 20_000)
+        self.assertGreater(rows['Leaky.outside']['bytes'], 5_000)
+        self.assertEqual(rows['Leaky.seen']['owner'], 'Leaky')
+        self.assertEqual(set(self.memory.by_cog()), {'Leaky', 'bot'})
+
+        await self.bot.remove_cog('Leaky')
+        rows = await self.memory.snapshot()
+        self.assertEqual([row['name'] for row in rows], ['bot.queue'])
+
+    async def test_warns_on_budget_and_steady_growth(self):
+        with self.assertLogs('jackybot.memory', 'WARNING') as logs:
+            for n in range(1, 5):
+                self.cog.cache.update((f'{n}-{i}', b'v' * 100) for i in range(20))
+                await self.memory.snapshot()
+        messages = '\n'.join(logs.output)
+        self.assertEqual(messages.count('Memory budget exceeded: Leaky.cache'), 1)
+        self.assertEqual(messages.count('Possible leak: Leaky.cache'), 1)
+        self.assertNotIn('Leaky.seen', messages)
+        row = next(r for r in self.memory.rows if r['name'] == 'Leaky.cache')
+        self.assertTrue(row['over_budget'] and row['growing'])
+        self.assertGreater(row['growth_per_hour'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from cogs.utils.overload import (COSMETIC, CRITICAL, ELEVATED, HEAVY, INTERACTIVE, NORMAL, OVERLOADED,
+                                 Overloaded, OverloadController)
+from cogs.utils.scheduler import Scheduler
+
+
+class OverloadControllerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.controller = OverloadController(lag_limit=0.25, cpu_limit=0.9, rss_limit=1000, smoothing=1.0)
+
+    def test_levels_follow_the_worst_signal_with_hysteresis(self):
+        update = self.controller.update
+        self.assertEqual(update(lag=0.05, cpu=0.3), NORMAL)
+        self.assertEqual(update(lag=0.05, cpu=0.3, rss=750), ELEVATED)
+        self.assertEqual(update(lag=0.3), OVERLOADED)
+        # Just under the threshold is not enough to recover.
+        self.assertEqual(update(lag=0.24), OVERLOADED)
+        self.assertEqual(update(lag=0.19), ELEVATED)
+        self.assertEqual(update(cpu=0.0), NORMAL)
+
+        smoothed = OverloadController(smoothing=0.5)
+        self.assertEqual(smoothed.update(lag=0.4), ELEVATED)
+        self.assertEqual(smoothed.update(lag=0.4), OVERLOADED)
+
+    async def test_samples_on_the_scheduler_using_the_metrics_lag(self):
+        scheduler = Scheduler()
+        self.addCleanup(scheduler.stop)
+        self.controller.start(scheduler, SimpleNamespace(lag_last=0.5))
+        self.assertIn('overload.sample', scheduler.jobs)
+        await self.controller.sample()
+        await self.controller.sample()
+        self.assertEqual((self.controller.level, self.controller.signals['lag']), (OVERLOADED, 2.0))
+        self.controller.stop()
+        self.assertNotIn('overload.sample', scheduler.jobs)
+
+    def test_shedding_by_priority(self):
+        controller = self.controller
+        for name, priority in (('groq', INTERACTIVE), ('video', HEAVY), ('record', CRITICAL)):
+            controller.register(name, priority, concurrency=1, max_queue=None)
+        controller.update(lag=0.2)
+        self.assertEqual(controller.scale(128, 64), 64)
+        self.assertEqual(controller.scale(100, 64), 64)
+        self.assertFalse(controller.allows(COSMETIC))
+        controller.admit('video')
+
+        controller.update(lag=1.0)
+        with self.assertRaises(Overloaded) as shed:
+            controller.admit('video')
+        self.assertEqual(shed.exception.retry_after, controller.retry_after)
+        self.assertIn('Try again in 15s', shed.exception.user_message())
+        controller.admit('groq')
+        controller.admit('record')
+        self.assertEqual(controller.stats()['subsystems']['video']['rejected'], 1)
+        self.assertEqual(controller.deferred, 1)
+
+        controller.update()
+        self.assertEqual(controller.scale(128, 64), 128)
+        self.assertTrue(controller.allows(COSMETIC))
+
+    def test_external_queue_depth_bounds_admission(self):
+        depth = [0]
+        self.controller.register('groq', INTERACTIVE, concurrency=2, max_queue=4, depth=lambda: depth[0],
+                                 service_time=2.0)
+        depth[0] = 5
+        self.controller.admit('groq')
+        depth[0] = 6
+        with self.assertRaises(Overloaded) as full:
+            self.controller.admit('groq')
+        self.assertEqual(full.exception.retry_after, 7.0)
+        # Interactive queues are halved while overloaded.
+        self.controller.update(lag=1.0)
+        depth[0] = 4
+        with self.assertRaises(Overloaded):
+            self.controller.admit('groq')
+
+    async def test_slots_queue_then_reject(self):
+        self.controller.register('video', HEAVY, concurrency=1, max_queue=1, service_time=10.0)
+        release = asyncio.Event()
+        waited = []
+
+        async def job(tag):
+            async def on_wait():
+                waited.append(tag)
+            async with self.controller.slot('video', on_wait=on_wait):
+                await release.wait()
+
+        first = asyncio.create_task(job('first'))
+        second = asyncio.create_task(job('second'))
+        await asyncio.sleep(0)
+        self.assertEqual(self.controller.queue_depths(), {'video': 2})
+        with self.assertRaises(Overloaded) as full:
+            await job('third')
+        self.assertEqual(full.exception.retry_after, 20.0)
+        self.assertEqual(waited, ['second'])
+
+        release.set()
+        await asyncio.gather(first, second)
+        self.assertEqual(self.controller.queue_depths(), {'video': 0})
+        self.assertEqual(self.controller.rejections(), {'video': 1})
+        self.assertLess(self.controller.subsystems['video'].service_time, 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
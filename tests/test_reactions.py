@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+
+import discord
+from discord.ext import commands
+
+from cogs.utils.reactions import ReactionDispatcher
+
+GUILD_ID = 10
+CHANNEL_ID = 20
+STAR = '⭐'
+
+
+def _payload(message_id, user_id, emoji=STAR, event_type='REACTION_ADD'):
+    data = {'message_id': message_id, 'channel_id': CHANNEL_ID, 'user_id': user_id,
+            'guild_id': GUILD_ID, 'type': 0}
+    return discord.RawReactionActionEvent(data, discord.PartialEmoji(name=emoji), event_type)
+
+
+class ReactionDispatcherTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+        self.dispatcher = ReactionDispatcher(self.bot, max_counters=3)
+        self.fetched = []
+
+        async def fetch(channel_id, message_id):
+            self.fetched.append(message_id)
+            return f'message-{message_id}'
+        self.dispatcher.fetch_message = fetch
+
+    async def add(self, message_id, user_id, emoji=STAR):
+        await self.dispatcher.on_raw_reaction_add(_payload(message_id, user_id, emoji))
+
+    async def remove(self, message_id, user_id, emoji=STAR):
+        await self.dispatcher.on_raw_reaction_remove(_payload(message_id, user_id, emoji, 'REACTION_REMOVE'))
+
+    async def test_threshold_fetches_once_when_crossed(self):
+        fired = []
+
+        async def handler(event):
+            fired.append((event.message_id, event.count, event.message))
+        self.dispatcher.subscribe(handler, emoji=STAR, threshold=2)
+
+        await self.add(1, 100)
+        await self.add(1, 100, emoji='👍')
+        self.assertEqual((fired, self.fetched), ([], []))
+        await self.add(1, 101)
+        await self.add(1, 102)
+        self.assertEqual(fired, [(1, 2, 'message-1')])
+        self.assertEqual(self.fetched, [1])
+
+        # Dropping below and climbing back crosses the threshold again.
+        await self.remove(1, 101)
+        await self.remove(1, 102)
+        await self.add(1, 103)
+        self.assertEqual(len(fired), 2)
+
+    async def test_unthresholded_subscription_uses_check_and_never_fetches(self):
+        seen = []
+
+        async def handler(event):
+            seen.append((event.message_id, event.emoji, event.added))
+        sub = self.dispatcher.subscribe(handler, emoji=('1️⃣', '2️⃣'), check=lambda p: p.message_id == 5, removes=True)
+
+        await self.add(5, 100, '1️⃣')
+        await self.add(6, 100, '1️⃣')
+        await self.add(5, 100, STAR)
+        await self.remove(5, 100, '2️⃣')
+        self.assertEqual(seen, [(5, '1️⃣', True), (5, '2️⃣', False)])
+        self.assertEqual(self.fetched, [])
+
+        self.dispatcher.unsubscribe(sub)
+        await self.add(5, 101, '2️⃣')
+        self.assertEqual(len(seen), 2)
+
+    async def test_counters_are_bounded(self):
+        async def handler(event):
+            pass
+        self.dispatcher.subscribe(handler, emoji=STAR, threshold=10)
+        for message_id in range(5):
+            await self.add(message_id, 100)
+        self.assertEqual(self.dispatcher.stats()['counters'], 3)
+        self.assertEqual(self.dispatcher.evictions, 2)
+
+    async def test_failing_handler_does_not_block_others(self):
+        calls = asyncio.Queue()
+
+        async def broken(event):
+            raise RuntimeError('boom')
+
+        async def working(event):
+            calls.put_nowait(event.user_id)
+        self.dispatcher.subscribe(broken, emoji=STAR)
+        self.dispatcher.subscribe(working, emoji=STAR)
+        await self.add(1, 100)
+        self.assertEqual(calls.get_nowait(), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
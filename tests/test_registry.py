@@ -0,0 +1,151 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+from cogs.help import CustomHelpCommand
+from cogs.utils.errors import CommandErrors
+from cogs.utils.registry import Bot, CommandRegistry
+
+
+class Music(commands.Cog):
+    @commands.command(aliases=['p'])
+    async def play(self, ctx, *, query):
+        """Play music in voice channel"""
+
+    @commands.group()
+    async def playlist(self, ctx):
+        """Manage playlists"""
+
+    @playlist.command()
+    async def create(self, ctx, name):
+        """Create a new playlist"""
+
+
+class CommandRegistryTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.bot = Bot(command_prefix='!', intents=discord.Intents.none(), help_command=None)
+        # Binds the client to this loop so bot.dispatch works without logging in.
+        await self.bot._async_setup_hook()
+        self.bot.errors = CommandErrors(self.bot)
+        self.registry = self.bot.registry = CommandRegistry(self.bot)
+        self.registry.install()
+
+        @self.bot.command()
+        async def ping(ctx):
+            """Check bot connection to Discord"""
+
+        @self.bot.command(hidden=True)
+        async def memory(ctx):
+            pass
+
+    async def test_snapshot_tables(self):
+        await self.bot.add_cog(Music())
+        snapshot = self.registry.snapshot
+        self.assertIs(self.registry.snapshot, snapshot)
+        self.assertEqual([info.name for info in snapshot.commands], ['ping', 'play', 'playlist', 'playlist create'])
+        self.assertIs(snapshot.get('P'), snapshot.get('play'))
+        self.assertEqual(snapshot.get('play').usage, '!play <query>')
+        self.assertEqual(snapshot.get('playlist create').summary, 'Create a new playlist')
+        self.assertIsNone(snapshot.get('memory'))
+        self.assertEqual(set(snapshot.categories), {'General'})
+        self.assertIn('`!ping` — Check bot connection to Discord', snapshot.embeds['General'].description)
+
+    async def test_suggestions(self):
+        await self.bot.add_cog(Music())
+        suggest = self.registry.snapshot.suggest
+        self.assertEqual([info.name for info in suggest('paly', limit=1)], ['play'])
+        self.assertEqual([info.name for info in suggest('pign')], ['ping'])
+        self.assertEqual([info.name for info in suggest('plaay')], ['play'])
+        # Prefixes of longer names match beyond the edit distance.
+        self.assertEqual([info.name for info in suggest('playlis', limit=1)], ['playlist'])
+        self.assertIn('playlist', [info.name for info in suggest('playl')])
+        self.assertEqual(suggest('volume'), [])
+
+    async def test_rebuilt_after_cog_changes(self):
+        events = []
+
+        async def on_cog_add(cog):
+            events.append(('add', cog.qualified_name))
+
+        async def on_cog_remove(cog):
+            events.append(('remove', cog.qualified_name))
+        self.bot.add_listener(on_cog_add)
+        self.bot.add_listener(on_cog_remove)
+
+        before = self.registry.snapshot
+        await self.bot.add_cog(Music())
+        after = self.registry.snapshot
+        self.assertIsNot(after, before)
+        self.assertIsNotNone(after.get('play'))
+        await self.bot.remove_cog('Music')
+        self.assertIsNone(self.registry.snapshot.get('play'))
+        self.assertGreater(self.registry.snapshot.version, after.version)
+        await asyncio.sleep(0)
+        self.assertEqual(events, [('add', 'Music'), ('remove', 'Music')])
+
+    def test_needs_the_bot_subclass(self):
+        plain = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+        plain.errors = CommandErrors(plain)
+        with self.assertRaises(TypeError):
+            CommandRegistry(plain).install()
+
+    async def test_unknown_commands_get_one_close_suggestion_per_channel(self):
+        await self.bot.add_cog(Music())
+        replies = []
+
+        def ctx(name, channel_id=1):
+            async def reply(content, **kwargs):
+                replies.append((channel_id, content))
+            return SimpleNamespace(invoked_with=name, prefix='!', channel=SimpleNamespace(id=channel_id),
+                                   reply=reply)
+
+        handle = self.registry._on_command_error
+        error = commands.CommandNotFound()
+        # Other bots' commands that only loosely resemble ours get no answer.
+        self.assertFalse(await handle(ctx('pl'), error))
+        self.assertFalse(await handle(ctx('rank'), error))
+        self.assertFalse(await handle(ctx('plyalsit'), error))
+        self.assertTrue(await handle(ctx('paly'), error))
+        self.assertEqual(replies, [(1, 'Unknown command `!paly`. Did you mean `!play <query>`?')])
+        # At most one reply per channel per cooldown.
+        self.assertFalse(await handle(ctx('pign'), error))
+        self.assertTrue(await handle(ctx('pign', channel_id=2), error))
+        self.assertEqual(len(replies), 2)
+
+    async def test_help_menu_survives_removed_categories(self):
+        class Fun(commands.Cog):
+            @commands.command()
+            async def joke(self, ctx):
+                """Tell a joke"""
+
+        Fun.joke.callback.__module__ = 'cogs.fun'
+        self.registry._modules = {'fun': 'Fun'}
+        await self.bot.add_cog(Fun())
+        help_cog = CustomHelpCommand(self.bot)
+        view = help_cog.HelpView(help_cog)
+        self.assertIn('Fun', [option.value for option in view.select.options])
+        await self.bot.remove_cog('Fun')
+
+        edits, followups = [], []
+
+        async def edit_message(**kwargs):
+            edits.append(kwargs)
+
+        async def send(content, **kwargs):
+            followups.append(content)
+
+        interaction = SimpleNamespace(data={'values': ['Fun']}, response=SimpleNamespace(edit_message=edit_message),
+                                      followup=SimpleNamespace(send=send))
+        await view.category_callback(interaction)
+        self.assertEqual(followups, ['The Fun category is no longer available.'])
+        self.assertNotIn('Fun', [option.value for option in view.select.options])
+        interaction.data = {'values': ['General']}
+        await view.category_callback(interaction)
+        self.assertIn('!ping', edits[-1]['embed'].description)
+
+
+if __name__ == '__main__':
+    unittest.main()
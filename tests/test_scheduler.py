@@ -0,0 +1,105 @@
+import asyncio
+import random
+import unittest
+
+from cogs.utils.scheduler import Scheduler
+
+
+class SchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.now = 1000.0
+        self.scheduler = Scheduler(clock=lambda: self.now, rng=random.Random(7))
+        self.runs = []
+
+    async def asyncTearDown(self):
+        self.scheduler.stop()
+
+    def job(self, tag):
+        async def run():
+            self.runs.append((tag, self.now))
+        return run
+
+    async def advance(self, seconds):
+        """Step the fake clock to each armed deadline in turn, firing the wheel as the timer would."""
+        scheduler = self.scheduler
+        end = self.now + seconds
+        while scheduler._armed is not None and scheduler._armed * scheduler.resolution <= end:
+            self.now = scheduler._armed * scheduler.resolution
+            scheduler._fire()
+            await asyncio.sleep(0)
+        self.now = end
+
+    async def test_jobs_run_on_schedule_across_levels(self):
+        self.scheduler.every('fast', 5, self.job('fast'))
+        self.scheduler.every('hourly', 3600, self.job('hourly'), delay=10)
+        self.scheduler.call_later('once', 70_000, self.job('once'))
+        await self.advance(3620)
+
+        self.assertEqual(sum(tag == 'fast' for tag, _ in self.runs), 724)
+        self.assertEqual([t for tag, t in self.runs if tag == 'hourly'], [1010.0, 4610.0])
+        self.scheduler.cancel('fast')
+        await self.advance(70_000)
+        self.assertEqual([t for tag, t in self.runs if tag == 'once'], [71_000.0])
+        self.assertNotIn('once', self.scheduler.jobs)
+        # One wakeup per occupied tick, never for empty stretches.
+        self.assertLess(self.scheduler.wakeups, len(self.runs) + 1)
+
+    async def test_alignment_coalesces_and_jitter_spreads(self):
+        for name, delay in (('a', 25), ('b', 40), ('c', 55)):
+            self.scheduler.every(name, 300, self.job(name), delay=delay, align=60)
+        await self.advance(900)
+        times = [t for _, t in self.runs]
+        self.assertEqual(len(times), 9)
+        self.assertEqual(sorted(set(times)), [1080.0, 1380.0, 1680.0])
+        self.assertEqual(self.scheduler.wakeups, 3)
+
+        self.runs.clear()
+        for n in range(8):
+            self.scheduler.every(f'poll{n}', 3600, self.job(n), delay=3600, jitter=300)
+        await self.advance(3600 + 300)
+        first = sorted(t for tag, t in self.runs if not isinstance(tag, str))
+        self.assertEqual(len(first), 8)
+        self.assertGreater(first[-1] - first[0], 60)
+        self.assertTrue(all(5200 <= t <= 5800 for t in first))
+
+    async def test_overlapping_runs_are_skipped_and_timed(self):
+        release = asyncio.Event()
+
+        async def slow():
+            self.runs.append(self.now)
+            await release.wait()
+        job = self.scheduler.every('slow', 10, slow)
+        await self.advance(35)
+        self.assertEqual(self.runs, [1010.0])
+        self.assertEqual(job.skipped, 2)
+        release.set()
+        await asyncio.sleep(0)
+        await self.advance(10)
+        self.assertEqual(len(self.runs), 2)
+        self.assertEqual(self.scheduler.skips, {'slow': 2})
+        self.assertEqual(self.scheduler.runtimes['slow'].count, 2)
+
+    async def test_failures_defer_and_missed_runs(self):
+        async def broken():
+            raise ValueError('nope')
+        job = self.scheduler.every('broken', 60, broken)
+        with self.assertLogs('jackybot.scheduler', 'ERROR'):
+            await self.advance(60)
+            await asyncio.sleep(0)
+        self.assertEqual((job.failures, job.last_error), (1, 'ValueError: nope'))
+        job.cancel()
+
+        ticker = self.scheduler.every('ticker', 60, self.job('ticker'))
+        ticker.defer(5)
+        await self.advance(5)
+        self.assertEqual(self.runs, [('ticker', 1065.0)])
+        # A blocked loop wakes late: the missed runs collapse into one.
+        self.now += 600
+        self.scheduler._fire()
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.runs), 2)
+        self.assertEqual(ticker.base, 1725.0)
+
+        self.assertEqual(self.scheduler.job_counts(), {'ticker': 1})
+        ticker.cancel()
+        self.assertIsNone(self.scheduler._armed)
@@ -0,0 +1,159 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+from typing import List
+from unittest import mock
+
+from cogs.utils import schemas, serial
+
+GUILDS = 5_000
+USERS = 50_000
+COGS = 25
+ROUNDS = 3
+
+
+class SerialTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='jackybot_serial_')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+
+    def test_round_trip_is_compact_and_stdlib_compatible(self):
+        path = os.path.join(self.tmp, 'state', 'channels.json')
+        data = {'515628838991167498': {'channel_id': 1133748117049708565}, '2': {'channel_id': 3}}
+        serial.write(path, data)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        self.assertNotIn(b' ', raw)
+        self.assertEqual(json.loads(raw), data)
+        self.assertEqual(serial.read(path, schemas.RELAY_CHANNELS), data)
+        # Int keys come back as strings, as with json.dumps.
+        self.assertEqual(serial.loads(serial.dumps({1: 'a'})), {'1': 'a'})
+        self.assertEqual(json.loads(serial.dumps(['é'], pretty=True)), ['é'])
+
+    def test_schema_errors_name_the_field(self):
+        serial.validate({'1': {'name': 'a', 'count': 2, 'last_used': '2025'}}, schemas.SERVER_STATS)
+        serial.validate([{'title': 'F1', 'added_by_id': 1}], schemas.MOVIES)
+        with self.assertRaisesRegex(serial.SchemaError, r'\$\.1\.count: expected int'):
+            serial.validate({'1': {'name': 'a', 'count': '2'}}, schemas.USER_STATS)
+        with self.assertRaisesRegex(serial.SchemaError, r"\$\[0\]: missing 'title'"):
+            serial.validate([{'added_by': 'x'}], schemas.MOVIES)
+        with self.assertRaisesRegex(serial.SchemaError, 'expected int'):
+            serial.validate({'a': True}, schemas.COUNTS)
+
+    def test_undecodable_files_are_moved_aside(self):
+        path = os.path.join(self.tmp, 'stats.json')
+        for content in (b'{"!love": 1', b'["!love"]'):
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.assertEqual(serial.read(path, schemas.COUNTS), {})
+            self.assertFalse(os.path.exists(path))
+            with open(f'{path}.bad', 'rb') as f:
+                self.assertEqual(f.read(), content)
+        self.assertEqual(serial.read(os.path.join(self.tmp, 'missing.json'), default=list), [])
+
+    def test_schema_mismatches_drop_only_the_bad_parts(self):
+        path = os.path.join(self.tmp, 'movies.json')
+        movies = [
+            {'title': 'Heat', 'added_by_id': '42', 'rating': 5},
+            {'suggested_by': 'x'},
+            {'title': 'Alien', 'watched_date': '2025-01-01'},
+        ]
+        serial.write(path, movies)
+        with open(path, 'rb') as f:
+            content = f.read()
+        # The legacy string ID is dropped, the unknown key kept, the untitled movie removed.
+        self.assertEqual(serial.read(path, schemas.MOVIES), [
+            {'title': 'Heat', 'rating': 5},
+            {'title': 'Alien', 'watched_date': '2025-01-01'},
+        ])
+        with open(f'{path}.bad', 'rb') as f:
+            self.assertEqual(f.read(), content)
+
+        stats = os.path.join(self.tmp, 'stats.json')
+        serial.write(stats, {'!love': 1, '!hate': 'many', '1': {'name': 'a', 'count': 'x'}})
+        self.assertEqual(serial.read(stats, schemas.COUNTS), {'!love': 1})
+        serial.write(stats, {'1': {'name': 'a', 'count': 'x'}, '2': {'name': 'b', 'count': 2}})
+        self.assertEqual(serial.read(stats, schemas.USER_STATS), {'2': {'name': 'b', 'count': 2}})
+
+    def test_list_errors_name_the_failing_position(self):
+        with self.assertRaisesRegex(serial.SchemaError, r'\$\[2\]: expected int'):
+            serial.validate([1, 1, 'x'], List[int])
+
+    def test_failed_write_keeps_previous_file(self):
+        path = os.path.join(self.tmp, 'stats.json')
+        serial.write(path, {'!love': 1})
+        with mock.patch('cogs.utils.serial.os.replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                serial.write(path, {'!love': 2})
+        self.assertEqual(serial.read(path), {'!love': 1})
+        self.assertEqual(os.listdir(self.tmp), ['stats.json'])
+
+
+def _large_state():
+    rng = random.Random(7)
+    ids = lambda n: [str(rng.getrandbits(60)) for _ in range(n)]
+    cogs = [f'cog_{i}' for i in range(COGS)]
+    return {
+        'user_stats': (schemas.USER_STATS, {uid: {'name': f'user{i}', 'count': rng.randrange(1, 5000)}
+                                            for i, uid in enumerate(ids(USERS))}),
+        'server_command_stats': (schemas.SERVER_STATS, {
+            gid: {'name': f'Guild {i}', 'count': rng.randrange(1, 10 ** 5), 'last_used': '2025-10-26T20:28:52.465386'}
+            for i, gid in enumerate(ids(GUILDS))}),
+        'cog_settings': (schemas.COG_SETTINGS, {gid: {cog: {'enabled': True, 'channel': int(gid) >> 3}
+                                                      for cog in cogs} for gid in ids(GUILDS)}),
+        'jackychat_channels': (schemas.RELAY_CHANNELS, {gid: {'channel_id': int(gid) + 1} for gid in ids(GUILDS)}),
+    }
+
+
+def _best(fn):
+    best = float('inf')
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+class SerializationBenchmark(unittest.TestCase):
+    """Load and save times for large state files: the old pretty-printed stdlib path vs. serial."""
+
+    def test_save_and_load(self):
+        tmp = tempfile.mkdtemp(prefix='jackybot_serial_bench_')
+        self.addCleanup(shutil.rmtree, tmp, True)
+        lines = [f"backend: {serial.BACKEND}",
+                 f"{'file':<22}{'size':>10}{'old save':>11}{'save':>9}{'old load':>11}{'load':>9}{'+schema':>9}"]
+        old_total = new_total = 0.0
+        for name, (schema, data) in _large_state().items():
+            old_path = os.path.join(tmp, f'{name}.old.json')
+            path = os.path.join(tmp, f'{name}.json')
+
+            def old_save():
+                with open(old_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=4)
+
+            def old_load():
+                with open(old_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+
+            old_save_ms = _best(old_save)
+            save_ms = _best(lambda: serial.write(path, data))
+            old_load_ms = _best(old_load)
+            load_ms = _best(lambda: serial.read(path))
+            checked_ms = _best(lambda: serial.read(path, schema))
+            self.assertEqual(serial.read(path, schema), old_load())
+            old_total += old_save_ms + old_load_ms
+            new_total += save_ms + checked_ms
+            size = os.path.getsize(path) / (1 << 20)
+            old_size = os.path.getsize(old_path) / (1 << 20)
+            lines.append(f"{name:<22}{size:>4.1f}/{old_size:.1f}MB{old_save_ms:>9.1f}ms{save_ms:>7.1f}ms"
+                         f"{old_load_ms:>9.1f}ms{load_ms:>7.1f}ms{checked_ms:>7.1f}ms")
+        print('\n' + '\n'.join(lines))
+        self.assertLess(new_total, old_total)
+
+
+if __name__ == '__main__':
+    unittest.main()
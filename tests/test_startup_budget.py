@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Per-cog and whole-boot budgets for loading the eager (non-lazy) cogs. Override
+# with JACKYBOT_COG_BUDGET_MS / JACKYBOT_BOOT_BUDGET_MS on slower machines.
+COG_BUDGET_MS = float(os.environ.get('JACKYBOT_COG_BUDGET_MS', 1000))
+BOOT_BUDGET_MS = float(os.environ.get('JACKYBOT_BOOT_BUDGET_MS', 5000))
+
+PROFILE_SCRIPT = """
+import asyncio, json, os, sys
+sys.path.insert(0, {root!r})
+os.environ.setdefault('GROQ_API_KEY', 'test')
+import bot as jackybot
+from cogs.utils.startup import StartupProfiler, discover_cogs
+
+async def main():
+    profiler = StartupProfiler()
+    client = jackybot.create_bot()
+    async with client:
+        eager, _ = discover_cogs(os.path.join({root!r}, 'cogs'), jackybot._DISABLED_COGS, jackybot._LAZY_COGS)
+        for name in eager:
+            try:
+                await profiler.load_extension(client, f'cogs.{{name}}')
+            except Exception:
+                pass
+    sys.stderr.write(profiler.table() + '\\n')
+    print(json.dumps(profiler.to_dict()))
+
+asyncio.run(main())
+"""
+
+
+class StartupBudgetTest(unittest.TestCase):
+    """Cold-loads every eager cog in a fresh interpreter and enforces import budgets."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Cogs read and write data/ and json/ relative to the working directory,
+        # so run against a scratch copy to keep the checkout untouched.
+        cls.workdir = tempfile.mkdtemp(prefix='jackybot_startup_')
+        for name in ('data', 'json'):
+            shutil.copytree(os.path.join(REPO_ROOT, name), os.path.join(cls.workdir, name))
+        for name in ('assets', 'jackybot_system_prompt.md'):
+            os.symlink(os.path.join(REPO_ROOT, name), os.path.join(cls.workdir, name))
+
+        result = subprocess.run(
+            [sys.executable, '-c', PROFILE_SCRIPT.format(root=REPO_ROOT)],
+            cwd=cls.workdir, capture_output=True, text=True, timeout=300,
+        )
+        if result.returncode != 0 or not result.stdout.strip():
+            shutil.rmtree(cls.workdir, ignore_errors=True)
+            raise AssertionError(f"Could not profile startup:\n{result.stderr[-2000:]}")
+        cls.profile = json.loads(result.stdout.strip().splitlines()[-1])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+
+    def test_cogs_within_budget(self):
+        loaded = [r for r in self.profile['cogs'] if not r['error']]
+        self.assertTrue(loaded, f"No cogs loaded: {[r['error'] for r in self.profile['cogs']]}")
+        slow = [f"{r['cog']}: {r['total_ms']:.0f} ms (import {r['import_ms']:.0f} ms)"
+                for r in loaded if r['total_ms'] > COG_BUDGET_MS]
+        self.assertFalse(slow, f"Cogs over the {COG_BUDGET_MS:.0f} ms startup budget: {slow}")
+
+    def test_boot_within_budget(self):
+        total = sum(r['total_ms'] for r in self.profile['cogs'] if not r['error'])
+        self.assertLessEqual(total, BOOT_BUDGET_MS,
+                             f"Eager cogs took {total:.0f} ms to load (budget {BOOT_BUDGET_MS:.0f} ms)")
+
+
+if __name__ == '__main__':
+    unittest.main()
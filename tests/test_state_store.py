@@ -0,0 +1,104 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from cogs.utils import state_store
+from cogs.utils.state_store import StateStore
+
+
+class StateStoreTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='jackybot_store_')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.path = os.path.join(self.tmp, 'state.db')
+        self.store = StateStore(self.path, flush_interval=0.01)
+        self.addCleanup(self.store.close)
+
+    async def test_load_imports_legacy_file_off_the_loop(self):
+        legacy = os.path.join(self.tmp, 'timezone_data.json')
+        with open(legacy, 'w', encoding='utf-8') as f:
+            json.dump({'1': ['UTC'], '2': ['Europe/London']}, f)
+
+        threads = []
+        namespace = state_store.StateStore.namespace
+
+        def spy(store, *args):
+            threads.append(threading.current_thread().name)
+            return namespace(store, *args)
+
+        state_store.StateStore.namespace = spy
+        self.addCleanup(setattr, state_store.StateStore, 'namespace', namespace)
+
+        ns = await self.store.load('timezone', legacy_path=legacy)
+        self.assertEqual(ns.to_dict(), {'1': ['UTC'], '2': ['Europe/London']})
+        self.assertTrue(threads[0].startswith('state-store-read'))
+        # A second load is served from memory.
+        self.assertIs(await self.store.load('timezone', legacy_path=legacy), ns)
+        self.assertEqual(len(threads), 1)
+
+    async def test_writes_survive_reopen(self):
+        ns = await self.store.load('timezone')
+        ns.put('1', ['UTC'])
+        ns.put('2', ['Asia/Tokyo'])
+        ns.delete('2')
+        await self.store.flush()
+        self.store.close()
+
+        reopened = StateStore(self.path)
+        self.addCleanup(reopened.close)
+        self.assertEqual((await reopened.load('timezone')).to_dict(), {'1': ['UTC']})
+
+    async def test_update_goes_through_the_database(self):
+        await self.store.prepare('timezone')
+        other = StateStore(self.path)
+        self.addCleanup(other.close)
+
+        add = lambda tz: lambda current: (current or []) + [tz]
+        await self.store.update('timezone', 1, add('UTC'))
+        # A second process sees the first one's write, and its own is not lost.
+        self.assertEqual(await other.update('timezone', 1, add('Asia/Tokyo')), ['UTC', 'Asia/Tokyo'])
+        self.assertEqual(await self.store.fetch('timezone', 1), ['UTC', 'Asia/Tokyo'])
+
+        self.assertIsNone(await self.store.update('timezone', 1, lambda current: None))
+        self.assertEqual(await self.store.fetch('timezone', 1, []), [])
+
+    async def test_failed_commit_is_retried_before_flush_returns(self):
+        ns = await self.store.load('timezone')
+        commit = StateStore._commit
+        batches = []
+
+        def locked_once(store, conn, pending, clears):
+            batches.append(dict(pending))
+            if len(batches) == 1:
+                # Written while the failing batch is in flight; it must not be undone.
+                ns.put('1', ['Asia/Tokyo'])
+                raise sqlite3.OperationalError('database is locked')
+            return commit(store, conn, pending, clears)
+
+        ns.put('1', ['UTC'])
+        ns.put('2', ['Europe/London'])
+        with mock.patch.object(StateStore, '_commit', locked_once), contextlib.redirect_stdout(io.StringIO()):
+            await self.store.flush()
+        self.assertEqual(len(batches), 2)
+        self.store.close()
+
+        reopened = StateStore(self.path)
+        self.addCleanup(reopened.close)
+        self.assertEqual((await reopened.load('timezone')).to_dict(), {'1': ['Asia/Tokyo'], '2': ['Europe/London']})
+
+    async def test_close_stops_the_read_thread(self):
+        await self.store.prepare('timezone')
+        self.store.close()
+        with self.assertRaises(RuntimeError):
+            await self.store.fetch('timezone', 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
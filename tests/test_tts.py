@@ -0,0 +1,180 @@
+import asyncio
+import io
+import os
+import stat
+import sys
+import tempfile
+import unittest
+import wave
+from array import array
+from types import SimpleNamespace
+
+import discord
+from aiohttp import web
+
+from cogs.utils.tts import CommandBackend, TTSBackend, TTSError, TTSPipeline, split_text
+
+FRAME_BYTES = discord.opus.Encoder.FRAME_SIZE
+
+# Stands in for ffmpeg: swallows the input, then writes 60 frames of PCM in slow pieces.
+SLOW_DECODER = f"""#!{sys.executable}
+import sys, time
+sys.stdin.buffer.read()
+for _ in range(3):
+    sys.stdout.buffer.write(b'\\1' * {FRAME_BYTES} * 20)
+    sys.stdout.buffer.flush()
+    time.sleep(0.1)
+"""
+
+
+class StubSynth(TTSBackend):
+    """Offline synthesizer: a 48kHz mono WAV whose length depends on the text."""
+
+    name = 'stub'
+    format = 'wav'
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    async def synthesize(self, text, lang, voice):
+        self.calls.append((text, lang, voice))
+        await asyncio.sleep(self.delay)
+        samples = array('h', (i % 1000 for i in range(960 * len(text) + 100)))
+        buf = io.BytesIO()
+        with wave.open(buf, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(48000)
+            w.writeframes(samples.tobytes())
+        return buf.getvalue()
+
+
+class Mp3Synth(StubSynth):
+    name = 'mp3'
+    format = 'mp3'
+
+
+class BackendTest(unittest.IsolatedAsyncioTestCase):
+    def test_backend_must_implement_synthesize(self):
+        with self.assertRaises(TypeError):
+            TTSBackend()
+
+    async def test_command_fills_only_its_placeholders(self):
+        script = 'import sys; sys.stdout.write(sys.argv[1] + sys.argv[2] + sys.stdin.read())'
+        backend = CommandBackend([sys.executable, '-c', script, '{"rate": 1}', '-v={voice}'])
+        self.assertEqual(await backend.synthesize('hi', 'en', 'en-gb'), b'{"rate": 1}-v=en-gbhi')
+        self.assertEqual(await backend.synthesize('hi', 'fr', None), b'{"rate": 1}-v=frhi')
+
+
+class SplitTextTest(unittest.TestCase):
+    def test_long_text_splits_at_sentences_then_words(self):
+        self.assertEqual(split_text('  one. two  '), ['one. two'])
+        sentence = 'word ' * 30
+        parts = split_text(f'{sentence}. {sentence}!', limit=100)
+        self.assertTrue(all(len(p) <= 100 for p in parts))
+        self.assertEqual(' '.join(parts).split(), f'{sentence}. {sentence}!'.split())
+        self.assertTrue(parts[1].endswith('.'))
+        self.assertEqual(split_text('x' * 250, limit=100), ['x' * 100, 'x' * 100, 'x' * 50])
+        self.assertEqual(split_text('   '), [])
+
+
+class TTSPipelineTest(unittest.IsolatedAsyncioTestCase):
+    async def test_repeated_phrase_is_served_from_cache(self):
+        synth = StubSynth()
+        tts = TTSPipeline(synth)
+        first = await tts.clip('hello there')
+        second = await tts.clip('  hello there ')
+        self.assertIs(first, second)
+        self.assertEqual(len(synth.calls), 1)
+        self.assertEqual((tts.hits, tts.misses), (1, 1))
+
+        await tts.clip('hello there', voice='co.uk')
+        await tts.clip('hello there', lang='fr')
+        self.assertEqual(len(synth.calls), 3)
+
+    async def test_concurrent_requests_synthesize_once(self):
+        synth = StubSynth(delay=0.05)
+        tts = TTSPipeline(synth)
+        clips = await asyncio.gather(*(tts.clip('same words') for _ in range(5)))
+        self.assertEqual(len(synth.calls), 1)
+        self.assertTrue(all(c is clips[0] for c in clips))
+
+    async def test_source_streams_whole_frames_from_memory(self):
+        tts = TTSPipeline(StubSynth())
+        clip = await tts.clip('abc')
+        source = clip.source()
+        frames = []
+        while True:
+            frame = source.read()
+            if not frame:
+                break
+            frames.append(frame)
+        self.assertEqual(len(frames), len(clip.frames))
+        self.assertEqual(source.is_opus(), discord.opus.is_loaded())
+        if not clip.opus:
+            self.assertTrue(all(len(f) == FRAME_BYTES for f in frames))
+            # Mono input is duplicated into both stereo channels.
+            pcm = array('h', frames[0])
+            self.assertEqual(pcm[2:8].tolist(), [1, 1, 2, 2, 3, 3])
+        # A second source replays the same cached frames from the start.
+        self.assertEqual(clip.source().read(), frames[0])
+
+    async def test_long_text_is_spoken_in_parts(self):
+        synth = StubSynth()
+        tts = TTSPipeline(synth)
+        text = ' '.join(f'This is sentence {i}.' for i in range(60))
+        with self.assertRaises(TTSError):
+            await tts.clip(text)
+        clips = [clip async for clip in tts.clips(text)]
+        self.assertGreater(len(clips), 1)
+        self.assertEqual(' '.join(call[0] for call in synth.calls).split(), text.split())
+
+    async def test_decoded_clip_plays_while_it_streams(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write(SLOW_DECODER)
+        self.addCleanup(os.unlink, f.name)
+        os.chmod(f.name, os.stat(f.name).st_mode | stat.S_IXUSR)
+
+        tts = TTSPipeline(Mp3Synth(), ffmpeg=f.name)
+        clip = await tts.clip('abc')
+        self.assertFalse(clip.done)
+        self.assertIs(await tts.clip('abc'), clip)
+        # The player thread reads ahead of the decoder and waits for each block.
+        frames = await asyncio.to_thread(lambda: list(iter(clip.source().read, b'')))
+        self.assertTrue(clip.done)
+        self.assertIsNone(clip.error)
+        self.assertEqual(len(frames), 60)
+        await asyncio.sleep(0)
+        self.assertEqual(tts.stats()['clips'], 1)
+        self.assertIs(await tts.clip('abc'), clip)
+
+    async def test_budget_evicts_least_recently_used(self):
+        synth = StubSynth()
+        tts = TTSPipeline(synth)
+        a = await tts.clip('aaaa')
+        tts.budget_bytes = a.nbytes * 2
+        await tts.clip('bbbb')
+        await tts.clip('aaaa')
+        await tts.clip('cccc')
+        self.assertEqual(tts.evictions, 1)
+        await tts.clip('aaaa')
+        self.assertEqual(len(synth.calls), 3)
+        await tts.clip('bbbb')
+        self.assertEqual(len(synth.calls), 4)
+
+    async def test_clips_are_served_for_lavalink(self):
+        tts = TTSPipeline(StubSynth(), base_url='http://127.0.0.1:9108/tts/')
+        clip = await tts.clip('abc')
+        url = tts.url(clip)
+        self.assertEqual(url, f'http://127.0.0.1:9108/tts/{clip.key}.wav')
+        request = SimpleNamespace(match_info={'name': url.rsplit('/', 1)[1]})
+        response = await tts.handle(request)
+        self.assertEqual((response.body, response.content_type), (clip.data, 'audio/wav'))
+        with self.assertRaises(web.HTTPNotFound):
+            await tts.handle(SimpleNamespace(match_info={'name': 'missing.wav'}))
+        self.assertIsNone(TTSPipeline(StubSynth()).url(clip))
+
+
+if __name__ == '__main__':
+    unittest.main()
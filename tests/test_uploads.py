@@ -0,0 +1,82 @@
+import unittest
+from types import SimpleNamespace
+
+from cogs.utils.uploads import (TooLarge, UploadGovernor, audio_ladder, gif_ladder, image_ladder, plan,
+                                video_ladder)
+
+MB = 1 << 20
+
+
+class LadderTest(unittest.TestCase):
+    def test_video_spends_the_budget_then_trades_resolution(self):
+        short = plan(video_ladder(10 * MB, 12, 1280, 720, 30), 10 * MB)
+        self.assertEqual(len(short), 3)
+        first = short[0].params
+        self.assertEqual((first['width'], first['height'], first['fps'], first['audio_kbps']), (1280, 720, 30, 128))
+        self.assertLessEqual(short[0].estimate, 10 * MB)
+        self.assertGreater(short[0].estimate, 9 * MB)
+        self.assertTrue(all(a.estimate > b.estimate for a, b in zip(short, short[1:])))
+
+        long = video_ladder(10 * MB, 200, 1920, 1080, 30)
+        self.assertLess(long[0].params['width'], 1920)
+        self.assertEqual(long[0].params['width'] % 2, 0)
+        self.assertEqual((long[-1].params['height'], long[-1].params['fps']), (240, 15))
+
+    def test_audio_prefers_wav_then_fitting_mp3(self):
+        rungs = plan(audio_ladder(10 * MB, 30, lossless=True), 10 * MB)
+        self.assertEqual(rungs[0].format, 'wav')
+        self.assertEqual(rungs[0].estimate, 30 * 48000 * 2 * 2 + 44)
+
+        rungs = plan(audio_ladder(10 * MB, 600, lossless=True), 10 * MB)
+        self.assertEqual([(r.format, r.params['kbps'], r.params['channels']) for r in rungs],
+                         [('mp3', 128, 2), ('mp3', 96, 2), ('mp3', 64, 1)])
+        # A lower cap (record under load) starts below the bitrate that would fit.
+        rungs = plan(audio_ladder(10 * MB, 30, max_kbps=64), 10 * MB)
+        self.assertEqual([(r.format, r.params['kbps']) for r in rungs], [('mp3', 64), ('mp3', 48), ('mp3', 32)])
+        # Nothing fits an hour at 10MB: only the cheapest rung is tried.
+        self.assertEqual([r.params['kbps'] for r in plan(audio_ladder(10 * MB, 3600), 10 * MB)], [32])
+
+    def test_gif_and_image_ladders(self):
+        rungs = plan(gif_ladder(512, 48, 42), MB)
+        self.assertEqual([(r.params['size'], r.params['frames']) for r in rungs], [(256, 16)])
+        self.assertEqual(rungs[0].params['frame_duration'], 126)
+        self.assertEqual(plan(gif_ladder(128, 48, 42), 10 * MB)[0].params['frames'], 48)
+
+        self.assertEqual(plan(image_ladder(800, 800), 10 * MB)[0].format, 'png')
+        self.assertEqual(plan(image_ladder(800, 800), 500_000)[0].params, {'quality': 92, 'scale': 1.0})
+
+
+class UploadGovernorTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.governor = UploadGovernor(headroom=1.0)
+
+    def test_budget_from_guild_limit(self):
+        self.assertEqual(self.governor.budget(SimpleNamespace(filesize_limit=50 * MB)), 50 * MB)
+        self.assertEqual(self.governor.budget(None), 10 * MB)
+
+    async def test_falls_back_until_the_output_fits(self):
+        sizes = {'png': 3 * MB, 92: 1500_000, 85: 900_000, 75: 400_000}
+        encoded = []
+
+        async def encode(rung):
+            encoded.append(rung.params['quality'])
+            return b'x' * sizes[rung.params['quality'] or 'png']
+
+        rung, data = await self.governor.fit('image_gen', image_ladder(800, 800), encode, 1_000_000)
+        # The PNG was skipped on its estimate; q92 came out too big, q85 fit.
+        self.assertEqual(encoded, [92, 85])
+        self.assertEqual((rung.params['quality'], len(data)), (85, 900_000))
+        self.assertEqual(self.governor.fallbacks, {'image_gen': 1})
+        self.assertEqual(self.governor.encodes, {'image_gen': 2})
+        self.assertEqual(self.governor.actual['image_gen'].count, 2)
+        self.assertGreater(self.governor.accuracy['image_gen'].sum, 2)
+
+        with self.assertRaises(TooLarge) as too_large:
+            await self.governor.fit('image_gen', image_ladder(800, 800), encode, 100_000)
+        self.assertEqual(too_large.exception.size, 400_000)
+        self.assertEqual(self.governor.oversize, {'image_gen': 1})
+        self.assertIn('upload limit', too_large.exception.user_message())
+
+
+if __name__ == '__main__':
+    unittest.main()
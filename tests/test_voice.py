@@ -0,0 +1,186 @@
+import asyncio
+import unittest
+
+import discord
+from discord.ext import commands
+
+from cogs.utils.voice import (PRIORITY_MUSIC, PRIORITY_RECORD, PRIORITY_TTS, ClipCancelled, VoiceBusy,
+                              VoiceManager, VoiceProducer)
+
+
+class FakeClient:
+    def __init__(self, channel):
+        self.channel = channel
+        self.connected = True
+        self.played = []
+        self._after = None
+
+    def is_connected(self):
+        return self.connected
+
+    async def move_to(self, channel):
+        self.channel = channel
+
+    async def disconnect(self, force=False):
+        self.connected = False
+        self.channel.guild.voice_client = None
+
+    def play(self, source, after=None):
+        self.played.append(source)
+        self._after = after
+
+    def finish(self):
+        after, self._after = self._after, None
+        after(None)
+
+
+class LocalClient(FakeClient):
+    pass
+
+
+class Player(FakeClient):
+    pass
+
+
+class RecordClient(FakeClient):
+    pass
+
+
+class FakeGuild:
+    id = 1
+    voice_client = None
+
+
+class FakeChannel:
+    def __init__(self, guild, name):
+        self.guild = guild
+        self.name = name
+        self.connects = 0
+
+    async def connect(self, cls, timeout):
+        self.connects += 1
+        client = self.guild.voice_client = cls(self)
+        return client
+
+
+class VoiceManagerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+        self.voice = VoiceManager(self.bot, linger=0)
+        self.guild = FakeGuild()
+        self.general = FakeChannel(self.guild, 'general')
+        self.gaming = FakeChannel(self.guild, 'gaming')
+        self.resumed = []
+
+        async def suspend(player):
+            return {'position': 42}
+
+        async def resume(channel, state):
+            await self.voice.acquire(channel, self.music)
+            self.resumed.append((channel.name, state))
+        self.music = VoiceProducer('music', PRIORITY_MUSIC, Player, suspend, resume)
+        self.tts = VoiceProducer('tts', PRIORITY_TTS, LocalClient)
+        self.record = VoiceProducer('record', PRIORITY_RECORD, LocalClient)
+
+    async def test_local_producers_share_one_connection(self):
+        client = await self.voice.acquire(self.general, self.record)
+        self.assertIs(await self.voice.play(self.general, self.tts, 'hello'), client)
+        self.assertEqual(self.general.connects, 1)
+        self.assertEqual(client.played, ['hello'])
+        self.assertEqual(self.voice.holders(self.guild), ['record', 'tts'])
+
+        # The recording outranks TTS, so TTS cannot drag the client to another channel.
+        with self.assertRaises(VoiceBusy):
+            await self.voice.acquire(self.gaming, self.tts)
+        client.finish()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.assertEqual(self.voice.holders(self.guild), ['record'])
+        await self.voice.release(self.guild, self.record, disconnect=True)
+        self.assertIsNone(self.guild.voice_client)
+        self.assertEqual(self.voice.counters['reuses'], 1)
+        self.assertIn('record', self.voice.connect_latency)
+
+    async def test_tts_suspends_music_and_resumes_it(self):
+        player = await self.voice.acquire(self.general, self.music)
+        heard = []
+        client = await self.voice.play(self.general, self.tts, 'one', after=heard.append)
+        await self.voice.play(self.general, self.tts, 'two', after=heard.append)
+        self.assertFalse(player.connected)
+        self.assertIsInstance(client, LocalClient)
+        self.assertEqual(self.voice.holders(self.guild), ['tts'])
+
+        client.finish()
+        await asyncio.sleep(0)
+        self.assertEqual(client.played, ['one', 'two'])
+        self.assertEqual(self.resumed, [])
+        client.finish()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        self.assertEqual(heard, [None, None])
+        self.assertEqual(self.resumed, [('general', {'position': 42})])
+        self.assertIsInstance(self.guild.voice_client, Player)
+        self.assertEqual(self.voice.holders(self.guild), ['music'])
+        self.assertEqual((self.voice.counters['preemptions'], self.voice.counters['resumes']), (1, 1))
+
+    async def test_lower_priority_waits_for_holder(self):
+        client = await self.voice.play(self.general, self.tts, 'clip')
+        with self.assertRaises(VoiceBusy) as busy:
+            await self.voice.acquire(self.general, self.music)
+        self.assertEqual(busy.exception.holder, 'tts')
+
+        waiting = asyncio.create_task(self.voice.acquire(self.general, self.music, wait=5))
+        await asyncio.sleep(0)
+        self.assertFalse(waiting.done())
+        client.finish()
+        player = await asyncio.wait_for(waiting, 1)
+        self.assertIsInstance(player, Player)
+        self.assertEqual(self.general.connects, 2)
+
+    async def test_queued_clips_play_by_priority(self):
+        low = VoiceProducer('chime', PRIORITY_MUSIC, LocalClient)
+        client = await self.voice.play(self.general, self.tts, 'first')
+        await self.voice.play(self.general, low, 'chime')
+        await self.voice.play(self.general, self.tts, 'second')
+        for _ in range(2):
+            client.finish()
+            await asyncio.sleep(0)
+        self.assertEqual(client.played, ['first', 'second', 'chime'])
+
+    async def test_music_plays_tts_over_its_own_connection(self):
+        shared = []
+
+        async def share(player, url, after):
+            shared.append((player, url))
+            after(None)
+            return True
+        music = VoiceProducer('music', PRIORITY_MUSIC, Player, share=share)
+        player = await self.voice.acquire(self.general, music)
+        heard = []
+        client = await self.voice.play(self.general, self.tts, 'clip', after=heard.append, url='http://bot/tts/k.wav')
+        self.assertIs(client, player)
+        self.assertTrue(player.connected)
+        self.assertEqual(shared, [(player, 'http://bot/tts/k.wav')])
+        self.assertEqual(heard, [None])
+        self.assertEqual(self.general.connects, 1)
+        self.assertEqual(self.voice.holders(self.guild), ['music'])
+        self.assertEqual(self.voice.counters['shares'], 1)
+
+        # Without a URL the connection is taken over as before.
+        await self.voice.play(self.general, self.tts, 'clip')
+        self.assertFalse(player.connected)
+
+    async def test_dropped_clips_are_cancelled(self):
+        client = await self.voice.play(self.general, self.tts, 'one')
+        heard = []
+        await self.voice.play(self.general, self.tts, 'two', after=heard.append)
+        await self.voice.play(self.general, self.tts, 'three', after=heard.append)
+        record = VoiceProducer('record', PRIORITY_RECORD, RecordClient)
+        await self.voice.acquire(self.general, record)
+        self.assertFalse(client.connected)
+        self.assertEqual(len(heard), 2)
+        self.assertTrue(all(isinstance(error, ClipCancelled) for error in heard))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+from aiohttp import web
+
+from cogs.utils.web import WebClient
+
+
+class WebClientTest(unittest.IsolatedAsyncioTestCase):
+    """Exercises WebClient against a local aiohttp server (no network access)."""
+
+    async def asyncSetUp(self):
+        self.hits = {}
+        self.conditional = 0
+        self.cache_dir = tempfile.mkdtemp(prefix='jackybot_http_')
+
+        app = web.Application()
+        app.router.add_get('/etag', self.etag_handler)
+        app.router.add_get('/modified', self.modified_handler)
+        app.router.add_get('/fresh', self.fresh_handler)
+        app.router.add_get('/slow', self.slow_handler)
+        app.router.add_get('/missing', self.missing_handler)
+        app.router.add_get('/lang', self.lang_handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base = f'http://127.0.0.1:{port}'
+        self.client = WebClient(cache_dir=self.cache_dir)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.runner.cleanup()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _hit(self, request):
+        self.hits[request.path] = self.hits.get(request.path, 0) + 1
+
+    async def etag_handler(self, request):
+        self._hit(request)
+        if request.headers.get('If-None-Match') == '"v1"':
+            self.conditional += 1
+            return web.Response(status=304, headers={'ETag': '"v1"'})
+        return web.json_response({'version': 1}, headers={'ETag': '"v1"'})
+
+    async def modified_handler(self, request):
+        self._hit(request)
+        stamp = 'Wed, 01 Jan 2025 00:00:00 GMT'
+        if request.headers.get('If-Modified-Since') == stamp:
+            self.conditional += 1
+            return web.Response(status=304)
+        return web.Response(text='hello', headers={'Last-Modified': stamp})
+
+    async def fresh_handler(self, request):
+        self._hit(request)
+        return web.Response(text='fresh', headers={'ETag': '"f"', 'Cache-Control': 'max-age=60'})
+
+    async def slow_handler(self, request):
+        self._hit(request)
+        await asyncio.sleep(0.2)
+        return web.Response(text='slow')
+
+    async def missing_handler(self, request):
+        self._hit(request)
+        return web.Response(status=404, text='nope')
+
+    async def lang_handler(self, request):
+        self._hit(request)
+        lang = request.headers.get('Accept-Language', 'en')
+        return web.Response(text=lang, headers={'ETag': f'"{lang}"', 'Vary': 'Accept-Language',
+                                                'Cache-Control': 'max-age=60'})
+
+    async def test_etag_revalidation_serves_cached_body(self):
+        first = await self.client.get(f'{self.base}/etag')
+        self.assertEqual(first.json(), {'version': 1})
+        self.assertFalse(first.from_cache)
+
+        second = await self.client.get(f'{self.base}/etag')
+        self.assertEqual(second.status, 200)
+        self.assertTrue(second.not_modified)
+        self.assertEqual(second.json(), {'version': 1})
+        self.assertEqual(self.conditional, 1)
+
+    async def test_last_modified_revalidation(self):
+        await self.client.get(f'{self.base}/modified')
+        resp = await self.client.get(f'{self.base}/modified')
+        self.assertTrue(resp.not_modified)
+        self.assertEqual(resp.text(), 'hello')
+
+    async def test_cache_survives_restart(self):
+        await self.client.get(f'{self.base}/etag')
+        await self.client.close()
+
+        self.client = WebClient(cache_dir=self.cache_dir)
+        resp = await self.client.get(f'{self.base}/etag')
+        self.assertTrue(resp.not_modified)
+        self.assertEqual(resp.json(), {'version': 1})
+
+    async def test_max_age_skips_network(self):
+        await self.client.get(f'{self.base}/fresh')
+        resp = await self.client.get(f'{self.base}/fresh')
+        self.assertTrue(resp.from_cache)
+        self.assertEqual(resp.text(), 'fresh')
+        self.assertEqual(self.hits['/fresh'], 1)
+
+    async def test_single_flight(self):
+        results = await asyncio.gather(*(self.client.get(f'{self.base}/slow') for _ in range(10)))
+        self.assertEqual({r.text() for r in results}, {'slow'})
+        self.assertEqual(self.hits['/slow'], 1)
+        self.assertEqual(self.client.coalesced, 9)
+
+    async def test_errors_are_not_cached(self):
+        resp = await self.client.get(f'{self.base}/missing')
+        self.assertEqual(resp.status, 404)
+        self.assertIsNone(await self.client.get_json(f'{self.base}/missing'))
+        self.assertEqual(self.hits['/missing'], 2)
+
+    async def test_cache_disabled(self):
+        await self.client.get(f'{self.base}/etag', cache=False)
+        resp = await self.client.get(f'{self.base}/etag', cache=False)
+        self.assertFalse(resp.from_cache)
+        self.assertEqual(self.conditional, 0)
+
+    async def test_header_varied_responses_do_not_collide(self):
+        french = await self.client.get(f'{self.base}/lang', headers={'Accept-Language': 'fr'})
+        english = await self.client.get(f'{self.base}/lang', headers={'Accept-Language': 'en'})
+        self.assertEqual((french.text(), english.text()), ('fr', 'en'))
+        again = await self.client.get(f'{self.base}/lang', headers={'Accept-Language': 'fr'})
+        self.assertTrue(again.from_cache)
+        self.assertEqual(again.text(), 'fr')
+        self.assertEqual(self.hits['/lang'], 2)
+
+    async def test_credentials_stay_out_of_the_disk_cache(self):
+        await self.client.get(f'{self.base}/etag?apikey=s3cret', params={'t': 'Heat', 'token': 'hunter2'})
+        stored = b''
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                with open(os.path.join(self.cache_dir, name), 'rb') as f:
+                    stored += f.read()
+        self.assertIn(b'apikey=***', stored)
+        self.assertIn(b't=Heat', stored)
+        self.assertNotIn(b's3cret', stored)
+        self.assertNotIn(b'hunter2', stored)
+
+
+if __name__ == '__main__':
+    unittest.main()